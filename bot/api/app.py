@@ -9,7 +9,6 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from sqlalchemy import select
 logger = logging.getLogger(__name__)
 from .probes import (
     APP_BOOT_TIME,
@@ -17,7 +16,8 @@ from .probes import (
     build_readiness_response,
     collect_readiness_checks,
 )
-from .websocket import router as ws_router
+from .rate_limit import rate_limit_headers_middleware
+from .websocket import manager as ws_manager, router as ws_router
 
 
 # Production origins only
@@ -68,8 +68,40 @@ async def lifespan(app: FastAPI):
     logger.info("Mini App API starting...")
     logger.info(f"Debug mode: {IS_DEBUG}")
     logger.info(f"CORS origins: {len(ALLOWED_ORIGINS)} configured")
+
+    from bot.services.achievements import install_achievement_tracking
+    from bot.services.admin_feed import install_admin_feed_tracking
+    from bot.services.order_stats import install_order_stats_tracking
+    from bot.services.profile_snapshot import install_profile_snapshot_tracking
+    from bot.services.time_series import install_series_tracking
+    from core.cache import start_invalidation_listener, stop_invalidation_listener
+    from core.config import settings
+    install_order_stats_tracking()
+    install_achievement_tracking()
+    install_profile_snapshot_tracking()
+    install_admin_feed_tracking()
+    install_series_tracking()
+    start_invalidation_listener()
+    if settings.WS_BACKPLANE_ENABLED:
+        try:
+            await ws_manager.start_backplane(shards=settings.WS_BACKPLANE_SHARDS)
+        except Exception as e:
+            logger.warning(f"WebSocket backplane disabled, Redis unavailable: {e}")
+            await ws_manager.stop_backplane()
+
+    from bot.services.broadcast import get_broadcast_engine, shutdown_broadcast_engine
+    try:
+        resumed = await get_broadcast_engine().resume_unfinished()
+        if resumed:
+            logger.info(f"Resumed {resumed} unfinished broadcast job(s)")
+    except Exception as e:
+        logger.warning(f"Broadcast jobs not resumed: {e}")
+
     yield
     app.state.accepting_traffic = False
+    await shutdown_broadcast_engine()
+    await ws_manager.stop_backplane()
+    await stop_invalidation_listener()
     logger.info("Mini App API shutting down...")
 
 
@@ -86,7 +118,9 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
 
-    # Rate limiting is handled per-endpoint via @rate_limit decorator (Redis-based)
+    # Rate limiting is handled per-endpoint via @rate_limit decorator (Redis-based);
+    # the middleware only exposes its verdict as X-RateLimit-* headers
+    app.middleware("http")(rate_limit_headers_middleware)
 
     # CORS for Mini App
     # Note: Cannot use "*" with credentials=True, must specify origins explicitly
@@ -113,10 +147,9 @@ def create_app() -> FastAPI:
     )
 
     # Include routers
-    from .routers import auth, orders, daily, chat, admin, god_mode, payments, assistant
-    from database.db import async_session_maker
-    from database.models.users import User
+    from .routers import auth, orders, daily, chat, admin, god_mode, payments, assistant, telegram_webhook
     from bot.api.auth import validate_init_data
+    from bot.services.terms_acceptance import is_terms_accepted
     from core.config import settings
 
     app.include_router(auth.router, prefix="/api")
@@ -128,6 +161,7 @@ def create_app() -> FastAPI:
     app.include_router(payments.router, prefix="/api")  # YooKassa payments
     app.include_router(assistant.router, prefix="/api")  # AI assistant (FAQ + complexity)
     app.include_router(ws_router)  # WebSocket for real-time updates
+    app.include_router(telegram_webhook.router)  # Bot updates (BOT_UPDATES_MODE=webhook)
 
     @app.middleware("http")
     async def enforce_terms_acceptance(request: Request, call_next):
@@ -145,13 +179,11 @@ def create_app() -> FastAPI:
             logger.warning(f"[Terms Gate] Auth skip for {path}: {error_reason}")
             return await call_next(request)
 
-        async with async_session_maker() as session:
-            result = await session.execute(
-                select(User.terms_accepted_at).where(User.telegram_id == tg_user.id)
-            )
-            terms_accepted_at = result.scalar_one_or_none()
+        # get_current_user picks this up instead of validating again
+        request.state.tg_user = tg_user
+        request.state.tg_init_data = init_data
 
-        if not terms_accepted_at:
+        if not await is_terms_accepted(tg_user.id):
             return JSONResponse(
                 status_code=403,
                 content={
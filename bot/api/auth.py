@@ -8,6 +8,8 @@ import hmac
 import json
 import logging
 import time
+from collections import OrderedDict
+from functools import lru_cache
 from urllib.parse import parse_qs, unquote
 from typing import Optional, Tuple
 from dataclasses import dataclass
@@ -34,6 +36,79 @@ class TelegramUser:
 # Header for Telegram initData
 telegram_header = APIKeyHeader(name="X-Telegram-Init-Data", auto_error=False)
 
+INIT_DATA_MAX_AGE_SECONDS = 86400  # 24 hours
+INIT_DATA_CACHE_SIZE = 10_000
+
+
+@lru_cache(maxsize=4)
+def _webapp_secret_key(bot_token: str) -> bytes:
+    """
+    Secret key: HMAC-SHA256("WebAppData", bot_token).
+    Note: hmac.new(key, msg, digestmod) - per Telegram docs and aiogram implementation,
+    key is "WebAppData", msg is bot_token (mathematical notation is msg, key order).
+    Depends only on the token, so it is derived once per token.
+    """
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+class InitDataCache:
+    """
+    Bounded LRU of successfully validated initData, keyed by its hash.
+
+    An entry is only returned for the exact same initData string and
+    expires together with the initData itself (auth_date + 24h).
+    """
+
+    def __init__(self, maxsize: int = INIT_DATA_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[str, TelegramUser, float]] = OrderedDict()
+
+    def get(self, received_hash: str, init_data: str, bot_token: str) -> Optional[TelegramUser]:
+        key = (received_hash, bot_token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        cached_init_data, user, expires_at = entry
+        if cached_init_data != init_data or time.time() > expires_at:
+            if time.time() > expires_at:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user
+
+    def set(self, received_hash: str, init_data: str, bot_token: str, user: TelegramUser, auth_date: int):
+        key = (received_hash, bot_token)
+        self._entries[key] = (init_data, user, auth_date + INIT_DATA_MAX_AGE_SECONDS)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_init_data_cache = InitDataCache()
+
+
+def _extract_hash(init_data: str) -> str:
+    """Fast path: pull the hash parameter out without parsing the whole string"""
+    for part in init_data.split("&"):
+        if part.startswith("hash="):
+            return part[5:]
+    return ""
+
 
 def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[TelegramUser], str]:
     """
@@ -41,6 +116,9 @@ def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[Telegra
 
     Returns (TelegramUser, "") if valid, (None, error_reason) otherwise
 
+    Successful results are cached by hash (see InitDataCache), so repeated
+    requests with the same initData skip parsing and HMAC.
+
     Algorithm:
     1. Parse init_data as URL query string
     2. Extract 'hash' parameter
@@ -52,6 +130,12 @@ def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[Telegra
         logger.warning("[AUTH] Empty initData received")
         return None, "empty_init_data"
 
+    cached_hash = _extract_hash(init_data)
+    if cached_hash:
+        cached_user = _init_data_cache.get(cached_hash, init_data, bot_token)
+        if cached_user is not None:
+            return cached_user, ""
+
     try:
         # Parse URL-encoded data
         parsed = parse_qs(init_data, keep_blank_values=True)
@@ -72,14 +156,8 @@ def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[Telegra
 
         data_check_string = '\n'.join(data_check_parts)
 
-        # Compute secret key: HMAC-SHA256("WebAppData", bot_token)
-        # Note: hmac.new(key, msg, digestmod) - per Telegram docs and aiogram implementation,
-        # key is "WebAppData", msg is bot_token (mathematical notation is msg, key order)
-        secret_key = hmac.new(
-            b"WebAppData",
-            bot_token.encode(),
-            hashlib.sha256
-        ).digest()
+        # Secret key is derived once per bot token
+        secret_key = _webapp_secret_key(bot_token)
 
         # Compute hash
         computed_hash = hmac.new(
@@ -99,7 +177,7 @@ def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[Telegra
         current_time = time.time()
         age_seconds = current_time - auth_date
 
-        if age_seconds > 86400:  # 24 hours
+        if age_seconds > INIT_DATA_MAX_AGE_SECONDS:
             logger.warning(f"[AUTH] initData too old: {age_seconds/3600:.1f} hours (auth_date={auth_date})")
             return None, "expired"
 
@@ -128,6 +206,9 @@ def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[Telegra
             is_premium=user_data.get('is_premium', False)
         )
 
+        if received_hash == cached_hash:
+            _init_data_cache.set(received_hash, init_data, bot_token, user, auth_date)
+
         logger.info(f"[AUTH] Success: user_id={user.id} username={user.username}")
         return user, ""
 
@@ -143,16 +224,24 @@ def validate_init_data(init_data: str, bot_token: str) -> Tuple[Optional[Telegra
 
 
 async def get_current_user(
-    init_data: Optional[str] = Depends(telegram_header)
+    request: Request,
+    init_data: Optional[str] = Depends(telegram_header),
 ) -> TelegramUser:
     """
     FastAPI dependency to get authenticated Telegram user
 
+    Reuses the user already validated by the terms middleware
+    (request.state.tg_user), so each request is validated once.
+
     Usage:
         @app.get("/api/user")
         async def get_user(user: TelegramUser = Depends(get_current_user)):
             ...
     """
+    validated = getattr(request.state, "tg_user", None)
+    if validated is not None and getattr(request.state, "tg_init_data", None) == init_data:
+        return validated
+
     if not init_data:
         logger.warning("[AUTH] Request without X-Telegram-Init-Data header")
         raise HTTPException(
@@ -183,4 +272,6 @@ async def get_current_user(
         detail = error_messages.get(error_reason, f"Invalid or expired initData ({error_reason})")
         raise HTTPException(status_code=401, detail=detail)
 
+    request.state.tg_user = user
+    request.state.tg_init_data = init_data
     return user
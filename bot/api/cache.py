@@ -1,51 +1,53 @@
 """
 Cache module for frequently accessed but rarely changed data.
 Reduces database queries by caching rank_levels and loyalty_levels.
+
+Backed by the two-tier cache in core/cache.py (in-process LRU + Redis),
+so a level change invalidated on one worker is dropped on all of them.
 """
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, Any
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.cache import CacheNamespace
 from database.models.levels import RankLevel, LoyaltyLevel
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache with TTL
-class SimpleCache:
-    """Simple in-memory cache with time-to-live (TTL) support"""
+LEVELS_TTL_SECONDS = 300  # 5 minutes
+
+_RANK_FIELDS = ("id", "name", "emoji", "min_spent", "cashback_percent", "bonus")
+_LOYALTY_FIELDS = ("id", "name", "emoji", "min_orders", "discount_percent")
 
-    def __init__(self):
-        self._cache: dict[str, tuple[Any, datetime]] = {}
 
-    def get(self, key: str, ttl_seconds: int = 300) -> Optional[Any]:
-        """Get value from cache if not expired (default TTL: 5 minutes)"""
-        if key not in self._cache:
-            return None
+def _encode_levels(fields: tuple[str, ...]):
+    def encode(levels) -> str:
+        return json.dumps([{field: getattr(level, field) for field in fields} for level in levels])
 
-        value, cached_at = self._cache[key]
-        if datetime.now() - cached_at > timedelta(seconds=ttl_seconds):
-            # Cache expired, remove it
-            del self._cache[key]
-            return None
+    return encode
 
-        return value
 
-    def set(self, key: str, value: Any):
-        """Set value in cache with current timestamp"""
-        self._cache[key] = (value, datetime.now())
+def _decode_levels(model):
+    def decode(raw: str):
+        # Detached (transient) instances: same attributes as rows loaded by the session
+        return [model(**row) for row in json.loads(raw)]
 
-    def clear(self, key: Optional[str] = None):
-        """Clear specific key or entire cache"""
-        if key:
-            self._cache.pop(key, None)
-        else:
-            self._cache.clear()
+    return decode
 
 
-# Global cache instance
-_cache = SimpleCache()
+rank_levels_cache = CacheNamespace(
+    "rank_levels",
+    ttl=LEVELS_TTL_SECONDS,
+    encode=_encode_levels(_RANK_FIELDS),
+    decode=_decode_levels(RankLevel),
+)
+loyalty_levels_cache = CacheNamespace(
+    "loyalty_levels",
+    ttl=LEVELS_TTL_SECONDS,
+    encode=_encode_levels(_LOYALTY_FIELDS),
+    decode=_decode_levels(LoyaltyLevel),
+)
 
 
 async def get_cached_rank_levels(session: AsyncSession) -> list[RankLevel]:
@@ -53,19 +55,12 @@ async def get_cached_rank_levels(session: AsyncSession) -> list[RankLevel]:
     Get rank levels with caching (5 minute TTL).
     These levels rarely change, so caching significantly reduces DB load.
     """
-    cache_key = "rank_levels"
-    cached = _cache.get(cache_key, ttl_seconds=300)  # 5 minutes
-
-    if cached is not None:
-        logger.debug(f"[Cache HIT] {cache_key}")
-        return cached
+    async def load():
+        logger.debug("[Cache MISS] rank_levels - fetching from DB")
+        result = await session.execute(select(RankLevel).order_by(RankLevel.min_spent))
+        return list(result.scalars().all())
 
-    logger.debug(f"[Cache MISS] {cache_key} - fetching from DB")
-    result = await session.execute(select(RankLevel).order_by(RankLevel.min_spent))
-    levels = result.scalars().all()
-
-    _cache.set(cache_key, levels)
-    return levels
+    return await rank_levels_cache.get_or_load("all", load)
 
 
 async def get_cached_loyalty_levels(session: AsyncSession) -> list[LoyaltyLevel]:
@@ -73,26 +68,19 @@ async def get_cached_loyalty_levels(session: AsyncSession) -> list[LoyaltyLevel]
     Get loyalty levels with caching (5 minute TTL).
     These levels rarely change, so caching significantly reduces DB load.
     """
-    cache_key = "loyalty_levels"
-    cached = _cache.get(cache_key, ttl_seconds=300)  # 5 minutes
-
-    if cached is not None:
-        logger.debug(f"[Cache HIT] {cache_key}")
-        return cached
-
-    logger.debug(f"[Cache MISS] {cache_key} - fetching from DB")
-    result = await session.execute(select(LoyaltyLevel).order_by(LoyaltyLevel.min_orders))
-    levels = result.scalars().all()
+    async def load():
+        logger.debug("[Cache MISS] loyalty_levels - fetching from DB")
+        result = await session.execute(select(LoyaltyLevel).order_by(LoyaltyLevel.min_orders))
+        return list(result.scalars().all())
 
-    _cache.set(cache_key, levels)
-    return levels
+    return await loyalty_levels_cache.get_or_load("all", load)
 
 
-def clear_levels_cache():
+async def clear_levels_cache():
     """
-    Clear cached levels data.
+    Clear cached levels data on every worker.
     Call this when rank_levels or loyalty_levels are modified in DB.
     """
-    _cache.clear("rank_levels")
-    _cache.clear("loyalty_levels")
+    await rank_levels_cache.invalidate("all")
+    await loyalty_levels_cache.invalidate("all")
     logger.info("[Cache] Cleared rank_levels and loyalty_levels cache")
@@ -0,0 +1,140 @@
+"""
+Keyset-пагинация списков API по (created_at, id).
+
+Страница читается как `WHERE (created_at, id) < (:created_at, :id)
+ORDER BY created_at DESC, id DESC LIMIT n + 1` — по составному индексу,
+без OFFSET: стоимость не зависит от номера страницы. Курсор непрозрачный
+(urlsafe base64 от [created_at, id] последней строки), клиент просто
+передаёт next_cursor обратно.
+
+Старые клиенты с offset продолжают работать: без cursor применяется
+OFFSET, но has_more считается по лишней строке, а не по COUNT(*).
+
+Общее количество (total) опционально:
+- без фильтров — оценка pg_class.reltuples (для больших таблиц);
+- с фильтрами или на маленьких таблицах — COUNT(*) в кэше на TOTALS_TTL_SECONDS.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Generic, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import Select, desc, func, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import CacheNamespace
+
+T = TypeVar("T")
+
+TOTALS_TTL_SECONDS = 60
+# Ниже этого порога reltuples неточен, а COUNT(*) и так дешёвый
+ESTIMATE_MIN_ROWS = 10_000
+
+totals_cache = CacheNamespace("list_totals", ttl=TOTALS_TTL_SECONDS, l1_ttl=15)
+
+
+@dataclass(frozen=True, slots=True)
+class Cursor:
+    created_at: datetime
+    id: int
+
+
+@dataclass(slots=True)
+class KeysetPage(Generic[T]):
+    items: Sequence[T]
+    has_more: bool
+    next_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Разобрать курсор; мусор от клиента — 400, а не 500."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return Cursor(created_at=datetime.fromisoformat(created_at), id=int(row_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор пагинации")
+
+
+def keyset_order(query: Select, model) -> Select:
+    return query.order_by(desc(model.created_at), desc(model.id))
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select,
+    model,
+    *,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+) -> KeysetPage:
+    """
+    Одна страница `query` (без order_by/limit) в порядке created_at DESC, id DESC.
+
+    С cursor — keyset, иначе legacy OFFSET. Читается limit + 1 строк:
+    лишняя строка говорит, есть ли следующая страница.
+    """
+    if cursor:
+        position = decode_cursor(cursor)
+        query = query.where(tuple_(model.created_at, model.id) < tuple_(position.created_at, position.id))
+    elif offset:
+        query = query.offset(offset)
+
+    result = await session.execute(keyset_order(query, model).limit(limit + 1))
+    rows = result.scalars().all()
+    items = rows[:limit]
+    has_more = len(rows) > limit
+    next_cursor = encode_cursor(items[-1].created_at, items[-1].id) if has_more else None
+    return KeysetPage(items=items, has_more=has_more, next_cursor=next_cursor)
+
+
+def totals_key(scope: str, **filters: Any) -> str:
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{scope}:{digest}"
+
+
+async def estimate_rows(session: AsyncSession, table_name: str) -> Optional[int]:
+    """Оценка числа строк по статистике планировщика (только PostgreSQL)."""
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+    estimate = await session.scalar(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    )
+    # -1: таблицу ещё не анализировали
+    if estimate is None or estimate < ESTIMATE_MIN_ROWS:
+        return None
+    return int(estimate)
+
+
+async def resolve_total(
+    session: AsyncSession,
+    query: Select,
+    model,
+    *,
+    cache_key: str,
+    filtered: bool,
+) -> int:
+    """Приблизительный total: reltuples для всей таблицы, иначе COUNT(*) из кэша."""
+    if not filtered:
+        estimate = await estimate_rows(session, model.__tablename__)
+        if estimate is not None:
+            return estimate
+
+    async def count() -> int:
+        return await session.scalar(select(func.count()).select_from(query.subquery())) or 0
+
+    return await totals_cache.get_or_load(cache_key, count)
@@ -1,17 +1,82 @@
 """
 Redis-based rate limiting for FastAPI.
 Replaces slowapi which crashes behind nginx reverse proxy.
-Uses sliding window counter via Redis INCR + EXPIRE.
+
+Uses GCRA (generic cell rate algorithm) in a single Lua script: one key per
+client holding the "theoretical arrival time", updated atomically together
+with its TTL. Equivalent to a sliding window of `limit` requests per
+`window` seconds, without the burst at fixed-window boundaries.
+
+An optional in-process token bucket with the same rate sits in front of
+Redis: it only sees this worker's share of the traffic, so when it is
+empty the global limit is exceeded too and the request is rejected
+without a Redis round-trip.
 """
 
 import logging
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
 from functools import wraps
 
 from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse
 
+from core.redis_pool import RedisScript
+from core.token_bucket import TokenBucket
+
 logger = logging.getLogger(__name__)
 
+# KEYS[1] — ключ клиента; ARGV[1] — интервал между запросами (мс),
+# ARGV[2] — допуск burst (мс) = limit * интервал.
+# Возвращает {allowed, remaining, reset_ms, retry_after_ms}.
+GCRA_SCRIPT = """
+local key = KEYS[1]
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local tat = tonumber(redis.call('GET', key)) or now
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission
+local allow_at = new_tat - tolerance
+if allow_at > now then
+    return {0, 0, tat - now, allow_at - now}
+end
+
+redis.call('SET', key, string.format('%d', new_tat), 'PX', new_tat - now)
+return {1, math.floor((now - allow_at) / emission), new_tat - now, 0}
+"""
+gcra = RedisScript(GCRA_SCRIPT)
+GCRA_SCRIPT_SHA = gcra.sha
+
+LOCAL_BUCKETS_MAX = 10_000
+_local_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float = 0.0
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
 
 def _get_client_ip(request: Request) -> str:
     """Extract real client IP, respecting proxy headers."""
@@ -26,25 +91,65 @@ def _get_client_ip(request: Request) -> str:
     return "unknown"
 
 
-async def check_rate_limit(key: str, limit: int, window_seconds: int) -> bool:
+def _local_bucket(key: str, limit: int, window_seconds: int) -> TokenBucket:
+    bucket = _local_buckets.get(key)
+    if bucket is None:
+        bucket = _local_buckets[key] = TokenBucket(rate=limit / window_seconds, capacity=limit)
+        if len(_local_buckets) > LOCAL_BUCKETS_MAX:
+            _local_buckets.popitem(last=False)
+    else:
+        _local_buckets.move_to_end(key)
+    return bucket
+
+
+async def acquire_rate_limit(
+    key: str,
+    limit: int,
+    window_seconds: int,
+    *,
+    local_prefilter: bool = True,
+) -> RateLimitResult:
     """
-    Check rate limit using Redis sliding window.
-    Returns True if request is ALLOWED, False if rate limit exceeded.
+    Take one request from the client's budget.
     Fails open (allows request) if Redis is unavailable.
     """
+    if local_prefilter:
+        bucket = _local_bucket(key, limit, window_seconds)
+        if not bucket.try_acquire():
+            retry_after = bucket.time_until()
+            return RateLimitResult(False, limit, 0, window_seconds, retry_after)
+
+    emission_ms = max(1, window_seconds * 1000 // limit)
     try:
         from core.redis_pool import get_redis
         redis = await get_redis()
-        current = await redis.incr(key)
-        if current == 1:
-            await redis.expire(key, window_seconds)
-        return current <= limit
+        allowed, remaining, reset_ms, retry_ms = await gcra(
+            redis, keys=[key], args=[emission_ms, emission_ms * limit],
+        )
     except Exception as e:
         logger.warning(f"[RateLimit] Redis error, allowing request: {e}")
-        return True  # Fail-open for rate limiting
+        return RateLimitResult(True, limit, limit, 0)  # Fail-open for rate limiting
+
+    return RateLimitResult(
+        allowed=bool(int(allowed)),
+        limit=limit,
+        remaining=int(remaining),
+        reset_after=int(reset_ms) / 1000,
+        retry_after=int(retry_ms) / 1000,
+    )
+
+
+async def check_rate_limit(key: str, limit: int, window_seconds: int) -> bool:
+    """
+    Check rate limit using the Redis GCRA script.
+    Returns True if request is ALLOWED, False if rate limit exceeded.
+    Fails open (allows request) if Redis is unavailable.
+    """
+    result = await acquire_rate_limit(key, limit, window_seconds, local_prefilter=False)
+    return result.allowed
 
 
-def rate_limit(limit: int = 30, window: int = 60, key_prefix: str = "rl"):
+def rate_limit(limit: int = 30, window: int = 60, key_prefix: str = "rl", local_prefilter: bool = True):
     """
     Rate limiting decorator for FastAPI endpoints.
 
@@ -55,6 +160,7 @@ def rate_limit(limit: int = 30, window: int = 60, key_prefix: str = "rl"):
             ...
 
     Note: The decorated function MUST have a `request: Request` parameter.
+    X-RateLimit-* headers are added to the response by rate_limit_headers_middleware.
     """
     def decorator(func):
         @wraps(func)
@@ -70,16 +176,29 @@ def rate_limit(limit: int = 30, window: int = 60, key_prefix: str = "rl"):
             if request:
                 ip = _get_client_ip(request)
                 key = f"{key_prefix}:{request.url.path}:{ip}"
-                if not await check_rate_limit(key, limit, window):
+                result = await acquire_rate_limit(key, limit, window, local_prefilter=local_prefilter)
+                request.state.rate_limit = result
+                if not result.allowed:
                     raise HTTPException(
                         status_code=429,
                         detail="Too many requests. Please try again later.",
+                        headers=result.headers,
                     )
             return await func(*args, **kwargs)
         return wrapper
     return decorator
 
 
+async def rate_limit_headers_middleware(request: Request, call_next):
+    """Copy the limiter verdict of the endpoint into X-RateLimit-* response headers."""
+    response = await call_next(request)
+    result = getattr(request.state, "rate_limit", None)
+    if result is not None:
+        for name, value in result.headers.items():
+            response.headers.setdefault(name, value)
+    return response
+
+
 async def rate_limit_exceeded_handler(request: Request, exc: Exception) -> JSONResponse:
     """Handler for rate limit exceeded errors (kept for compatibility)."""
     return JSONResponse(
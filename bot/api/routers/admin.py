@@ -3,14 +3,14 @@ import re
 from datetime import datetime, timedelta
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select, desc, func, text, and_
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, desc, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from aiogram import Bot
 
 from database.db import get_session
 from database.models.users import User
-from database.models.orders import Order, OrderStatus, WORK_TYPE_LABELS, canonicalize_order_status
+from database.models.orders import Order, OrderStatus, canonicalize_order_status
 from core.config import settings
 from bot.api.auth import TelegramUser, get_current_user
 from bot.api.schemas import (
@@ -21,6 +21,16 @@ from bot.api.schemas import (
     LiveEvent, LiveFeedResponse
 )
 from bot.bot_instance import get_bot
+from bot.services.admin_feed import recent_events
+from bot.services.order_stats import (
+    DONE_STATUSES,
+    get_daily_stats,
+    get_status_counters,
+    get_total_users,
+    msk_today,
+    sum_field,
+)
+from bot.services.time_series import MSK_TZ, bucket_step, get_series
 from bot.services.order_status_service import (
     OrderStatusDispatchOptions,
     OrderStatusTransitionError,
@@ -32,6 +42,11 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["Admin"])
 
+# Глубина графика выручки по гранулярности (дней)
+REVENUE_CHART_MAX_DAYS = {"hour": 14, "day": 90, "week": 365}
+
+LIVE_FEED_LIMIT = 30
+
 def is_admin(user_id: int) -> bool:
     """Check if user is in admin list"""
     return user_id in settings.ADMIN_IDS
@@ -266,78 +281,27 @@ async def get_admin_stats(
     if not is_admin(tg_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    now = datetime.utcnow()
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = today_start - timedelta(days=now.weekday())
+    # Агрегаты — из rollup-таблиц (bot/services/order_stats.py), без сканирования orders/users
+    today = msk_today()
+    week_start = today - timedelta(days=today.weekday())
     last_week_start = week_start - timedelta(days=7)
 
-    # Total revenue (from completed orders)
-    revenue_query = select(func.sum(Order.paid_amount)).where(Order.status == OrderStatus.COMPLETED.value)
-    revenue_res = await session.execute(revenue_query)
-    revenue = revenue_res.scalar() or 0.0
-
-    # Active orders count
-    active_query = select(func.count(Order.id)).where(
-        Order.status.notin_([OrderStatus.COMPLETED.value, OrderStatus.CANCELLED.value, OrderStatus.REJECTED.value])
-    )
-    active_res = await session.execute(active_query)
-    active_count = active_res.scalar() or 0
-
-    # Total users
-    users_query = select(func.count(User.id))
-    users_res = await session.execute(users_query)
-    users_count = users_res.scalar() or 0
-
-    # Orders by status
-    status_query = select(Order.status, func.count(Order.id)).group_by(Order.status)
-    status_res = await session.execute(status_query)
-    orders_by_status = {row[0]: row[1] for row in status_res.fetchall()}
-
-    # New users today
-    new_users_query = select(func.count(User.id)).where(User.created_at >= today_start)
-    new_users_res = await session.execute(new_users_query)
-    new_users_today = new_users_res.scalar() or 0
-
-    # Completed today
-    completed_today_query = select(func.count(Order.id)).where(
-        and_(
-            Order.status == OrderStatus.COMPLETED.value,
-            Order.completed_at >= today_start
-        )
-    )
-    completed_res = await session.execute(completed_today_query)
-    completed_today = completed_res.scalar() or 0
-
-    # Revenue this week
-    revenue_week_query = select(func.sum(Order.paid_amount)).where(
-        and_(
-            Order.status == OrderStatus.COMPLETED.value,
-            Order.completed_at >= week_start
-        )
-    )
-    revenue_week_res = await session.execute(revenue_week_query)
-    revenue_this_week = revenue_week_res.scalar() or 0.0
-
-    # Revenue last week
-    revenue_last_week_query = select(func.sum(Order.paid_amount)).where(
-        and_(
-            Order.status == OrderStatus.COMPLETED.value,
-            Order.completed_at >= last_week_start,
-            Order.completed_at < week_start
-        )
+    counters = await get_status_counters(session)
+    daily = await get_daily_stats(session, last_week_start)
+    completed = counters.get(OrderStatus.COMPLETED.value)
+
+    revenue = completed.paid_sum if completed else 0.0
+    active_count = sum(row.orders_count for status, row in counters.items() if status not in DONE_STATUSES)
+    users_count = await get_total_users(session)
+    orders_by_status = {status: row.orders_count for status, row in counters.items() if row.orders_count}
+    today_row = daily.get(today)
+    new_users_today = today_row.users_created if today_row else 0
+    completed_today = today_row.completed_count if today_row else 0
+    revenue_this_week = sum_field((row for day, row in daily.items() if day >= week_start), "completed_revenue")
+    revenue_last_week = sum_field((row for day, row in daily.items() if day < week_start), "completed_revenue")
+    average_order_value = (
+        float(completed.paid_sum) / completed.orders_count if completed and completed.orders_count else 0.0
     )
-    revenue_last_week_res = await session.execute(revenue_last_week_query)
-    revenue_last_week = revenue_last_week_res.scalar() or 0.0
-
-    # Average order value
-    avg_query = select(func.avg(Order.final_price)).where(
-        and_(
-            Order.status == OrderStatus.COMPLETED.value,
-            Order.final_price > 0
-        )
-    )
-    avg_res = await session.execute(avg_query)
-    average_order_value = avg_res.scalar() or 0.0
 
     # Recent activity (last 10 orders and users)
     recent_activity: List[RecentActivityItem] = []
@@ -390,59 +354,36 @@ async def get_admin_stats(
 @router.get("/admin/revenue-chart", response_model=RevenueChartResponse)
 async def get_revenue_chart(
     days: int = 30,
+    granularity: str = Query(default="day", pattern="^(hour|day|week)$"),
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Get daily revenue data for chart"""
+    """Completed-order revenue per hour/day/week (MSK), up to and including the current bucket"""
     if not is_admin(tg_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    if days > 90:
-        days = 90  # Limit to 90 days max
-
-    now = datetime.utcnow()
-    start_date = (now - timedelta(days=days)).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = max(1, min(days, REVENUE_CHART_MAX_DAYS[granularity]))
 
-    # Get all completed orders in the period
-    query = select(Order).where(
-        and_(
-            Order.status == OrderStatus.COMPLETED.value,
-            Order.completed_at >= start_date
-        )
-    ).order_by(Order.completed_at)
+    # Ровно `days` суток бакетов, включая текущий
+    now = datetime.now(MSK_TZ)
+    start = now - timedelta(days=days) + bucket_step(granularity)
+    series = await get_series(session, "completed_orders", granularity, start, now)
+    revenue = series.values["revenue"]
+    counts = [int(count) for count in series.values["count"]]
 
-    result = await session.execute(query)
-    orders = result.scalars().all()
-
-    # Group by date
-    daily_data: dict[str, dict] = {}
-    for i in range(days):
-        date = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
-        daily_data[date] = {'revenue': 0.0, 'count': 0}
-
-    for order in orders:
-        if order.completed_at:
-            date_key = order.completed_at.strftime('%Y-%m-%d')
-            if date_key in daily_data:
-                daily_data[date_key]['revenue'] += float(order.paid_amount or 0)
-                daily_data[date_key]['count'] += 1
-
-    # Convert to list
     chart_data = [
-        DailyRevenueItem(
-            date=date,
-            revenue=data['revenue'],
-            orders_count=data['count']
-        )
-        for date, data in sorted(daily_data.items())
+        DailyRevenueItem(date=bucket if granularity == "hour" else bucket[:10], revenue=amount, orders_count=count)
+        for bucket, amount, count in zip(series.buckets, revenue, counts)
     ]
 
-    total_revenue = sum(d['revenue'] for d in daily_data.values())
-
     return RevenueChartResponse(
         data=chart_data,
-        total=total_revenue,
-        period_days=days
+        total=series.total("revenue"),
+        period_days=days,
+        granularity=granularity,
+        buckets=series.buckets,
+        revenue=revenue,
+        orders=counts,
     )
 
 @router.get('/admin/orders', response_model=List[OrderResponse])
@@ -593,169 +534,52 @@ async def update_order_progress_admin(
 @router.get("/admin/live-feed", response_model=LiveFeedResponse)
 async def get_live_feed(
     since: str = None,  # ISO timestamp to get events after
+    since_seq: int = Query(default=None, ge=0),  # Last seen event seq (preferred over since)
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Get live feed of events for real-time admin updates
+    """Snapshot of the admin live feed
 
-    Returns:
-    - New orders (pending status)
-    - Payments awaiting verification
-    - Recent status changes
-    - New users
-
-    Pass `since` timestamp to get only new events since last poll.
+    Events are pushed over /api/ws (admin_feed_event) when they happen;
+    this endpoint returns the shared replay buffer (bot/services/admin_feed.py)
+    for the initial render and after a replay gap, plus status counters from
+    the order_status_counters rollup. No per-poll scans of orders/users.
     """
     if not is_admin(tg_user.id):
         raise HTTPException(status_code=403, detail="Access denied")
 
-    now = datetime.utcnow()
+    now = datetime.now(MSK_TZ)
 
-    # Parse since timestamp or default to last 30 minutes
-    if since:
+    feed, gap = await recent_events(since_seq, limit=LIVE_FEED_LIMIT)
+    if since and since_seq is None:
         try:
-            since_dt = datetime.fromisoformat(since.replace('Z', '+00:00').replace('+00:00', ''))
+            since_dt = datetime.fromisoformat(since.replace('Z', '+00:00'))
+            if since_dt.tzinfo is None:
+                since_dt = since_dt.replace(tzinfo=MSK_TZ)
+            feed = [item for item in feed if datetime.fromisoformat(item["timestamp"]) > since_dt]
         except ValueError:
-            since_dt = now - timedelta(minutes=30)
-    else:
-        since_dt = now - timedelta(minutes=30)
-
-    events: List[LiveEvent] = []
-
-    # 1. New orders (pending) - CRITICAL priority
-    pending_orders_query = select(Order).where(
-        and_(
-            Order.status == OrderStatus.PENDING.value,
-            Order.created_at >= since_dt
-        )
-    ).order_by(desc(Order.created_at)).limit(20)
-
-    pending_res = await session.execute(pending_orders_query)
-    for order in pending_res.scalars():
-        work_label = WORK_TYPE_LABELS.get(order.work_type, order.work_type)
-        events.append(LiveEvent(
-            id=f"{order.created_at.timestamp()}_new_order_{order.id}",
-            type="new_order",
-            priority="critical",
-            title="🆕 Новый заказ",
-            message=f"#{order.id} • {work_label}" + (f" • {order.subject}" if order.subject else ""),
-            order_id=order.id,
-            user_id=order.user_id,
-            timestamp=order.created_at.isoformat() if order.created_at else now.isoformat()
-        ))
-
-    # 2. Payments awaiting verification - CRITICAL priority
-    payment_orders_query = select(Order).where(
-        and_(
-            Order.status == OrderStatus.VERIFICATION_PENDING.value,
-            Order.updated_at >= since_dt
-        )
-    ).order_by(desc(Order.updated_at)).limit(20)
-
-    payment_res = await session.execute(payment_orders_query)
-    for order in payment_res.scalars():
-        events.append(LiveEvent(
-            id=f"{order.updated_at.timestamp()}_payment_{order.id}",
-            type="payment_received",
-            priority="critical",
-            title="💰 Оплата на проверке",
-            message=f"#{order.id} • {order.final_price or order.price or 0:,.0f} ₽",
-            order_id=order.id,
-            user_id=order.user_id,
-            amount=float(order.final_price or order.price or 0),
-            timestamp=order.updated_at.isoformat() if order.updated_at else now.isoformat()
-        ))
-
-    # 3. Orders waiting estimation - HIGH priority
-    estimation_orders_query = select(Order).where(
-        and_(
-            Order.status == OrderStatus.WAITING_ESTIMATION.value,
-            Order.created_at >= since_dt
-        )
-    ).order_by(desc(Order.created_at)).limit(10)
-
-    estimation_res = await session.execute(estimation_orders_query)
-    for order in estimation_res.scalars():
-        events.append(LiveEvent(
-            id=f"{order.created_at.timestamp()}_estimation_{order.id}",
-            type="needs_estimation",
-            priority="high",
-            title="📝 Нужна оценка",
-            message=f"#{order.id} • {order.subject or 'Без темы'}",
-            order_id=order.id,
-            user_id=order.user_id,
-            timestamp=order.created_at.isoformat() if order.created_at else now.isoformat()
-        ))
-
-    # 4. New users - NORMAL priority
-    new_users_query = select(User).where(
-        User.created_at >= since_dt
-    ).order_by(desc(User.created_at)).limit(10)
-
-    users_res = await session.execute(new_users_query)
-    for user in users_res.scalars():
-        events.append(LiveEvent(
-            id=f"{user.created_at.timestamp()}_new_user_{user.id}",
-            type="new_user",
-            priority="normal",
-            title="👤 Новый клиент",
-            message=user.fullname or user.username or f"ID: {user.telegram_id}",
-            user_id=user.telegram_id,
-            timestamp=user.created_at.isoformat() if user.created_at else now.isoformat()
-        ))
+            pass
 
-    # 5. Completed orders - LOW priority (just for info)
-    completed_query = select(Order).where(
-        and_(
-            Order.status == OrderStatus.COMPLETED.value,
-            Order.completed_at >= since_dt
-        )
-    ).order_by(desc(Order.completed_at)).limit(5)
-
-    completed_res = await session.execute(completed_query)
-    for order in completed_res.scalars():
-        events.append(LiveEvent(
-            id=f"{order.completed_at.timestamp()}_completed_{order.id}",
-            type="order_completed",
-            priority="low",
-            title="✅ Заказ завершён",
-            message=f"#{order.id} • +{order.paid_amount or 0:,.0f} ₽",
-            order_id=order.id,
-            amount=float(order.paid_amount or 0),
-            timestamp=order.completed_at.isoformat() if order.completed_at else now.isoformat()
-        ))
+    events = [LiveEvent(**{key: value for key, value in item.items() if key != "entity_id"}) for item in feed]
 
-    # Sort events by timestamp (newest first)
-    events.sort(key=lambda e: e.timestamp, reverse=True)
+    counters = await get_status_counters(session)
 
-    # Calculate counters
-    pending_count_query = select(func.count(Order.id)).where(
-        Order.status == OrderStatus.PENDING.value
-    )
-    pending_count_res = await session.execute(pending_count_query)
-    pending_count = pending_count_res.scalar() or 0
-
-    payments_count_query = select(func.count(Order.id)).where(
-        Order.status == OrderStatus.VERIFICATION_PENDING.value
-    )
-    payments_count_res = await session.execute(payments_count_query)
-    payments_count = payments_count_res.scalar() or 0
-
-    estimation_count_query = select(func.count(Order.id)).where(
-        Order.status == OrderStatus.WAITING_ESTIMATION.value
-    )
-    estimation_count_res = await session.execute(estimation_count_query)
-    estimation_count = estimation_count_res.scalar() or 0
+    def count(status: OrderStatus) -> int:
+        row = counters.get(status.value)
+        return int(row.orders_count) if row else 0
 
-    has_critical = pending_count > 0 or payments_count > 0
+    pending_count = count(OrderStatus.PENDING)
+    payments_count = count(OrderStatus.VERIFICATION_PENDING)
 
     return LiveFeedResponse(
-        events=events[:30],  # Limit to 30 events
+        events=events,
         counters={
             "pending_orders": pending_count,
             "pending_payments": payments_count,
-            "needs_estimation": estimation_count,
+            "needs_estimation": count(OrderStatus.WAITING_ESTIMATION),
         },
         last_update=now.isoformat(),
-        has_critical=has_critical
+        has_critical=pending_count > 0 or payments_count > 0,
+        last_seq=events[0].seq if events else since_seq,
+        gap=gap,
     )
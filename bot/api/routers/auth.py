@@ -21,6 +21,15 @@ from bot.api.dependencies import (
 from bot.services.order_pause_events import sync_orders_pause_state
 from bot.services.qr_generator import generate_premium_qr_card, generate_simple_qr
 from bot.services.achievements import sync_user_achievements
+from bot.services.profile_snapshot import (
+    ProfileSnapshot,
+    etag_matches,
+    load_profile_snapshot,
+    make_etag,
+    snapshot_ttl,
+    store_profile_snapshot,
+)
+from bot.services.terms_acceptance import mark_terms_accepted
 # Rate limiting done via nginx — slowapi crashes behind reverse proxy
 # from bot.api.rate_limit import limiter
 
@@ -41,6 +50,17 @@ async def get_config(request: Request):
         legal_hub_url=settings.public_legal_hub_url,
     )
 
+def _profile_response(request: Request, snapshot: ProfileSnapshot) -> Response:
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "X-Telegram-Init-Data",
+    }
+    if etag_matches(request.headers.get("If-None-Match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
 @router.get("/user", response_model=UserResponse)
 async def get_user_profile(
     request: Request,
@@ -50,6 +70,15 @@ async def get_user_profile(
     """Get current user profile with rank, loyalty, and orders"""
     logger.info(f"[API /user] Request from telegram_id={tg_user.id} ({tg_user.first_name})")
 
+    # Precomputed snapshot: served from Redis without touching Postgres
+    version = None
+    try:
+        snapshot, version = await load_profile_snapshot(tg_user.id)
+        if snapshot is not None:
+            return _profile_response(request, snapshot)
+    except Exception as e:
+        logger.warning(f"[API /user] Profile snapshot unavailable: {e}")
+
     # Get user from database
     result = await session.execute(
         select(User).where(User.telegram_id == tg_user.id)
@@ -112,10 +141,12 @@ async def get_user_profile(
     referral_code = f"REF{user.telegram_id}"
     ref_tier = get_referral_tier_info(user.referrals_count or 0)
 
+    # Precomputed metrics: only unlocks newly reached achievements, no order scan
     achievements = await sync_user_achievements(
         session=session,
         telegram_id=user.telegram_id,
         notify=False,
+        user=user,
     )
 
     # Recent balance transactions
@@ -134,7 +165,7 @@ async def get_user_profile(
     bonus_expiry_data = user.bonus_expiry_info
     bonus_expiry = BonusExpiryInfo(**bonus_expiry_data) if bonus_expiry_data else None
 
-    return UserResponse(
+    response = UserResponse(
         id=user.id,
         telegram_id=user.telegram_id,
         created_at=user.created_at.isoformat() if user.created_at else None,
@@ -174,6 +205,15 @@ async def get_user_profile(
         orders=[order_to_response(o) for o in orders]
     )
 
+    body = response.model_dump_json()
+    snapshot = None
+    if version is not None:
+        try:
+            snapshot = await store_profile_snapshot(user.telegram_id, version, body, snapshot_ttl(orders))
+        except Exception as e:
+            logger.warning(f"[API /user] Failed to store profile snapshot: {e}")
+    return _profile_response(request, snapshot or ProfileSnapshot(etag=make_etag(body), body=body))
+
 
 @router.post("/user/accept-terms", response_model=AcceptTermsResponse)
 async def accept_terms(
@@ -196,6 +236,7 @@ async def accept_terms(
     accepted_at = user.terms_accepted_at or datetime.now(timezone.utc)
     user.terms_accepted_at = accepted_at
     await session.commit()
+    await mark_terms_accepted(tg_user.id)
 
     return AcceptTermsResponse(
         success=True,
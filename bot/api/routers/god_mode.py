@@ -19,18 +19,20 @@ from __future__ import annotations
 
 import logging
 import secrets
-from datetime import datetime, timedelta
+from dataclasses import asdict
+from datetime import datetime
 from typing import Optional
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel
-from sqlalchemy import and_, desc, func, or_, select, text
+from sqlalchemy import and_, desc, func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.api.auth import TelegramUser, get_current_user
 from bot.api.dependencies import order_to_response
+from bot.api.pagination import fetch_page, resolve_total, totals_key
 from bot.api.schemas import (
     GodActivityUpdateRequest,
     GodBroadcastRequest,
@@ -43,6 +45,7 @@ from bot.api.schemas import (
     GodPaymentRejectRequest,
     GodPromoCreateRequest,
     GodSqlRequest,
+    GodStopWordsRequest,
     GodUserBalanceRequest,
     GodUserBanRequest,
     GodUserNotesRequest,
@@ -50,6 +53,8 @@ from bot.api.schemas import (
 )
 from bot.bot_instance import get_bot
 from bot.services.bonus import BonusService, BonusReason
+from bot.services.broadcast import TARGETS as BROADCAST_TARGETS, get_broadcast_engine
+from bot.services.god_dashboard import collect_order_stats, collect_user_and_promo_stats, dashboard_cache
 from bot.services.order_message_formatter import (
     build_client_payment_rejected_text,
     build_client_price_ready_text,
@@ -78,14 +83,30 @@ from bot.services.payment_verification import (
     get_payment_verification_contexts,
     get_pending_verification_amount,
 )
+from bot.services.presence import HEARTBEAT_INTERVAL_SECONDS, get_online, record_heartbeat
+from bot.services.promo_analytics import EMPTY_STATS as EMPTY_PROMO_STATS, get_promo_usage_stats
+from bot.services.search import (
+    normalize_term,
+    order_search_clause,
+    search_messages,
+    search_orders,
+    search_users,
+    user_search_clause,
+)
+from bot.services.stop_words import (
+    get_config as get_stop_words_config,
+    refresh_matcher as refresh_stop_words,
+    save_stop_words,
+)
 from bot.services.payment_accounting import (
     apply_payment_update_to_user,
     build_payment_update,
 )
+from core.cache import cache_metrics
 from core.config import settings
 from core.redis_pool import get_redis
 from database.db import get_session
-from database.models.admin_logs import AdminActionLog, AdminActionType, UserActivity
+from database.models.admin_logs import AdminActionLog, AdminActionType
 from database.models.order_events import OrderLifecycleEvent, OrderLifecycleEventType
 from database.models.orders import (
     LEGACY_WAITING_PAYMENT_STATUSES,
@@ -996,211 +1017,28 @@ async def get_dashboard(
     require_god_mode(tg_user)
     await require_god_2fa(tg_user, request)
 
-    now = datetime.now(MSK_TZ)
-    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    week_start = today_start - timedelta(days=7)
-    month_start = today_start - timedelta(days=30)
-
-    # === ORDERS STATS ===
-    # Total orders
-    total_orders = await session.scalar(select(func.count(Order.id)))
-
-    # Orders by status
-    status_counts_result = await session.execute(
-        select(Order.status, func.count(Order.id)).group_by(Order.status)
-    )
-    raw_status_counts = {
-        status: count or 0
-        for status, count in status_counts_result.all()
-        if status
-    }
-    status_counts = merge_god_order_status_counts(raw_status_counts)
-
-    # Active orders (not completed/cancelled/rejected)
-    active_statuses = [
-        OrderStatus.PENDING.value, OrderStatus.WAITING_ESTIMATION.value,
-        OrderStatus.VERIFICATION_PENDING.value,
-        OrderStatus.PAID.value, OrderStatus.PAID_FULL.value,
-        OrderStatus.IN_PROGRESS.value, OrderStatus.REVIEW.value, OrderStatus.REVISION.value,
-        *LEGACY_WAITING_PAYMENT_STATUSES,
-    ]
-    active_orders = await session.scalar(
-        select(func.count(Order.id)).where(Order.status.in_(active_statuses))
-    )
-
-    # Orders needing attention (pending, verification_pending, waiting_estimation)
-    attention_statuses = [
-        OrderStatus.PENDING.value,
-        OrderStatus.VERIFICATION_PENDING.value,
-        OrderStatus.WAITING_ESTIMATION.value,
-    ]
-    orders_needing_attention = await session.scalar(
-        select(func.count(Order.id)).where(Order.status.in_(attention_statuses))
-    )
-
-    # Orders today
-    orders_today = await session.scalar(
-        select(func.count(Order.id)).where(Order.created_at >= today_start)
-    )
-
-    # Completed today
-    completed_today = await session.scalar(
-        select(func.count(Order.id)).where(
-            and_(Order.status == OrderStatus.COMPLETED.value, Order.completed_at >= today_start)
-        )
-    )
-
-    # === REVENUE STATS ===
-    # Total revenue (all time)
-    total_revenue = await session.scalar(
-        select(func.sum(Order.paid_amount)).where(Order.paid_amount > 0)
-    ) or 0.0
+    return await dashboard_cache.get_or_load("snapshot", lambda: build_god_dashboard(session))
 
-    # Revenue today
-    revenue_today = await session.scalar(
-        select(func.sum(Order.paid_amount)).where(
-            and_(Order.paid_amount > 0, Order.created_at >= today_start)
-        )
-    ) or 0.0
-
-    # Revenue this week
-    revenue_week = await session.scalar(
-        select(func.sum(Order.paid_amount)).where(
-            and_(Order.paid_amount > 0, Order.created_at >= week_start)
-        )
-    ) or 0.0
-
-    # Revenue this month
-    revenue_month = await session.scalar(
-        select(func.sum(Order.paid_amount)).where(
-            and_(Order.paid_amount > 0, Order.created_at >= month_start)
-        )
-    ) or 0.0
-
-    # Average order value
-    avg_order_value = await session.scalar(
-        select(func.avg(Order.paid_amount)).where(Order.paid_amount > 0)
-    ) or 0.0
-
-    # === USERS STATS ===
-    total_users = await session.scalar(select(func.count(User.id)))
-    users_today = await session.scalar(
-        select(func.count(User.id)).where(User.created_at >= today_start)
-    )
-    users_week = await session.scalar(
-        select(func.count(User.id)).where(User.created_at >= week_start)
-    )
-    banned_users = await session.scalar(
-        select(func.count(User.id)).where(User.is_banned)
-    )
-    watched_users = await session.scalar(
-        select(func.count(User.id)).where(User.is_watched)
-    )
-
-    # Total bonus balance across all users
-    total_bonus_balance = await session.scalar(
-        select(func.sum(User.balance)).where(User.balance > 0)
-    ) or 0.0
-
-    # === PROMO STATS ===
-    total_promos = await session.scalar(
-        select(func.count(PromoCode.id))
-    ) or 0
-    active_promos = await session.scalar(
-        select(func.count(PromoCode.id)).where(PromoCode.is_active)
-    ) or 0
-    total_promo_uses = await session.scalar(
-        select(func.count(PromoCodeUsage.id))
-    ) or 0
-
-    # Total discount given (sum of all active promo usages)
-    # Use fallback if is_active column doesn't exist on promocode_usages
-    try:
-        total_discount_given = await session.scalar(
-            select(
-                func.sum(
-                    Order.price * (1 - (Order.discount / 100.0)) * (Order.promo_discount / 100.0)
-                )
-            )
-            .select_from(PromoCodeUsage)
-            .join(Order, Order.id == PromoCodeUsage.order_id)
-            .where(PromoCodeUsage.is_active)
-        ) or 0.0
-    except Exception:
-        total_discount_given = await session.scalar(
-            select(
-                func.sum(
-                    Order.price * (1 - (Order.discount / 100.0)) * (Order.promo_discount / 100.0)
-                )
-            )
-            .select_from(PromoCodeUsage)
-            .join(Order, Order.id == PromoCodeUsage.order_id)
-        ) or 0.0
 
-    # Most popular promo codes (top 3 by usage count)
-    try:
-        popular_promos_result = await session.execute(
-            select(PromoCode.code, func.count(PromoCodeUsage.id).label('usage_count'))
-            .join(PromoCodeUsage, PromoCodeUsage.promocode_id == PromoCode.id)
-            .where(PromoCodeUsage.is_active)
-            .group_by(PromoCode.code)
-            .order_by(desc('usage_count'))
-            .limit(3)
-        )
-    except Exception:
-        popular_promos_result = await session.execute(
-            select(PromoCode.code, func.count(PromoCodeUsage.id).label('usage_count'))
-            .join(PromoCodeUsage, PromoCodeUsage.promocode_id == PromoCode.id)
-            .group_by(PromoCode.code)
-            .order_by(desc('usage_count'))
-            .limit(3)
-        )
-    popular_promos = [
-        {"code": row[0], "uses": row[1]}
-        for row in popular_promos_result.fetchall()
-    ]
-
-    # === ONLINE USERS ===
-    five_min_ago = now - timedelta(minutes=5)
-    online_users = await session.scalar(
-        select(func.count(UserActivity.id)).where(
-            and_(UserActivity.is_online, UserActivity.last_activity_at >= five_min_ago)
-        )
-    ) or 0
+async def build_god_dashboard(session: AsyncSession) -> dict:
+    """Collect all dashboard metrics with a few aggregate queries (see god_dashboard.py)"""
+    now = datetime.now(MSK_TZ)
+    orders = await collect_order_stats(session, now)
+    users_and_promos = await collect_user_and_promo_stats(session, now)
 
     return {
         "timestamp": now.isoformat(),
         "orders": {
-            "total": total_orders or 0,
-            "active": active_orders or 0,
-            "needing_attention": orders_needing_attention or 0,
-            "today": orders_today or 0,
-            "completed_today": completed_today or 0,
-            "by_status": status_counts,
-        },
-        "revenue": {
-            "total": float(total_revenue),
-            "today": float(revenue_today),
-            "week": float(revenue_week),
-            "month": float(revenue_month),
-            "average_order": round(float(avg_order_value), 2),
-        },
-        "users": {
-            "total": total_users or 0,
-            "today": users_today or 0,
-            "week": users_week or 0,
-            "banned": banned_users or 0,
-            "watched": watched_users or 0,
-            "online": online_users,
-            "total_bonus_balance": float(total_bonus_balance),
-        },
-        "promos": {
-            "total": total_promos,
-            "active": active_promos,
-            "total_uses": total_promo_uses,
-            "total_discount_given": float(total_discount_given),
-            "popular": popular_promos,
+            "total": orders["total"],
+            "active": orders["active"],
+            "needing_attention": orders["needing_attention"],
+            "today": orders["today"],
+            "completed_today": orders["completed_today"],
+            "by_status": merge_god_order_status_counts(orders["raw_status_counts"]),
         },
+        "revenue": orders["revenue"],
+        "users": users_and_promos["users"],
+        "promos": users_and_promos["promos"],
     }
 
 
@@ -1214,13 +1052,15 @@ async def get_orders(
     search: Optional[str] = None,
     limit: int = Query(default=50, le=200),
     offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Get orders with filtering and search"""
+    """Get orders with filtering and search (keyset via cursor, offset for old clients)"""
     require_god_mode(tg_user)
 
-    query = select(Order).order_by(desc(Order.created_at))
+    query = select(Order)
 
     # Filter by status
     status_filter_values = get_god_order_status_filter_values(status)
@@ -1230,29 +1070,29 @@ async def get_orders(
         else:
             query = query.where(Order.status.in_(status_filter_values))
 
-    # Search by order ID, subject, topic
+    # Search by order ID, subject, topic (FTS + trigram on PostgreSQL)
+    search = normalize_term(search)
     if search:
-        search_term = f"%{search}%"
         # Try to parse as order ID
         try:
             order_id = int(search)
             query = query.where(Order.id == order_id)
         except ValueError:
-            query = query.where(
-                or_(
-                    Order.subject.ilike(search_term),
-                    Order.topic.ilike(search_term),
-                )
-            )
-
-    # Get total count
-    count_query = select(func.count()).select_from(query.subquery())
-    total = await session.scalar(count_query) or 0
+            query = query.where(order_search_clause(session, search))
+
+    # Approximate total: pg_class estimate or cached COUNT(*)
+    total = None
+    if include_total is None:
+        include_total = cursor is None
+    if include_total:
+        total = await resolve_total(
+            session, query, Order,
+            cache_key=totals_key("god_orders", status=status, search=search),
+            filtered=bool(status_filter_values or search),
+        )
 
-    # Apply pagination
-    query = query.limit(limit).offset(offset)
-    result = await session.execute(query)
-    orders = result.scalars().all()
+    page = await fetch_page(session, query, Order, limit=limit, cursor=cursor, offset=offset)
+    orders = page.items
 
     # Get user info for each order
     user_ids = list(set(o.user_id for o in orders))
@@ -1300,7 +1140,8 @@ async def get_orders(
     return {
         "orders": orders_data,
         "total": total,
-        "has_more": offset + limit < total,
+        "has_more": page.has_more,
+        "next_cursor": page.next_cursor,
     }
 
 
@@ -2062,13 +1903,15 @@ async def get_users(
     filter_type: Optional[str] = None,  # banned, watched, active, with_balance
     limit: int = Query(default=50, le=200),
     offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Get users with filtering and search"""
+    """Get users with filtering and search (keyset via cursor, offset for old clients)"""
     require_god_mode(tg_user)
 
-    query = select(User).order_by(desc(User.created_at))
+    query = select(User)
 
     # Apply filters
     if filter_type == "banned":
@@ -2078,28 +1921,28 @@ async def get_users(
     elif filter_type == "with_balance":
         query = query.where(User.balance > 0)
 
-    # Search
+    # Search: telegram_id, username prefix, name substring
+    search = normalize_term(search)
     if search:
-        search_term = f"%{search}%"
         try:
             user_id = int(search)
             query = query.where(User.telegram_id == user_id)
         except ValueError:
-            query = query.where(
-                or_(
-                    User.username.ilike(search_term),
-                    User.fullname.ilike(search_term),
-                )
-            )
-
-    # Get total
-    count_query = select(func.count()).select_from(query.subquery())
-    total = await session.scalar(count_query) or 0
+            query = query.where(user_search_clause(search))
+
+    # Approximate total: pg_class estimate or cached COUNT(*)
+    total = None
+    if include_total is None:
+        include_total = cursor is None
+    if include_total:
+        total = await resolve_total(
+            session, query, User,
+            cache_key=totals_key("god_users", filter_type=filter_type, search=search),
+            filtered=bool(filter_type in ("banned", "watched", "with_balance") or search),
+        )
 
-    # Apply pagination
-    query = query.limit(limit).offset(offset)
-    result = await session.execute(query)
-    users = result.scalars().all()
+    page = await fetch_page(session, query, User, limit=limit, cursor=cursor, offset=offset)
+    users = page.items
 
     users_data = []
     for u in users:
@@ -2129,7 +1972,8 @@ async def get_users(
     return {
         "users": users_data,
         "total": total,
-        "has_more": offset + limit < total,
+        "has_more": page.has_more,
+        "next_cursor": page.next_cursor,
     }
 
 
@@ -2441,54 +2285,13 @@ async def get_promos(
         for row in creators_result.fetchall()
     }
 
+    # Usage stats for all promos: one grouped query, cached
+    usage_stats = await get_promo_usage_stats(session)
+
     # Build promo data with stats
     promo_data = []
     for p in promos:
-        # Get active usage count (with fallback if is_active column doesn't exist)
-        try:
-            active_count = await session.scalar(
-                select(func.count(PromoCodeUsage.id)).where(
-                    and_(
-                        PromoCodeUsage.promocode_id == p.id,
-                        PromoCodeUsage.is_active
-                    )
-                )
-            ) or 0
-        except Exception:
-            active_count = await session.scalar(
-                select(func.count(PromoCodeUsage.id)).where(
-                    PromoCodeUsage.promocode_id == p.id
-                )
-            ) or 0
-
-        # Get total savings (with fallback)
-        try:
-            total_savings = await session.scalar(
-                select(
-                    func.sum(
-                        Order.price * (1 - (Order.discount / 100.0)) * (Order.promo_discount / 100.0)
-                    )
-                )
-                .select_from(PromoCodeUsage)
-                .join(Order, Order.id == PromoCodeUsage.order_id)
-                .where(
-                    and_(
-                        PromoCodeUsage.promocode_id == p.id,
-                        PromoCodeUsage.is_active
-                    )
-                )
-            ) or 0.0
-        except Exception:
-            total_savings = await session.scalar(
-                select(
-                    func.sum(
-                        Order.price * (1 - (Order.discount / 100.0)) * (Order.promo_discount / 100.0)
-                    )
-                )
-                .select_from(PromoCodeUsage)
-                .join(Order, Order.id == PromoCodeUsage.order_id)
-                .where(PromoCodeUsage.promocode_id == p.id)
-            ) or 0.0
+        stats = usage_stats.get(p.id, EMPTY_PROMO_STATS)
 
         # Get creator info
         creator = None
@@ -2513,8 +2316,8 @@ async def get_promos(
             "discount_percent": p.discount_percent,
             "max_uses": p.max_uses,
             "current_uses": p.current_uses,
-            "active_usages": active_count,
-            "total_savings": float(total_savings),
+            "active_usages": stats.active_usages,
+            "total_savings": stats.total_savings,
             "is_active": p.is_active,
             "new_users_only": new_users_only_value,
             "valid_from": p.valid_from.isoformat() if p.valid_from else None,
@@ -2637,38 +2440,33 @@ async def delete_promo(
 @router.get("/live")
 async def get_live_activity(
     tg_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
 ):
-    """Get live user activity - who's online and what they're doing"""
+    """Get live user activity - who's online and what they're doing (Redis presence only)"""
     require_god_mode(tg_user)
 
     now = datetime.now(MSK_TZ)
-    five_min_ago = now - timedelta(minutes=5)
-
-    # Get recent activity
-    result = await session.execute(
-        select(UserActivity)
-        .where(UserActivity.last_activity_at >= five_min_ago)
-        .order_by(desc(UserActivity.last_activity_at))
-    )
-    activities = result.scalars().all()
+    try:
+        online = await get_online(now)
+    except Exception as e:
+        logger.warning(f"[God Mode] Presence store unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Presence store unavailable")
 
     return {
         "timestamp": now.isoformat(),
-        "online_count": len(activities),
+        "online_count": len(online),
         "users": [
             {
-                "telegram_id": a.telegram_id,
-                "username": a.username,
-                "fullname": a.fullname,
-                "current_page": a.current_page,
-                "current_action": a.current_action,
-                "current_order_id": a.current_order_id,
-                "session_duration_min": a.activity_duration_minutes,
-                "last_activity": a.last_activity_at.isoformat() if a.last_activity_at else None,
-                "platform": a.platform,
+                "telegram_id": p.telegram_id,
+                "username": p.username,
+                "fullname": p.fullname,
+                "current_page": p.page,
+                "current_action": p.action,
+                "current_order_id": p.order_id,
+                "session_duration_min": p.session_duration_minutes,
+                "last_activity": p.last_seen.isoformat(),
+                "platform": p.platform,
             }
-            for a in activities
+            for p in online
         ],
     }
 
@@ -2677,37 +2475,81 @@ async def get_live_activity(
 async def update_user_activity(
     data: GodActivityUpdateRequest,
     tg_user: TelegramUser = Depends(get_current_user),
-    session: AsyncSession = Depends(get_session),
 ):
-    """Update user activity (called by frontend)"""
+    """Update user activity (called by frontend); history reaches user_activities via PresenceFlusher"""
     # This endpoint is for all users, not just admin
-    user_id = tg_user.id
-
-    activity = await session.scalar(
-        select(UserActivity).where(UserActivity.telegram_id == user_id)
+    await record_heartbeat(
+        tg_user.id,
+        username=tg_user.username,
+        fullname=tg_user.first_name,
+        page=data.page,
+        action=data.action,
+        order_id=data.order_id,
+        platform=data.platform,
     )
 
-    now = datetime.now(MSK_TZ)
+    return {"success": True, "heartbeat_interval": HEARTBEAT_INTERVAL_SECONDS}
 
-    if not activity:
-        activity = UserActivity(
-            telegram_id=user_id,
-            username=tg_user.username,
-            fullname=tg_user.first_name,
-            session_started_at=now,
-        )
-        session.add(activity)
 
-    activity.current_page = data.page
-    activity.current_action = data.action
-    activity.current_order_id = data.order_id
-    activity.is_online = True
-    activity.platform = data.platform
-    activity.last_activity_at = now
+# ═══════════════════════════════════════════════════════════════════════════════
+#                          SEARCH
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@router.get("/search")
+async def global_search(
+    q: str = Query(..., min_length=1),
+    scope: str = Query(default="all", pattern="^(all|orders|users|messages)$"),
+    limit: int = Query(default=20, ge=1, le=50),
+    tg_user: TelegramUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Ranked search over orders, clients and order chat messages"""
+    require_god_mode(tg_user)
 
-    await session.commit()
+    term = normalize_term(q)
+    if not term:
+        raise HTTPException(status_code=400, detail="Пустой запрос")
 
-    return {"success": True}
+    result: dict = {"query": term}
+    if scope in ("all", "orders"):
+        orders = await search_orders(session, term, limit=limit)
+        result["orders"] = [
+            {
+                "id": o.id,
+                "user_id": o.user_id,
+                "status": canonicalize_god_order_status(o.status),
+                "work_type": o.work_type,
+                "subject": o.subject,
+                "topic": o.topic,
+                "created_at": o.created_at.isoformat() if o.created_at else None,
+            }
+            for o in orders
+        ]
+    if scope in ("all", "users"):
+        users = await search_users(session, term, limit=limit)
+        result["users"] = [
+            {
+                "telegram_id": u.telegram_id,
+                "username": u.username,
+                "fullname": u.fullname,
+                "orders_count": u.orders_count,
+                "is_banned": u.is_banned,
+            }
+            for u in users
+        ]
+    if scope in ("all", "messages"):
+        hits = await search_messages(session, term, limit=limit)
+        result["messages"] = [
+            {
+                "id": hit.message_id,
+                "order_id": hit.order_id,
+                "sender_type": hit.sender_type,
+                "snippet": hit.snippet,
+                "created_at": hit.created_at.isoformat() if hit.created_at else None,
+            }
+            for hit in hits
+        ]
+    return result
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -2720,22 +2562,31 @@ async def get_admin_logs(
     target_type: Optional[str] = None,
     limit: int = Query(default=100, le=500),
     offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
 ):
-    """Get admin action logs"""
+    """Get admin action logs (keyset via cursor, offset for old clients)"""
     require_god_mode(tg_user)
 
-    query = select(AdminActionLog).order_by(desc(AdminActionLog.created_at))
+    query = select(AdminActionLog)
 
     if action_type:
         query = query.where(AdminActionLog.action_type == action_type)
     if target_type:
         query = query.where(AdminActionLog.target_type == target_type)
 
-    query = query.limit(limit).offset(offset)
-    result = await session.execute(query)
-    logs = result.scalars().all()
+    total = None
+    if include_total:
+        total = await resolve_total(
+            session, query, AdminActionLog,
+            cache_key=totals_key("god_logs", action_type=action_type, target_type=target_type),
+            filtered=bool(action_type or target_type),
+        )
+
+    page = await fetch_page(session, query, AdminActionLog, limit=limit, cursor=cursor, offset=offset)
+    logs = page.items
 
     return {
         "logs": [
@@ -2753,7 +2604,10 @@ async def get_admin_logs(
                 "created_at": log.created_at.isoformat() if log.created_at else None,
             }
             for log in logs
-        ]
+        ],
+        "total": total,
+        "has_more": page.has_more,
+        "next_cursor": page.next_cursor,
     }
 
 
@@ -2864,47 +2718,110 @@ async def send_broadcast(
     request: Request,
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session),
-    bot: Bot = Depends(get_bot),
 ):
-    """Send broadcast message to users"""
+    """Queue a background broadcast job and return its id immediately"""
     require_god_mode(tg_user)
     await require_god_2fa(tg_user, request)
 
-    text = data.text
-    target = data.target
+    if data.target not in BROADCAST_TARGETS:
+        raise HTTPException(status_code=400, detail=f"Unknown target: {data.target}")
 
-    # Get target users
-    query = select(User.telegram_id).where(~User.is_banned)
+    job = await get_broadcast_engine().create_job(data.text, data.target, created_by=tg_user.id)
 
-    if target == "active":
-        week_ago = datetime.now(MSK_TZ) - timedelta(days=7)
-        query = query.where(User.updated_at >= week_ago)
-    elif target == "with_orders":
-        query = query.where(User.orders_count > 0)
+    await log_admin_action(
+        session, tg_user, AdminActionType.BROADCAST_SEND,
+        details=f"Broadcast job {job.id} to {job.target}: {job.total} recipients",
+        new_value={"text": data.text[:100], "target": job.target, "job_id": job.id, "total": job.total},
+        request=request,
+    )
+    await session.commit()
 
-    result = await session.execute(query)
-    user_ids = [row[0] for row in result.fetchall()]
+    return {"success": True, "job_id": job.id, "total": job.total, "status": job.status}
 
-    # Send messages
-    sent = 0
-    failed = 0
 
-    for user_id in user_ids:
-        try:
-            await bot.send_message(user_id, text)
-            sent += 1
-        except Exception:
-            failed += 1
+@router.get("/broadcast/{job_id}")
+async def get_broadcast_status(
+    job_id: str,
+    tg_user: TelegramUser = Depends(get_current_user),
+):
+    """Progress of a broadcast job: sent, failed, blocked and ETA"""
+    require_god_mode(tg_user)
+
+    job = await get_broadcast_engine().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return job.progress()
+
+
+@router.get("/broadcasts")
+async def list_broadcasts(
+    tg_user: TelegramUser = Depends(get_current_user),
+):
+    """Recent broadcast jobs"""
+    require_god_mode(tg_user)
+
+    jobs = await get_broadcast_engine().list_jobs()
+    return {"jobs": [job.progress() for job in jobs]}
+
+
+@router.post("/broadcast/{job_id}/cancel")
+async def cancel_broadcast(
+    job_id: str,
+    request: Request,
+    tg_user: TelegramUser = Depends(get_current_user),
+):
+    """Stop a running broadcast job"""
+    require_god_mode(tg_user)
+    await require_god_2fa(tg_user, request)
+
+    job = await get_broadcast_engine().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Broadcast job not found")
+    return job.progress()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#                          STOP WORDS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@router.get("/stop-words")
+async def get_stop_words(
+    request: Request,
+    tg_user: TelegramUser = Depends(get_current_user),
+):
+    """Current stop-words list and matching options"""
+    require_god_mode(tg_user)
+    await require_god_2fa(tg_user, request)
+
+    await refresh_stop_words()
+    return asdict(get_stop_words_config())
+
+
+@router.put("/stop-words")
+async def update_stop_words(
+    data: GodStopWordsRequest,
+    request: Request,
+    tg_user: TelegramUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """Replace the stop-words list; bot processes pick it up without restart"""
+    require_god_mode(tg_user)
+    await require_god_2fa(tg_user, request)
+
+    old_config = get_stop_words_config()
+    config = await save_stop_words(data.words, word_boundary=data.word_boundary, normalize=data.normalize)
 
     await log_admin_action(
-        session, tg_user, AdminActionType.BROADCAST_SEND,
-        details=f"Broadcast to {target}: {sent} sent, {failed} failed",
-        new_value={"text": text[:100], "target": target, "sent": sent, "failed": failed},
+        session, tg_user, AdminActionType.SETTINGS_CHANGE,
+        target_type="stop_words",
+        details=f"Stop words updated: {len(old_config.words)} → {len(config.words)}",
+        old_value={"words": old_config.words, "word_boundary": old_config.word_boundary, "normalize": old_config.normalize},
+        new_value={"words": config.words, "word_boundary": config.word_boundary, "normalize": config.normalize},
         request=request,
     )
     await session.commit()
 
-    return {"success": True, "sent": sent, "failed": failed, "total": len(user_ids)}
+    return {"success": True, **asdict(config)}
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -2931,6 +2848,27 @@ async def get_system_info(
     }
 
 
+@router.get("/metrics")
+async def get_runtime_metrics(
+    tg_user: TelegramUser = Depends(get_current_user),
+):
+    """Runtime metrics of this API worker: cache tiers, WebSocket, bot update and send queues"""
+    require_god_mode(tg_user)
+
+    from bot.api.websocket import manager
+    from bot.services.send_scheduler import get_send_scheduler
+    from bot.services.update_queue import get_update_queue
+
+    update_queue = get_update_queue()
+    send_scheduler = get_send_scheduler()
+    return {
+        "cache": cache_metrics(),
+        "websocket": manager.queue_stats(),
+        "bot_updates": update_queue.metrics() if update_queue is not None else None,
+        "bot_sends": send_scheduler.metrics() if send_scheduler is not None else None,
+    }
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 #                          WEBSOCKET ADMIN REGISTRATION
 # ═══════════════════════════════════════════════════════════════════════════════
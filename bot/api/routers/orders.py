@@ -7,7 +7,7 @@ from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Request, Query
 from fastapi.responses import JSONResponse
-from sqlalchemy import select, desc, func
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.db import get_session
@@ -39,6 +39,7 @@ from bot.api.schemas import (
 from bot.api.dependencies import (
     get_loyalty_levels, get_loyalty_info, order_to_response
 )
+from bot.api.pagination import fetch_page
 from bot.api.rate_limit import rate_limit
 from bot.services.pricing import calculate_price
 from bot.services.yandex_disk import yandex_disk_service
@@ -282,10 +283,18 @@ async def get_orders(
     status: Optional[str] = None,
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
     tg_user: TelegramUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_session)
 ):
-    """Get user's orders with optional filtering"""
+    """
+    Get user's orders with optional filtering.
+
+    Pass next_cursor back as `cursor` for the next page; `offset` still works
+    for old clients. total is counted on the first page only unless
+    include_total is set explicitly.
+    """
     # Get user to get internal ID (if needed, but telegram_id is on Order)
     # Actually Order.user_id IS telegram_id.
     # But we check user existence.
@@ -313,18 +322,24 @@ async def get_orders(
         else:
             query = query.where(Order.status == status)
 
-    count_query = query.with_only_columns(func.count(Order.id))
-    total = (await session.execute(count_query)).scalar() or 0
+    if include_total is None:
+        include_total = cursor is None
 
-    query = query.order_by(desc(Order.created_at)).offset(offset).limit(limit)
-    result = await session.execute(query)
-    orders = result.scalars().all()
-    await sync_orders_pause_state(session, list(orders), notify_user=True)
+    total = None
+    if include_total:
+        # Заказы одного клиента: точный COUNT по ix_orders_user_status дешёвый
+        count_query = query.with_only_columns(func.count(Order.id))
+        total = (await session.execute(count_query)).scalar() or 0
+
+    page = await fetch_page(session, query, Order, limit=limit, cursor=cursor, offset=offset)
+    orders = list(page.items)
+    await sync_orders_pause_state(session, orders, notify_user=True)
 
     return OrdersListResponse(
         orders=[order_to_response(o) for o in orders],
         total=total,
-        has_more=offset + len(orders) < total
+        has_more=page.has_more,
+        next_cursor=page.next_cursor,
     )
 
 # ═══════════════════════════════════════════════════════════════════════════
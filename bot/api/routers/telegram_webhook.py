@@ -0,0 +1,63 @@
+"""
+Telegram Bot API webhook (BOT_UPDATES_MODE=webhook).
+
+- POST {BOT_WEBHOOK_PATH} — принять апдейт: проверить секрет, положить в
+  UpdateQueue и сразу ответить 200. Обработка идёт в воркерах очереди
+  (по порядку для каждого пользователя, см. bot/services/update_queue.py).
+
+Ответы:
+- 401 — неверный X-Telegram-Bot-Api-Secret-Token;
+- 404 — в этом процессе бот не в webhook-режиме (очереди нет);
+- 503 + Retry-After — очередь полна, Telegram повторит доставку.
+"""
+
+from __future__ import annotations
+
+import hmac
+import logging
+
+from aiogram.types import Update
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+
+from bot.services.update_queue import get_update_queue
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["telegram"])
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+RETRY_AFTER_SECONDS = 1
+
+
+def _secret_matches(received: str | None) -> bool:
+    expected = settings.BOT_WEBHOOK_SECRET
+    if not expected or received is None:
+        return False
+    return hmac.compare_digest(received.encode(), expected.encode())
+
+
+@router.post(settings.BOT_WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(request: Request):
+    queue = get_update_queue()
+    if queue is None or settings.BOT_UPDATES_MODE != "webhook":
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not _secret_matches(request.headers.get(SECRET_HEADER)):
+        raise HTTPException(status_code=401, detail="Invalid secret token")
+
+    try:
+        update = Update.model_validate(await request.json(), context={"bot": queue.bot})
+    except (ValueError, ValidationError) as e:
+        # Повтор не поможет — подтверждаем, чтобы Telegram не слал его снова
+        logger.warning(f"[Webhook] Malformed update dropped: {e}")
+        return {"ok": True}
+
+    if not queue.submit(update):
+        logger.warning(f"[Webhook] Update queue full ({queue.depth}), asking Telegram to retry {update.update_id}")
+        return JSONResponse(
+            status_code=503,
+            content={"ok": False},
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+    return {"ok": True}
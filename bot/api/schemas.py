@@ -215,10 +215,11 @@ class UserResponse(BaseModel):
 
 
 class OrdersListResponse(BaseModel):
-    """Paginated orders list"""
+    """Paginated orders list (total is omitted on cursor pages by default)"""
     orders: List[OrderResponse]
-    total: int
+    total: Optional[int] = None
     has_more: bool
+    next_cursor: Optional[str] = None
 
 
 class PauseOrderRequest(BaseModel):
@@ -468,6 +469,11 @@ class RevenueChartResponse(BaseModel):
     data: List[DailyRevenueItem]
     total: float
     period_days: int
+    # Компактный ряд: buckets[i] — начало бакета по МСК
+    granularity: str = "day"
+    buckets: List[str] = []
+    revenue: List[float] = []
+    orders: List[int] = []
 
 class AdminUserResponse(BaseModel):
     internal_id: int
@@ -760,6 +766,7 @@ class LiveEvent(BaseModel):
     amount: Optional[float] = None
     timestamp: str
     is_new: bool = True  # For highlighting new events
+    seq: Optional[int] = None  # Position in the admin feed replay buffer
 
 
 class LiveFeedResponse(BaseModel):
@@ -768,6 +775,8 @@ class LiveFeedResponse(BaseModel):
     counters: Dict[str, int]  # pending_orders, pending_payments, unread_messages
     last_update: str
     has_critical: bool = False  # True if there are critical events
+    last_seq: Optional[int] = None  # Pass as since_seq / WS subscribe since_seq to resume
+    gap: bool = False  # Replay buffer no longer covers since_seq
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -938,3 +947,18 @@ class GodBroadcastRequest(BaseModel):
         if v not in valid_targets:
             raise ValueError(f'Некорректная целевая группа: {v}')
         return v
+
+
+class GodStopWordsRequest(BaseModel):
+    """Request to replace the stop-words list"""
+    words: List[str] = Field(..., max_length=1000)
+    word_boundary: bool = False
+    normalize: bool = True
+
+    @field_validator('words')
+    @classmethod
+    def validate_words(cls, v: List[str]) -> List[str]:
+        words = [w.strip() for w in v if w.strip()]
+        if any(len(w) > 100 for w in words):
+            raise ValueError('Стоп-слово длиннее 100 символов')
+        return words
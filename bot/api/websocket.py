@@ -7,91 +7,262 @@ WebSocket handler for real-time updates to Mini App clients
 import asyncio
 import json
 import logging
+from collections import deque
+from contextlib import suppress
 from typing import Dict, Set, Optional
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from starlette.websockets import WebSocketState
 
+from bot.api.ws_backplane import WebSocketBackplane
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["websocket"])
 
 
+# Outbound queue per socket: a slow client only delays itself
+SEND_QUEUE_SIZE = 100
+SEND_TIMEOUT_SECONDS = 10.0
+# Message types where only the latest pending copy matters. Not balance_update:
+# each frame carries its own change/reason and the Mini App shows a toast per event
+COALESCED_TYPES = {"refresh", "ping", "pong"}
+
+
+def coalesce_key(message: dict) -> Optional[tuple]:
+    """Key of a pending frame this message may replace: type plus refresh_type"""
+    msg_type = message.get("type")
+    if msg_type not in COALESCED_TYPES:
+        return None
+    return (msg_type, message.get("refresh_type"))
+
+
+def encode_message(message: dict) -> str:
+    """Serialize a message once (same format as WebSocket.send_json)"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class ClientConnection:
+    """
+    One WebSocket with its own bounded outbound queue and writer task.
+
+    When the queue is full the oldest pending frame is dropped. Frames of
+    COALESCED_TYPES replace a pending frame with the same coalesce_key (type
+    and refresh_type) instead of queueing a second copy.
+    """
+
+    def __init__(self, websocket: WebSocket, telegram_id: int, *, on_dead=None, maxsize: int = SEND_QUEUE_SIZE):
+        self.websocket = websocket
+        self.telegram_id = telegram_id
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.closed = False
+        self._queue: deque[list] = deque()
+        self._pending: Dict[tuple, list] = {}
+        self._wakeup = asyncio.Event()
+        self._on_dead = on_dead
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop(), name=f"ws-writer-{self.telegram_id}")
+
+    def stop(self):
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._writer = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, text: str, coalesce_key: Optional[tuple] = None) -> bool:
+        """Queue a pre-encoded frame without waiting for the socket"""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None:
+            slot = self._pending.get(coalesce_key)
+            if slot is not None:
+                slot[1] = text
+                return True
+
+        if len(self._queue) >= self.maxsize:
+            oldest = self._queue.popleft()
+            if oldest[0] is not None and self._pending.get(oldest[0]) is oldest:
+                del self._pending[oldest[0]]
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                logger.warning(f"[WS] Send queue full for user {self.telegram_id}, dropped {self.dropped} frames")
+
+        slot = [coalesce_key, text]
+        self._queue.append(slot)
+        if coalesce_key is not None:
+            self._pending[coalesce_key] = slot
+        self._wakeup.set()
+        return True
+
+    def send(self, message: dict) -> bool:
+        return self.enqueue(encode_message(message), coalesce_key(message))
+
+    async def _write_loop(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                slot = self._queue.popleft()
+                if slot[0] is not None and self._pending.get(slot[0]) is slot:
+                    del self._pending[slot[0]]
+
+                if self.websocket.client_state != WebSocketState.CONNECTED:
+                    break
+                await asyncio.wait_for(self.websocket.send_text(slot[1]), timeout=SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[WS] Writer for user {self.telegram_id} failed: {type(e).__name__}: {e}")
+
+        self.closed = True
+        if self._on_dead is not None:
+            await self._on_dead(self)
+
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates"""
 
     def __init__(self):
-        # Map telegram_id -> set of WebSocket connections
-        self.active_connections: Dict[int, Set[WebSocket]] = {}
+        # Map telegram_id -> {WebSocket: ClientConnection}
+        self.active_connections: Dict[int, Dict[WebSocket, ClientConnection]] = {}
         # Track last activity for cleanup
         self.last_activity: Dict[int, datetime] = {}
         # Lock for thread safety
         self._lock = asyncio.Lock()
-
-    async def connect(self, websocket: WebSocket, telegram_id: int):
+        # Cross-process delivery (Redis pub/sub), see ws_backplane.py
+        self.backplane: Optional[WebSocketBackplane] = None
+
+    async def start_backplane(self, shards: int = 64, redis_factory=None):
+        """Enable cross-worker delivery through Redis pub/sub"""
+        if self.backplane is None:
+            self.backplane = WebSocketBackplane(
+                self.send_local,
+                broadcast=self.broadcast_local,
+                shards=shards,
+                redis_factory=redis_factory,
+            )
+            for telegram_id in list(self.active_connections.keys()):
+                await self.backplane.retain_user(telegram_id)
+        await self.backplane.start()
+
+    async def stop_backplane(self):
+        """Disable cross-worker delivery"""
+        if self.backplane is not None:
+            await self.backplane.stop()
+            self.backplane = None
+
+    async def connect(self, websocket: WebSocket, telegram_id: int) -> ClientConnection:
         """Accept a new WebSocket connection"""
         await websocket.accept()
 
+        connection = ClientConnection(websocket, telegram_id, on_dead=self._drop_dead)
+        connection.start()
+
         async with self._lock:
-            if telegram_id not in self.active_connections:
-                self.active_connections[telegram_id] = set()
-            self.active_connections[telegram_id].add(websocket)
+            is_first = telegram_id not in self.active_connections
+            if is_first:
+                self.active_connections[telegram_id] = {}
+            self.active_connections[telegram_id][websocket] = connection
             self.last_activity[telegram_id] = datetime.now(timezone.utc)
 
+        if is_first and self.backplane is not None:
+            await self.backplane.retain_user(telegram_id)
+
         logger.info(f"[WS] User {telegram_id} connected. Total connections: {self._total_connections()}")
+        return connection
 
     async def disconnect(self, websocket: WebSocket, telegram_id: int):
         """Remove a WebSocket connection"""
+        is_last = False
+        connection = None
         async with self._lock:
             if telegram_id in self.active_connections:
-                self.active_connections[telegram_id].discard(websocket)
+                connection = self.active_connections[telegram_id].pop(websocket, None)
                 if not self.active_connections[telegram_id]:
                     del self.active_connections[telegram_id]
                     self.last_activity.pop(telegram_id, None)
+                    is_last = True
+
+        if connection is not None:
+            connection.stop()
+
+        if is_last and self.backplane is not None:
+            await self.backplane.release_user(telegram_id)
 
-        logger.info(f"[WS] User {telegram_id} disconnected. Total connections: {self._total_connections()}")
+        if connection is not None:
+            logger.info(f"[WS] User {telegram_id} disconnected. Total connections: {self._total_connections()}")
+
+    async def _drop_dead(self, connection: ClientConnection):
+        """Writer gave up on a socket (error or send timeout)"""
+        await self.disconnect(connection.websocket, connection.telegram_id)
+        with suppress(Exception):
+            await connection.websocket.close(code=1011)
 
     def _total_connections(self) -> int:
         """Count total active connections"""
         return sum(len(conns) for conns in self.active_connections.values())
 
+    def queue_stats(self) -> dict:
+        """Outbound queue depth and drop counters across local sockets"""
+        connections = [c for conns in self.active_connections.values() for c in conns.values()]
+        return {
+            "connections": len(connections),
+            "queued_frames": sum(c.queue_depth for c in connections),
+            "max_queue_depth": max((c.queue_depth for c in connections), default=0),
+            "dropped_frames": sum(c.dropped for c in connections),
+        }
+
     async def send_to_user(self, telegram_id: int, message: dict):
-        """Send a message to all connections of a specific user"""
+        """
+        Send a message to all connections of a specific user.
+        Delivers to local sockets and, when the backplane is running,
+        publishes the event for sockets held by other workers.
+        """
+        delivered = await self.send_local(telegram_id, message)
+        if self.backplane is not None and self.backplane.running:
+            delivered = await self.backplane.publish(telegram_id, message) or delivered
+        return delivered
+
+    async def send_local(self, telegram_id: int, message: dict):
+        """Queue a message to connections of a user held by this process"""
         if telegram_id not in self.active_connections:
-            logger.info(f"[WS] User {telegram_id} not connected, cannot send: {message.get('type', 'unknown')}")
+            logger.debug(f"[WS] User {telegram_id} not connected locally, skip: {message.get('type', 'unknown')}")
             return False
 
-        dead_connections = set()
-        sent_count = 0
-
-        logger.info(f"[WS] Sending {message.get('type', 'unknown')} to user {telegram_id} ({len(self.active_connections[telegram_id])} connections)")
+        return self._enqueue_to_user(telegram_id, encode_message(message), coalesce_key(message))
 
-        for websocket in self.active_connections[telegram_id]:
-            try:
-                if websocket.client_state == WebSocketState.CONNECTED:
-                    await websocket.send_json(message)
-                    sent_count += 1
-                    logger.info(f"[WS] Successfully sent {message.get('type')} to user {telegram_id}")
-                else:
-                    dead_connections.add(websocket)
-            except Exception as e:
-                logger.warning(f"[WS] Failed to send to user {telegram_id}: {e}")
-                dead_connections.add(websocket)
-
-        # Clean up dead connections
-        async with self._lock:
-            if telegram_id in self.active_connections:
-                self.active_connections[telegram_id] -= dead_connections
-
-        return sent_count > 0
+    def _enqueue_to_user(self, telegram_id: int, text: str, coalesce_key: Optional[tuple]) -> bool:
+        queued = False
+        for connection in list(self.active_connections.get(telegram_id, {}).values()):
+            queued = connection.enqueue(text, coalesce_key) or queued
+        return queued
 
     async def broadcast(self, message: dict, exclude_user: Optional[int] = None):
-        """Broadcast a message to all connected users"""
+        """Broadcast a message to all connected users (on every worker)"""
+        await self.broadcast_local(message, exclude_user)
+        if self.backplane is not None and self.backplane.running:
+            await self.backplane.publish_broadcast(message, exclude_user)
+
+    async def broadcast_local(self, message: dict, exclude_user: Optional[int] = None):
+        """Broadcast a message to users connected to this process (encoded once)"""
+        key = coalesce_key(message)
+        text = encode_message(message)
         for telegram_id in list(self.active_connections.keys()):
             if exclude_user and telegram_id == exclude_user:
                 continue
-            await self.send_to_user(telegram_id, message)
+            self._enqueue_to_user(telegram_id, text, key)
 
     def is_user_connected(self, telegram_id: int) -> bool:
         """Check if a user has any active connections"""
@@ -120,29 +291,22 @@ async def websocket_endpoint(
     - revision_round_opened: Client opened a new revision round
     - revision_round_updated: Client added details to an open revision round
     - revision_round_fulfilled: Manager closed revision round with a new version
+    - admin_feed_event / admin_feed_replay: Admin live feed (after subscribing to "admin_feed")
     - ping: Keep-alive ping
     """
     # Authenticate via initData
     if init_data:
         try:
             from bot.api.auth import validate_init_data
+            from bot.services.terms_acceptance import is_terms_accepted
             from core.config import settings
-            from database.db import async_session_maker
-            from database.models.users import User
-            from sqlalchemy import select
             user, error = validate_init_data(init_data, settings.BOT_TOKEN.get_secret_value())
             if not user or user.id != telegram_id:
                 logger.warning(f"[WS] Auth failed for telegram_id={telegram_id}: {error}")
                 await websocket.close(code=4001, reason="Authentication failed")
                 return
 
-            async with async_session_maker() as session:
-                result = await session.execute(
-                    select(User.terms_accepted_at).where(User.telegram_id == telegram_id)
-                )
-                terms_accepted_at = result.scalar_one_or_none()
-
-            if not terms_accepted_at:
+            if not await is_terms_accepted(telegram_id):
                 logger.warning(f"[WS] Terms not accepted for telegram_id={telegram_id}")
                 await websocket.close(code=4003, reason="Terms acceptance required")
                 return
@@ -155,11 +319,11 @@ async def websocket_endpoint(
         await websocket.close(code=4001, reason="Missing init_data")
         return
 
-    await manager.connect(websocket, telegram_id)
+    connection = await manager.connect(websocket, telegram_id)
 
     try:
-        # Send initial connection confirmation
-        await websocket.send_json({
+        # Send initial connection confirmation (all frames go through the writer queue)
+        connection.send({
             "type": "connected",
             "telegram_id": telegram_id,
             "timestamp": datetime.now(timezone.utc).isoformat()
@@ -181,29 +345,30 @@ async def websocket_endpoint(
 
                     if msg_type == "ping":
                         # Respond to ping
-                        await websocket.send_json({
+                        connection.send({
                             "type": "pong",
                             "timestamp": datetime.now(timezone.utc).isoformat()
                         })
                     elif msg_type == "subscribe":
                         # Client wants to subscribe to specific updates
-                        await websocket.send_json({
+                        channels = message.get("channels", [])
+                        connection.send({
                             "type": "subscribed",
-                            "channels": message.get("channels", [])
+                            "channels": channels
                         })
+                        if ADMIN_FEED_CHANNEL in channels and telegram_id in admin_recipients():
+                            await replay_admin_feed(connection, message.get("since_seq"))
 
                 except json.JSONDecodeError:
                     pass  # Ignore invalid JSON
 
             except asyncio.TimeoutError:
                 # Send ping to keep connection alive
-                try:
-                    await websocket.send_json({
-                        "type": "ping",
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
-                except Exception:
-                    break  # Connection dead
+                if not connection.send({
+                    "type": "ping",
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                }):
+                    break  # Writer gave up, connection dead
 
     except WebSocketDisconnect:
         logger.info(f"[WS] User {telegram_id} disconnected normally")
@@ -284,9 +449,22 @@ def get_manager() -> ConnectionManager:
 #  ADMIN/GOD MODE NOTIFICATIONS
 # ═══════════════════════════════════════════════════════════════════════════
 
-# Set of admin telegram IDs that should receive admin notifications
+# Admin IDs registered at runtime via /god/subscribe (on top of settings.ADMIN_IDS)
 _admin_ids: Set[int] = set()
 
+ADMIN_FEED_CHANNEL = "admin_feed"
+
+
+def admin_recipients() -> Set[int]:
+    """
+    Admins that receive admin notifications.
+    settings.ADMIN_IDS is the same on every worker, so delivery does not
+    depend on which worker handled /god/subscribe.
+    """
+    from core.config import settings
+    return set(settings.ADMIN_IDS) | _admin_ids
+
+
 def register_admin_id(admin_id: int):
     """Register an admin ID to receive admin notifications"""
     _admin_ids.add(admin_id)
@@ -307,7 +485,7 @@ async def notify_admin_new_order(order_data: dict):
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     sent_to = []
-    for admin_id in _admin_ids:
+    for admin_id in admin_recipients():
         if await manager.send_to_user(admin_id, message):
             sent_to.append(admin_id)
     if sent_to:
@@ -338,7 +516,7 @@ async def notify_admin_payment_pending(
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     sent_to = []
-    for admin_id in _admin_ids:
+    for admin_id in admin_recipients():
         if await manager.send_to_user(admin_id, message):
             sent_to.append(admin_id)
     if sent_to:
@@ -369,7 +547,7 @@ async def notify_admin_batch_payment_pending(
     }
 
     sent_to = []
-    for admin_id in _admin_ids:
+    for admin_id in admin_recipients():
         if await manager.send_to_user(admin_id, message):
             sent_to.append(admin_id)
     if sent_to:
@@ -387,12 +565,42 @@ async def notify_admin_event(event_type: str, data: dict):
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
     sent_to = []
-    for admin_id in _admin_ids:
+    for admin_id in admin_recipients():
         if await manager.send_to_user(admin_id, message):
             sent_to.append(admin_id)
     return len(sent_to) > 0
 
 
+
+async def notify_admin_feed(feed_event: dict) -> bool:
+    """
+    Push one live feed event (bot/services/admin_feed.py) to admins.
+    Replaces polling GET /api/admin/live-feed.
+    """
+    message = {"type": "admin_feed_event", "event": feed_event}
+    sent_to = []
+    for admin_id in admin_recipients():
+        if await manager.send_to_user(admin_id, message):
+            sent_to.append(admin_id)
+    return len(sent_to) > 0
+
+
+async def replay_admin_feed(connection: ClientConnection, since_seq) -> None:
+    """Send events missed since since_seq (reconnect) from the shared replay buffer"""
+    from bot.services.admin_feed import recent_events
+
+    try:
+        since = int(since_seq) if since_seq is not None else None
+    except (TypeError, ValueError):
+        since = None
+    events, gap = await recent_events(since)
+    connection.send({
+        "type": "admin_feed_replay",
+        "events": list(reversed(events)),  # Oldest first, in publish order
+        "gap": gap,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    })
+
 async def notify_file_delivery(telegram_id: int, order_id: int, file_count: int, files_url: str):
     """
     Notify user that work files have been uploaded and are ready for download.
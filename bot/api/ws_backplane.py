@@ -0,0 +1,214 @@
+"""
+Redis pub/sub backplane for cross-process WebSocket delivery.
+
+Each API worker holds only its own sockets. To reach a user connected to a
+different worker, events are published to a Redis channel and the worker that
+owns the socket delivers them.
+
+Users are sharded into ``WS_BACKPLANE_SHARDS`` channels (``telegram_id % N``).
+A worker subscribes only to shards that currently have at least one of its
+users connected, so it does not receive the whole event stream.
+Broadcasts go through a single ``ws:broadcast`` channel every worker listens to.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "ws:shard:"
+BROADCAST_CHANNEL = "ws:broadcast"
+
+DeliverFn = Callable[[int, dict], Awaitable[bool]]
+BroadcastFn = Callable[[dict, Optional[int]], Awaitable[None]]
+
+
+def shard_for_user(telegram_id: int, shards: int) -> int:
+    """Shard number for a user."""
+    return telegram_id % shards
+
+
+def channel_for_shard(shard: int) -> str:
+    """Redis channel name for a shard."""
+    return f"{CHANNEL_PREFIX}{shard}"
+
+
+class WebSocketBackplane:
+    """
+    Publishes user-targeted events to Redis and delivers events received
+    from other workers to locally connected sockets.
+    """
+
+    def __init__(
+        self,
+        deliver: DeliverFn,
+        *,
+        broadcast: Optional[BroadcastFn] = None,
+        shards: int = 64,
+        redis_factory: Optional[Callable[[], Awaitable[Any]]] = None,
+    ):
+        self.instance_id = uuid.uuid4().hex
+        self.shards = max(1, shards)
+        self._deliver = deliver
+        self._broadcast = broadcast
+        self._redis_factory = redis_factory
+        self._redis = None
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        # shard -> number of local users on that shard
+        self._shard_refs: dict[int, int] = {}
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._listener_task is not None and not self._listener_task.done()
+
+    async def _get_redis(self):
+        if self._redis_factory is not None:
+            return await self._redis_factory()
+        from core.redis_pool import get_redis
+        return await get_redis()
+
+    async def start(self) -> None:
+        """Open the pub/sub connection and start the listener task."""
+        if self.running:
+            return
+
+        self._redis = await self._get_redis()
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+
+        async with self._lock:
+            channels = [BROADCAST_CHANNEL, *(channel_for_shard(s) for s in self._shard_refs)]
+            await self._pubsub.subscribe(*channels)
+
+        self._listener_task = asyncio.create_task(self._listen(), name="ws-backplane")
+        logger.info(f"[WS Backplane] Started instance {self.instance_id[:8]} with {self.shards} shards")
+
+    async def stop(self) -> None:
+        """Stop the listener and release the pub/sub connection."""
+        if self._listener_task is not None:
+            self._listener_task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await self._listener_task
+            self._listener_task = None
+
+        if self._pubsub is not None:
+            with suppress(Exception):
+                await self._pubsub.aclose()
+            self._pubsub = None
+
+        logger.info(f"[WS Backplane] Stopped instance {self.instance_id[:8]}")
+
+    async def retain_user(self, telegram_id: int) -> None:
+        """Called when a user gets their first local socket."""
+        shard = shard_for_user(telegram_id, self.shards)
+        async with self._lock:
+            refs = self._shard_refs.get(shard, 0)
+            self._shard_refs[shard] = refs + 1
+            if refs == 0 and self._pubsub is not None:
+                await self._pubsub.subscribe(channel_for_shard(shard))
+
+    async def release_user(self, telegram_id: int) -> None:
+        """Called when a user's last local socket is gone."""
+        shard = shard_for_user(telegram_id, self.shards)
+        async with self._lock:
+            refs = self._shard_refs.get(shard, 0)
+            if refs <= 1:
+                self._shard_refs.pop(shard, None)
+                if refs == 1 and self._pubsub is not None:
+                    await self._pubsub.unsubscribe(channel_for_shard(shard))
+            else:
+                self._shard_refs[shard] = refs - 1
+
+    def is_subscribed(self, telegram_id: int) -> bool:
+        return shard_for_user(telegram_id, self.shards) in self._shard_refs
+
+    async def publish(self, telegram_id: int, message: dict) -> bool:
+        """
+        Publish an event for a user to the other workers.
+        Returns True if at least one other worker is subscribed to the shard.
+        """
+        if not self.running or self._redis is None:
+            return False
+
+        payload = json.dumps(
+            {"origin": self.instance_id, "uid": telegram_id, "msg": message},
+            ensure_ascii=False,
+            default=str,
+        )
+        try:
+            receivers = await self._redis.publish(
+                channel_for_shard(shard_for_user(telegram_id, self.shards)),
+                payload,
+            )
+        except Exception as e:
+            logger.warning(f"[WS Backplane] Publish failed for user {telegram_id}: {e}")
+            return False
+
+        if self.is_subscribed(telegram_id):
+            receivers -= 1
+        return receivers > 0
+
+    async def publish_broadcast(self, message: dict, exclude_user: Optional[int] = None) -> None:
+        """Publish an event for every connected user on the other workers."""
+        if not self.running or self._redis is None:
+            return
+
+        payload = json.dumps(
+            {"origin": self.instance_id, "uid": None, "exclude": exclude_user, "msg": message},
+            ensure_ascii=False,
+            default=str,
+        )
+        try:
+            await self._redis.publish(BROADCAST_CHANNEL, payload)
+        except Exception as e:
+            logger.warning(f"[WS Backplane] Broadcast publish failed: {e}")
+
+    async def handle_raw(self, data: str | bytes) -> bool:
+        """Deliver one pub/sub payload to local sockets."""
+        try:
+            envelope = json.loads(data)
+        except (TypeError, ValueError):
+            logger.warning("[WS Backplane] Dropping malformed payload")
+            return False
+
+        if envelope.get("origin") == self.instance_id:
+            return False  # Already delivered locally by the publisher
+
+        telegram_id = envelope.get("uid")
+        message = envelope.get("msg")
+        if not isinstance(message, dict):
+            return False
+
+        if telegram_id is None:
+            if self._broadcast is None:
+                return False
+            await self._broadcast(message, envelope.get("exclude"))
+            return True
+
+        if not isinstance(telegram_id, int):
+            return False
+
+        return await self._deliver(telegram_id, message)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                if self._pubsub is None or not self._pubsub.subscribed:
+                    await asyncio.sleep(0.2)
+                    continue
+
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    await self.handle_raw(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[WS Backplane] Listener error: {e}")
+                await asyncio.sleep(1.0)
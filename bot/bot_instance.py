@@ -6,6 +6,7 @@ Provides a singleton bot instance that can be used by both:
 - The FastAPI endpoints
 
 This allows the API to send messages, create topics, and trigger admin notifications.
+All outgoing sends go through the shared SendScheduler (bot/services/send_scheduler.py).
 """
 
 from __future__ import annotations
@@ -14,6 +15,7 @@ from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
+from bot.services.send_scheduler import install_send_scheduler, shutdown_send_scheduler
 from core.config import settings
 
 # Singleton bot instance
@@ -34,6 +36,7 @@ def get_bot() -> Bot:
             token=settings.BOT_TOKEN.get_secret_value(),
             default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
+        install_send_scheduler(_bot_instance)
 
     return _bot_instance
 
@@ -46,6 +49,7 @@ def set_bot(bot: Bot) -> None:
         bot: The Bot instance to use
     """
     global _bot_instance
+    install_send_scheduler(bot)
     _bot_instance = bot
 
 
@@ -53,6 +57,7 @@ async def close_bot() -> None:
     """Close the bot session."""
     global _bot_instance
 
+    await shutdown_send_scheduler()
     if _bot_instance is not None:
         await _bot_instance.session.close()
         _bot_instance = None
@@ -40,6 +40,7 @@ from database.models.orders import (
     is_waiting_payment_status,
 )
 from bot.services.logger import BotLogger
+from bot.services.terms_acceptance import invalidate_terms_acceptance
 from bot.services.bonus import BonusService, BonusReason
 from bot.services.order_delivery_service import send_order_delivery_batch
 from core.config import settings
@@ -1022,7 +1023,7 @@ async def set_order_status(callback: CallbackQuery, session: AsyncSession, bot:
         bot,
         order,
         change,
-        dispatch=OrderStatusDispatchOptions(notify_user=False),
+        dispatch=OrderStatusDispatchOptions(notify_user=False, defer_slow_surfaces=True),
     )
     cashback_amount = change.cashback_amount
 
@@ -1122,7 +1123,7 @@ async def cancel_order(callback: CallbackQuery, session: AsyncSession, bot: Bot)
         bot,
         order,
         change,
-        dispatch=OrderStatusDispatchOptions(notify_user=False),
+        dispatch=OrderStatusDispatchOptions(notify_user=False, defer_slow_surfaces=True),
     )
 
     # ═══ WEBSOCKET REAL-TIME УВЕДОМЛЕНИЕ ═══
@@ -1785,6 +1786,7 @@ async def enable_newbie_mode(callback: CallbackQuery, session: AsyncSession):
         # Сбрасываем принятие оферты
         user.terms_accepted_at = None
         await session.commit()
+        await invalidate_terms_acceptance(telegram_id)
 
         text = """👶  <b>Режим новичка включён</b>
 
@@ -3588,6 +3590,7 @@ async def admin_reject_order(callback: CallbackQuery, session: AsyncSession, bot
             client_username=user.username if user else None,
             client_name=user.fullname if user else None,
             card_extra_text="❌ Отклонено админом",
+            defer_slow_surfaces=True,
         ),
     )
 
@@ -45,17 +45,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
 from database.models.orders import (
-    Order,
-    OrderStatus,
     ORDER_STATUS_META,
     canonicalize_order_status,
     get_active_statuses,
     LEGACY_CONFIRMED_STATUS,
 )
-from database.models.payment_logs import PaymentLog
 from database.models.subscriptions import Subscription
-from database.models.transactions import BalanceTransaction
 from database.models.users import User
+from bot.services.order_stats import get_daily_stats, get_status_counters, msk_day, sum_field
+from bot.services.time_series import TimeSeries, bucket_floor, bucket_key, get_series, to_decimal
 from bot.services.subscription_service import TIERS
 
 logger = logging.getLogger(__name__)
@@ -63,8 +61,8 @@ router = Router()
 
 MSK_TZ = ZoneInfo("Europe/Moscow")
 
-REFERRAL_BONUS_REASON = "referral_bonus"
-PAYMENT_SUCCEEDED_EVENT = "payment.succeeded"
+# Ряды bot/services/time_series.py для блоков СЕГОДНЯ / 7 / 30 ДНЕЙ
+PERIOD_SERIES = ("users", "online_payments", "bonus_ledger")
 
 
 def _fmt_money(value: Decimal | int | float | None) -> str:
@@ -79,79 +77,37 @@ def _boss_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-async def _collect_period_stats(session: AsyncSession, since: datetime) -> dict:
-    """Все агрегаты одного окна времени. Только SELECT-ы."""
-    # Новые пользователи
-    new_users = (await session.execute(
-        select(func.count()).select_from(User).where(User.created_at >= since)
-    )).scalar() or 0
+async def _load_period_series(session: AsyncSession, since: datetime, now: datetime) -> dict[str, TimeSeries]:
+    """Почасовые ряды событий за самое длинное окно — периоды режутся из них."""
+    return {name: await get_series(session, name, "hour", since, now) for name in PERIOD_SERIES}
+
+
+def _series_sum(series: TimeSeries, metric: str, since: datetime) -> float:
+    first = bucket_key(bucket_floor(since, "hour"))
+    return sum(value for bucket, value in zip(series.buckets, series.values[metric]) if bucket >= first)
 
-    # Заявки (без черновиков — черновик ещё не отправлен)
-    orders_row = (await session.execute(
-        select(
-            func.count(),
-            func.coalesce(func.sum(Order.price), 0),
-        ).where(
-            Order.created_at >= since,
-            Order.status != OrderStatus.DRAFT.value,
-        )
-    )).one()
-    orders_count, orders_sum = int(orders_row[0] or 0), Decimal(orders_row[1] or 0)
 
+async def _collect_period_stats(session: AsyncSession, since: datetime, series: dict[str, TimeSeries]) -> dict:
+    """Все агрегаты одного окна времени. Только SELECT-ы."""
+    # Заявки и оплаты по заявкам периода — из дневного rollup
+    # (order_daily_stats, день по МСК): окно округляется до начала дня since
+    days = (await get_daily_stats(session, msk_day(since))).values()
+    # Заявки (без черновиков — черновик ещё не отправлен)
+    orders_count, orders_sum = int(sum_field(days, "orders_created")), Decimal(sum_field(days, "orders_price_sum"))
     # Оплачено по заявкам периода (когорта: заказы, созданные в окне)
-    paid_row = (await session.execute(
-        select(
-            func.count(),
-            func.coalesce(func.sum(Order.paid_amount), 0),
-        ).where(
-            Order.created_at >= since,
-            Order.paid_amount > 0,
-        )
-    )).one()
-    paid_count, paid_sum = int(paid_row[0] or 0), Decimal(paid_row[1] or 0)
-
-    # Онлайн-оплаты ЮKassa — точные по дате
-    online_row = (await session.execute(
-        select(
-            func.count(),
-            func.coalesce(func.sum(PaymentLog.amount), 0),
-        ).where(
-            PaymentLog.processed_at >= since,
-            PaymentLog.event_type == PAYMENT_SUCCEEDED_EVENT,
-        )
-    )).one()
-    online_count, online_sum = int(online_row[0] or 0), Decimal(online_row[1] or 0)
+    paid_count, paid_sum = int(sum_field(days, "paid_orders")), Decimal(sum_field(days, "paid_sum"))
 
+    # События с точным временем — из почасовых рядов (окно выровнено по часу since)
+    users, online, bonuses = series["users"], series["online_payments"], series["bonus_ledger"]
+    new_users = _series_sum(users, "count", since)
     # Пришло по реф-ссылкам
-    ref_users = (await session.execute(
-        select(func.count()).select_from(User).where(
-            User.created_at >= since,
-            User.referrer_id.isnot(None),
-        )
-    )).scalar() or 0
-
-    # Реф-бонусов начислено
-    ref_bonus_sum = Decimal((await session.execute(
-        select(func.coalesce(func.sum(BalanceTransaction.amount), 0)).where(
-            BalanceTransaction.created_at >= since,
-            BalanceTransaction.reason == REFERRAL_BONUS_REASON,
-            BalanceTransaction.type == "credit",
-        )
-    )).scalar() or 0)
-
-    # Бонусы: начислено / списано всего
-    bonus_credit = Decimal((await session.execute(
-        select(func.coalesce(func.sum(BalanceTransaction.amount), 0)).where(
-            BalanceTransaction.created_at >= since,
-            BalanceTransaction.type == "credit",
-        )
-    )).scalar() or 0)
-    bonus_debit = Decimal((await session.execute(
-        select(func.coalesce(func.sum(BalanceTransaction.amount), 0)).where(
-            BalanceTransaction.created_at >= since,
-            BalanceTransaction.type == "debit",
-        )
-    )).scalar() or 0)
+    ref_users = _series_sum(users, "referred", since)
+    # Онлайн-оплаты ЮKassa
+    online_count, online_sum = int(_series_sum(online, "count", since)), to_decimal(_series_sum(online, "amount", since))
+    # Реф-бонусов начислено; бонусы: начислено / списано всего
+    ref_bonus_sum = to_decimal(_series_sum(bonuses, "referral_bonus", since))
+    bonus_credit = to_decimal(_series_sum(bonuses, "credit", since))
+    bonus_debit = to_decimal(_series_sum(bonuses, "debit", since))
 
     return {
         "new_users": int(new_users),
@@ -196,16 +152,14 @@ async def _collect_current_state(session: AsyncSession) -> str:
     now = datetime.now(MSK_TZ)
 
     # Активные заказы по статусам (+ legacy 'confirmed' -> waiting_payment)
-    active_statuses = get_active_statuses()
-    rows = (await session.execute(
-        select(Order.status, func.count()).where(
-            Order.status.in_(active_statuses + [LEGACY_CONFIRMED_STATUS])
-        ).group_by(Order.status)
-    )).all()
+    active_statuses = set(get_active_statuses() + [LEGACY_CONFIRMED_STATUS])
+    counters = await get_status_counters(session)
     by_status: dict[str, int] = {}
-    for status, cnt in rows:
+    for status, row in counters.items():
+        if status not in active_statuses:
+            continue
         canonical = canonicalize_order_status(status) or status
-        by_status[canonical] = by_status.get(canonical, 0) + int(cnt)
+        by_status[canonical] = by_status.get(canonical, 0) + int(row.orders_count)
 
     order_lines: list[str] = []
     total_active = 0
@@ -263,9 +217,12 @@ async def build_dashboard_text(session: AsyncSession) -> str:
     now = datetime.now(MSK_TZ)
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-    today = await _collect_period_stats(session, today_start)
-    week = await _collect_period_stats(session, now - timedelta(days=7))
-    month = await _collect_period_stats(session, now - timedelta(days=30))
+    month_start = now - timedelta(days=30)
+    series = await _load_period_series(session, month_start, now)
+
+    today = await _collect_period_stats(session, today_start, series)
+    week = await _collect_period_stats(session, now - timedelta(days=7), series)
+    month = await _collect_period_stats(session, month_start, series)
     current_state = await _collect_current_state(session)
 
     return (
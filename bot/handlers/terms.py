@@ -22,6 +22,7 @@ from bot.keyboards.terms import (
 )
 from bot.keyboards.inline import get_start_keyboard
 from bot.services.logger import log_action, LogEvent, LogLevel
+from bot.services.terms_acceptance import mark_terms_accepted
 from core.config import settings
 from bot.handlers.menu import send_main_menu
 from core.media_cache import send_cached_photo, get_cached_input_media_photo
@@ -159,6 +160,7 @@ async def accept_terms(callback: CallbackQuery, session: AsyncSession, bot: Bot,
         user.terms_accepted_at = datetime.now(timezone.utc)
 
     await session.commit()
+    await mark_terms_accepted(telegram_id)
 
     # ═══ ШАГ Б: МЕНЮ — отправляем главное меню ═══
     if is_first_accept:
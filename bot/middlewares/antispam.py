@@ -1,23 +1,72 @@
 """
 Антиспам middleware.
 Отслеживает частоту сообщений и блокирует спамеров.
-Данные хранятся в Redis для персистентности и экономии памяти.
+
+История сообщений — sorted set в Redis (score = время в мс), окно обрезается
+ZREMRANGEBYSCORE. Проверка мута, запись сообщения и подсчёт выполняются
+одним Lua-скриптом: один round-trip на апдейт и никаких гонок
+read-modify-write между параллельными апдейтами одного пользователя.
 """
 
-import json
-from datetime import datetime, timedelta
+import logging
 from typing import Any, Awaitable, Callable, Dict
 
 from aiogram import BaseMiddleware, Bot
 from aiogram.types import TelegramObject, Update
 
 from core.config import settings
-from core.redis_pool import get_redis
+from core.redis_pool import RedisScript, get_redis
 from bot.services.logger import BotLogger, LogEvent, LogLevel
 
+logger = logging.getLogger(__name__)
+
 # Настройки антиспама
 MAX_MESSAGES_PER_MINUTE = 10  # Максимум сообщений в минуту
 MUTE_DURATION_SECONDS = 300   # Время мута (5 минут)
+WINDOW_SECONDS = 60
+
+# Результат скрипта: {статус, значение}
+ALLOWED = 0   # значение — сообщений в окне
+MUTED = 1     # значение — сколько мс осталось до конца мута
+SPAM = 2      # только что превышен лимит, значение — длительность мута в мс
+
+# KEYS[1] — ключ мута, KEYS[2] — история (zset);
+# ARGV: окно (мс), лимит, длительность мута (мс), уникальный member
+ANTISPAM_SCRIPT = """
+local mute_ttl = redis.call('PTTL', KEYS[1])
+if mute_ttl > 0 then
+    return {1, mute_ttl}
+end
+
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - window)
+redis.call('ZADD', KEYS[2], now, ARGV[4])
+local count = redis.call('ZCARD', KEYS[2])
+
+if count > tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[1], '1', 'PX', ARGV[3])
+    redis.call('DEL', KEYS[2])
+    return {2, tonumber(ARGV[3])}
+end
+
+redis.call('PEXPIRE', KEYS[2], window)
+return {0, count}
+"""
+antispam_script = RedisScript(ANTISPAM_SCRIPT)
+
+
+async def register_message(user_id: int, member: str) -> tuple[int, int]:
+    """Учесть сообщение пользователя. Возвращает (статус, значение)."""
+    redis = await get_redis()
+    status, value = await antispam_script(
+        redis,
+        keys=[f"antispam:mute:{user_id}", f"antispam:zhistory:{user_id}"],
+        args=[WINDOW_SECONDS * 1000, MAX_MESSAGES_PER_MINUTE, MUTE_DURATION_SECONDS * 1000, member],
+    )
+    return int(status), int(value)
 
 
 class AntiSpamMiddleware(BaseMiddleware):
@@ -45,71 +94,27 @@ class AntiSpamMiddleware(BaseMiddleware):
         if user.id in settings.ADMIN_IDS:
             return await handler(event, data)
 
-        user_id = user.id
-        now = datetime.now()
-        redis = await get_redis()
-
-        # Ключи в Redis
-        mute_key = f"antispam:mute:{user_id}"
-        history_key = f"antispam:history:{user_id}"
-
-        # Проверяем, замучен ли пользователь
-        mute_until_str = await redis.get(mute_key)
-        if mute_until_str:
-            try:
-                mute_until = datetime.fromisoformat(mute_until_str)
-            except (ValueError, TypeError):
-                # Повреждённые данные — удаляем ключ и продолжаем
-                await redis.delete(mute_key)
-                mute_until = None
-
-            if mute_until and now < mute_until:
-                # Всё ещё замучен — игнорируем сообщение
-                remaining = int((mute_until - now).total_seconds())
-                if isinstance(event, Update) and event.message:
-                    await event.message.answer(
-                        f"⏳ Слишком много сообщений!\n"
-                        f"Подожди {remaining // 60} мин. {remaining % 60} сек."
-                    )
-                return None
-            elif mute_until:
-                # Мут закончился — удаляем ключ
-                await redis.delete(mute_key)
-
-        # Получаем историю сообщений (список timestamp'ов)
-        history_raw = await redis.get(history_key)
-        if history_raw:
-            try:
-                history = json.loads(history_raw)
-                if not isinstance(history, list):
-                    history = []
-            except (json.JSONDecodeError, TypeError):
-                history = []
-        else:
-            history = []
-
-        # Очищаем старые записи (старше минуты)
-        cutoff = (now - timedelta(minutes=1)).timestamp()
-        history = [ts for ts in history if ts > cutoff]
-
-        # Добавляем текущее сообщение
-        history.append(now.timestamp())
-
-        # Сохраняем историю с TTL 2 минуты
-        await redis.set(history_key, json.dumps(history), ex=120)
-
-        # Проверяем количество сообщений
-        if len(history) > MAX_MESSAGES_PER_MINUTE:
-            # Спам! Мутим пользователя
-            mute_until = now + timedelta(seconds=MUTE_DURATION_SECONDS)
-            await redis.set(mute_key, mute_until.isoformat(), ex=MUTE_DURATION_SECONDS + 60)
-            await redis.delete(history_key)  # Очищаем историю
+        try:
+            status, value = await register_message(user.id, f"{event.update_id}")
+        except Exception as e:
+            logger.warning(f"[AntiSpam] Redis error, skipping check: {e}")
+            return await handler(event, data)
+
+        if status == MUTED:
+            # Всё ещё замучен — игнорируем сообщение
+            remaining = max(1, value // 1000)
+            await event.message.answer(
+                f"⏳ Слишком много сообщений!\n"
+                f"Подожди {remaining // 60} мин. {remaining % 60} сек."
+            )
+            return None
 
+        if status == SPAM:
             # Логируем в канал
             bot: Bot = data.get("bot")
             if bot:
-                logger = BotLogger(bot)
-                await logger.log(
+                bot_logger = BotLogger(bot)
+                await bot_logger.log(
                     event=LogEvent.SPAM_DETECTED,
                     user=user,
                     details=f"Заблокирован на {MUTE_DURATION_SECONDS // 60} мин. за спам",
@@ -117,11 +122,10 @@ class AntiSpamMiddleware(BaseMiddleware):
                     silent=False,
                 )
 
-            if isinstance(event, Update) and event.message:
-                await event.message.answer(
-                    f"🤖 Обнаружен спам!\n"
-                    f"Ты заблокирован на {MUTE_DURATION_SECONDS // 60} минут."
-                )
+            await event.message.answer(
+                f"🤖 Обнаружен спам!\n"
+                f"Ты заблокирован на {MUTE_DURATION_SECONDS // 60} минут."
+            )
             return None
 
         return await handler(event, data)
@@ -3,73 +3,32 @@ Middleware для отслеживания стоп-слов.
 Уведомляет админа о подозрительных сообщениях.
 """
 
-import re
-from typing import Any, Awaitable, Callable, Dict, List
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 from aiogram import BaseMiddleware, Bot
 from aiogram.types import TelegramObject, Update
 
 from core.config import settings
 from bot.services.logger import BotLogger, LogEvent, LogLevel
-
-
-# Стоп-слова и паттерны (можно расширить)
-STOP_WORDS: List[str] = [
-    # Конкуренты
-    "zaochnik",
-    "автор24",
-    "author24",
-    "студворк",
-    "studwork",
-    "напишем",
-
-    # Подозрительное
-    "возврат денег",
-    "верни деньги",
-    "обман",
-    "мошенник",
-    "развод",
-    "кинул",
-
-    # Угрозы
-    "в полицию",
-    "в суд",
-    "жалоба",
-    "роспотребнадзор",
-]
-
-# Регулярные выражения для более сложных паттернов
-STOP_PATTERNS = [
-    r"(\+7|8)[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}",  # Телефоны
-    r"@[a-zA-Z_][a-zA-Z0-9_]{4,}",  # Username других ботов/людей (длинные)
-    r"t\.me/[a-zA-Z0-9_]+",  # Ссылки на телеграм
-]
+from bot.services.stop_words import get_matcher, refresh_due, refresh_matcher
 
 
 class StopWordsMiddleware(BaseMiddleware):
     """
     Middleware для отслеживания стоп-слов.
     Не блокирует сообщения, но уведомляет админа.
+
+    Поиск — один проход скомпилированного матчера (bot/services/stop_words.py);
+    список слов перечитывается из Redis в фоне, не задерживая сообщение.
     """
 
     def __init__(self):
-        self.stop_words = [w.lower() for w in STOP_WORDS]
-        self.patterns = [re.compile(p, re.IGNORECASE) for p in STOP_PATTERNS]
-        # Белый список - свои username и ссылки, которые не должны вызывать алерт
-        self.whitelist = [
-            f"@{settings.SUPPORT_USERNAME}".lower(),
-            f"@{settings.BOT_USERNAME}".lower(),
-            f"t.me/{settings.BOT_USERNAME}".lower(),
-            settings.REVIEWS_CHANNEL.lower(),
-        ]
+        self._refresh: Optional[asyncio.Task] = None
 
-    def _is_whitelisted(self, match: str) -> bool:
-        """Проверяет, находится ли совпадение в белом списке"""
-        match_lower = match.lower()
-        for allowed in self.whitelist:
-            if match_lower in allowed or allowed in match_lower:
-                return True
-        return False
+    def _schedule_refresh(self) -> None:
+        if refresh_due() and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.create_task(refresh_matcher())
 
     async def __call__(
         self,
@@ -80,24 +39,11 @@ class StopWordsMiddleware(BaseMiddleware):
         # Проверяем только текстовые сообщения
         if isinstance(event, Update) and event.message and event.message.text:
             user = event.message.from_user
-            text = event.message.text.lower()
 
             # Админов не проверяем
             if user and user.id not in settings.ADMIN_IDS:
-                found_words = []
-
-                # Проверяем стоп-слова
-                for word in self.stop_words:
-                    if word in text:
-                        found_words.append(word)
-
-                # Проверяем паттерны
-                for pattern in self.patterns:
-                    matches = pattern.findall(event.message.text)
-                    for match in matches[:3]:  # Максимум 3 совпадения
-                        # Исключаем свои username и ссылки
-                        if not self._is_whitelisted(match):
-                            found_words.append(match)
+                self._schedule_refresh()
+                found_words = get_matcher().scan(event.message.text)
 
                 # Если нашли что-то подозрительное — уведомляем
                 if found_words:
@@ -107,7 +53,7 @@ class StopWordsMiddleware(BaseMiddleware):
                         await logger.log(
                             event=LogEvent.STOP_WORD,
                             user=user,
-                            details=f"Стоп-слова: {', '.join(found_words[:5])}",
+                            details=f"Стоп-слова: {', '.join(found_words)}",
                             extra_data={"Сообщение": event.message.text[:200]},
                             level=LogLevel.WARNING,
                             silent=False,
@@ -240,11 +240,15 @@ class AbandonedOrderTracker:
 _tracker: Optional[AbandonedOrderTracker] = None
 
 
-def init_abandoned_tracker(bot: Bot, storage: RedisStorage) -> AbandonedOrderTracker:
-    """Инициализировать трекер брошенных заказов"""
+def init_abandoned_tracker(bot: Bot, storage: RedisStorage, *, start: bool = True) -> AbandonedOrderTracker:
+    """
+    Инициализировать трекер брошенных заказов.
+    start=False — только запись в Redis, проверку ведёт другой процесс.
+    """
     global _tracker
     _tracker = AbandonedOrderTracker(bot, storage)
-    _tracker.start()
+    if start:
+        _tracker.start()
     return _tracker
 
 
@@ -1,17 +1,33 @@
+"""
+Achievements: definitions, per-user progress and unlock rewards.
+
+Order-derived metrics live in user_achievement_metrics and are maintained
+incrementally by mapper hooks on Order (install_achievement_tracking());
+referrals and daily streak come from the users row. A missing or stale
+metrics row is rebuilt from orders on the next read. Owner percentages are
+read from achievement_owner_stats, refreshed by AchievementStatsRefresher.
+Reading a profile therefore costs a few primary-key lookups.
+"""
+
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections import defaultdict
 from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable, Optional
 
 from aiogram import Bot
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, event, func, insert, inspect, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from bot.services.bonus import BonusReason, BonusService
+from bot.services.order_stats import attribute_changes, current_values, dialect_insert
 from core.ranks import get_next_rank
-from database.models.achievements import UserAchievement
+from database.models.achievements import AchievementOwnerStat, UserAchievement, UserAchievementMetrics
 from database.models.orders import Order, OrderStatus
 from database.models.users import User
 
@@ -282,49 +298,200 @@ def _to_int(value: Any) -> int:
     return int(value)
 
 
-async def _load_user(session: AsyncSession, telegram_id: int) -> User | None:
-    return await session.scalar(select(User).where(User.telegram_id == telegram_id))
+ORDER_METRICS = (
+    "paid_orders_count",
+    "full_payment_orders_count",
+    "promo_paid_orders_count",
+    "perfect_orders_count",
+    "reviewed_orders_count",
+    "completed_spend_total",
+)
+_METRIC_ORDER_FIELDS = (
+    "user_id",
+    "work_type",
+    "status",
+    "paid_amount",
+    "payment_scheme",
+    "promo_code",
+    "revision_count",
+    "review_submitted",
+)
+_UNPAID_STATUSES = (OrderStatus.CANCELLED.value, OrderStatus.REJECTED.value)
+
+OWNER_STATS_REFRESH_SECONDS = 900
+
+
+def order_contribution(
+    user_id, work_type, status, paid_amount, payment_scheme, promo_code, revision_count, review_submitted,
+) -> dict[str, int | Decimal]:
+    """What a single order adds to its owner's metrics."""
+    metrics: dict[str, int | Decimal] = {}
+    if work_type == "support_chat":
+        return metrics
+
+    paid_amount = Decimal(str(paid_amount or 0))
+    if paid_amount > 0 and status not in _UNPAID_STATUSES:
+        metrics["paid_orders_count"] = 1
+        if promo_code:
+            metrics["promo_paid_orders_count"] = 1
+        if str(payment_scheme or "").lower() == "full":
+            metrics["full_payment_orders_count"] = 1
+
+    if status == OrderStatus.COMPLETED.value:
+        metrics["completed_spend_total"] = paid_amount
+        if int(revision_count or 0) == 0:
+            metrics["perfect_orders_count"] = 1
+        if review_submitted:
+            metrics["reviewed_orders_count"] = 1
+    return metrics
+
+
+def _metrics_aggregate_query():
+    """Metrics for every user straight from orders (same rules as order_contribution)."""
+    paid = and_(Order.paid_amount > 0, Order.status.notin_(_UNPAID_STATUSES))
+    completed = Order.status == OrderStatus.COMPLETED.value
+    return (
+        select(
+            Order.user_id,
+            func.count(Order.id).filter(paid),
+            func.count(Order.id).filter(and_(paid, func.lower(Order.payment_scheme) == "full")),
+            func.count(Order.id).filter(and_(paid, Order.promo_code.isnot(None), Order.promo_code != "")),
+            func.count(Order.id).filter(and_(completed, func.coalesce(Order.revision_count, 0) == 0)),
+            func.count(Order.id).filter(and_(completed, Order.review_submitted.is_(True))),
+            func.coalesce(func.sum(Order.paid_amount).filter(completed), 0),
+        )
+        .where(Order.work_type != "support_chat")
+        .group_by(Order.user_id)
+    )
 
 
-async def _load_orders(session: AsyncSession, telegram_id: int) -> list[Order]:
-    result = await session.execute(
-        select(Order).where(
-            Order.user_id == telegram_id,
-            Order.work_type != "support_chat",
+# ══════════════════════════════════════════════════════════════
+#           INCREMENTAL METRICS (mapper hooks)
+# ══════════════════════════════════════════════════════════════
+
+def _apply_metric_deltas(connection: Connection, deltas: dict[int, dict[str, int | Decimal]]) -> None:
+    """
+    Add deltas to existing rows only: a user without a row gets it rebuilt
+    from orders on read, so a partial row is never created here.
+    """
+    table = UserAchievementMetrics.__table__
+    for user_id, increments in deltas.items():
+        increments = {field: value for field, value in increments.items() if value}
+        if not increments:
+            continue
+        connection.execute(
+            update(table)
+            .where(table.c.user_id == user_id)
+            .values({
+                **{field: table.c[field] + value for field, value in increments.items()},
+                "updated_at": func.now(),
+            })
         )
-    )
-    return result.scalars().all()
-
-
-def _build_context(user: User, orders: list[Order]) -> AchievementContext:
-    paid_orders = [
-        order for order in orders
-        if float(order.paid_amount or 0) > 0 and order.status not in {
-            OrderStatus.CANCELLED.value,
-            OrderStatus.REJECTED.value,
-        }
-    ]
-    completed_orders = [order for order in orders if order.status == OrderStatus.COMPLETED.value]
-    perfect_orders = [order for order in completed_orders if int(order.revision_count or 0) == 0]
-    reviewed_orders = [order for order in completed_orders if bool(getattr(order, "review_submitted", False))]
-    promo_paid_orders = [order for order in paid_orders if getattr(order, "promo_code", None)]
-    full_payment_orders = [
-        order for order in paid_orders
-        if str(getattr(order, "payment_scheme", "") or "").lower() == "full"
-    ]
-    completed_spend_total = sum(float(order.paid_amount or 0) for order in completed_orders)
+
+
+def _mark_stale(connection: Connection, user_id) -> None:
+    if user_id is not None:
+        table = UserAchievementMetrics.__table__
+        connection.execute(delete(table).where(table.c.user_id == user_id))
+
+
+def _add_contribution(deltas: dict, values: tuple, sign: int) -> None:
+    user_id = values[0]
+    for field, value in order_contribution(*values).items():
+        deltas[user_id][field] += sign * value
+
+
+def _on_order_insert(mapper, connection, target) -> None:
+    deltas: dict = defaultdict(lambda: defaultdict(int))
+    _add_contribution(deltas, tuple(inspect(target).dict.get(key) for key in _METRIC_ORDER_FIELDS), 1)
+    _apply_metric_deltas(connection, deltas)
+
+
+def _on_order_update(mapper, connection, target) -> None:
+    values = attribute_changes(target, _METRIC_ORDER_FIELDS)
+    if values is None:
+        _mark_stale(connection, inspect(target).dict.get("user_id"))
+        return
+    old, new = values
+    if old == new:
+        return
+    deltas: dict = defaultdict(lambda: defaultdict(int))
+    _add_contribution(deltas, old, -1)
+    _add_contribution(deltas, new, 1)
+    _apply_metric_deltas(connection, deltas)
+
+
+def _on_order_delete(mapper, connection, target) -> None:
+    values = current_values(target, _METRIC_ORDER_FIELDS)
+    if values is None:
+        _mark_stale(connection, inspect(target).dict.get("user_id"))
+        return
+    deltas: dict = defaultdict(lambda: defaultdict(int))
+    _add_contribution(deltas, values, -1)
+    _apply_metric_deltas(connection, deltas)
+
+
+_HOOKS = (
+    (Order, "after_insert", _on_order_insert),
+    (Order, "after_update", _on_order_update),
+    (Order, "after_delete", _on_order_delete),
+)
+
+
+def install_achievement_tracking() -> None:
+    """Attach incremental metric updates to Order flushes (idempotent)."""
+    for model, identifier, fn in _HOOKS:
+        if not event.contains(model, identifier, fn):
+            event.listen(model, identifier, fn)
+
+
+def uninstall_achievement_tracking() -> None:
+    for model, identifier, fn in _HOOKS:
+        if event.contains(model, identifier, fn):
+            event.remove(model, identifier, fn)
+
+
+async def rebuild_achievement_metrics(session: AsyncSession, user_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+    """Recompute metrics rows for the given (existing) users from orders. Does not commit."""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+
+    fresh = {user_id: dict.fromkeys(ORDER_METRICS, 0) for user_id in user_ids}
+    result = await session.execute(_metrics_aggregate_query().where(Order.user_id.in_(user_ids)))
+    for user_id, *values in result.all():
+        fresh[user_id] = dict(zip(ORDER_METRICS, (*map(int, values[:-1]), Decimal(str(values[-1] or 0)))))
+
+    connection = await session.connection()
+    insert_ = dialect_insert(connection)
+    for user_id, metrics in fresh.items():
+        stmt = insert_(UserAchievementMetrics).values(user_id=user_id, **metrics)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={**{field: stmt.excluded[field] for field in ORDER_METRICS}, "updated_at": func.now()},
+        )
+        await session.execute(stmt)
+    return fresh
+
+
+async def _load_metrics(session: AsyncSession, telegram_id: int) -> tuple[dict[str, Any], bool]:
+    """(metrics, rebuilt) — rebuilt=True if the row had to be recomputed."""
+    row = await session.get(UserAchievementMetrics, telegram_id, populate_existing=True)
+    if row is not None:
+        return {field: getattr(row, field) for field in ORDER_METRICS}, False
+    fresh = await rebuild_achievement_metrics(session, [telegram_id])
+    return fresh[telegram_id], True
+
+
+def _build_context(user: User, metrics: dict[str, Any]) -> AchievementContext:
+    completed_spend_total = float(metrics.get("completed_spend_total") or 0)
     next_rank = get_next_rank(completed_spend_total)
 
     return AchievementContext(
         metrics={
-            "paid_orders_count": len(paid_orders),
+            **{field: _to_int(metrics.get(field)) for field in ORDER_METRICS},
             "referrals_count": int(user.referrals_count or 0),
             "daily_streak": int(user.daily_bonus_streak or 0),
-            "completed_spend_total": int(round(completed_spend_total)),
-            "promo_paid_orders_count": len(promo_paid_orders),
-            "perfect_orders_count": len(perfect_orders),
-            "reviewed_orders_count": len(reviewed_orders),
-            "full_payment_orders_count": len(full_payment_orders),
             "max_rank_unlocked": 1 if next_rank is None else 0,
         },
         next_rank_name=None if next_rank is None else next_rank.name,
@@ -340,21 +507,101 @@ async def _get_existing_unlocks(session: AsyncSession, telegram_id: int) -> dict
 
 
 async def _get_owner_percentages(session: AsyncSession) -> dict[str, int]:
-    total_users = int((await session.scalar(select(func.count(User.id)))) or 0)
-    if total_users <= 0:
-        return {}
+    result = await session.execute(
+        select(AchievementOwnerStat.achievement_key, AchievementOwnerStat.owners_percent)
+    )
+    return {key: percent for key, percent in result.all() if percent}
+
+
+# ══════════════════════════════════════════════════════════════
+#           PERIODIC REFRESH
+# ══════════════════════════════════════════════════════════════
 
+async def refresh_achievement_owner_stats(session: AsyncSession) -> dict[str, int]:
+    """Recount owners of every achievement into achievement_owner_stats and commit."""
+    total_users = int((await session.scalar(select(func.count(User.id)))) or 0)
     result = await session.execute(
         select(UserAchievement.achievement_key, func.count(UserAchievement.id))
         .group_by(UserAchievement.achievement_key)
     )
-    counts = result.all()
-    return {
-        key: max(1, min(100, int(round((count / total_users) * 100))))
-        for key, count in counts
-        if count
+    owners = {key: count for key, count in result.all() if count}
+    percentages = {
+        key: max(1, min(100, int(round((count / total_users) * 100)))) if total_users else 0
+        for key, count in owners.items()
     }
 
+    await session.execute(delete(AchievementOwnerStat))
+    if owners:
+        await session.execute(insert(AchievementOwnerStat), [
+            {"achievement_key": key, "owners_count": count, "owners_percent": percentages[key]}
+            for key, count in owners.items()
+        ])
+    await session.commit()
+    return percentages
+
+
+async def rebuild_recent_achievement_metrics(session: AsyncSession, since: datetime) -> int:
+    """
+    Recompute metrics of users whose orders changed since `since` and commit.
+    Repairs drift from bulk UPDATEs or processes without the hooks installed.
+    Both range conditions are indexed (ix_orders_created_id, ix_orders_updated_at).
+    """
+    result = await session.execute(
+        select(Order.user_id)
+        .where(or_(Order.created_at >= since, Order.updated_at >= since))
+        .distinct()
+    )
+    user_ids = [user_id for (user_id,) in result.all()]
+    for start in range(0, len(user_ids), 500):
+        await rebuild_achievement_metrics(session, user_ids[start:start + 500])
+    await session.commit()
+    return len(user_ids)
+
+
+class AchievementStatsRefresher:
+    """Periodic refresh of owner percentages and recently touched metrics rows."""
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> None:
+        since = datetime.now(timezone.utc) - timedelta(seconds=OWNER_STATS_REFRESH_SECONDS * 2)
+        async with self.session_maker() as session:
+            await rebuild_recent_achievement_metrics(session, since)
+            await refresh_achievement_owner_stats(session)
+
+    async def _loop(self):
+        while self._running:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[Achievements] Stats refresh failed: {e}")
+            await asyncio.sleep(OWNER_STATS_REFRESH_SECONDS)
+
+    def start(self):
+        """Запустить сервис"""
+        if not self._running:
+            self._running = True
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        """Остановить сервис"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+
+
+def init_achievement_stats(session_maker: async_sessionmaker) -> AchievementStatsRefresher:
+    """Install metric hooks and start the periodic refresh."""
+    install_achievement_tracking()
+    refresher = AchievementStatsRefresher(session_maker)
+    refresher.start()
+    return refresher
+
 
 def _serialize_achievements(
     context: AchievementContext,
@@ -459,13 +706,20 @@ async def sync_user_achievements(
     bot: Bot | None = None,
     notify: bool = False,
     auto_commit: bool = True,
+    user: User | None = None,
 ) -> list[dict[str, Any]]:
-    user = await _load_user(session, telegram_id)
+    """
+    Unlock everything the user currently qualifies for and return the payload.
+
+    Reads precomputed metrics only; pass `user` if it is already loaded.
+    """
+    if user is None:
+        user = await session.scalar(select(User).where(User.telegram_id == telegram_id))
     if user is None:
         return []
 
-    orders = await _load_orders(session, telegram_id)
-    context = _build_context(user, orders)
+    metrics, rebuilt = await _load_metrics(session, telegram_id)
+    context = _build_context(user, metrics)
     unlocks = await _get_existing_unlocks(session, telegram_id)
 
     new_rows: list[UserAchievement] = []
@@ -504,8 +758,8 @@ async def sync_user_achievements(
         await session.flush()
         for row in new_rows:
             await session.refresh(row)
-        if auto_commit:
-            await session.commit()
+    if (new_rows or rebuilt) and auto_commit:
+        await session.commit()
 
     owner_percentages = await _get_owner_percentages(session)
     payload = _serialize_achievements(context, unlocks, owner_percentages)
@@ -0,0 +1,287 @@
+"""
+Лента событий для админов (God Mode → Радар) — push вместо опроса.
+
+Раньше клиент раз в 10 секунд дёргал GET /api/admin/live-feed, а тот
+делал пять упорядоченных выборок по orders/users. Теперь события
+публикуются в момент изменения:
+
+- session-хуки (after_flush) замечают переходы заказа в pending /
+  waiting_estimation / verification_pending / completed и регистрацию
+  пользователя, after_commit публикует их (после rollback — ничего);
+- событие получает номер seq (INCR) и попадает в кольцевой буфер
+  admin_feed:events в Redis (последние REPLAY_SIZE), общий для воркеров;
+- админам оно уходит по /api/ws (тип admin_feed_event) через
+  ConnectionManager — с backplane доходит до сокета на любом воркере.
+
+При переподключении клиент шлёт {"type": "subscribe", "channels":
+["admin_feed"], "since_seq": N} и получает пропущенное из буфера
+(admin_feed_replay; gap=True — буфер уже не покрывает N, нужен полный
+снимок через GET /api/admin/live-feed, который тоже читает буфер).
+Если Redis недоступен, буфер локальный для процесса: номера продолжают
+последний увиденный seq (и после возврата Redis счётчик поднимается выше
+них), а replay из локального буфера всегда отдаёт gap=True — события других
+воркеров в нём не видны.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from core.redis_pool import get_redis
+from database.models.orders import Order, OrderStatus, WORK_TYPE_LABELS
+from database.models.users import User
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+REPLAY_SIZE = 200
+SEQ_KEY = "admin_feed:seq"
+EVENTS_KEY = "admin_feed:events"
+
+_PENDING_KEY = "admin_feed_events"
+
+_last_seq = 0  # Последний seq, выданный или прочитанный этим процессом
+_local_buffer: deque[dict] = deque(maxlen=REPLAY_SIZE)
+_background_tasks: set[asyncio.Task] = set()
+
+
+# ══════════════════════════════════════════════════════════════
+#           СОБЫТИЯ
+# ══════════════════════════════════════════════════════════════
+
+def _now_iso() -> str:
+    return datetime.now(MSK_TZ).isoformat()
+
+
+def make_event(
+    event_type: str,
+    priority: str,
+    title: str,
+    message: str,
+    *,
+    entity_id: int,
+    order_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    amount: Optional[float] = None,
+) -> dict:
+    """Событие в формате LiveEvent (bot/api/schemas.py); id и seq проставляются при публикации."""
+    return {
+        "type": event_type,
+        "priority": priority,
+        "title": title,
+        "message": message,
+        "order_id": order_id,
+        "user_id": user_id,
+        "amount": amount,
+        "timestamp": _now_iso(),
+        "entity_id": entity_id,
+    }
+
+
+def _order_amount(order: Order) -> float:
+    loaded = inspect(order).dict
+    if all(key in loaded for key in ("price", "discount", "promo_discount", "bonus_used")) and loaded["price"] is not None:
+        return float(order.final_price)
+    return float(loaded.get("price") or 0)
+
+
+def order_event(order: Order, status: str) -> Optional[dict]:
+    """Событие ленты для перехода заказа в status (None — статус ленту не интересует)."""
+    data = inspect(order).dict  # Без lazy-load: хук работает внутри flush
+    order_id, user_id = data.get("id"), data.get("user_id")
+    if status == OrderStatus.PENDING.value:
+        work_label = WORK_TYPE_LABELS.get(data.get("work_type"), data.get("work_type"))
+        subject = data.get("subject")
+        return make_event(
+            "new_order", "critical", "🆕 Новый заказ",
+            f"#{order_id} • {work_label}" + (f" • {subject}" if subject else ""),
+            entity_id=order_id, order_id=order_id, user_id=user_id,
+        )
+    if status == OrderStatus.WAITING_ESTIMATION.value:
+        return make_event(
+            "needs_estimation", "high", "📝 Нужна оценка",
+            f"#{order_id} • {data.get('subject') or 'Без темы'}",
+            entity_id=order_id, order_id=order_id, user_id=user_id,
+        )
+    if status == OrderStatus.VERIFICATION_PENDING.value:
+        amount = _order_amount(order)
+        return make_event(
+            "payment_received", "critical", "💰 Оплата на проверке",
+            f"#{order_id} • {amount:,.0f} ₽",
+            entity_id=order_id, order_id=order_id, user_id=user_id, amount=amount,
+        )
+    if status == OrderStatus.COMPLETED.value:
+        paid = float(data.get("paid_amount") or 0)
+        return make_event(
+            "order_completed", "low", "✅ Заказ завершён",
+            f"#{order_id} • +{paid:,.0f} ₽",
+            entity_id=order_id, order_id=order_id, amount=paid,
+        )
+    return None
+
+
+def user_event(user: User) -> dict:
+    data = inspect(user).dict
+    return make_event(
+        "new_user", "normal", "👤 Новый клиент",
+        data.get("fullname") or data.get("username") or f"ID: {data.get('telegram_id')}",
+        entity_id=data.get("id"), user_id=data.get("telegram_id"),
+    )
+
+
+# ══════════════════════════════════════════════════════════════
+#           БУФЕР И ДОСТАВКА
+# ══════════════════════════════════════════════════════════════
+
+async def _store(events: list[dict]) -> list[dict]:
+    """Присвоить seq и положить в буфер (Redis, при ошибке — локальный)."""
+    global _last_seq
+    try:
+        redis = await get_redis()
+        last = int(await redis.incrby(SEQ_KEY, len(events)))
+        if last - len(events) < _last_seq:
+            # Пока Redis был недоступен, номера шли локально — продолжить после них,
+            # иначе клиент с since_seq из локальных номеров отфильтрует новые события
+            last = int(await redis.incrby(SEQ_KEY, _last_seq - (last - len(events))))
+        first = last - len(events) + 1
+        _last_seq = max(_last_seq, last)
+        for offset, item in enumerate(events):
+            item["seq"] = first + offset
+            item["id"] = f"{item['seq']}_{item['type']}_{item['entity_id']}"
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.lpush(EVENTS_KEY, *(json.dumps(item, ensure_ascii=False) for item in events))
+            pipe.ltrim(EVENTS_KEY, 0, REPLAY_SIZE - 1)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"[AdminFeed] Redis buffer unavailable, keeping events locally: {e}")
+        for item in events:
+            _last_seq += 1
+            item["seq"] = _last_seq
+            item["id"] = f"local{_last_seq}_{item['type']}_{item['entity_id']}"
+            _local_buffer.append(item)
+    return events
+
+
+async def recent_events(since_seq: Optional[int] = None, limit: int = REPLAY_SIZE) -> tuple[list[dict], bool]:
+    """
+    События буфера новее since_seq, новые первыми.
+    Второй элемент — gap: буфер начинается позже since_seq (часть событий потеряна)
+    или это локальный буфер процесса, не полный по определению.
+    """
+    global _last_seq
+    local = False
+    try:
+        redis = await get_redis()
+        raw = await redis.lrange(EVENTS_KEY, 0, REPLAY_SIZE - 1)
+        buffered = [json.loads(item) for item in raw]
+        if buffered:
+            _last_seq = max(_last_seq, buffered[0]["seq"])
+    except Exception as e:
+        logger.warning(f"[AdminFeed] Reading local buffer: {e}")
+        buffered = list(reversed(_local_buffer))
+        local = True
+
+    if since_seq is None:
+        return buffered[:limit], False
+    fresh = [item for item in buffered if item["seq"] > since_seq]
+    oldest = buffered[-1]["seq"] if buffered else None
+    gap = local or (oldest is not None and oldest > since_seq + 1 and len(buffered) >= REPLAY_SIZE)
+    return fresh[:limit], gap
+
+
+async def publish_admin_events(events: Iterable[dict]) -> list[dict]:
+    """Сохранить события в буфер и разослать админам по WebSocket."""
+    events = [item for item in events if item is not None]
+    if not events:
+        return []
+    stored = await _store(events)
+
+    from bot.api.websocket import notify_admin_feed
+
+    for item in stored:
+        await notify_admin_feed(item)
+    return stored
+
+
+# ══════════════════════════════════════════════════════════════
+#           SESSION HOOKS
+# ══════════════════════════════════════════════════════════════
+
+def _status_change(order: Order) -> Optional[str]:
+    history = inspect(order).attrs.status.history
+    if not history.added:
+        return None
+    new_status = history.added[0]
+    if history.deleted and history.deleted[0] == new_status:
+        return None
+    return new_status
+
+
+def _on_after_flush(session: Session, flush_context) -> None:
+    pending = None
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Order):
+            status = _status_change(obj)
+            item = order_event(obj, status) if status else None
+        elif isinstance(obj, User) and obj in session.new:
+            item = user_event(obj)
+        else:
+            continue
+        if item is not None:
+            if pending is None:
+                pending = session.info.setdefault(_PENDING_KEY, [])
+            pending.append(item)
+
+
+def _on_after_commit(session: Session) -> None:
+    events = session.info.pop(_PENDING_KEY, None)
+    if not events:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Синхронный контекст (скрипты) — ленту не шлём
+    task = loop.create_task(_publish_safely(events))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _publish_safely(events: list[dict]) -> None:
+    try:
+        await publish_admin_events(events)
+    except Exception as e:
+        logger.error(f"[AdminFeed] Publish failed: {e}")
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_HOOKS = (
+    ("after_flush", _on_after_flush),
+    ("after_commit", _on_after_commit),
+    ("after_rollback", _on_after_rollback),
+)
+
+
+def install_admin_feed_tracking() -> None:
+    """Публиковать события ленты после commit (идемпотентно)."""
+    for identifier, fn in _HOOKS:
+        if not event.contains(Session, identifier, fn):
+            event.listen(Session, identifier, fn)
+
+
+def uninstall_admin_feed_tracking() -> None:
+    for identifier, fn in _HOOKS:
+        if event.contains(Session, identifier, fn):
+            event.remove(Session, identifier, fn)
@@ -0,0 +1,445 @@
+"""
+Фоновые рассылки God Mode.
+
+POST /api/god/broadcast только создаёт задачу и сразу возвращает job_id;
+отправкой занимается BroadcastEngine в фоне:
+- получатели читаются страницами по telegram_id (keyset), короткими запросами;
+- сообщения уходят параллельно (BROADCAST_CONCURRENCY) под общим TokenBucket
+  и ChatThrottle (core/token_bucket.py), TelegramRetryAfter ставит ведро на паузу;
+  в общем планировщике отправок рассылка идёт низшей полосой marketing;
+- прогресс хранится в Redis (hash broadcast:job:{id}): счётчики, курсор страницы,
+  множество уже обработанных id текущей страницы. После рестарта задача
+  продолжается с курсора без повторной отправки;
+- lock broadcast:job:{id}:lock не даёт двум воркерам вести одну задачу;
+- итоговый статус пишется скриптом только если задачу не отменили: отмена,
+  пришедшая во время последней страницы, не затирается COMPLETED.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import suppress
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+)
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from bot.services.send_scheduler import SendQueueFull, send_lane
+from core.redis_pool import RedisScript, get_redis
+from core.token_bucket import ChatThrottle, TokenBucket
+from database.models.users import User
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+BROADCAST_RATE_PER_SECOND = 25  # Telegram: ~30 сообщений/с на бота
+BROADCAST_CONCURRENCY = 20
+BROADCAST_PAGE_SIZE = 500
+BROADCAST_MAX_ATTEMPTS = 3
+BROADCAST_JOB_TTL = 7 * 24 * 3600
+BROADCAST_LOCK_TTL = 60
+
+JOB_KEY = "broadcast:job:{job_id}"
+DONE_KEY = "broadcast:job:{job_id}:done"
+LOCK_KEY = "broadcast:job:{job_id}:lock"
+JOBS_INDEX_KEY = "broadcast:jobs"
+
+TARGETS = ("all", "active", "with_orders")
+
+_INSTANCE_ID = uuid.uuid4().hex
+
+# KEYS[1] — hash задачи; ARGV: status, finished_at, error, ttl. 1 — записано, 0 — задачу уже отменили
+FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'status') == 'cancelled' then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'status', ARGV[1], 'finished_at', ARGV[2], 'error', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+finish_script = RedisScript(FINISH_SCRIPT)
+
+
+class BroadcastStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    CANCELLED = "cancelled"
+    FAILED = "failed"
+
+    FINAL = frozenset({COMPLETED, CANCELLED, FAILED})
+
+
+@dataclass
+class BroadcastJob:
+    id: str
+    text: str
+    target: str
+    created_by: int
+    created_at: float
+    total: int = 0
+    status: str = BroadcastStatus.QUEUED
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+    cursor: int = 0  # Последний telegram_id полностью обработанной страницы
+    active_since: float = 0.0  # Для target="active": фиксируется при создании
+    started_at: float = 0.0
+    run_started_at: float = 0.0
+    run_processed_start: int = 0
+    finished_at: float = 0.0
+    error: str = ""
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+    def to_redis(self) -> dict[str, str]:
+        return {key: str(value) for key, value in asdict(self).items()}
+
+    @classmethod
+    def from_redis(cls, data: dict[str, str]) -> "BroadcastJob":
+        values = {}
+        for field in fields(cls):
+            if field.name not in data:
+                continue
+            raw = data[field.name]
+            if field.type in ("int", int):
+                values[field.name] = int(raw)
+            elif field.type in ("float", float):
+                values[field.name] = float(raw)
+            else:
+                values[field.name] = raw
+        return cls(**values)
+
+    def eta_seconds(self, now: Optional[float] = None) -> Optional[int]:
+        if self.status != BroadcastStatus.RUNNING or not self.run_started_at:
+            return None
+        done_in_run = self.processed - self.run_processed_start
+        elapsed = (now or time.time()) - self.run_started_at
+        if done_in_run <= 0 or elapsed <= 0:
+            return None
+        remaining = max(self.total - self.processed, 0)
+        return int(remaining / (done_in_run / elapsed))
+
+    def progress(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "target": self.target,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "blocked": self.blocked,
+            "processed": self.processed,
+            "eta_seconds": self.eta_seconds(),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at or None,
+            "error": self.error or None,
+        }
+
+
+def recipients_query(job: BroadcastJob):
+    """Получатели задачи в порядке telegram_id (для keyset-пагинации)."""
+    query = select(User.telegram_id).where(~User.is_banned)
+    if job.target == "active":
+        query = query.where(User.updated_at >= datetime.fromtimestamp(job.active_since, MSK_TZ))
+    elif job.target == "with_orders":
+        query = query.where(User.orders_count > 0)
+    return query.order_by(User.telegram_id)
+
+
+class BroadcastEngine:
+    """Запускает и ведёт задачи рассылки в фоне текущего процесса."""
+
+    def __init__(
+        self,
+        bot: Bot,
+        session_maker: async_sessionmaker,
+        *,
+        redis_factory: Callable[[], Awaitable] = get_redis,
+        rate: float = BROADCAST_RATE_PER_SECOND,
+        concurrency: int = BROADCAST_CONCURRENCY,
+        page_size: int = BROADCAST_PAGE_SIZE,
+    ):
+        self.bot = bot
+        self.session_maker = session_maker
+        self.redis_factory = redis_factory
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.chat_throttle = ChatThrottle(interval=1.0)
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    # ── Хранилище ──
+
+    async def _save(self, job: BroadcastJob, *fields_to_save: str) -> None:
+        redis = await self.redis_factory()
+        mapping = job.to_redis()
+        if fields_to_save:
+            mapping = {key: mapping[key] for key in fields_to_save}
+        key = JOB_KEY.format(job_id=job.id)
+        await redis.hset(key, mapping=mapping)
+        await redis.expire(key, BROADCAST_JOB_TTL)
+
+    async def _finish(self, job: BroadcastJob, status: str, error: str = "") -> bool:
+        """Записать итоговый статус, если задачу не отменили (False — отменили раньше)."""
+        redis = await self.redis_factory()
+        job.finished_at = time.time()
+        finished = await finish_script(
+            redis,
+            keys=[JOB_KEY.format(job_id=job.id)],
+            args=[status, job.finished_at, error, BROADCAST_JOB_TTL],
+        )
+        if finished:
+            job.status, job.error = status, error
+        return bool(finished)
+
+    async def get_job(self, job_id: str) -> Optional[BroadcastJob]:
+        redis = await self.redis_factory()
+        data = await redis.hgetall(JOB_KEY.format(job_id=job_id))
+        return BroadcastJob.from_redis(data) if data else None
+
+    async def list_jobs(self, limit: int = 10) -> list[BroadcastJob]:
+        redis = await self.redis_factory()
+        job_ids = await redis.zrevrange(JOBS_INDEX_KEY, 0, limit - 1)
+        jobs = [await self.get_job(job_id) for job_id in job_ids]
+        return [job for job in jobs if job is not None]
+
+    # ── Управление ──
+
+    async def create_job(self, text: str, target: str, created_by: int) -> BroadcastJob:
+        if target not in TARGETS:
+            raise ValueError(f"Unknown broadcast target: {target}")
+        now = time.time()
+        job = BroadcastJob(
+            id=uuid.uuid4().hex[:12],
+            text=text,
+            target=target,
+            created_by=created_by,
+            created_at=now,
+            active_since=(datetime.now(MSK_TZ) - timedelta(days=7)).timestamp(),
+        )
+        async with self.session_maker() as session:
+            job.total = await session.scalar(
+                select(func.count()).select_from(recipients_query(job).order_by(None).subquery())
+            ) or 0
+
+        redis = await self.redis_factory()
+        await self._save(job)
+        await redis.zadd(JOBS_INDEX_KEY, {job.id: now})
+        self.start(job.id)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[BroadcastJob]:
+        job = await self.get_job(job_id)
+        if job is None or job.status in BroadcastStatus.FINAL:
+            return job
+        job.status = BroadcastStatus.CANCELLED
+        job.finished_at = time.time()
+        await self._save(job, "status", "finished_at")
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+        return job
+
+    def start(self, job_id: str) -> None:
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            self._tasks[job_id] = asyncio.create_task(self._run(job_id), name=f"broadcast-{job_id}")
+
+    async def resume_unfinished(self) -> int:
+        """Подхватить задачи, прерванные рестартом (вызывается при старте API)."""
+        redis = await self.redis_factory()
+        resumed = 0
+        for job_id in await redis.zrevrange(JOBS_INDEX_KEY, 0, 49):
+            job = await self.get_job(job_id)
+            if job is not None and job.status not in BroadcastStatus.FINAL:
+                self.start(job_id)
+                resumed += 1
+        return resumed
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+        self._tasks.clear()
+
+    # ── Исполнение ──
+
+    async def _acquire_lock(self, job_id: str) -> bool:
+        redis = await self.redis_factory()
+        return bool(await redis.set(LOCK_KEY.format(job_id=job_id), _INSTANCE_ID, nx=True, ex=BROADCAST_LOCK_TTL))
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Продлевать lock, пока задача жива (в т.ч. во время долгих retry_after)."""
+        while True:
+            await asyncio.sleep(BROADCAST_LOCK_TTL / 3)
+            with suppress(Exception):
+                redis = await self.redis_factory()
+                await redis.expire(LOCK_KEY.format(job_id=job_id), BROADCAST_LOCK_TTL)
+
+    async def _release_lock(self, job_id: str) -> None:
+        with suppress(Exception):
+            redis = await self.redis_factory()
+            key = LOCK_KEY.format(job_id=job_id)
+            if await redis.get(key) == _INSTANCE_ID:
+                await redis.delete(key)
+
+    async def _next_page(self, job: BroadcastJob) -> list[int]:
+        async with self.session_maker() as session:
+            result = await session.execute(
+                recipients_query(job).where(User.telegram_id > job.cursor).limit(self.page_size)
+            )
+            return [row[0] for row in result.all()]
+
+    async def _run(self, job_id: str) -> None:
+        if not await self._acquire_lock(job_id):
+            logger.info(f"[Broadcast] Job {job_id} is running on another worker")
+            return
+        job = None
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            job = await self.get_job(job_id)
+            if job is None or job.status in BroadcastStatus.FINAL:
+                return
+
+            job.status = BroadcastStatus.RUNNING
+            job.started_at = job.started_at or time.time()
+            job.run_started_at = time.time()
+            job.run_processed_start = job.processed
+            await self._save(job, "status", "started_at", "run_started_at", "run_processed_start")
+            logger.info(f"[Broadcast] Job {job_id} started: target={job.target}, total={job.total}")
+
+            redis = await self.redis_factory()
+            done_key = DONE_KEY.format(job_id=job_id)
+            while True:
+                page = await self._next_page(job)
+                if not page:
+                    break
+                already_done = set(map(int, await redis.smembers(done_key)))
+                await self._send_page(job, [chat_id for chat_id in page if chat_id not in already_done])
+
+                # Страница закрыта — двигаем курсор
+                job.cursor = page[-1]
+                await self._save(job, "cursor")
+                await redis.delete(done_key)
+
+                current = await self.get_job(job_id)
+                if current is None or current.status == BroadcastStatus.CANCELLED:
+                    return
+
+            job = await self.get_job(job_id) or job
+            if not await self._finish(job, BroadcastStatus.COMPLETED):
+                return  # Отменили, пока уходила последняя страница
+            logger.info(
+                f"[Broadcast] Job {job_id} completed: sent={job.sent}, failed={job.failed}, blocked={job.blocked}"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception(f"[Broadcast] Job {job_id} crashed")
+            if job is not None:
+                with suppress(Exception):
+                    await self._finish(job, BroadcastStatus.FAILED, error=str(e)[:500])
+        finally:
+            heartbeat.cancel()
+            await self._release_lock(job_id)
+            self._tasks.pop(job_id, None)
+
+    async def _send_page(self, job: BroadcastJob, chat_ids: list[int]) -> None:
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(chat_id)
+
+        async def worker():
+            while True:
+                try:
+                    chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                outcome = await self._deliver(chat_id, job.text)
+                setattr(job, outcome, getattr(job, outcome) + 1)
+                await self._record(job, chat_id, outcome)
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(chat_ids)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+    async def _record(self, job: BroadcastJob, chat_id: int, outcome: str) -> None:
+        redis = await self.redis_factory()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hincrby(JOB_KEY.format(job_id=job.id), outcome, 1)
+            pipe.sadd(DONE_KEY.format(job_id=job.id), chat_id)
+            pipe.expire(DONE_KEY.format(job_id=job.id), BROADCAST_JOB_TTL)
+            await pipe.execute()
+
+    async def _deliver(self, chat_id: int, text: str) -> str:
+        """Отправить одно сообщение: 'sent' | 'blocked' | 'failed'."""
+        for attempt in range(1, BROADCAST_MAX_ATTEMPTS + 1):
+            await self.chat_throttle.wait(chat_id)
+            await self.bucket.acquire()
+            try:
+                with send_lane("marketing"):
+                    await self.bot.send_message(chat_id, text)
+                return "sent"
+            except TelegramRetryAfter as e:
+                logger.warning(f"[Broadcast] Flood control: retry after {e.retry_after}s")
+                self.bucket.pause(e.retry_after)
+                self.chat_throttle.defer(chat_id, e.retry_after)
+            except SendQueueFull:
+                # Полоса marketing забита более срочными отправками — подождать, а не терять получателя
+                await asyncio.sleep(min(2 ** attempt, 10))
+            except TelegramForbiddenError:
+                return "blocked"  # Пользователь заблокировал бота
+            except TelegramBadRequest as e:
+                logger.debug(f"[Broadcast] Bad request for {chat_id}: {e}")
+                return "failed"
+            except (TelegramNetworkError, asyncio.TimeoutError) as e:
+                logger.debug(f"[Broadcast] Network error for {chat_id} (attempt {attempt}): {e}")
+                await asyncio.sleep(min(2 ** attempt, 10))
+            except Exception as e:
+                logger.warning(f"[Broadcast] Send to {chat_id} failed: {e}")
+                return "failed"
+        return "failed"
+
+
+_engine: Optional[BroadcastEngine] = None
+
+
+def get_broadcast_engine() -> BroadcastEngine:
+    """Движок рассылок процесса (создаётся лениво на общем Bot)."""
+    global _engine
+    if _engine is None:
+        from bot.bot_instance import get_bot
+        from database.db import async_session_maker
+
+        _engine = BroadcastEngine(get_bot(), async_session_maker)
+    return _engine
+
+
+async def shutdown_broadcast_engine() -> None:
+    global _engine
+    if _engine is not None:
+        await _engine.stop()
+        _engine = None
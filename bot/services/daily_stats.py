@@ -4,7 +4,6 @@
 """
 
 import asyncio
-import json
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
@@ -15,15 +14,16 @@ from aiogram import Bot
 logger = logging.getLogger(__name__)
 from sqlalchemy import select, func, and_
 
+from core.cache import CacheNamespace
 from core.config import settings
-from core.redis_pool import get_redis
 from database.db import async_session_maker
 from database.models.users import User
 from database.models.orders import Order
+from bot.services.order_stats import get_daily_stats, get_status_counters, get_total_users
 
-# Ключи кэша статистики
-STATS_CACHE_KEY = "bot:live_stats"
+# Кэш живой статистики для приветствия
 STATS_CACHE_TTL = 90  # 1.5 минуты
+live_stats_cache = CacheNamespace("live_stats", ttl=STATS_CACHE_TTL, l1_ttl=30)
 
 MSK = pytz.timezone("Europe/Moscow")
 
@@ -46,29 +46,16 @@ class DailyStatsService:
             now = datetime.now(MSK)
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-            # Новые пользователи за сегодня
-            new_users_query = select(func.count(User.id)).where(
-                User.created_at >= today_start
-            )
-            new_users_result = await session.execute(new_users_query)
-            new_users = new_users_result.scalar() or 0
-
-            # Всего пользователей
-            total_users_query = select(func.count(User.id))
-            total_users_result = await session.execute(total_users_query)
-            total_users = total_users_result.scalar() or 0
-
-            # Новые заказы за сегодня
-            new_orders_query = select(func.count(Order.id)).where(
-                Order.created_at >= today_start
-            )
-            new_orders_result = await session.execute(new_orders_query)
-            new_orders = new_orders_result.scalar() or 0
-
-            # Всего заказов
-            total_orders_query = select(func.count(Order.id))
-            total_orders_result = await session.execute(total_orders_query)
-            total_orders = total_orders_result.scalar() or 0
+            # Пользователи и заказы — из rollup-таблиц (bot/services/order_stats.py)
+            today_row = (await get_daily_stats(session, today_start.date())).get(today_start.date())
+            new_users = today_row.users_created if today_row else 0
+            total_users = await get_total_users(session)
+            # Заказы считаются вместе с черновиками, как и раньше: в rollup за день
+            # черновиков нет, а за один день COUNT по ix_orders_created_id дешёвый
+            new_orders_query = select(func.count(Order.id)).where(Order.created_at >= today_start)
+            new_orders = (await session.execute(new_orders_query)).scalar() or 0
+            counters = await get_status_counters(session)
+            total_orders = sum(row.orders_count for row in counters.values())
 
             # Пользователи, принявшие оферту сегодня
             accepted_terms_query = select(func.count(User.id)).where(
@@ -197,19 +184,13 @@ async def get_live_stats_line() -> str:
     """
     Получить строку с живой статистикой для приветствия.
     Показывает активность: заказы за сегодня и время последнего.
-    Кэшируется в Redis на 90 секунд для быстрого /start.
+    Кэшируется (L1 + Redis) на 90 секунд для быстрого /start.
     """
-    # Пробуем получить из кэша
-    try:
-        redis = await get_redis()
-        cached = await redis.get(STATS_CACHE_KEY)
-        if cached:
-            data = json.loads(cached)
-            return _format_stats_line(data["today_orders"], data.get("last_order_iso"))
-    except Exception:
-        pass  # Кэш недоступен — идём в БД
-
-    # Запрос в БД
+    data = await live_stats_cache.get_or_load("today", _load_live_stats)
+    return _format_stats_line(data["today_orders"], data.get("last_order_iso"))
+
+
+async def _load_live_stats() -> dict:
     async with async_session_maker() as session:
         now = datetime.now(MSK)
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -228,21 +209,13 @@ async def get_live_stats_line() -> str:
         last_order_result = await session.execute(last_order_query)
         last_order_time = last_order_result.scalar()
 
-        # Сохраняем в кэш
-        last_order_iso = None
-        if last_order_time:
-            if last_order_time.tzinfo is None:
-                last_order_time = MSK.localize(last_order_time)
-            last_order_iso = last_order_time.isoformat()
-
-        try:
-            redis = await get_redis()
-            cache_data = {"today_orders": today_orders, "last_order_iso": last_order_iso}
-            await redis.set(STATS_CACHE_KEY, json.dumps(cache_data), ex=STATS_CACHE_TTL)
-        except Exception:
-            pass
+    last_order_iso = None
+    if last_order_time:
+        if last_order_time.tzinfo is None:
+            last_order_time = MSK.localize(last_order_time)
+        last_order_iso = last_order_time.isoformat()
 
-        return _format_stats_line(today_orders, last_order_iso)
+    return {"today_orders": today_orders, "last_order_iso": last_order_iso}
 
 
 def _format_stats_line(today_orders: int, last_order_iso: Optional[str]) -> str:
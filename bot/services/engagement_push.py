@@ -30,6 +30,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, WebAppInfo
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from bot.services.send_scheduler import send_lane
 from core.config import settings
 from core.redis_pool import get_redis
 from database.models.users import User
@@ -109,13 +110,14 @@ class EngagementPushService:
 
     async def _send(self, chat_id: int, text: str, keyboard=None) -> bool:
         try:
-            await self.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                parse_mode="HTML",
-                reply_markup=keyboard,
-                disable_notification=False,
-            )
+            with send_lane("marketing"):
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    parse_mode="HTML",
+                    reply_markup=keyboard,
+                    disable_notification=False,
+                )
             return True
         except Exception as e:
             logger.warning(f"[EngagementPush] Failed to send to {chat_id}: {e}")
@@ -0,0 +1,160 @@
+"""
+Агрегаты для God Mode дашборда.
+
+Раньше /api/god/dashboard делал ~20 последовательных COUNT/SUM. Теперь:
+1. один проход по orders: GROUP BY status + FILTER-агрегаты по периодам;
+2. один SELECT из скалярных подзапросов по users / user_activities / promocodes;
+3. топ-3 промокода.
+
+Снимок кэшируется на несколько секунд (core/cache.py, single-flight),
+поэтому частый поллинг админов не множит запросы.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import and_, desc, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import CacheNamespace
+from database.models.admin_logs import UserActivity
+from database.models.orders import LEGACY_WAITING_PAYMENT_STATUSES, Order, OrderStatus
+from database.models.promocodes import PromoCode, PromoCodeUsage
+from database.models.users import User
+
+DASHBOARD_CACHE_TTL = 5  # секунд
+
+dashboard_cache = CacheNamespace("god_dashboard", ttl=DASHBOARD_CACHE_TTL)
+
+ACTIVE_STATUSES = (
+    OrderStatus.PENDING.value, OrderStatus.WAITING_ESTIMATION.value,
+    OrderStatus.VERIFICATION_PENDING.value,
+    OrderStatus.PAID.value, OrderStatus.PAID_FULL.value,
+    OrderStatus.IN_PROGRESS.value, OrderStatus.REVIEW.value, OrderStatus.REVISION.value,
+    *LEGACY_WAITING_PAYMENT_STATUSES,
+)
+ATTENTION_STATUSES = (
+    OrderStatus.PENDING.value,
+    OrderStatus.VERIFICATION_PENDING.value,
+    OrderStatus.WAITING_ESTIMATION.value,
+)
+
+
+def _sum_for(rows: Iterable, statuses: Iterable[str], field: str) -> int:
+    wanted = set(statuses)
+    return sum(getattr(row, field) or 0 for row in rows if row.status in wanted)
+
+
+async def collect_order_stats(session: AsyncSession, now: datetime) -> dict:
+    """Счётчики и выручка по заказам за один проход по таблице."""
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=7)
+    month_start = today_start - timedelta(days=30)
+    paid = Order.paid_amount > 0
+
+    result = await session.execute(
+        select(
+            Order.status.label("status"),
+            func.count(Order.id).label("total"),
+            func.count(Order.id).filter(Order.created_at >= today_start).label("today"),
+            func.count(Order.id).filter(
+                and_(Order.status == OrderStatus.COMPLETED.value, Order.completed_at >= today_start)
+            ).label("completed_today"),
+            func.count(Order.id).filter(paid).label("paid_count"),
+            func.sum(Order.paid_amount).filter(paid).label("revenue_total"),
+            func.sum(Order.paid_amount).filter(and_(paid, Order.created_at >= today_start)).label("revenue_today"),
+            func.sum(Order.paid_amount).filter(and_(paid, Order.created_at >= week_start)).label("revenue_week"),
+            func.sum(Order.paid_amount).filter(and_(paid, Order.created_at >= month_start)).label("revenue_month"),
+        ).group_by(Order.status)
+    )
+    rows = result.all()
+
+    paid_count = sum(row.paid_count or 0 for row in rows)
+    revenue_total = float(sum(row.revenue_total or 0 for row in rows))
+
+    return {
+        "total": sum(row.total or 0 for row in rows),
+        "active": _sum_for(rows, ACTIVE_STATUSES, "total"),
+        "needing_attention": _sum_for(rows, ATTENTION_STATUSES, "total"),
+        "today": sum(row.today or 0 for row in rows),
+        "completed_today": sum(row.completed_today or 0 for row in rows),
+        "raw_status_counts": {row.status: row.total or 0 for row in rows if row.status},
+        "revenue": {
+            "total": revenue_total,
+            "today": float(sum(row.revenue_today or 0 for row in rows)),
+            "week": float(sum(row.revenue_week or 0 for row in rows)),
+            "month": float(sum(row.revenue_month or 0 for row in rows)),
+            "average_order": round(revenue_total / paid_count, 2) if paid_count else 0.0,
+        },
+    }
+
+
+async def collect_user_and_promo_stats(session: AsyncSession, now: datetime) -> dict:
+    """Пользователи, онлайн и промокоды — одним SELECT из скалярных подзапросов."""
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today_start - timedelta(days=7)
+    five_min_ago = now - timedelta(minutes=5)
+
+    users = select(
+        func.count(User.id).label("total"),
+        func.count(User.id).filter(User.created_at >= today_start).label("today"),
+        func.count(User.id).filter(User.created_at >= week_start).label("week"),
+        func.count(User.id).filter(User.is_banned).label("banned"),
+        func.count(User.id).filter(User.is_watched).label("watched"),
+        func.coalesce(func.sum(User.balance).filter(User.balance > 0), 0).label("bonus_balance"),
+    ).subquery()
+    promos = select(
+        func.count(PromoCode.id).label("total"),
+        func.count(PromoCode.id).filter(PromoCode.is_active).label("active"),
+    ).subquery()
+
+    row = (await session.execute(
+        select(
+            users.c.total, users.c.today, users.c.week, users.c.banned, users.c.watched, users.c.bonus_balance,
+            select(func.count(UserActivity.id)).where(
+                and_(UserActivity.is_online, UserActivity.last_activity_at >= five_min_ago)
+            ).scalar_subquery().label("online"),
+            promos.c.total.label("promos_total"),
+            promos.c.active.label("promos_active"),
+            select(func.count(PromoCodeUsage.id)).scalar_subquery().label("promo_uses"),
+            select(
+                func.coalesce(func.sum(
+                    Order.price * (1 - (Order.discount / 100.0)) * (Order.promo_discount / 100.0)
+                ), 0)
+            )
+            .select_from(PromoCodeUsage)
+            .join(Order, Order.id == PromoCodeUsage.order_id)
+            .where(PromoCodeUsage.is_active)
+            .scalar_subquery().label("discount_given"),
+        ).select_from(users).join(promos, true())
+    )).one()
+
+    popular_result = await session.execute(
+        select(PromoCode.code, func.count(PromoCodeUsage.id).label("usage_count"))
+        .join(PromoCodeUsage, PromoCodeUsage.promocode_id == PromoCode.id)
+        .where(PromoCodeUsage.is_active)
+        .group_by(PromoCode.code)
+        .order_by(desc("usage_count"))
+        .limit(3)
+    )
+
+    return {
+        "users": {
+            "total": row.total or 0,
+            "today": row.today or 0,
+            "week": row.week or 0,
+            "banned": row.banned or 0,
+            "watched": row.watched or 0,
+            "online": row.online or 0,
+            "total_bonus_balance": float(row.bonus_balance or 0),
+        },
+        "promos": {
+            "total": row.promos_total or 0,
+            "active": row.promos_active or 0,
+            "total_uses": row.promo_uses or 0,
+            "total_discount_given": float(row.discount_given or 0),
+            "popular": [{"code": code, "uses": uses} for code, uses in popular_result.all()],
+        },
+    }
@@ -0,0 +1,297 @@
+"""
+Outbox для order_lifecycle_events: повторная доставка fan-out статусов и выдачи.
+
+Событие пишется в той же транзакции, что и смена статуса (order_status_service,
+order_delivery_service), и сразу отправляется inline. Всё, что inline не
+дошло, доставляет OrderLifecycleOutbox:
+
+- захват: SELECT … FOR UPDATE SKIP LOCKED по (dispatch_status, next_attempt_at)
+  и короткий lease (next_attempt_at = now + CLAIM_LEASE) в той же транзакции —
+  несколько процессов не возьмут одно событие; упавший воркер отпускает его
+  по истечении lease. Inline-отправка берёт такой же lease при создании;
+- отправка: каждое событие в своей сессии, не больше OUTBOX_CONCURRENCY
+  одновременно;
+- ошибка: экспоненциальный backoff (retry_delay) в next_attempt_at; после
+  MAX_DISPATCH_ATTEMPTS — dead_letter, дальше только ручной redrive;
+- пробуждение: на PostgreSQL LISTEN order_lifecycle_events (триггер из
+  миграции c0d1e2f3a4b5 шлёт NOTIFY на новое/упавшее событие), иначе — к
+  ближайшему next_attempt_at, но не реже OUTBOX_POLL_SECONDS.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from database.models.order_events import OrderLifecycleDispatchStatus, OrderLifecycleEvent
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+    from bot.services.order_status_service import OrderLifecycleReplaySummary
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+NOTIFY_CHANNEL = "order_lifecycle_events"
+
+OUTBOX_BATCH = 20
+OUTBOX_CONCURRENCY = 4
+OUTBOX_POLL_SECONDS = 300
+CLAIM_LEASE = timedelta(minutes=2)
+MAX_DISPATCH_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 3600
+
+RETRYABLE_STATUSES = (
+    OrderLifecycleDispatchStatus.PENDING.value,
+    OrderLifecycleDispatchStatus.FAILED.value,
+)
+
+
+# ══════════════════════════════════════════════════════════════
+#           СОСТОЯНИЕ СОБЫТИЯ
+# ══════════════════════════════════════════════════════════════
+
+def retry_delay(attempts: int, *, jitter: float = 0.1) -> timedelta:
+    """30 с, 1 мин, 2 мин, … до 6 ч; ±jitter, чтобы упавшие вместе не ретраились вместе."""
+    seconds = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=seconds * random.uniform(1 - jitter, 1 + jitter))
+
+
+def lease_event(event: OrderLifecycleEvent, now: Optional[datetime] = None) -> None:
+    """Занять событие на время отправки (inline или воркером)."""
+    event.next_attempt_at = (now or datetime.now(MSK_TZ)) + CLAIM_LEASE
+
+
+def mark_event_dispatched(event: OrderLifecycleEvent, now: Optional[datetime] = None) -> None:
+    event.dispatch_status = OrderLifecycleDispatchStatus.DISPATCHED.value
+    event.dispatched_at = now or datetime.now(MSK_TZ)
+    event.next_attempt_at = None
+
+
+def mark_event_failed(event: OrderLifecycleEvent, error: Optional[str], now: Optional[datetime] = None) -> None:
+    """Ошибка отправки (dispatch_attempts уже увеличен): backoff или dead letter."""
+    now = now or datetime.now(MSK_TZ)
+    event.last_error = error
+    attempts = event.dispatch_attempts or 0
+    if attempts >= MAX_DISPATCH_ATTEMPTS:
+        event.dispatch_status = OrderLifecycleDispatchStatus.DEAD_LETTER.value
+        event.next_attempt_at = None
+        logger.error(
+            "[Outbox] Lifecycle event #%s (order #%s) dead-lettered after %s attempts: %s",
+            event.id, event.order_id, attempts, error,
+        )
+        return
+    event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
+    event.next_attempt_at = now + retry_delay(attempts)
+
+
+# ══════════════════════════════════════════════════════════════
+#           ЗАХВАТ И ОТПРАВКА
+# ══════════════════════════════════════════════════════════════
+
+def _due(now: datetime):
+    return (
+        OrderLifecycleEvent.dispatch_status.in_(RETRYABLE_STATUSES),
+        or_(OrderLifecycleEvent.next_attempt_at.is_(None), OrderLifecycleEvent.next_attempt_at <= now),
+    )
+
+
+async def claim_due_events(
+    session: AsyncSession,
+    *,
+    limit: int = OUTBOX_BATCH,
+    now: Optional[datetime] = None,
+) -> list[int]:
+    """Захватить до limit готовых к отправке событий; возвращает их id (lease уже закоммичен)."""
+    now = now or datetime.now(MSK_TZ)
+    result = await session.execute(
+        select(OrderLifecycleEvent)
+        .where(*_due(now))
+        .order_by(OrderLifecycleEvent.id.asc())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    events = result.scalars().all()
+    for event in events:
+        lease_event(event, now)
+    await session.commit()
+    return [event.id for event in events]
+
+
+async def next_due_at(session: AsyncSession) -> Optional[datetime]:
+    """Когда станет готово ближайшее событие (None — ждать нечего)."""
+    return await session.scalar(
+        select(func.min(func.coalesce(OrderLifecycleEvent.next_attempt_at, OrderLifecycleEvent.created_at)))
+        .where(OrderLifecycleEvent.dispatch_status.in_(RETRYABLE_STATUSES))
+    )
+
+
+async def dispatch_claimed_event(session: AsyncSession, bot: Optional["Bot"], event_id: int) -> Optional[bool]:
+    """Отправить захваченное событие. True/False — результат, None — событие уже не ждёт отправки."""
+    from bot.services.order_status_service import replay_order_lifecycle_event
+
+    event = await session.get(OrderLifecycleEvent, event_id)
+    if event is None or event.dispatch_status not in RETRYABLE_STATUSES:
+        return None
+    try:
+        dispatch_result = await replay_order_lifecycle_event(session, bot, event)
+    except Exception as exc:
+        logger.exception("[Outbox] Replay crashed for lifecycle event #%s", event_id)
+        await session.rollback()
+        event = await session.get(OrderLifecycleEvent, event_id)
+        if event is None:
+            return False
+        event.dispatch_attempts = (event.dispatch_attempts or 0) + 1
+        mark_event_failed(event, str(exc))
+        await session.commit()
+        return False
+    return dispatch_result is not None and dispatch_result.successful
+
+
+async def replay_due_events(
+    session_maker: async_sessionmaker,
+    bot: Optional["Bot"],
+    *,
+    limit: int = OUTBOX_BATCH,
+    concurrency: int = OUTBOX_CONCURRENCY,
+) -> "OrderLifecycleReplaySummary":
+    """Один проход outbox: захват пачки и параллельная (ограниченная) отправка."""
+    from bot.services.order_status_service import OrderLifecycleReplaySummary
+
+    summary = OrderLifecycleReplaySummary()
+    async with session_maker() as session:
+        event_ids = await claim_due_events(session, limit=limit)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(event_id: int) -> Optional[bool]:
+        async with semaphore:
+            async with session_maker() as session:
+                return await dispatch_claimed_event(session, bot, event_id)
+
+    for outcome in await asyncio.gather(*(run(event_id) for event_id in event_ids)):
+        summary.processed += 1
+        if outcome is None:
+            summary.skipped += 1
+        elif outcome:
+            summary.dispatched += 1
+        else:
+            summary.failed += 1
+    return summary
+
+
+# ══════════════════════════════════════════════════════════════
+#           ВОРКЕР
+# ══════════════════════════════════════════════════════════════
+
+class OrderLifecycleOutbox:
+    """Фоновая доставка order_lifecycle_events (LISTEN/NOTIFY + таймер backoff)."""
+
+    def __init__(self, bot: Optional["Bot"], session_maker: async_sessionmaker, engine: Optional[AsyncEngine] = None):
+        self.bot = bot
+        self.session_maker = session_maker
+        self.engine = engine
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._listen_connection = None
+
+    def wake(self, *_args) -> None:
+        self._wakeup.set()
+
+    async def run_once(self) -> "OrderLifecycleReplaySummary":
+        summary = await replay_due_events(self.session_maker, self.bot)
+        if summary.processed:
+            logger.info(
+                "[Outbox] Lifecycle replay processed=%s dispatched=%s failed=%s skipped=%s",
+                summary.processed, summary.dispatched, summary.failed, summary.skipped,
+            )
+        return summary
+
+    async def _sleep_seconds(self) -> float:
+        async with self.session_maker() as session:
+            due = await next_due_at(session)
+        if due is None:
+            return OUTBOX_POLL_SECONDS
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=MSK_TZ)
+        seconds = (due - datetime.now(MSK_TZ)).total_seconds()
+        return min(max(seconds, 1.0), OUTBOX_POLL_SECONDS)
+
+    async def _listen(self) -> None:
+        """LISTEN на PostgreSQL (asyncpg); на других БД — только таймер."""
+        if self.engine is None or self.engine.dialect.name != "postgresql":
+            return
+        try:
+            connection = await self.engine.connect()
+            raw = await connection.get_raw_connection()
+            await raw.driver_connection.add_listener(NOTIFY_CHANNEL, self.wake)
+            self._listen_connection = connection
+            logger.info("[Outbox] Listening on %s", NOTIFY_CHANNEL)
+        except Exception as e:
+            logger.warning(f"[Outbox] LISTEN unavailable, falling back to polling: {e}")
+
+    async def _loop(self):
+        await self._listen()
+        while self._running:
+            self._wakeup.clear()
+            try:
+                summary = await self.run_once()
+                # Полная пачка — возможно, есть ещё: сразу следующий проход
+                if summary.processed >= OUTBOX_BATCH:
+                    continue
+                timeout = await self._sleep_seconds()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[Outbox] Replay failed: {e}")
+                timeout = BACKOFF_BASE_SECONDS
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+
+    def start(self):
+        """Запустить сервис"""
+        if not self._running:
+            self._running = True
+            self._task = asyncio.create_task(self._loop(), name="lifecycle-outbox")
+
+    def stop(self):
+        """Остановить сервис"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+        if self._listen_connection is not None:
+            connection, self._listen_connection = self._listen_connection, None
+            with suppress(RuntimeError):
+                asyncio.get_running_loop().create_task(connection.close())
+
+
+_outbox: Optional[OrderLifecycleOutbox] = None
+
+
+def init_lifecycle_outbox(
+    bot: Optional["Bot"],
+    session_maker: async_sessionmaker,
+    engine: Optional[AsyncEngine] = None,
+) -> OrderLifecycleOutbox:
+    global _outbox
+    _outbox = OrderLifecycleOutbox(bot, session_maker, engine)
+    _outbox.start()
+    return _outbox
+
+
+def wake_lifecycle_outbox() -> None:
+    """Разбудить outbox этого процесса (события, отложенные inline-отправкой)."""
+    if _outbox is not None:
+        _outbox.wake()
@@ -759,17 +759,17 @@ async def render_dashboard(session: AsyncSession) -> str:
     """
     Рендерит текст дашборда со статистикой заказов.
     """
-    from sqlalchemy import func
+    from bot.services.order_stats import get_status_counters
+
+    # Счётчики по статусам из rollup-таблицы — без COUNT по orders
+    counters = await get_status_counters(session)
 
     # Собираем статистику по стадиям
     stage_counts = {}
     for stage_name, stage_config in CARD_STAGES.items():
         statuses = stage_config["statuses"]
-        count_query = select(func.count(Order.id)).where(Order.status.in_(statuses))
-        result = await session.execute(count_query)
-        count = result.scalar() or 0
         stage_counts[stage_name] = {
-            "count": count,
+            "count": sum(counters[status].orders_count for status in statuses if status in counters),
             "emoji": stage_config["emoji"],
             "tag": stage_config["tag"],
         }
@@ -782,12 +782,7 @@ async def render_dashboard(session: AsyncSession) -> str:
         CARD_STAGES["work"]["statuses"] +
         CARD_STAGES["review"]["statuses"]
     )
-    sum_query = select(func.sum(Order.price)).where(
-        Order.status.in_(active_statuses),
-        Order.price > 0
-    )
-    sum_result = await session.execute(sum_query)
-    total_sum = sum_result.scalar() or 0
+    total_sum = sum(counters[status].price_sum for status in active_statuses if status in counters)
 
     # Форматируем
     now = datetime.now().strftime("%d.%m %H:%M")
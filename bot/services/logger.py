@@ -4,12 +4,21 @@
 UNIFIED HUB Architecture:
 - Логи отправляются в топик "Логи" в админской группе
 - Fallback на LOG_CHANNEL_ID если топик не инициализирован
+
+Сводки: события уровня не выше BOT_LOG_DIGEST_LEVEL (без звука, не по
+пользователю на слежке) копятся в LogDigest и уходят одним сообщением раз в
+BOT_LOG_DIGEST_WINDOW_SECONDS или по BOT_LOG_DIGEST_MAX_EVENTS. Статистика
+пользователя под логом кэшируется на BOT_LOG_USER_STATS_TTL_SECONDS.
 """
 
+import asyncio
+import html
 import logging
+import re
+from contextlib import suppress
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Awaitable, Callable, Optional
 import pytz
 
 from aiogram import Bot
@@ -17,6 +26,8 @@ from aiogram.types import User as TgUser, InlineKeyboardMarkup, InlineKeyboardBu
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from bot.services.send_scheduler import send_lane
+from core.cache import CacheNamespace
 from core.config import settings
 from database.models.users import User
 
@@ -24,6 +35,17 @@ from database.models.users import User
 # Московское время
 MSK = pytz.timezone("Europe/Moscow")
 
+DIGEST_TEXT_LIMIT = 3800  # Telegram: до 4096 символов в сообщении
+DIGEST_DETAILS_LIMIT = 120
+
+# Статистика под логом: заказы, баланс, теги, слежка, топик диалога
+user_stats_cache = CacheNamespace(
+    "log_user_stats",
+    ttl=settings.BOT_LOG_USER_STATS_TTL_SECONDS,
+    use_l2=False,
+    l1_maxsize=4096,
+)
+
 
 class LogLevel(Enum):
     """Уровни важности логов"""
@@ -149,6 +171,124 @@ EVENT_NAMES = {
     LogEvent.STOP_WORD: "Стоп-слово",
 }
 
+# Порядок уровней — для порога BOT_LOG_DIGEST_LEVEL
+LEVEL_ORDER = list(LogLevel)
+
+# После этих событий статистика под логом устарела (слежка, теги, баланс)
+STATS_CHANGING_EVENTS = {
+    LogEvent.USER_BAN, LogEvent.USER_UNBAN,
+    LogEvent.USER_WATCH, LogEvent.USER_UNWATCH, LogEvent.USER_NOTE,
+    LogEvent.BONUS_ADDED, LogEvent.BONUS_DEDUCTED,
+}
+
+
+class LogDigest:
+    """
+    Буфер низкоприоритетных логов.
+
+    Первое событие в пустом буфере заводит таймер на window секунд; по таймеру
+    (или когда набралось max_events) буфер уходит сводкой: события сгруппированы
+    по пользователю, подряд идущие одинаковые — одной строкой с ×N.
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable], *, window: float, max_events: int):
+        self.send = send
+        self.window = window
+        self.max_events = max(1, max_events)
+        self._entries: list[tuple[str, LogEvent, TgUser, Optional[str]]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, event: LogEvent, user: TgUser, details: Optional[str] = None) -> None:
+        self._entries.append((datetime.now(MSK).strftime("%H:%M"), event, user, details))
+        if len(self._entries) >= self.max_events:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            task = asyncio.create_task(self.flush())
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Отправить накопленное. Возвращает число событий в сводке."""
+        entries, self._entries = self._entries, []
+        if not entries:
+            return 0
+        for text in self.render(entries):
+            try:
+                await self.send(text)
+            except Exception as e:
+                logging.error(f"Failed to send log digest: {e}")
+        return len(entries)
+
+    async def close(self) -> None:
+        """Дослать буфер при остановке бота"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with suppress(Exception):
+            await asyncio.gather(*self._flushes)
+        await self.flush()
+
+    @staticmethod
+    def _short_details(details: str) -> str:
+        if len(details) <= DIGEST_DETAILS_LIMIT:
+            return details
+        plain = html.unescape(re.sub(r"<[^>]+>", "", details))
+        return html.escape(plain[:DIGEST_DETAILS_LIMIT]) + "…"
+
+    @classmethod
+    def render(cls, entries: list[tuple[str, LogEvent, TgUser, Optional[str]]]) -> list[str]:
+        """Тексты сводки (несколько сообщений, если не влезает в одно)"""
+        users: dict[int, tuple[TgUser, list[list]]] = {}
+        for _, event, user, details in entries:
+            lines = users.setdefault(user.id, (user, []))[1]
+            if lines and lines[-1][0] == event and lines[-1][2] == details:
+                lines[-1][1] += 1
+            else:
+                lines.append([event, 1, details])
+
+        period = entries[0][0] if entries[0][0] == entries[-1][0] else f"{entries[0][0]}–{entries[-1][0]}"
+        texts = [f"🗂  <b>Сводка действий</b> · {period} · событий: {len(entries)}"]
+        for user, events in users.values():
+            head = f"👤  {BotLogger.get_user_link(user)} · <code>{user.id}</code>"
+            lines = []
+            for event, count, details in events:
+                line = f"    {EVENT_ICONS.get(event, '📋')} {EVENT_NAMES.get(event, event.value)}"
+                if count > 1:
+                    line += f" ×{count}"
+                if details:
+                    line += f" · {cls._short_details(details)}"
+                lines.append(line)
+
+            block = "\n".join([head, *lines])
+            if len(texts[-1]) + len(block) + 2 <= DIGEST_TEXT_LIMIT:
+                texts[-1] += "\n\n" + block
+                continue
+            if len(block) <= DIGEST_TEXT_LIMIT and len(texts) > 1:
+                texts.append(block)  # Блок пользователя целиком в следующем сообщении
+                continue
+            # Блок не влезает и в отдельное сообщение — режем по строкам, повторяя пользователя
+            if len(texts[-1]) + len(head) + len(lines[0]) + 3 <= DIGEST_TEXT_LIMIT:
+                texts[-1] += "\n\n" + head
+            else:
+                texts.append(head)
+            for line in lines:
+                if len(texts[-1]) + len(line) + 1 > DIGEST_TEXT_LIMIT:
+                    texts.append(head)
+                texts[-1] += "\n" + line
+        return texts
+
 
 class BotLogger:
     """
@@ -161,6 +301,30 @@ class BotLogger:
     def __init__(self, bot: Bot):
         self.bot = bot
         self.channel_id = settings.LOG_CHANNEL_ID  # Fallback
+        self.digest: Optional[LogDigest] = None
+        if settings.BOT_LOG_DIGEST_WINDOW_SECONDS > 0:
+            self.digest = LogDigest(
+                self._send_digest,
+                window=settings.BOT_LOG_DIGEST_WINDOW_SECONDS,
+                max_events=settings.BOT_LOG_DIGEST_MAX_EVENTS,
+            )
+
+    def _goes_to_digest(self, level: LogLevel, silent: bool) -> bool:
+        """Низкий уровень и без звука — в сводку, остальное — сразу"""
+        if self.digest is None or not silent:
+            return False
+        threshold = LogLevel(settings.BOT_LOG_DIGEST_LEVEL)
+        return LEVEL_ORDER.index(level) <= LEVEL_ORDER.index(threshold)
+
+    async def _send_digest(self, text: str) -> None:
+        chat_id, thread_id = self._get_logs_destination()
+        with send_lane("logs"):
+            await self.bot.send_message(
+                chat_id=chat_id,
+                message_thread_id=thread_id,
+                text=text,
+                disable_notification=True,
+            )
 
     def _get_logs_destination(self) -> tuple[int, Optional[int]]:
         """
@@ -302,7 +466,7 @@ class BotLogger:
         self, user_id: int, session: Optional[AsyncSession] = None, order_id: int = None
     ) -> tuple[str, bool, Optional[int]]:
         """
-        Получает статистику пользователя из БД.
+        Получает статистику пользователя (из кэша или БД).
 
         Returns:
             (stats_str, is_watched, topic_id) — строка статистики, флаг слежки, ID топика
@@ -310,51 +474,59 @@ class BotLogger:
         if not session:
             return "", False, None
 
-        topic_id = None
         try:
-            query = select(User).where(User.telegram_id == user_id)
-            result = await session.execute(query)
-            user = result.scalar_one_or_none()
+            return await user_stats_cache.get_or_load(
+                f"{user_id}:{order_id or 0}",
+                lambda: self._load_user_stats(user_id, session, order_id),
+            )
+        except Exception:
+            return "", False, None
 
-            # Пытаемся найти topic_id для последнего диалога пользователя
-            try:
-                from database.models.orders import Conversation
-                conv_query = select(Conversation).where(
-                    Conversation.user_id == user_id
-                )
-                if order_id:
-                    conv_query = conv_query.where(Conversation.order_id == order_id)
-                conv_query = conv_query.order_by(Conversation.last_message_at.desc()).limit(1)
-                conv_result = await session.execute(conv_query)
-                conv = conv_result.scalar_one_or_none()
-                if conv and conv.topic_id:
-                    topic_id = conv.topic_id
-            except Exception:
-                pass
+    async def _load_user_stats(
+        self, user_id: int, session: AsyncSession, order_id: Optional[int]
+    ) -> tuple[str, bool, Optional[int]]:
+        topic_id = None
+        query = select(User).where(User.telegram_id == user_id)
+        result = await session.execute(query)
+        user = result.scalar_one_or_none()
 
-            if user:
-                status, discount = user.loyalty_status
-                stats = f"📊  Заказов: {user.orders_count}"
-                if user.balance > 0:
-                    stats += f" · Баланс: {user.balance:.0f}₽"
-                if discount > 0:
-                    stats += f" · Скидка: {discount}%"
-
-                # Авто-теги
-                tags = self.get_user_tags(user)
-                if tags:
-                    stats += f"\n🏷  {' · '.join(tags)}"
-
-                # Добавляем метку если пользователь на слежке
-                # (безопасная проверка - поле может не существовать)
-                is_watched = getattr(user, 'is_watched', False)
-                if is_watched:
-                    stats += "\n👀  <b>НА СЛЕЖКЕ</b>"
-
-                return stats, is_watched, topic_id
+        # Пытаемся найти topic_id для последнего диалога пользователя
+        try:
+            from database.models.orders import Conversation
+            conv_query = select(Conversation).where(
+                Conversation.user_id == user_id
+            )
+            if order_id:
+                conv_query = conv_query.where(Conversation.order_id == order_id)
+            conv_query = conv_query.order_by(Conversation.last_message_at.desc()).limit(1)
+            conv_result = await session.execute(conv_query)
+            conv = conv_result.scalar_one_or_none()
+            if conv and conv.topic_id:
+                topic_id = conv.topic_id
         except Exception:
             pass
 
+        if user:
+            status, discount = user.loyalty_status
+            stats = f"📊  Заказов: {user.orders_count}"
+            if user.balance > 0:
+                stats += f" · Баланс: {user.balance:.0f}₽"
+            if discount > 0:
+                stats += f" · Скидка: {discount}%"
+
+            # Авто-теги
+            tags = self.get_user_tags(user)
+            if tags:
+                stats += f"\n🏷  {' · '.join(tags)}"
+
+            # Добавляем метку если пользователь на слежке
+            # (безопасная проверка - поле может не существовать)
+            is_watched = getattr(user, 'is_watched', False)
+            if is_watched:
+                stats += "\n👀  <b>НА СЛЕЖКЕ</b>"
+
+            return stats, is_watched, topic_id
+
         return "", False, None
 
     async def log(
@@ -382,9 +554,20 @@ class BotLogger:
             order_id: ID заказа (для навигации в топик)
 
         Returns:
-            message_id отправленного лога или None при ошибке
+            message_id отправленного лога или None при ошибке (и если лог ушёл в сводку)
         """
         try:
+            if event in STATS_CHANGING_EVENTS:
+                user_stats_cache.drop_local()
+
+            # Статистика из БД, флаг слежки и topic_id
+            stats, is_watched, topic_id = await self._get_user_stats(user.id, session, order_id)
+
+            # Мелкие события — в сводку; слежка всегда отдельным логом
+            if not is_watched and self._goes_to_digest(level, silent):
+                self.digest.add(event, user, details)
+                return None
+
             icon = EVENT_ICONS.get(event, "📋")
             event_name = EVENT_NAMES.get(event, event.value)
 
@@ -393,9 +576,6 @@ class BotLogger:
             user_mention = self.get_user_mention(user)
             time_str = self.get_msk_time()
 
-            # Статистика из БД, флаг слежки и topic_id
-            stats, is_watched, topic_id = await self._get_user_stats(user.id, session, order_id)
-
             # Основной текст
             text_parts = [
                 f"{icon}  <b>{event_name}</b>",
@@ -438,13 +618,14 @@ class BotLogger:
             # UNIFIED HUB: отправляем в топик или канал
             chat_id, thread_id = self._get_logs_destination()
 
-            msg = await self.bot.send_message(
-                chat_id=chat_id,
-                message_thread_id=thread_id,
-                text=text,
-                reply_markup=keyboard,
-                disable_notification=silent,
-            )
+            with send_lane("logs"):
+                msg = await self.bot.send_message(
+                    chat_id=chat_id,
+                    message_thread_id=thread_id,
+                    text=text,
+                    reply_markup=keyboard,
+                    disable_notification=silent,
+                )
 
             return msg.message_id
 
@@ -565,6 +746,12 @@ def get_logger() -> Optional[BotLogger]:
     return _logger
 
 
+async def shutdown_logger() -> None:
+    """Дослать накопленную сводку (при остановке бота)"""
+    if _logger is not None and _logger.digest is not None:
+        await _logger.digest.close()
+
+
 async def log_action(
     bot: Bot,
     event: LogEvent,
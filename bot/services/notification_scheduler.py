@@ -22,6 +22,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from bot.services.order_pause import auto_resume_if_needed
+from bot.services.send_scheduler import send_lane
 from bot.utils.formatting import format_price
 from core.config import settings
 from core.redis_pool import get_redis
@@ -38,7 +39,6 @@ MSK = pytz.timezone("Europe/Moscow")
 
 # Check interval (minutes)
 CHECK_INTERVAL = 300  # 5 min
-ORDER_LIFECYCLE_REPLAY_BATCH = 20
 
 # Redis key prefix for dedup
 NOTIF_PREFIX = "notif:sent"
@@ -76,12 +76,13 @@ class NotificationScheduler:
     async def _send(self, chat_id: int, text: str, keyboard=None) -> bool:
         """Send notification to user. Returns True on success."""
         try:
-            await self.bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                reply_markup=keyboard,
-                disable_notification=False,
-            )
+            with send_lane("customer"):
+                await self.bot.send_message(
+                    chat_id=chat_id,
+                    text=text,
+                    reply_markup=keyboard,
+                    disable_notification=False,
+                )
             return True
         except Exception as e:
             logger.warning(f"[Scheduler] Failed to send to {chat_id}: {e}")
@@ -96,29 +97,6 @@ class NotificationScheduler:
             )],
         ])
 
-    # ══════════════════════════════════════════════════════════
-    #  ORDER LIFECYCLE REDRIVE
-    # ══════════════════════════════════════════════════════════
-
-    async def _replay_order_lifecycle_events(self):
-        """Retry pending/failed order lifecycle fanout events."""
-        async with self.session_maker() as session:
-            from bot.services.order_status_service import replay_pending_order_lifecycle_events
-
-            summary = await replay_pending_order_lifecycle_events(
-                session=session,
-                bot=self.bot,
-                limit=ORDER_LIFECYCLE_REPLAY_BATCH,
-            )
-            if summary.processed:
-                logger.info(
-                    "[Scheduler] Order lifecycle replay processed=%s dispatched=%s failed=%s skipped=%s",
-                    summary.processed,
-                    summary.dispatched,
-                    summary.failed,
-                    summary.skipped,
-                )
-
     # ══════════════════════════════════════════════════════════
     #  PAUSED ORDER AUTO-RESUME
     # ══════════════════════════════════════════════════════════
@@ -469,11 +447,6 @@ class NotificationScheduler:
 
     async def _run_checks(self):
         """Run all notification checks."""
-        try:
-            await self._replay_order_lifecycle_events()
-        except Exception as e:
-            logger.error(f"[Scheduler] Order lifecycle replay error: {e}")
-
         try:
             await self._check_paused_orders()
         except Exception as e:
@@ -11,6 +11,7 @@ from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from bot.services.lifecycle_outbox import lease_event, mark_event_dispatched, mark_event_failed
 from bot.services.order_lifecycle import can_deliver_order
 from bot.services.order_revision_round_service import close_current_revision_round
 from bot.services.order_status_service import (
@@ -664,8 +665,7 @@ async def replay_order_delivery_event(
     order = await session.get(Order, lifecycle_event.order_id)
     if order is None:
         lifecycle_event.dispatch_attempts = (lifecycle_event.dispatch_attempts or 0) + 1
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
-        lifecycle_event.last_error = "order_not_found"
+        mark_event_failed(lifecycle_event, "order_not_found")
         await session.commit()
         return None
 
@@ -673,16 +673,14 @@ async def replay_order_delivery_event(
     batch_id = payload.get("delivery_batch_id")
     if not batch_id:
         lifecycle_event.dispatch_attempts = (lifecycle_event.dispatch_attempts or 0) + 1
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
-        lifecycle_event.last_error = "delivery_batch_id_missing"
+        mark_event_failed(lifecycle_event, "delivery_batch_id_missing")
         await session.commit()
         return None
 
     batch = await session.get(OrderDeliveryBatch, int(batch_id))
     if batch is None:
         lifecycle_event.dispatch_attempts = (lifecycle_event.dispatch_attempts or 0) + 1
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
-        lifecycle_event.last_error = "delivery_batch_not_found"
+        mark_event_failed(lifecycle_event, "delivery_batch_not_found")
         await session.commit()
         return None
 
@@ -715,10 +713,9 @@ async def replay_order_delivery_event(
     )
     lifecycle_event.last_error = _format_dispatch_errors(dispatch_result.errors)
     if dispatch_result.successful:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.DISPATCHED.value
-        lifecycle_event.dispatched_at = datetime.now(MSK_TZ)
+        mark_event_dispatched(lifecycle_event)
     else:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
+        mark_event_failed(lifecycle_event, lifecycle_event.last_error)
     await session.commit()
     return dispatch_result
 
@@ -757,6 +754,7 @@ async def finalize_order_delivery_event(
         dispatch_status=OrderLifecycleDispatchStatus.PENDING.value,
         dispatch_attempts=0,
     )
+    lease_event(lifecycle_event)  # Inline-отправка ниже; outbox подхватит, если она не дойдёт
     session.add(lifecycle_event)
     await session.commit()
 
@@ -773,8 +771,7 @@ async def finalize_order_delivery_event(
     except Exception as exc:
         logger.exception("[Delivery] Dispatch crashed for order #%s", order.id)
         lifecycle_event.dispatch_attempts = (lifecycle_event.dispatch_attempts or 0) + 1
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
-        lifecycle_event.last_error = str(exc)
+        mark_event_failed(lifecycle_event, str(exc))
         await session.commit()
         return lifecycle_event
 
@@ -785,10 +782,9 @@ async def finalize_order_delivery_event(
     )
     lifecycle_event.last_error = _format_dispatch_errors(dispatch_result.errors)
     if dispatch_result.successful:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.DISPATCHED.value
-        lifecycle_event.dispatched_at = datetime.now(MSK_TZ)
+        mark_event_dispatched(lifecycle_event)
     else:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
+        mark_event_failed(lifecycle_event, lifecycle_event.last_error)
     await session.commit()
     return lifecycle_event
 
@@ -0,0 +1,502 @@
+"""
+Инкрементальная статистика заказов (rollup).
+
+Вместо COUNT/SUM по orders/users админские дашборды читают две маленькие
+таблицы (database/models/order_stats.py):
+- order_status_counters — число заказов и суммы по каждому статусу;
+- order_daily_stats — дневной срез по МСК (заявки, оплаты, завершения, новые юзеры).
+
+Как поддерживается:
+- Mapper-хуки Order/User (after_insert/after_update/after_delete) считают
+  разницу «было/стало» по status, price, paid_amount, created_at, completed_at
+  и копят её в session.info; after_flush применяет сумму за весь flush
+  одним UPSERT-проходом в порядке ключей, в той же транзакции. Так покрыты
+  apply_order_status_transition, все пути оплаты, создание и удаление заказов,
+  а параллельные транзакции берут блокировки строк в одном порядке.
+- OrderStatsReconciler раз в час пересчитывает счётчики статусов целиком и
+  дневные строки за последние дни, исправляя дрейф (ручные правки в БД,
+  bulk-UPDATE, хуки, не установленные в процессе-скрипте). Новых
+  пользователей до окна сверяет по итогу (один COUNT) и при расхождении
+  пересчитывает за всю историю — get_total_users читает сумму rollup.
+
+Хуки ставятся явно при старте процесса: install_order_stats_tracking().
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, event, func, inspect, insert, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, object_session
+
+from database.models.order_stats import DailyOrderStats, OrderStatusCounter
+from database.models.orders import Order, OrderStatus
+from database.models.users import User
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+RECONCILE_INTERVAL_SECONDS = 3600
+RECONCILE_WINDOW_DAYS = 3
+
+DONE_STATUSES = frozenset({
+    OrderStatus.COMPLETED.value,
+    OrderStatus.CANCELLED.value,
+    OrderStatus.REJECTED.value,
+})
+
+STATUS_FIELDS = ("orders_count", "price_sum", "paid_count", "paid_sum")
+DAILY_FIELDS = (
+    "orders_created", "orders_price_sum", "paid_orders", "paid_sum",
+    "completed_count", "completed_revenue", "users_created",
+)
+_ORDER_FIELDS = ("status", "price", "paid_amount", "created_at", "completed_at")
+_UNKNOWN = object()
+
+
+def msk_day(value: Optional[datetime]) -> date:
+    """День по МСК; None (ещё не известный server default) — сегодня."""
+    if value is None:
+        return datetime.now(MSK_TZ).date()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(MSK_TZ).date()
+
+
+def msk_today() -> date:
+    return datetime.now(MSK_TZ).date()
+
+
+def msk_day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=MSK_TZ)
+
+
+class StatsDelta:
+    """Накопитель изменений для обеих таблиц."""
+
+    def __init__(self):
+        self.statuses: dict[str, dict[str, int | Decimal]] = defaultdict(lambda: defaultdict(int))
+        self.days: dict[date, dict[str, int | Decimal]] = defaultdict(lambda: defaultdict(int))
+
+    def add_order(self, status, price, paid_amount, created_at, completed_at, sign: int = 1) -> None:
+        price = Decimal(str(price or 0))
+        paid = Decimal(str(paid_amount or 0))
+        is_paid = paid > 0
+
+        row = self.statuses[status or ""]
+        row["orders_count"] += sign
+        row["price_sum"] += sign * price
+        if is_paid:
+            row["paid_count"] += sign
+            row["paid_sum"] += sign * paid
+
+        if status != OrderStatus.DRAFT.value:
+            day = self.days[msk_day(created_at)]
+            day["orders_created"] += sign
+            day["orders_price_sum"] += sign * price
+            if is_paid:
+                day["paid_orders"] += sign
+                day["paid_sum"] += sign * paid
+
+        if status == OrderStatus.COMPLETED.value and completed_at is not None:
+            day = self.days[msk_day(completed_at)]
+            day["completed_count"] += sign
+            day["completed_revenue"] += sign * paid
+
+    def add_user(self, created_at, sign: int = 1) -> None:
+        self.days[msk_day(created_at)]["users_created"] += sign
+
+    @staticmethod
+    def _non_zero(rows: dict) -> dict:
+        return {
+            key: {field: value for field, value in fields.items() if value}
+            for key, fields in rows.items()
+            if any(fields.values())
+        }
+
+    def status_rows(self) -> dict[str, dict]:
+        return self._non_zero(self.statuses)
+
+    def daily_rows(self) -> dict[date, dict]:
+        return self._non_zero(self.days)
+
+
+# ══════════════════════════════════════════════════════════════
+#           ИНКРЕМЕНТАЛЬНОЕ ОБНОВЛЕНИЕ (mapper hooks)
+# ══════════════════════════════════════════════════════════════
+
+def attribute_changes(target, fields: tuple[str, ...]) -> tuple[tuple, tuple] | None:
+    """(старые, новые) значения полей объекта в after_update; None — если старое значение неизвестно."""
+    state = inspect(target)
+    old, new = [], []
+    for key in fields:
+        history = state.attrs[key].history
+        if history.deleted:
+            before = history.deleted[0]
+        elif history.unchanged:
+            before = history.unchanged[0]
+        elif key in state.expired_attributes:
+            before = _UNKNOWN
+        else:
+            before = None  # Никогда не задавалось с момента INSERT
+        after = history.added[0] if history.added else before
+        if before is _UNKNOWN:
+            return None
+        old.append(before)
+        new.append(after)
+    return tuple(old), tuple(new)
+
+
+def current_values(target, fields: tuple[str, ...]) -> tuple | None:
+    """Загруженные значения полей (after_insert/after_delete); None — если часть истекла."""
+    state = inspect(target)
+    if state.expired_attributes.intersection(fields):
+        return None
+    return tuple(state.dict.get(key) for key in fields)
+
+
+def dialect_insert(connection: Connection):
+    return pg_insert if connection.dialect.name == "postgresql" else sqlite_insert
+
+
+def apply_stats_delta(connection: Connection, delta: StatsDelta) -> None:
+    """
+    UPSERT приращений: строка создаётся при первом изменении.
+
+    Строки обновляются в порядке ключа (счётчики статусов, затем дни):
+    встречные переходы статусов в параллельных транзакциях берут блокировки
+    в одном порядке и не дедлокаются. Поэтому delta — сумма за весь flush
+    (_on_after_flush), а не по одному заказу.
+    """
+    insert_ = dialect_insert(connection)
+    targets = (
+        (OrderStatusCounter.__table__, "status", delta.status_rows()),
+        (DailyOrderStats.__table__, "day", delta.daily_rows()),
+    )
+    for table, key_column, rows in targets:
+        for key, increments in sorted(rows.items()):
+            stmt = insert_(table).values({key_column: key, **increments})
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key_column],
+                set_={
+                    **{field: table.c[field] + stmt.excluded[field] for field in increments},
+                    "updated_at": func.now(),
+                },
+            )
+            connection.execute(stmt)
+
+
+_PENDING_KEY = "order_stats_delta"
+
+
+def _flush_delta(target) -> StatsDelta:
+    """Накопитель текущего flush (применяется в _on_after_flush)."""
+    info = object_session(target).info
+    delta = info.get(_PENDING_KEY)
+    if delta is None:
+        delta = info[_PENDING_KEY] = StatsDelta()
+    return delta
+
+
+def _on_order_insert(mapper, connection, target) -> None:
+    _flush_delta(target).add_order(*(inspect(target).dict.get(key) for key in _ORDER_FIELDS))
+
+
+def _on_order_update(mapper, connection, target) -> None:
+    values = attribute_changes(target, _ORDER_FIELDS)
+    if values is None:
+        logger.debug(f"[OrderStats] Order #{target.id}: previous state unknown, leaving to reconciler")
+        return
+    old, new = values
+    if old == new:
+        return
+    delta = _flush_delta(target)
+    delta.add_order(*old, sign=-1)
+    delta.add_order(*new)
+
+
+def _on_order_delete(mapper, connection, target) -> None:
+    values = current_values(target, _ORDER_FIELDS)
+    if values is None:
+        return
+    _flush_delta(target).add_order(*values, sign=-1)
+
+
+def _on_user_insert(mapper, connection, target) -> None:
+    _flush_delta(target).add_user(inspect(target).dict.get("created_at"))
+
+
+def _on_user_delete(mapper, connection, target) -> None:
+    state = inspect(target)
+    if "created_at" in state.expired_attributes:
+        return
+    _flush_delta(target).add_user(state.dict.get("created_at"), sign=-1)
+
+
+def _on_after_flush(session: Session, flush_context) -> None:
+    delta = session.info.pop(_PENDING_KEY, None)
+    if delta is not None:
+        apply_stats_delta(session.connection(), delta)
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)  # Flush упал на полпути
+
+
+_HOOKS = (
+    (Order, "after_insert", _on_order_insert),
+    (Order, "after_update", _on_order_update),
+    (Order, "after_delete", _on_order_delete),
+    (User, "after_insert", _on_user_insert),
+    (User, "after_delete", _on_user_delete),
+    (Session, "after_flush", _on_after_flush),
+    (Session, "after_rollback", _on_after_rollback),
+)
+
+
+def install_order_stats_tracking() -> None:
+    """Подключить инкрементальное обновление rollup (идемпотентно)."""
+    for model, identifier, fn in _HOOKS:
+        if not event.contains(model, identifier, fn):
+            event.listen(model, identifier, fn)
+
+
+def uninstall_order_stats_tracking() -> None:
+    for model, identifier, fn in _HOOKS:
+        if event.contains(model, identifier, fn):
+            event.remove(model, identifier, fn)
+
+
+# ══════════════════════════════════════════════════════════════
+#           ЧТЕНИЕ
+# ══════════════════════════════════════════════════════════════
+
+async def get_status_counters(session: AsyncSession) -> dict[str, OrderStatusCounter]:
+    """Все счётчики по статусам (десяток строк)."""
+    result = await session.execute(select(OrderStatusCounter))
+    return {row.status: row for row in result.scalars().all()}
+
+
+async def get_daily_stats(
+    session: AsyncSession,
+    since: date,
+    until: Optional[date] = None,
+) -> dict[date, DailyOrderStats]:
+    """Дневные строки за [since, until] включительно."""
+    query = select(DailyOrderStats).where(DailyOrderStats.day >= since)
+    if until is not None:
+        query = query.where(DailyOrderStats.day <= until)
+    result = await session.execute(query.order_by(DailyOrderStats.day))
+    return {row.day: row for row in result.scalars().all()}
+
+
+def sum_field(rows: Iterable, field: str):
+    return sum((getattr(row, field) or 0 for row in rows), 0)
+
+
+async def get_total_users(session: AsyncSession) -> int:
+    total = await session.scalar(select(func.coalesce(func.sum(DailyOrderStats.users_created), 0)))
+    return int(total or 0)
+
+
+# ══════════════════════════════════════════════════════════════
+#           СВЕРКА (reconciler)
+# ══════════════════════════════════════════════════════════════
+
+async def _lock_rollup_tables(session: AsyncSession) -> None:
+    """На время пересчёта инкременты из других транзакций ждут (PostgreSQL)."""
+    connection = await session.connection()
+    if connection.dialect.name == "postgresql":
+        await session.execute(text(
+            "LOCK TABLE order_status_counters, order_daily_stats IN SHARE ROW EXCLUSIVE MODE"
+        ))
+
+
+async def reconcile_order_stats(
+    session: AsyncSession,
+    *,
+    days: Optional[int] = RECONCILE_WINDOW_DAYS,
+) -> int:
+    """
+    Пересчитать rollup из orders/users и закоммитить.
+
+    Счётчики статусов пересчитываются целиком (один GROUP BY), дневные строки —
+    за последние `days` дней (None — вся история). Возвращает число строк,
+    в которых обнаружен и исправлен дрейф.
+    """
+    await _lock_rollup_tables(session)
+
+    paid = Order.paid_amount > 0
+    status_result = await session.execute(
+        select(
+            Order.status,
+            func.count(Order.id),
+            func.coalesce(func.sum(Order.price), 0),
+            func.count(Order.id).filter(paid),
+            func.coalesce(func.sum(Order.paid_amount).filter(paid), 0),
+        ).group_by(Order.status)
+    )
+    fresh_statuses = {
+        status or "": dict(zip(STATUS_FIELDS, (count, Decimal(price), paid_count, Decimal(paid_sum))))
+        for status, count, price, paid_count, paid_sum in status_result.all()
+    }
+
+    since_day = None if days is None else msk_today() - timedelta(days=days - 1)
+    daily = StatsDelta()
+    order_query = select(*(getattr(Order, key) for key in _ORDER_FIELDS))
+    user_query = select(User.created_at)
+    if since_day is not None:
+        since = msk_day_start(since_day)
+        order_query = order_query.where(or_(Order.created_at >= since, Order.completed_at >= since))
+        user_query = user_query.where(User.created_at >= since)
+    async for row in await session.stream(order_query.execution_options(yield_per=5000)):
+        daily.add_order(*row)
+    async for (created_at,) in await session.stream(user_query.execution_options(yield_per=5000)):
+        daily.add_user(created_at)
+    fresh_days = {
+        day: {field: fields.get(field, 0) for field in DAILY_FIELDS}
+        for day, fields in daily.days.items()
+        if since_day is None or day >= since_day
+    }
+
+    status_table, daily_table = OrderStatusCounter.__table__, DailyOrderStats.__table__
+    stored_statuses = {row.status: row for row in await session.execute(select(status_table))}
+    stored_days = {
+        row.day: row
+        for row in await session.execute(select(daily_table).where(daily_table.c.day >= (since_day or date.min)))
+    }
+    drift = _count_drift(stored_statuses, fresh_statuses, STATUS_FIELDS)
+    drift += _count_drift(stored_days, fresh_days, DAILY_FIELDS)
+    if since_day is not None:
+        drift += await _reconcile_users_before(session, since_day)
+
+    await session.execute(delete(OrderStatusCounter))
+    day_delete = delete(DailyOrderStats)
+    if since_day is not None:
+        day_delete = day_delete.where(DailyOrderStats.day >= since_day)
+    await session.execute(day_delete)
+
+    if fresh_statuses:
+        await session.execute(
+            insert(OrderStatusCounter),
+            [{"status": status, **fields} for status, fields in fresh_statuses.items()],
+        )
+    if fresh_days:
+        await session.execute(
+            insert(DailyOrderStats),
+            [{"day": day, **fields} for day, fields in fresh_days.items()],
+        )
+    await session.commit()
+
+    if drift:
+        logger.warning(f"[OrderStats] Reconciler fixed {drift} drifted rollup rows")
+    return drift
+
+
+async def _reconcile_users_before(session: AsyncSession, since_day: date) -> int:
+    """
+    users_created за дни до окна сверки: сначала сравнить итог (один COUNT),
+    и только при расхождении пересчитать по всей истории — иначе дрейф старых
+    дней навсегда остался бы в get_total_users.
+    """
+    since = msk_day_start(since_day)
+    actual = await session.scalar(select(func.count(User.id)).where(User.created_at < since))
+    stored_total = await session.scalar(
+        select(func.coalesce(func.sum(DailyOrderStats.users_created), 0)).where(DailyOrderStats.day < since_day)
+    )
+    if int(actual or 0) == int(stored_total or 0):
+        return 0
+
+    counts: dict[date, int] = defaultdict(int)
+    users = select(User.created_at).where(User.created_at < since).execution_options(yield_per=5000)
+    async for (created_at,) in await session.stream(users):
+        counts[msk_day(created_at)] += 1
+    stored = dict((await session.execute(
+        select(DailyOrderStats.day, DailyOrderStats.users_created).where(DailyOrderStats.day < since_day)
+    )).all())
+
+    fixed = 0
+    for day in sorted(set(counts) | set(stored)):
+        expected = counts.get(day, 0)
+        if day not in stored:
+            await session.execute(insert(DailyOrderStats).values(day=day, users_created=expected))
+        elif stored[day] != expected:
+            await session.execute(
+                update(DailyOrderStats).where(DailyOrderStats.day == day).values(users_created=expected)
+            )
+        else:
+            continue
+        fixed += 1
+    return fixed
+
+
+def _count_drift(stored: dict, fresh: dict, fields: tuple[str, ...]) -> int:
+    drift = 0
+    for key in set(stored) | set(fresh):
+        row = stored.get(key)
+        expected = fresh.get(key, {})
+        for field in fields:
+            if Decimal(str(getattr(row, field, 0) or 0)) != Decimal(str(expected.get(field, 0) or 0)):
+                drift += 1
+                break
+    return drift
+
+
+class OrderStatsReconciler:
+    """Периодическая сверка rollup-таблиц с orders/users."""
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        async with self.session_maker() as session:
+            has_rows = await session.scalar(select(func.count()).select_from(OrderStatusCounter))
+            # Пустые счётчики (свежая база без миграции с backfill) — полный пересчёт
+            return await reconcile_order_stats(session, days=RECONCILE_WINDOW_DAYS if has_rows else None)
+
+    async def _loop(self):
+        while self._running:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[OrderStats] Reconcile failed: {e}")
+            await asyncio.sleep(RECONCILE_INTERVAL_SECONDS)
+
+    def start(self):
+        """Запустить сервис"""
+        if not self._running:
+            self._running = True
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        """Остановить сервис"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+
+
+_reconciler: Optional[OrderStatsReconciler] = None
+
+
+def init_order_stats_reconciler(session_maker: async_sessionmaker) -> OrderStatsReconciler:
+    """Включить хуки и запустить периодическую сверку."""
+    global _reconciler
+    install_order_stats_tracking()
+    _reconciler = OrderStatsReconciler(session_maker)
+    _reconciler.start()
+    return _reconciler
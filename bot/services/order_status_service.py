@@ -1,16 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
 from zoneinfo import ZoneInfo
 
 from aiogram import Bot
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from bot.services.bonus import BonusService
+from bot.services.lifecycle_outbox import (
+    OUTBOX_BATCH,
+    lease_event,
+    mark_event_dispatched,
+    mark_event_failed,
+    replay_due_events,
+    wake_lifecycle_outbox,
+)
 from bot.services.order_lifecycle import get_order_cashback_base
 from database.models.order_events import (
     OrderLifecycleDispatchStatus,
@@ -26,6 +35,29 @@ ORDER_EVENT_SURFACE_CLOSE_TOPIC = "close_topic"
 ORDER_EVENT_SURFACE_NOTIFY_USER = "notify_user"
 ORDER_EVENT_SURFACE_ACHIEVEMENTS = "achievements"
 
+# Поверхности одной полосы выполняются по порядку, полосы — параллельно
+SURFACE_LANES = (
+    (ORDER_EVENT_SURFACE_LIVE_CARD, ORDER_EVENT_SURFACE_CLOSE_TOPIC),
+    (ORDER_EVENT_SURFACE_NOTIFY_USER,),
+    (ORDER_EVENT_SURFACE_ACHIEVEMENTS,),
+)
+DB_SURFACES = frozenset({
+    ORDER_EVENT_SURFACE_LIVE_CARD,
+    ORDER_EVENT_SURFACE_CLOSE_TOPIC,
+    ORDER_EVENT_SURFACE_ACHIEVEMENTS,
+})
+# Не нужны тому, кто нажал кнопку, — можно отдать outbox (defer_slow_surfaces)
+DEFERRABLE_SURFACES = frozenset({
+    ORDER_EVENT_SURFACE_CLOSE_TOPIC,
+    ORDER_EVENT_SURFACE_ACHIEVEMENTS,
+})
+SURFACE_TIMEOUTS = {
+    ORDER_EVENT_SURFACE_LIVE_CARD: 10.0,
+    ORDER_EVENT_SURFACE_CLOSE_TOPIC: 10.0,
+    ORDER_EVENT_SURFACE_NOTIFY_USER: 5.0,
+    ORDER_EVENT_SURFACE_ACHIEVEMENTS: 20.0,
+}
+
 
 class OrderStatusTransitionError(ValueError):
     """Raised when an order status change violates the lifecycle."""
@@ -52,6 +84,8 @@ class OrderStatusDispatchOptions:
     yadisk_link: str | None = None
     card_extra_text: str | None = None
     close_topic: bool = False
+    # Только для inline-отправки: DEFERRABLE_SURFACES доставит outbox (в payload не пишется)
+    defer_slow_surfaces: bool = False
 
 
 @dataclass
@@ -61,6 +95,7 @@ class OrderStatusDispatchResult:
     user_notified: bool = False
     achievements_synced: bool = False
     errors: dict[str, str] = field(default_factory=dict)
+    deferred_surfaces: set[str] = field(default_factory=set)
 
     @property
     def successful(self) -> bool:
@@ -281,6 +316,136 @@ async def apply_order_status_side_effects(
     return result
 
 
+async def _sync_live_card(
+    session: AsyncSession,
+    bot: Bot | None,
+    order: Order,
+    result: OrderStatusChangeResult,
+    dispatch: OrderStatusDispatchOptions,
+) -> None:
+    from bot.services.live_cards import update_live_card
+
+    await update_live_card(
+        bot=bot,
+        session=session,
+        order=order,
+        client_username=dispatch.client_username,
+        client_name=dispatch.client_name,
+        yadisk_link=dispatch.yadisk_link,
+        extra_text=dispatch.card_extra_text,
+    )
+
+
+async def _close_topic(
+    session: AsyncSession,
+    bot: Bot | None,
+    order: Order,
+    result: OrderStatusChangeResult,
+    dispatch: OrderStatusDispatchOptions,
+) -> None:
+    from bot.services.unified_hub import close_order_topic
+
+    await close_order_topic(bot, session, order)
+
+
+async def _notify_user(
+    session: AsyncSession,
+    bot: Bot | None,
+    order: Order,
+    result: OrderStatusChangeResult,
+    dispatch: OrderStatusDispatchOptions,
+) -> None:
+    from bot.services.realtime_notifications import send_order_status_notification
+
+    await send_order_status_notification(
+        telegram_id=order.user_id,
+        order_id=order.id,
+        new_status=result.new_status,
+        old_status=result.old_status,
+        extra_data=_build_notification_extra_data(result, dispatch),
+    )
+
+
+async def _sync_achievements(
+    session: AsyncSession,
+    bot: Bot | None,
+    order: Order,
+    result: OrderStatusChangeResult,
+    dispatch: OrderStatusDispatchOptions,
+) -> None:
+    from bot.services.achievements import sync_user_achievements
+
+    await sync_user_achievements(
+        session=session,
+        telegram_id=order.user_id,
+        bot=bot,
+        notify=True,
+    )
+
+
+# surface -> (handler, флаг в OrderStatusDispatchResult, подпись для лога)
+_SURFACES: dict[str, tuple[Callable[..., Awaitable[None]], str, str]] = {
+    ORDER_EVENT_SURFACE_LIVE_CARD: (_sync_live_card, "live_card_updated", "Live card sync"),
+    ORDER_EVENT_SURFACE_CLOSE_TOPIC: (_close_topic, "topic_closed", "Topic close"),
+    ORDER_EVENT_SURFACE_NOTIFY_USER: (_notify_user, "user_notified", "User notification"),
+    ORDER_EVENT_SURFACE_ACHIEVEMENTS: (_sync_achievements, "achievements_synced", "Achievement sync"),
+}
+
+
+def _can_isolate_surfaces(session: AsyncSession) -> bool:
+    """Свои сессии для поверхностей — только если у вызывающего нет открытой транзакции."""
+    return (
+        isinstance(session, AsyncSession)
+        and session.bind is not None
+        and not session.in_transaction()
+        and not session.new
+        and not session.dirty
+    )
+
+
+async def _run_surface_lane(
+    lane: list[str],
+    session: AsyncSession,
+    bot: Bot | None,
+    order: Order,
+    result: OrderStatusChangeResult,
+    dispatch: OrderStatusDispatchOptions,
+    *,
+    isolated: bool,
+) -> dict[str, str | None]:
+    """Run surfaces of one lane in order; returns surface -> error (None on success)."""
+    outcomes: dict[str, str | None] = {}
+    if isolated and any(surface in DB_SURFACES for surface in lane):
+        async with AsyncSession(bind=session.bind, expire_on_commit=False) as lane_session:
+            lane_order = await lane_session.merge(order, load=False)
+            for surface in lane:
+                outcomes[surface] = await _run_surface(surface, lane_session, bot, lane_order, result, dispatch)
+        return outcomes
+    for surface in lane:
+        outcomes[surface] = await _run_surface(surface, session, bot, order, result, dispatch)
+    return outcomes
+
+
+async def _run_surface(
+    surface: str,
+    session: AsyncSession,
+    bot: Bot | None,
+    order: Order,
+    result: OrderStatusChangeResult,
+    dispatch: OrderStatusDispatchOptions,
+) -> str | None:
+    handler, _flag, label = _SURFACES[surface]
+    try:
+        await asyncio.wait_for(handler(session, bot, order, result, dispatch), SURFACE_TIMEOUTS[surface])
+    except asyncio.TimeoutError:
+        logger.warning(f"[OrderStatus] {label} timed out for order #{order.id}")
+        return f"timeout after {SURFACE_TIMEOUTS[surface]}s"
+    except Exception as exc:
+        logger.warning(f"[OrderStatus] {label} failed for order #{order.id}: {exc}")
+        return str(exc)
+    return None
+
+
 async def dispatch_order_status_change(
     session: AsyncSession,
     bot: Bot | None,
@@ -290,7 +455,15 @@ async def dispatch_order_status_change(
     options: OrderStatusDispatchOptions | None = None,
     completed_surfaces: set[str] | None = None,
 ) -> OrderStatusDispatchResult:
-    """Fan out a committed status change to user/admin surfaces."""
+    """
+    Fan out a committed status change to user/admin surfaces.
+
+    Independent surfaces run concurrently, each under SURFACE_TIMEOUTS; the live
+    card and topic close touch the same topic and stay ordered. DB-bound surfaces
+    get their own session when the caller's session is idle, otherwise they share
+    it sequentially. With defer_slow_surfaces, DEFERRABLE_SURFACES are skipped and
+    reported in deferred_surfaces for the lifecycle outbox.
+    """
     dispatch_result = OrderStatusDispatchResult()
     if not result.changed:
         return dispatch_result
@@ -298,75 +471,39 @@ async def dispatch_order_status_change(
     dispatch = options or OrderStatusDispatchOptions()
     already_completed = completed_surfaces or set()
 
-    if (
-        dispatch.update_live_card
-        and bot is not None
-        and ORDER_EVENT_SURFACE_LIVE_CARD not in already_completed
-    ):
-        try:
-            from bot.services.live_cards import update_live_card
-
-            await update_live_card(
-                bot=bot,
-                session=session,
-                order=order,
-                client_username=dispatch.client_username,
-                client_name=dispatch.client_name,
-                yadisk_link=dispatch.yadisk_link,
-                extra_text=dispatch.card_extra_text,
-            )
-            dispatch_result.live_card_updated = True
-        except Exception as exc:
-            logger.warning(f"[OrderStatus] Live card sync failed for order #{order.id}: {exc}")
-            dispatch_result.errors["live_card"] = str(exc)
-
-    if (
-        dispatch.close_topic
-        and bot is not None
-        and ORDER_EVENT_SURFACE_CLOSE_TOPIC not in already_completed
-    ):
-        try:
-            from bot.services.unified_hub import close_order_topic
-
-            await close_order_topic(bot, session, order)
-            dispatch_result.topic_closed = True
-        except Exception as exc:
-            logger.warning(f"[OrderStatus] Topic close failed for order #{order.id}: {exc}")
-            dispatch_result.errors["close_topic"] = str(exc)
-
-    if dispatch.notify_user and ORDER_EVENT_SURFACE_NOTIFY_USER not in already_completed:
-        try:
-            from bot.services.realtime_notifications import send_order_status_notification
-
-            await send_order_status_notification(
-                telegram_id=order.user_id,
-                order_id=order.id,
-                new_status=result.new_status,
-                old_status=result.old_status,
-                extra_data=_build_notification_extra_data(result, dispatch),
-            )
-            dispatch_result.user_notified = True
-        except Exception as exc:
-            logger.warning(f"[OrderStatus] User notification failed for order #{order.id}: {exc}")
-            dispatch_result.errors["notify_user"] = str(exc)
-
-    if (
-        result.achievement_sync_required
-        and ORDER_EVENT_SURFACE_ACHIEVEMENTS not in already_completed
-    ):
-        try:
-            from bot.services.achievements import sync_user_achievements
+    requested = {
+        ORDER_EVENT_SURFACE_LIVE_CARD: dispatch.update_live_card and bot is not None,
+        ORDER_EVENT_SURFACE_CLOSE_TOPIC: dispatch.close_topic and bot is not None,
+        ORDER_EVENT_SURFACE_NOTIFY_USER: dispatch.notify_user,
+        ORDER_EVENT_SURFACE_ACHIEVEMENTS: result.achievement_sync_required,
+    }
+    pending = [surface for surface, wanted in requested.items() if wanted and surface not in already_completed]
+    if dispatch.defer_slow_surfaces:
+        dispatch_result.deferred_surfaces = {surface for surface in pending if surface in DEFERRABLE_SURFACES}
+        pending = [surface for surface in pending if surface not in DEFERRABLE_SURFACES]
+    if not pending:
+        return dispatch_result
 
-            await sync_user_achievements(
-                session=session,
-                telegram_id=order.user_id,
-                bot=bot,
-                notify=True,
-            )
-            dispatch_result.achievements_synced = True
-        except Exception as exc:
-            logger.warning(f"[OrderStatus] Achievement sync failed for order #{order.id}: {exc}")
-            dispatch_result.errors["achievements"] = str(exc)
+    isolated = _can_isolate_surfaces(session)
+    if isolated:
+        lanes = [[surface for surface in lane if surface in pending] for lane in SURFACE_LANES]
+    else:
+        # Одна сессия — DB-поверхности строго по очереди, остальные параллельно с ними
+        lanes = [
+            [surface for surface in pending if surface in DB_SURFACES],
+            *([surface] for surface in pending if surface not in DB_SURFACES),
+        ]
+    lanes = [lane for lane in lanes if lane]
+
+    lane_outcomes = await asyncio.gather(
+        *(_run_surface_lane(lane, session, bot, order, result, dispatch, isolated=isolated) for lane in lanes)
+    )
+    for outcomes in lane_outcomes:
+        for surface, error in outcomes.items():
+            if error is None:
+                setattr(dispatch_result, _SURFACES[surface][1], True)
+            else:
+                dispatch_result.errors[surface] = error
 
     return dispatch_result
 
@@ -384,8 +521,7 @@ async def replay_order_lifecycle_event(
     order = await session.get(Order, lifecycle_event.order_id)
     if order is None:
         lifecycle_event.dispatch_attempts = (lifecycle_event.dispatch_attempts or 0) + 1
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
-        lifecycle_event.last_error = "order_not_found"
+        mark_event_failed(lifecycle_event, "order_not_found")
         await session.commit()
         return None
 
@@ -410,48 +546,21 @@ async def replay_order_lifecycle_event(
     )
     lifecycle_event.last_error = _format_dispatch_errors(dispatch_result.errors)
     if dispatch_result.successful:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.DISPATCHED.value
-        lifecycle_event.dispatched_at = datetime.now(MSK_TZ)
+        mark_event_dispatched(lifecycle_event)
     else:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
+        mark_event_failed(lifecycle_event, lifecycle_event.last_error)
     await session.commit()
     return dispatch_result
 
 
 async def replay_pending_order_lifecycle_events(
-    session: AsyncSession,
+    session_maker: async_sessionmaker,
     bot: Bot | None,
     *,
-    limit: int = 25,
+    limit: int = OUTBOX_BATCH,
 ) -> OrderLifecycleReplaySummary:
-    summary = OrderLifecycleReplaySummary()
-    result = await session.execute(
-        select(OrderLifecycleEvent)
-        .where(
-            OrderLifecycleEvent.dispatch_status.in_(
-                [
-                    OrderLifecycleDispatchStatus.PENDING.value,
-                    OrderLifecycleDispatchStatus.FAILED.value,
-                ]
-            )
-        )
-        .order_by(OrderLifecycleEvent.created_at.asc(), OrderLifecycleEvent.id.asc())
-        .limit(limit)
-    )
-    events = result.scalars().all()
-
-    for lifecycle_event in events:
-        summary.processed += 1
-        dispatch_result = await replay_order_lifecycle_event(session, bot, lifecycle_event)
-        if dispatch_result is None:
-            summary.failed += 1
-            continue
-        if dispatch_result.successful:
-            summary.dispatched += 1
-        else:
-            summary.failed += 1
-
-    return summary
+    """One outbox pass: claim due events (SKIP LOCKED + lease) and dispatch them concurrently."""
+    return await replay_due_events(session_maker, bot, limit=limit)
 
 
 async def finalize_order_status_change(
@@ -482,6 +591,7 @@ async def finalize_order_status_change(
         dispatch_status=OrderLifecycleDispatchStatus.PENDING.value,
         dispatch_attempts=0,
     )
+    lease_event(lifecycle_event)  # Inline-отправка ниже; outbox подхватит, если она не дойдёт
     session.add(lifecycle_event)
     await session.commit()
 
@@ -496,8 +606,7 @@ async def finalize_order_status_change(
     except Exception as exc:
         logger.exception("[OrderStatus] Dispatch crashed for order #%s", order.id)
         lifecycle_event.dispatch_attempts = (lifecycle_event.dispatch_attempts or 0) + 1
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
-        lifecycle_event.last_error = str(exc)
+        mark_event_failed(lifecycle_event, str(exc))
         await session.commit()
         return result
 
@@ -508,10 +617,14 @@ async def finalize_order_status_change(
         completed_surfaces,
     )
     lifecycle_event.last_error = _format_dispatch_errors(dispatch_result.errors)
+    if dispatch_result.successful and dispatch_result.deferred_surfaces:
+        lifecycle_event.next_attempt_at = None  # Снять lease: остальное outbox доставит сразу
+        await session.commit()
+        wake_lifecycle_outbox()
+        return result
     if dispatch_result.successful:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.DISPATCHED.value
-        lifecycle_event.dispatched_at = datetime.now(MSK_TZ)
+        mark_event_dispatched(lifecycle_event)
     else:
-        lifecycle_event.dispatch_status = OrderLifecycleDispatchStatus.FAILED.value
+        mark_event_failed(lifecycle_event, lifecycle_event.last_error)
     await session.commit()
     return result
@@ -0,0 +1,279 @@
+"""
+Присутствие пользователей Mini App (кто онлайн и где) — в Redis.
+
+Раньше каждый переход по странице делал SELECT + UPSERT + commit в
+user_activities, а /api/god/live сканировал таблицу. Теперь heartbeat —
+один pipeline в Redis:
+
+- presence:user:{id} — hash с текущей страницей/действием; TTL = SESSION_GAP,
+  поэтому после долгой паузы hash истекает и сессия начинается заново
+  (session_started_at ставится через HSETNX);
+- presence:online — sorted set telegram_id → время последнего heartbeat;
+- presence:dirty — set изменившихся с прошлого сброса.
+
+PresenceFlusher раз в FLUSH_INTERVAL_SECONDS переносит изменившихся в
+user_activities (write-behind, для истории и отчётов) и снимает is_online
+с тех, кто давно не появлялся. /live читает только Redis.
+
+Клиент шлёт heartbeat не чаще HEARTBEAT_INTERVAL_SECONDS (интервал
+отдаётся в ответе), если страница/действие не изменились.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from core.redis_pool import get_redis
+from database.models.admin_logs import UserActivity
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+ONLINE_WINDOW_SECONDS = 300
+SESSION_GAP_SECONDS = 1800
+HEARTBEAT_INTERVAL_SECONDS = 30
+FLUSH_INTERVAL_SECONDS = 30
+FLUSH_BATCH = 500
+
+USER_KEY = "presence:user:{}"
+ONLINE_KEY = "presence:online"
+DIRTY_KEY = "presence:dirty"
+
+_FIELDS = ("username", "fullname", "page", "action", "order_id", "platform")
+
+
+@dataclass(frozen=True, slots=True)
+class Presence:
+    telegram_id: int
+    username: Optional[str]
+    fullname: Optional[str]
+    page: Optional[str]
+    action: Optional[str]
+    order_id: Optional[int]
+    platform: Optional[str]
+    session_started_at: Optional[datetime]
+    last_seen: datetime
+
+    @property
+    def session_duration_minutes(self) -> int:
+        if not self.session_started_at:
+            return 0
+        return int((self.last_seen - self.session_started_at).total_seconds() / 60)
+
+
+def _ts(value: datetime) -> float:
+    return round(value.timestamp(), 3)
+
+
+def _from_ts(raw) -> Optional[datetime]:
+    return datetime.fromtimestamp(float(raw), MSK_TZ) if raw else None
+
+
+def _parse(telegram_id: int, data: dict) -> Optional[Presence]:
+    last_seen = _from_ts(data.get("last_seen"))
+    if last_seen is None:
+        return None
+    order_id = data.get("order_id")
+    return Presence(
+        telegram_id=telegram_id,
+        **{name: data.get(name) or None for name in _FIELDS if name != "order_id"},
+        order_id=int(order_id) if order_id else None,
+        session_started_at=_from_ts(data.get("session_started_at")),
+        last_seen=last_seen,
+    )
+
+
+# ══════════════════════════════════════════════════════════════
+#           HEARTBEAT / ЧТЕНИЕ
+# ══════════════════════════════════════════════════════════════
+
+async def record_heartbeat(
+    telegram_id: int,
+    *,
+    username: Optional[str] = None,
+    fullname: Optional[str] = None,
+    page: Optional[str] = None,
+    action: Optional[str] = None,
+    order_id: Optional[int] = None,
+    platform: Optional[str] = None,
+    now: Optional[datetime] = None,
+) -> bool:
+    """Отметить пользователя онлайн. False — Redis недоступен (heartbeat теряется, это не критично)."""
+    stamp = _ts(now or datetime.now(MSK_TZ))
+    key = USER_KEY.format(telegram_id)
+    values = {
+        "username": username, "fullname": fullname, "page": page,
+        "action": action, "order_id": order_id, "platform": platform,
+    }
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.hsetnx(key, "session_started_at", stamp)
+            pipe.hset(key, mapping={
+                **{name: "" if value is None else str(value) for name, value in values.items()},
+                "last_seen": stamp,
+            })
+            pipe.expire(key, SESSION_GAP_SECONDS)
+            pipe.zadd(ONLINE_KEY, {str(telegram_id): stamp})
+            pipe.sadd(DIRTY_KEY, str(telegram_id))
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.debug(f"[Presence] Heartbeat for {telegram_id} dropped: {e}")
+        return False
+
+
+async def _load_presences(redis, telegram_ids: list[int]) -> list[Presence]:
+    if not telegram_ids:
+        return []
+    async with redis.pipeline(transaction=False) as pipe:
+        for telegram_id in telegram_ids:
+            pipe.hgetall(USER_KEY.format(telegram_id))
+        rows = await pipe.execute()
+    presences = (_parse(telegram_id, data or {}) for telegram_id, data in zip(telegram_ids, rows))
+    return [presence for presence in presences if presence is not None]
+
+
+async def get_online(
+    now: Optional[datetime] = None,
+    window_seconds: int = ONLINE_WINDOW_SECONDS,
+) -> list[Presence]:
+    """Онлайн за последние window_seconds, свежие первыми."""
+    stamp = _ts(now or datetime.now(MSK_TZ))
+    redis = await get_redis()
+    # Попутно чистим тех, чья сессия уже истекла
+    await redis.zremrangebyscore(ONLINE_KEY, "-inf", stamp - SESSION_GAP_SECONDS)
+    members = await redis.zrevrangebyscore(ONLINE_KEY, "+inf", stamp - window_seconds)
+    return await _load_presences(redis, [int(member) for member in members])
+
+
+async def count_online(now: Optional[datetime] = None, window_seconds: int = ONLINE_WINDOW_SECONDS) -> int:
+    stamp = _ts(now or datetime.now(MSK_TZ))
+    redis = await get_redis()
+    return int(await redis.zcount(ONLINE_KEY, stamp - window_seconds, "+inf"))
+
+
+# ══════════════════════════════════════════════════════════════
+#           WRITE-BEHIND В user_activities
+# ══════════════════════════════════════════════════════════════
+
+async def flush_presence(session: AsyncSession, now: Optional[datetime] = None, batch: int = FLUSH_BATCH) -> int:
+    """Перенести изменившихся пользователей в user_activities. Возвращает число строк."""
+    now = now or datetime.now(MSK_TZ)
+    redis = await get_redis()
+    flushed = 0
+    popped: list = []
+    try:
+        while True:
+            # SPOP атомарен: несколько процессов не сбросят одного пользователя дважды
+            members = await redis.spop(DIRTY_KEY, batch)
+            if not members:
+                break
+            popped.extend(members)
+            presences = await _load_presences(redis, [int(member) for member in members])
+            if presences:
+                await _upsert_activities(session, presences)
+                flushed += len(presences)
+            if len(members) < batch:
+                break
+
+        await session.execute(
+            update(UserActivity)
+            .where(
+                UserActivity.is_online.is_(True),
+                UserActivity.last_activity_at < now - timedelta(seconds=ONLINE_WINDOW_SECONDS),
+            )
+            .values(is_online=False)
+        )
+        await session.commit()
+    except Exception:
+        # Запись не дошла до базы — вернуть пользователей в dirty до следующего сброса
+        await session.rollback()
+        if popped:
+            await redis.sadd(DIRTY_KEY, *popped)
+        raise
+    return flushed
+
+
+async def _upsert_activities(session: AsyncSession, presences: list[Presence]) -> None:
+    insert_ = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert_(UserActivity).values([
+        {
+            "telegram_id": presence.telegram_id,
+            "username": presence.username,
+            "fullname": presence.fullname,
+            "current_page": presence.page,
+            "current_action": presence.action,
+            "current_order_id": presence.order_id,
+            "platform": presence.platform,
+            "session_started_at": presence.session_started_at,
+            "last_activity_at": presence.last_seen,
+            "is_online": True,
+        }
+        for presence in presences
+    ])
+    updated = (
+        "username", "fullname", "current_page", "current_action", "current_order_id",
+        "platform", "session_started_at", "last_activity_at", "is_online",
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserActivity.telegram_id],
+        set_={column: stmt.excluded[column] for column in updated},
+    )
+    await session.execute(stmt)
+
+
+class PresenceFlusher:
+    """Периодический сброс присутствия из Redis в базу."""
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        async with self.session_maker() as session:
+            return await flush_presence(session)
+
+    async def _loop(self):
+        while self._running:
+            await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[Presence] Flush failed: {e}")
+
+    def start(self):
+        """Запустить сервис"""
+        if not self._running:
+            self._running = True
+            self._task = asyncio.create_task(self._loop())
+
+    def stop(self):
+        """Остановить сервис"""
+        self._running = False
+        if self._task:
+            self._task.cancel()
+
+
+_flusher: Optional[PresenceFlusher] = None
+
+
+def init_presence_flusher(session_maker: async_sessionmaker) -> PresenceFlusher:
+    global _flusher
+    _flusher = PresenceFlusher(session_maker)
+    _flusher.start()
+    return _flusher
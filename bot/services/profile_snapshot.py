@@ -0,0 +1,206 @@
+"""
+Снапшот профиля для GET /api/user.
+
+В Redis лежит готовый JSON UserResponse на каждого telegram_id:
+- profile:snap:{id} — hash {version, etag, body} с TTL;
+- profile:ver:{id}  — версия профиля, растёт при каждом изменении.
+
+Инвалидация событийная: session-хуки собирают telegram_id изменённых
+User/Order/BalanceTransaction/UserAchievement при flush и после commit
+увеличивают версию и удаляют снапшот. Так покрыты смены статуса заказа,
+начисления/списания баланса, daily bonus, рефералы и достижения — любые
+записи через ORM.
+
+Сборка снапшота запоминает версию ДО чтения из БД и сохраняет результат
+только если версия не изменилась (Lua) — параллельная инвалидация не
+перезатрётся устаревшим профилем. TTL ограничен полуночью по МСК (daily
+bonus, сгорание бонусов) и ближайшим окончанием паузы заказа.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from core.redis_pool import RedisScript, get_redis
+from database.models.achievements import UserAchievement
+from database.models.orders import Order
+from database.models.transactions import BalanceTransaction
+from database.models.users import User
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+SNAPSHOT_TTL_SECONDS = 300
+VERSION_TTL_SECONDS = 86400
+
+# Модель → атрибут с telegram_id владельца
+_OWNER_ATTRS = {
+    User: "telegram_id",
+    Order: "user_id",
+    BalanceTransaction: "user_id",
+    UserAchievement: "user_id",
+}
+_PENDING_KEY = "profile_snapshot_dirty"
+
+# KEYS[1] — версия, KEYS[2] — снапшот; ARGV: версия, etag, body, ttl
+STORE_SCRIPT = """
+local current = redis.call('GET', KEYS[1]) or '0'
+if current ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[2], 'version', ARGV[1], 'etag', ARGV[2], 'body', ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+store_script = RedisScript(STORE_SCRIPT)
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileSnapshot:
+    etag: str
+    body: str
+
+
+def _version_key(telegram_id: int) -> str:
+    return f"profile:ver:{telegram_id}"
+
+
+def _snapshot_key(telegram_id: int) -> str:
+    return f"profile:snap:{telegram_id}"
+
+
+def make_etag(body: str) -> str:
+    return '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def snapshot_ttl(orders: Iterable[Order], now: Optional[datetime] = None) -> int:
+    """Не дольше SNAPSHOT_TTL_SECONDS, полуночи МСК и ближайшего окончания паузы."""
+    now = now or datetime.now(MSK_TZ)
+    deadlines = [
+        now + timedelta(seconds=SNAPSHOT_TTL_SECONDS),
+        datetime.combine(now.astimezone(MSK_TZ).date() + timedelta(days=1), datetime.min.time(), tzinfo=MSK_TZ),
+    ]
+    for order in orders:
+        pause_until = getattr(order, "pause_until", None)
+        if pause_until is not None:
+            if pause_until.tzinfo is None:
+                pause_until = pause_until.replace(tzinfo=MSK_TZ)
+            if pause_until > now:
+                deadlines.append(pause_until)
+    return max(1, int((min(deadlines) - now).total_seconds()))
+
+
+async def load_profile_snapshot(telegram_id: int) -> tuple[Optional[ProfileSnapshot], str]:
+    """(снапшот или None, текущая версия) за один round-trip."""
+    redis = await get_redis()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hmget(_snapshot_key(telegram_id), "etag", "body")
+        pipe.get(_version_key(telegram_id))
+        (etag, body), version = await pipe.execute()
+    snapshot = ProfileSnapshot(etag=etag, body=body) if etag and body is not None else None
+    return snapshot, version or "0"
+
+
+async def store_profile_snapshot(telegram_id: int, version: str, body: str, ttl: int) -> Optional[ProfileSnapshot]:
+    """Сохранить снапшот, если версия не менялась с начала сборки."""
+    snapshot = ProfileSnapshot(etag=make_etag(body), body=body)
+    redis = await get_redis()
+    stored = await store_script(
+        redis,
+        keys=[_version_key(telegram_id), _snapshot_key(telegram_id)],
+        args=[version, snapshot.etag, body, ttl],
+    )
+    return snapshot if int(stored) else None
+
+
+async def invalidate_profile_snapshots(telegram_ids: Iterable[int]) -> None:
+    telegram_ids = [tid for tid in set(telegram_ids) if tid]
+    if not telegram_ids:
+        return
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=True) as pipe:
+            for telegram_id in telegram_ids:
+                pipe.incr(_version_key(telegram_id))
+                pipe.expire(_version_key(telegram_id), VERSION_TTL_SECONDS)
+                pipe.delete(_snapshot_key(telegram_id))
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"[ProfileSnapshot] Invalidation failed for {telegram_ids}: {e}")
+
+
+async def invalidate_profile_snapshot(telegram_id: int) -> None:
+    await invalidate_profile_snapshots([telegram_id])
+
+
+# ══════════════════════════════════════════════════════════════
+#           SESSION HOOKS
+# ══════════════════════════════════════════════════════════════
+
+def _owner_id(obj) -> Optional[int]:
+    attr = _OWNER_ATTRS.get(type(obj))
+    return inspect(obj).dict.get(attr) if attr else None  # Без lazy-load
+
+
+def _on_after_flush(session: Session, flush_context) -> None:
+    dirty = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        owner = _owner_id(obj)
+        if owner:
+            dirty.add(owner)
+
+
+def _on_after_commit(session: Session) -> None:
+    telegram_ids = session.info.pop(_PENDING_KEY, None)
+    if not telegram_ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Синхронный контекст без event loop (скрипты) — остаётся TTL
+    task = loop.create_task(invalidate_profile_snapshots(telegram_ids))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_HOOKS = (
+    ("after_flush", _on_after_flush),
+    ("after_commit", _on_after_commit),
+    ("after_rollback", _on_after_rollback),
+)
+
+
+def install_profile_snapshot_tracking() -> None:
+    """Инвалидировать снапшоты профилей после commit (идемпотентно)."""
+    for identifier, fn in _HOOKS:
+        if not event.contains(Session, identifier, fn):
+            event.listen(Session, identifier, fn)
+
+
+def uninstall_profile_snapshot_tracking() -> None:
+    for identifier, fn in _HOOKS:
+        if event.contains(Session, identifier, fn):
+            event.remove(Session, identifier, fn)
@@ -0,0 +1,112 @@
+"""
+Статистика использования промокодов.
+
+Раньше /api/god/promos делал 2–4 запроса на каждый промокод. Теперь все
+счётчики считаются одним GROUP BY по promocode_usages с JOIN на orders и
+кэшируются (core/cache.py). Кэш сбрасывается после commit транзакции, в
+которой промокод применили или вернули (PromoService), TTL ограничивает
+устаревание при прочих изменениях заказов.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.cache import CacheNamespace
+from database.models.orders import Order
+from database.models.promocodes import PromoCodeUsage
+
+logger = logging.getLogger(__name__)
+
+PROMO_STATS_TTL = 120
+_ALL_KEY = "all"
+_PENDING_KEY = "promo_stats_dirty"
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+@dataclass(frozen=True, slots=True)
+class PromoUsageStats:
+    total_usages: int = 0
+    active_usages: int = 0
+    total_savings: float = 0.0  # По заказам: цена после скидки лояльности × % промокода
+    recorded_savings: float = 0.0  # Сумма discount_amount, записанная при применении
+
+
+EMPTY_STATS = PromoUsageStats()
+
+
+def _encode(stats: dict[int, PromoUsageStats]) -> str:
+    return json.dumps({str(promo_id): asdict(item) for promo_id, item in stats.items()})
+
+
+def _decode(raw: str) -> dict[int, PromoUsageStats]:
+    return {int(promo_id): PromoUsageStats(**item) for promo_id, item in json.loads(raw).items()}
+
+
+promo_stats_cache = CacheNamespace("promo_stats", ttl=PROMO_STATS_TTL, encode=_encode, decode=_decode)
+
+
+async def load_promo_usage_stats(session: AsyncSession) -> dict[int, PromoUsageStats]:
+    """Статистика по всем промокодам одним запросом."""
+    active = PromoCodeUsage.is_active
+    order_savings = Order.price * (1 - (Order.discount / 100.0)) * (Order.promo_discount / 100.0)
+
+    result = await session.execute(
+        select(
+            PromoCodeUsage.promocode_id,
+            func.count(PromoCodeUsage.id).label("total_usages"),
+            func.count(PromoCodeUsage.id).filter(active).label("active_usages"),
+            func.sum(order_savings).filter(active).label("total_savings"),
+            func.sum(PromoCodeUsage.discount_amount).filter(active).label("recorded_savings"),
+        )
+        .outerjoin(Order, Order.id == PromoCodeUsage.order_id)
+        .group_by(PromoCodeUsage.promocode_id)
+    )
+    return {
+        row.promocode_id: PromoUsageStats(
+            total_usages=row.total_usages or 0,
+            active_usages=row.active_usages or 0,
+            total_savings=float(row.total_savings or 0),
+            recorded_savings=float(row.recorded_savings or 0),
+        )
+        for row in result
+    }
+
+
+async def get_promo_usage_stats(session: AsyncSession) -> dict[int, PromoUsageStats]:
+    return await promo_stats_cache.get_or_load(_ALL_KEY, lambda: load_promo_usage_stats(session))
+
+
+async def get_promo_usage_stat(session: AsyncSession, promo_id: int) -> PromoUsageStats:
+    return (await get_promo_usage_stats(session)).get(promo_id, EMPTY_STATS)
+
+
+async def invalidate_promo_stats() -> None:
+    await promo_stats_cache.invalidate(_ALL_KEY)
+
+
+def invalidate_promo_stats_after_commit(session: AsyncSession) -> None:
+    """Сбросить кэш, когда транзакция session закоммитится (не раньше — иначе гонка с перечитыванием)."""
+    sync_session = session.sync_session
+    if sync_session.info.get(_PENDING_KEY):
+        return
+    sync_session.info[_PENDING_KEY] = True
+
+    def on_commit(_session) -> None:
+        sync_session.info.pop(_PENDING_KEY, None)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(invalidate_promo_stats())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    event.listen(sync_session, "after_commit", on_commit, once=True)
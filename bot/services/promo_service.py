@@ -20,6 +20,7 @@ from aiogram import Bot
 from database.models.promocodes import PromoCode, PromoCodeUsage
 from database.models.orders import Order
 from core.config import settings
+from bot.services.promo_analytics import get_promo_usage_stat, invalidate_promo_stats_after_commit
 
 logger = logging.getLogger(__name__)
 MSK_TZ = ZoneInfo("Europe/Moscow")
@@ -328,6 +329,7 @@ class PromoService:
             except Exception:
                 pass  # Column doesn't exist yet
             session.add(usage)
+            invalidate_promo_stats_after_commit(session)
 
             # Increment usage counter
             old_uses = promo.current_uses
@@ -464,6 +466,7 @@ class PromoService:
                 pass  # Columns don't exist yet
 
             await session.flush()
+            invalidate_promo_stats_after_commit(session)
 
             logger.info(
                 f"[PromoService] Returned promo usage for order #{order_id}: "
@@ -583,49 +586,15 @@ class PromoService:
         if not promo:
             return {}
 
-        # Count active usages (with fallback if is_active column doesn't exist)
-        try:
-            active_count_stmt = select(func.count()).select_from(PromoCodeUsage).where(
-                and_(
-                    PromoCodeUsage.promocode_id == promo_id,
-                    PromoCodeUsage.is_active == True
-                )
-            )
-            active_result = await session.execute(active_count_stmt)
-            active_count = active_result.scalar() or 0
-        except Exception:
-            # Fallback: count all usages
-            active_count_stmt = select(func.count()).select_from(PromoCodeUsage).where(
-                PromoCodeUsage.promocode_id == promo_id
-            )
-            active_result = await session.execute(active_count_stmt)
-            active_count = active_result.scalar() or 0
-
-        # Sum total savings (with fallback)
-        try:
-            savings_stmt = select(func.sum(PromoCodeUsage.discount_amount)).where(
-                and_(
-                    PromoCodeUsage.promocode_id == promo_id,
-                    PromoCodeUsage.is_active == True
-                )
-            )
-            savings_result = await session.execute(savings_stmt)
-            total_savings = savings_result.scalar() or 0.0
-        except Exception:
-            # Fallback: sum all savings
-            savings_stmt = select(func.sum(PromoCodeUsage.discount_amount)).where(
-                PromoCodeUsage.promocode_id == promo_id
-            )
-            savings_result = await session.execute(savings_stmt)
-            total_savings = savings_result.scalar() or 0.0
+        stats = await get_promo_usage_stat(session, promo_id)
 
         return {
             "code": promo.code,
             "discount_percent": promo.discount_percent,
             "max_uses": promo.max_uses,
             "current_uses": promo.current_uses,
-            "active_usages": active_count,
-            "total_savings": float(total_savings),
+            "active_usages": stats.active_usages,
+            "total_savings": stats.recorded_savings,
             "is_active": promo.is_active,
             "valid_until": promo.valid_until,
         }
@@ -0,0 +1,159 @@
+"""
+Поиск для God Mode: заказы, клиенты, переписка по заказам.
+
+На PostgreSQL (миграция a8b9c0d1e2f3):
+- orders.search_vector / order_messages.search_vector — tsvector с конфигом
+  'russian', обновляется триггером, GIN-индекс; ранжирование ts_rank;
+- GIN pg_trgm на orders.subject/topic, users.username/fullname и
+  order_messages.message_text — ILIKE '%x%' и similarity() идут по индексу.
+  Колонки search_vector в ORM не отображаются: ими владеет триггер.
+
+На SQLite (тесты) остаётся прежний ILIKE без ранжирования (lower() там
+регистронезависим только для ASCII).
+
+Username ищется по префиксу (`@ivan` → username LIKE 'ivan%'), имя — по подстроке.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import ColumnElement, case, desc, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models.orders import Order, OrderMessage
+from database.models.users import User
+
+TS_CONFIG = "russian"
+MAX_TERM_LENGTH = 100
+SNIPPET_RADIUS = 60
+
+_ORDER_VECTOR = literal_column("orders.search_vector")
+_MESSAGE_VECTOR = literal_column("order_messages.search_vector")
+
+
+@dataclass(slots=True)
+class MessageHit:
+    message_id: int
+    order_id: int
+    sender_type: str
+    snippet: str
+    created_at: Optional[datetime]
+
+
+def normalize_term(term: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", term or "").strip()[:MAX_TERM_LENGTH]
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _contains(column, term: str) -> ColumnElement[bool]:
+    return column.ilike(f"%{_escape_like(term)}%", escape="\\")
+
+
+def _starts_with(column, term: str) -> ColumnElement[bool]:
+    return column.ilike(f"{_escape_like(term)}%", escape="\\")
+
+
+def is_postgres(session: AsyncSession) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def _tsquery(term: str):
+    return func.websearch_to_tsquery(TS_CONFIG, term)
+
+
+# ══════════════════════════════════════════════════════════════
+#           FILTERS (для списков с keyset-пагинацией)
+# ══════════════════════════════════════════════════════════════
+
+def order_search_clause(session: AsyncSession, term: str) -> ColumnElement[bool]:
+    """Заказ подходит по теме/предмету (+ полнотекстово по описанию на PG)."""
+    clause = or_(_contains(Order.subject, term), _contains(Order.topic, term))
+    if is_postgres(session):
+        clause = or_(_ORDER_VECTOR.op("@@")(_tsquery(term)), clause)
+    return clause
+
+
+def user_search_clause(term: str) -> ColumnElement[bool]:
+    username = term.lstrip("@")
+    return or_(_starts_with(User.username, username), _contains(User.fullname, term))
+
+
+# ══════════════════════════════════════════════════════════════
+#           RANKED SEARCH
+# ══════════════════════════════════════════════════════════════
+
+async def search_orders(session: AsyncSession, term: str, *, limit: int = 20) -> list[Order]:
+    query = select(Order).where(order_search_clause(session, term)).limit(limit)
+    if is_postgres(session):
+        rank = func.ts_rank(_ORDER_VECTOR, _tsquery(term)) + func.greatest(
+            func.similarity(func.coalesce(Order.subject, ""), term),
+            func.similarity(func.coalesce(Order.topic, ""), term),
+        )
+        query = query.order_by(desc(rank), desc(Order.created_at))
+    else:
+        query = query.order_by(desc(Order.created_at), desc(Order.id))
+    return list((await session.execute(query)).scalars().all())
+
+
+async def search_users(session: AsyncSession, term: str, *, limit: int = 20) -> list[User]:
+    username = term.lstrip("@")
+    # Точное совпадение username, затем префикс, затем остальное
+    exact_first = case(
+        (func.lower(User.username) == username.lower(), 2),
+        (_starts_with(User.username, username), 1),
+        else_=0,
+    )
+    query = select(User).where(user_search_clause(term)).limit(limit)
+    if is_postgres(session):
+        similarity = func.greatest(
+            func.similarity(func.coalesce(User.username, ""), username),
+            func.similarity(func.coalesce(User.fullname, ""), term),
+        )
+        query = query.order_by(desc(exact_first), desc(similarity), desc(User.created_at))
+    else:
+        query = query.order_by(desc(exact_first), desc(User.created_at), desc(User.id))
+    return list((await session.execute(query)).scalars().all())
+
+
+def make_snippet(text: str, term: str, radius: int = SNIPPET_RADIUS) -> str:
+    """Фрагмент текста вокруг первого вхождения любого слова запроса."""
+    lowered = text.lower()
+    positions = [lowered.find(word) for word in term.lower().split()]
+    found = [pos for pos in positions if pos >= 0]
+    if not found:
+        return text[: radius * 2] + ("…" if len(text) > radius * 2 else "")
+    start = max(0, min(found) - radius)
+    end = min(len(text), min(found) + radius)
+    return ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+async def search_messages(session: AsyncSession, term: str, *, limit: int = 20) -> list[MessageHit]:
+    clause = _contains(OrderMessage.message_text, term)
+    query = select(OrderMessage).limit(limit)
+    if is_postgres(session):
+        tsquery = _tsquery(term)
+        query = query.where(or_(_MESSAGE_VECTOR.op("@@")(tsquery), clause)).order_by(
+            desc(func.ts_rank(_MESSAGE_VECTOR, tsquery)),
+            desc(OrderMessage.created_at),
+        )
+    else:
+        query = query.where(clause).order_by(desc(OrderMessage.created_at), desc(OrderMessage.id))
+
+    messages = (await session.execute(query)).scalars().all()
+    return [
+        MessageHit(
+            message_id=message.id,
+            order_id=message.order_id,
+            sender_type=message.sender_type,
+            snippet=make_snippet(message.message_text or "", term),
+            created_at=message.created_at,
+        )
+        for message in messages
+    ]
@@ -0,0 +1,435 @@
+"""
+Единый планировщик исходящих сообщений Bot API.
+
+Все send*/edit*/copy*/forward* вызовы общего Bot (bot/bot_instance.py) идут
+через SendScheduler — request-middleware сессии aiogram, поэтому вызывающий
+код по-прежнему просто делает await bot.send_message(...):
+
+- полосы приоритета: customer > admin > logs > marketing. Полоса берётся из
+  send_lane(...) вокруг вызова, иначе — по чату: LOG_CHANNEL_ID → logs,
+  админская группа / канал карточек / ADMIN_IDS → admin, остальное → customer;
+- общий TokenBucket (GLOBAL_RATE_PER_SECOND) и ведро сообщений на каждый чат
+  (личка ~1/с, группы и каналы BOT_SEND_GROUP_RATE_PER_MINUTE,
+  core/token_bucket.py). Свободный слот получает самый приоритетный запрос,
+  чей чат не упёрся в лимит. Edit* и вызовы топиков чатовое ведро не тратят;
+- у логов своё ведро (BOT_SEND_LOGS_RATE_PER_MINUTE), и в чатах, куда идут
+  логи, оно вычитается из ведра остальных полос: логи не съедают токены,
+  нужные админке и пересылке сообщений клиентов в топики;
+- в одно ведро (и в одно сообщение для edit) — не больше одного запроса
+  одновременно (порядок сообщений);
+- у каждой полосы предел очереди (LANE_LIMITS): при переполнении вызов сразу
+  падает с SendQueueFull, а не ждёт без ограничения;
+- TelegramRetryAfter ставит на паузу ведро чата (а для личных чатов — и общее)
+  и возвращает запрос в начало полосы, вызывающий код его не видит;
+- повторные edit одного сообщения, ещё не ушедшие в Telegram, склеиваются:
+  уходит последняя версия, все вызывающие получают её результат.
+
+Метрики полос (очередь, задержка доставки p50/p95/max) — metrics()
+(God Mode → /api/god/metrics).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Hashable, Iterator, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+from core.config import settings
+from core.token_bucket import TokenBucket
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+    from aiogram.methods import TelegramMethod
+    from aiogram.methods.base import Response
+
+logger = logging.getLogger(__name__)
+
+LANES = ("customer", "admin", "logs", "marketing")
+
+GLOBAL_RATE_PER_SECOND = 25  # Telegram: ~30 сообщений/с на бота
+PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST = 1.0, 3
+GROUP_CHAT_BURST = 5
+LOGS_BURST = 2
+MAX_CHAT_BUCKETS = 10_000
+MAX_RETRY_AFTER_ATTEMPTS = 3
+LATENCY_WINDOW = 500
+DRAIN_TIMEOUT_SECONDS = 10
+
+# Очередь полосы не больше стольких запросов, дальше — SendQueueFull
+LANE_LIMITS = {"customer": 1000, "admin": 1000, "logs": 200, "marketing": 500}
+
+SCHEDULED_PREFIXES = ("Send", "Edit", "Copy", "Forward")
+MESSAGE_PREFIXES = ("Send", "Copy", "Forward")  # Тратят ведро чата; Edit* — только общее
+UNSCHEDULED_METHODS = frozenset({"SendChatAction"})
+COALESCED_EDITS = frozenset({"EditMessageText", "EditMessageCaption", "EditMessageReplyMarkup", "EditMessageMedia"})
+
+
+class SendQueueFull(RuntimeError):
+    """Очередь полосы переполнена — запрос не принят."""
+
+
+_current_lane: ContextVar[Optional[str]] = ContextVar("send_lane", default=None)
+
+
+@contextmanager
+def send_lane(lane: str) -> Iterator[None]:
+    """Отправки внутри блока идут в полосу lane (customer / admin / logs / marketing)."""
+    if lane not in LANES:
+        raise ValueError(f"Unknown send lane: {lane}")
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def lane_for(method: "TelegramMethod") -> Optional[str]:
+    """Полоса запроса; None — запрос идёт мимо планировщика."""
+    name = type(method).__name__
+    if not name.startswith(SCHEDULED_PREFIXES) or name in UNSCHEDULED_METHODS:
+        return None
+    chat_id = getattr(method, "chat_id", None)
+    if chat_id is None:
+        return None  # inline_message_id и прочее без чата
+    lane = _current_lane.get()
+    if lane is not None:
+        return lane
+    if chat_id == settings.LOG_CHANNEL_ID:
+        return "logs"
+    if chat_id in (settings.ADMIN_GROUP_ID, settings.ORDERS_CHANNEL_ID) or chat_id in settings.ADMIN_IDS:
+        return "admin"
+    return "customer"
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class LaneStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0  # TelegramRetryAfter → повтор
+    dropped: int = 0  # Очередь полосы полна
+    coalesced: int = 0  # edit склеен с более новым
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def to_dict(self, queued: int) -> dict:
+        latencies = list(self.latencies)
+        latency_ms = None
+        if latencies:
+            latency_ms = {
+                "p50": round(_percentile(latencies, 0.5) * 1000, 1),
+                "p95": round(_percentile(latencies, 0.95) * 1000, 1),
+                "max": round(max(latencies) * 1000, 1),
+            }
+        return {
+            "queued": queued,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "latency_ms": latency_ms,
+        }
+
+
+@dataclass(eq=False)
+class _Send:
+    lane: str
+    chat_id: Hashable
+    bot: "Bot"
+    method: "TelegramMethod"
+    make_request: Any
+    edit_key: Optional[tuple]
+    waiters: list[asyncio.Future]
+    slot: Hashable  # Не больше одного запроса одновременно на slot
+    throttle_key: Optional[Hashable]  # Ведро сообщений; None — только общий лимит
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+    @property
+    def abandoned(self) -> bool:
+        return all(waiter.done() for waiter in self.waiters)
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """Очереди по приоритетам + общий и початовые лимиты."""
+
+    def __init__(self, *, rate: float = GLOBAL_RATE_PER_SECOND):
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self._chat_buckets: OrderedDict[Hashable, TokenBucket] = OrderedDict()
+        self._lanes: dict[str, deque[_Send]] = {lane: deque() for lane in LANES}
+        self._edits: dict[tuple, _Send] = {}
+        self._in_flight: set[Hashable] = set()
+        self._sends: set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {lane: LaneStats() for lane in LANES}
+
+    # ── Приём ──
+
+    async def __call__(self, make_request, bot: "Bot", method: "TelegramMethod") -> "Response":
+        lane = lane_for(method)
+        if lane is None:
+            return await make_request(bot, method)
+        self._ensure_running()
+
+        chat_id = method.chat_id
+        name = type(method).__name__
+        edit_key = (name, chat_id, getattr(method, "message_id", None)) if name in COALESCED_EDITS else None
+        queued = self._edits.get(edit_key) if edit_key is not None else None
+        if queued is None and len(self._lanes[lane]) >= LANE_LIMITS[lane]:
+            self.stats[lane].dropped += 1
+            raise SendQueueFull(f"Send lane {lane} is full ({LANE_LIMITS[lane]} queued)")
+
+        waiter = self._loop.create_future()
+        if queued is not None:
+            # Ещё не отправлен — уйдёт сразу новая версия
+            queued.method, queued.make_request = method, make_request
+            queued.waiters.append(waiter)
+            self.stats[queued.lane].coalesced += 1
+        else:
+            if name.startswith(MESSAGE_PREFIXES):
+                throttle_key = ("logs", chat_id) if lane == "logs" else chat_id
+                slot = throttle_key
+            else:
+                # Edit*, топики форума: лимит на сообщения чата их не касается, порядок — по сообщению
+                throttle_key = None
+                slot = ("edit", chat_id, getattr(method, "message_id", None) or getattr(method, "message_thread_id", None))
+            send = _Send(lane, chat_id, bot, method, make_request, edit_key, [waiter], slot, throttle_key)
+            self._lanes[lane].append(send)
+            if edit_key is not None:
+                self._edits[edit_key] = send
+            self._idle.clear()
+            self._wakeup.set()
+        return await waiter
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новый event loop (перезапуск сервиса, тесты) — старые очереди к нему не относятся
+            self._loop = loop
+            self._lanes = {lane: deque() for lane in LANES}
+            self._edits.clear()
+            self._in_flight.clear()
+            self._sends.clear()
+            self._wakeup = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="send-scheduler")
+
+    # ── Выбор следующего запроса ──
+
+    @staticmethod
+    def _bucket_limits(key: Hashable) -> tuple[float, float]:
+        """(сообщений в секунду, burst) для ведра: чат или ("logs", чат)"""
+        logs_rate = settings.BOT_SEND_LOGS_RATE_PER_MINUTE / 60
+        if isinstance(key, tuple):
+            return logs_rate, LOGS_BURST
+        if isinstance(key, int) and key > 0:
+            return PRIVATE_CHAT_RATE, PRIVATE_CHAT_BURST
+        rate = settings.BOT_SEND_GROUP_RATE_PER_MINUTE / 60
+        if key in (settings.ADMIN_GROUP_ID, settings.LOG_CHANNEL_ID):
+            rate = max(rate - logs_rate, 1 / 60)  # Доля логов вычтена — общий лимит чата не превышаем
+        return rate, GROUP_CHAT_BURST
+
+    def _chat_bucket(self, key: Hashable) -> TokenBucket:
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            rate, burst = self._bucket_limits(key)
+            bucket = self._chat_buckets[key] = TokenBucket(rate, capacity=burst)
+            while len(self._chat_buckets) > MAX_CHAT_BUCKETS:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(key)
+        return bucket
+
+    def _next_send(self) -> tuple[Optional[_Send], Optional[float]]:
+        """Самый приоритетный запрос, чьё ведро свободно; иначе — через сколько секунд проверить снова."""
+        wait: Optional[float] = None
+        for lane in LANES:
+            queue = self._lanes[lane]
+            blocked: set[Hashable] = set()
+            index = 0
+            while index < len(queue):
+                send = queue[index]
+                if send.abandoned:
+                    del queue[index]
+                    self._forget_edit(send)
+                    continue
+                index += 1
+                if send.slot in blocked or send.slot in self._in_flight:
+                    continue
+                if send.throttle_key is not None:
+                    bucket = self._chat_bucket(send.throttle_key)
+                    delay = bucket.time_until()
+                    if delay > 0:
+                        blocked.add(send.slot)
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+                    bucket.try_acquire()
+                elif send.chat_id in self._chat_buckets:
+                    delay = self._chat_buckets[send.chat_id].paused_for  # Flood control чата касается и edit
+                    if delay > 0:
+                        blocked.add(send.slot)
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+                del queue[index - 1]
+                self._forget_edit(send)
+                return send, None
+        return None, wait
+
+    def _forget_edit(self, send: _Send) -> None:
+        if send.edit_key is not None and self._edits.get(send.edit_key) is send:
+            del self._edits[send.edit_key]
+
+    async def _run(self) -> None:
+        while True:
+            delay = self.bucket.time_until()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            send, wait = self._next_send()
+            if send is None:
+                self._refresh_idle()
+                self._wakeup.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                continue
+            self.bucket.try_acquire()
+            self._in_flight.add(send.slot)
+            task = asyncio.create_task(self._deliver(send))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    # ── Отправка ──
+
+    async def _deliver(self, send: _Send) -> None:
+        stats = self.stats[send.lane]
+        send.attempts += 1
+        try:
+            response = await send.make_request(send.bot, send.method)
+        except TelegramRetryAfter as e:
+            self._chat_bucket(send.chat_id).pause(e.retry_after)
+            if send.throttle_key is not None and send.throttle_key != send.chat_id:
+                self._chat_bucket(send.throttle_key).pause(e.retry_after)
+            if isinstance(send.chat_id, int) and send.chat_id > 0:
+                self.bucket.pause(e.retry_after)  # В личку упираемся в общий лимит бота
+            if send.attempts < MAX_RETRY_AFTER_ATTEMPTS:
+                logger.warning(f"[SendScheduler] Flood control in {send.chat_id} ({send.lane}), retry in {e.retry_after}s")
+                stats.retried += 1
+                self._requeue(send)
+            else:
+                stats.failed += 1
+                self._resolve(send, error=e)
+        except Exception as e:
+            stats.failed += 1
+            self._resolve(send, error=e)
+        else:
+            stats.sent += 1
+            stats.latencies.append(time.monotonic() - send.enqueued_at)
+            self._resolve(send, response=response)
+        finally:
+            self._in_flight.discard(send.slot)
+            self._wakeup.set()
+
+    def _requeue(self, send: _Send) -> None:
+        newer = self._edits.get(send.edit_key) if send.edit_key is not None else None
+        if newer is not None:
+            newer.waiters.extend(send.waiters)  # Пока ждали, пришла новая версия — отправим её
+            self.stats[send.lane].coalesced += 1
+            return
+        self._lanes[send.lane].appendleft(send)
+        if send.edit_key is not None:
+            self._edits[send.edit_key] = send
+
+    @staticmethod
+    def _resolve(send: _Send, *, response=None, error: Optional[BaseException] = None) -> None:
+        for waiter in send.waiters:
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(response)
+
+    def _refresh_idle(self) -> None:
+        if not self._in_flight and not any(self._lanes.values()):
+            self._idle.set()
+
+    # ── Сервис ──
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._lanes.values())
+
+    def metrics(self) -> dict:
+        """Очереди, лимиты и задержки по полосам (для God Mode)"""
+        return {
+            "queued": self.queued,
+            "in_flight": len(self._in_flight),
+            "paused_for": round(self.bucket.paused_for, 1),
+            "lanes": {lane: self.stats[lane].to_dict(len(self._lanes[lane])) for lane in LANES},
+        }
+
+    async def stop(self, drain_timeout: float = DRAIN_TIMEOUT_SECONDS) -> None:
+        """Остановить планировщик, дав отправить уже принятые сообщения"""
+        if self._task is None:
+            return
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), timeout=drain_timeout)
+        if self.queued or self._in_flight:
+            logger.warning(f"[SendScheduler] Stopping with {self.queued + len(self._in_flight)} unsent requests")
+        task, self._task = self._task, None
+        task.cancel()
+        sends = list(self._sends)
+        for send_task in sends:
+            send_task.cancel()
+        await asyncio.gather(task, *sends, return_exceptions=True)
+        for queue in self._lanes.values():
+            for send in queue:
+                for waiter in send.waiters:
+                    waiter.cancel()
+            queue.clear()
+        self._edits.clear()
+        self._in_flight.clear()
+
+
+_scheduler: Optional[SendScheduler] = None
+
+
+def install_send_scheduler(bot: "Bot") -> SendScheduler:
+    """Повесить планировщик процесса на сессию bot (повторный вызов ничего не меняет)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = SendScheduler()
+    if _scheduler not in bot.session.middleware:
+        bot.session.middleware(_scheduler)
+    return _scheduler
+
+
+def get_send_scheduler() -> Optional[SendScheduler]:
+    """Планировщик текущего процесса (None — общий Bot ещё не создан)."""
+    return _scheduler
+
+
+async def shutdown_send_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        await _scheduler.stop()
+        _scheduler = None
@@ -0,0 +1,275 @@
+"""
+Стоп-слова: один скомпилированный матчер для StopWordsMiddleware.
+
+StopWordMatcher собирает слова в префиксное дерево (trie) и компилирует его
+вместе с паттернами (телефоны, @username, t.me-ссылки) в один regex. Текст
+приводится к нижнему регистру один раз и проходится одним finditer — вместо
+цикла `in` по словам, трёх findall и вложенного цикла по белому списку.
+Каждая ветка regex начинается с буквы, поэтому sre сразу перескакивает к
+позициям с подходящим первым символом, а время почти не зависит от длины
+списка (scripts/bench_stop_words.py).
+
+Опции:
+- word_boundary — слово только целиком (иначе и как часть слова:
+  «обман» находит «обманули»);
+- normalize — «ё» = «е» и латинские двойники кириллицы (a/а, o/о/0, p/р, c/с…),
+  чтобы «0бмaн» латиницей не проходил мимо.
+
+Список слов и опции можно менять без рестарта: конфиг лежит в Redis
+(STOP_WORDS_KEY, God Mode → PUT /api/god/stop-words), процессы перечитывают
+его не чаще раза в REFRESH_INTERVAL_SECONDS (refresh_matcher).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, Optional
+
+from core.config import settings
+from core.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+STOP_WORDS_KEY = "stop_words:config"
+REFRESH_INTERVAL_SECONDS = 30
+MAX_FINDINGS = 5
+
+# Стоп-слова по умолчанию (пока в Redis нет своего списка)
+DEFAULT_STOP_WORDS: list[str] = [
+    # Конкуренты
+    "zaochnik",
+    "автор24",
+    "author24",
+    "студворк",
+    "studwork",
+    "напишем",
+
+    # Подозрительное
+    "возврат денег",
+    "верни деньги",
+    "обман",
+    "мошенник",
+    "развод",
+    "кинул",
+
+    # Угрозы
+    "в полицию",
+    "в суд",
+    "жалоба",
+    "роспотребнадзор",
+]
+
+# Паттерны по тексту в нижнем регистре: имя → варианты, каждый начинается с символа
+STOP_PATTERNS: dict[str, list[str]] = {
+    "phone": [  # Телефоны
+        r"\+7[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}",
+        r"8[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}",
+    ],
+    "username": [r"@[a-z_][a-z0-9_]{4,}"],  # Username других ботов/людей (длинные)
+    "link": [r"t\.me/[a-z0-9_]+"],  # Ссылки на телеграм
+}
+
+# Кириллица ↔ латинские двойники (и цифры), для normalize
+_HOMOGLYPHS = ["аa", "вb", "еeё", "кk", "мm", "нh", "оo0", "рp", "сc", "тt", "уy", "хx"]
+_EQUIVALENTS: dict[str, str] = {char: group for group in _HOMOGLYPHS for char in group}
+
+
+def _canonical(text: str, normalize: bool) -> str:
+    """Ключ слова: нижний регистр, пробелы схлопнуты, двойники — первым символом группы."""
+    text = " ".join(text.lower().split())
+    if normalize:
+        text = "".join(_EQUIVALENTS.get(char, char)[0] for char in text)
+    return text
+
+
+def _atom(char: str, normalize: bool) -> str:
+    if char == " ":
+        return r"\s+"
+    if normalize and char in _EQUIVALENTS:
+        return "[" + re.escape(_EQUIVALENTS[char]) + "]"
+    return re.escape(char)
+
+
+def _trie_regex(node: dict, normalize: bool) -> str:
+    alternatives = [_atom(char, normalize) + _trie_regex(node[char], normalize) for char in sorted(k for k in node if k)]
+    if not alternatives:
+        return ""
+    if "" in node:
+        return "(?:" + "|".join(alternatives) + ")?"  # Жадно: длинное слово раньше короткого
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+def _root_alternatives(trie: dict, normalize: bool) -> list[str]:
+    """
+    Верхний уровень дерева — отдельными ветками с буквой в начале (класс
+    двойников раскрыт): так sre знает набор первых символов и пропускает
+    остальные позиции без попытки сопоставления.
+    """
+    alternatives = []
+    for char in sorted(k for k in trie if k):
+        rest = _trie_regex(trie[char], normalize)
+        variants = _EQUIVALENTS[char] if normalize and char in _EQUIVALENTS else char
+        alternatives.extend(re.escape(variant) + rest for variant in variants)
+    return alternatives
+
+
+@dataclass
+class StopWordsConfig:
+    words: list[str] = field(default_factory=lambda: list(DEFAULT_STOP_WORDS))
+    word_boundary: bool = False
+    normalize: bool = True
+    version: float = 0.0
+
+    @classmethod
+    def from_redis(cls, raw: str) -> "StopWordsConfig":
+        data = json.loads(raw)
+        return cls(
+            words=[str(word) for word in data.get("words", [])],
+            word_boundary=bool(data.get("word_boundary", False)),
+            normalize=bool(data.get("normalize", True)),
+            version=float(data.get("version", 0.0)),
+        )
+
+    def to_redis(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+
+class StopWordMatcher:
+    """Слова и паттерны в одном regex; scan() — найденное без дублей."""
+
+    def __init__(self, words: Iterable[str], *, word_boundary: bool = False, normalize: bool = True):
+        self.words = list(dict.fromkeys(w.strip().lower() for w in words if w and w.strip()))
+        self.word_boundary = word_boundary
+        self.normalize = normalize
+        self.whitelist = [
+            f"@{settings.SUPPORT_USERNAME}".lower(),
+            f"@{settings.BOT_USERNAME}".lower(),
+            f"t.me/{settings.BOT_USERNAME}".lower(),
+            settings.REVIEWS_CHANNEL.lower(),
+        ]
+
+        # Канонический вид → слово из списка (для отчёта)
+        self._by_key: dict[str, str] = {}
+        trie: dict = {}
+        for word in self.words:
+            key = _canonical(word, normalize)
+            self._by_key.setdefault(key, word)
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[""] = {}
+
+        pattern_alternatives = [alt for variants in STOP_PATTERNS.values() for alt in variants]
+        self.regex = re.compile("|".join(_root_alternatives(trie, normalize) + pattern_alternatives))
+
+    @classmethod
+    def from_config(cls, config: StopWordsConfig) -> "StopWordMatcher":
+        return cls(config.words, word_boundary=config.word_boundary, normalize=config.normalize)
+
+    def _is_whitelisted(self, match: str) -> bool:
+        """Свои username и ссылки не должны вызывать алерт"""
+        return any(match in allowed or allowed in match for allowed in self.whitelist)
+
+    @staticmethod
+    def _inside_word(text: str, start: int, end: int) -> bool:
+        return (start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_")) or (
+            end < len(text) and (text[end].isalnum() or text[end] == "_")
+        )
+
+    def scan(self, text: str, limit: int = MAX_FINDINGS) -> list[str]:
+        """Стоп-слова (в каноническом виде) и совпадения паттернов, по порядку в тексте."""
+        lowered = text.lower()
+        same_length = len(lowered) == len(text)
+        found: dict[str, None] = {}
+        position = 0
+        while len(found) < limit:
+            match = self.regex.search(lowered, position)
+            if match is None:
+                break
+            start, end = match.span()
+            value = match.group()
+            word = self._by_key.get(_canonical(value, self.normalize))
+            if word is not None:
+                if self.word_boundary and self._inside_word(lowered, start, end):
+                    position = start + 1  # Внутри ветки могло начинаться другое слово
+                    continue
+                found[word] = None
+            elif not self._is_whitelisted(value):
+                found[text[start:end] if same_length else value] = None
+            position = end
+        return list(found)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#                          HOT RELOAD
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_config = StopWordsConfig()
+_matcher: Optional[StopWordMatcher] = None
+_next_refresh_at = 0.0
+
+
+def get_matcher() -> StopWordMatcher:
+    """Текущий матчер процесса (компилируется при первом обращении)."""
+    global _matcher
+    if _matcher is None:
+        _matcher = StopWordMatcher.from_config(_config)
+    return _matcher
+
+
+def get_config() -> StopWordsConfig:
+    return _config
+
+
+def _apply(config: StopWordsConfig) -> None:
+    global _config, _matcher
+    _matcher = StopWordMatcher.from_config(config)
+    _config = config
+
+
+def refresh_due() -> bool:
+    return time.monotonic() >= _next_refresh_at
+
+
+async def refresh_matcher() -> bool:
+    """Перечитать конфиг из Redis; True — список поменялся и матчер пересобран."""
+    global _next_refresh_at
+    _next_refresh_at = time.monotonic() + REFRESH_INTERVAL_SECONDS
+    try:
+        redis = await get_redis()
+        raw = await redis.get(STOP_WORDS_KEY)
+    except Exception as e:
+        logger.debug(f"[StopWords] Redis read failed: {e}")
+        return False
+    if raw is None:
+        return False
+    try:
+        config = StopWordsConfig.from_redis(raw)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"[StopWords] Corrupted config in Redis: {e}")
+        return False
+    if config.version == _config.version:
+        return False
+    _apply(config)
+    logger.info(f"[StopWords] Reloaded {len(config.words)} words (version {config.version})")
+    return True
+
+
+async def save_stop_words(words: list[str], *, word_boundary: bool, normalize: bool) -> StopWordsConfig:
+    """Сохранить список в Redis и сразу применить в этом процессе (остальные подхватят при refresh)."""
+    config = StopWordsConfig(
+        words=list(dict.fromkeys(w.strip().lower() for w in words if w.strip())),
+        word_boundary=word_boundary,
+        normalize=normalize,
+        version=time.time(),
+    )
+    redis = await get_redis()
+    await redis.set(STOP_WORDS_KEY, config.to_redis())
+    _apply(config)
+    return config
@@ -0,0 +1,98 @@
+"""
+Кэш принятия оферты.
+
+Принятие оферты пишется один раз, а проверяется на каждом запросе к /api/*
+и при каждом WebSocket-handshake. Чтобы не ходить в Postgres, держим:
+- in-process LRU telegram_id -> срок жизни записи (без сетевых вызовов,
+  не больше LOCAL_MAXSIZE записей);
+- Redis SET ``terms:accepted`` — общий для всех воркеров.
+
+В БД идём только если пользователя нет ни там, ни там.
+Сброс принятия (режим новичка у админа) — через invalidate_terms_acceptance.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from core.redis_pool import get_redis
+from database.models.users import User
+
+logger = logging.getLogger(__name__)
+
+TERMS_ACCEPTED_KEY = "terms:accepted"
+# Локальная запись живёт ограниченно, чтобы сброс в другом воркере дошёл без рестарта
+LOCAL_TTL_SECONDS = 300
+# Верхняя граница локального кэша: самые давние записи вытесняются первыми
+LOCAL_MAXSIZE = 10_000
+
+_local_accepted: OrderedDict[int, float] = OrderedDict()
+
+
+def _session_maker():
+    from database.db import async_session_maker
+    return async_session_maker
+
+
+def _remember_locally(telegram_id: int) -> None:
+    _local_accepted[telegram_id] = time.monotonic() + LOCAL_TTL_SECONDS
+    _local_accepted.move_to_end(telegram_id)
+    while len(_local_accepted) > LOCAL_MAXSIZE:
+        _local_accepted.popitem(last=False)
+
+
+async def is_terms_accepted(telegram_id: int, session_maker=None) -> bool:
+    """Принял ли пользователь оферту. Для принявших — без запросов в БД."""
+    expires_at = _local_accepted.get(telegram_id)
+    if expires_at is not None:
+        if expires_at > time.monotonic():
+            _local_accepted.move_to_end(telegram_id)
+            return True
+        del _local_accepted[telegram_id]
+
+    try:
+        redis = await get_redis()
+        if await redis.sismember(TERMS_ACCEPTED_KEY, str(telegram_id)):
+            _remember_locally(telegram_id)
+            return True
+    except Exception as e:
+        logger.warning(f"[Terms] Redis unavailable, falling back to DB: {e}")
+
+    async with (session_maker or _session_maker())() as session:
+        result = await session.execute(
+            select(User.terms_accepted_at).where(User.telegram_id == telegram_id)
+        )
+        terms_accepted_at = result.scalar_one_or_none()
+
+    if terms_accepted_at:
+        await mark_terms_accepted(telegram_id)
+        return True
+    return False
+
+
+async def mark_terms_accepted(telegram_id: int) -> None:
+    """Вызывать после коммита terms_accepted_at."""
+    _remember_locally(telegram_id)
+    try:
+        redis = await get_redis()
+        await redis.sadd(TERMS_ACCEPTED_KEY, str(telegram_id))
+    except Exception as e:
+        logger.warning(f"[Terms] Failed to cache acceptance for {telegram_id}: {e}")
+
+
+async def invalidate_terms_acceptance(telegram_id: int) -> None:
+    """Вызывать после сброса terms_accepted_at."""
+    _local_accepted.pop(telegram_id, None)
+    try:
+        redis = await get_redis()
+        await redis.srem(TERMS_ACCEPTED_KEY, str(telegram_id))
+    except Exception as e:
+        logger.warning(f"[Terms] Failed to invalidate acceptance for {telegram_id}: {e}")
+
+
+def clear_local_terms_cache() -> None:
+    _local_accepted.clear()
@@ -0,0 +1,325 @@
+"""
+Временные ряды для админской статистики (день/час/неделя по МСК).
+
+Бакеты считает база: GROUP BY date_trunc(granularity, ts AT TIME ZONE
+'Europe/Moscow') — в Python приходят готовые суммы, а не строки заказов.
+
+Закрытые бакеты (конец раньше now − CLOSE_GRACE) больше не меняются и
+кэшируются надолго (core/cache.py, по ключу источник:гранулярность);
+при каждом чтении из базы пересчитываются только незакэшированные и
+текущий бакет. Поэтому источники — только «неизменяемые» по времени
+события: завершённые заказы, регистрации, платежи ЮKassa, движение
+бонусов. Когортные метрики (заявки и оплаты по дате создания заказа)
+меняются задним числом и остаются в rollup order_daily_stats.
+
+Завершённый заказ всё же можно поменять задним числом (God Mode: force-смена
+статуса снимает completed_at, правка оплаты переписывает paid_amount). Такие
+правки ловят session-хуки (install_series_tracking()): после commit ряд
+completed_orders сбрасывается целиком.
+
+На SQLite (тесты) вместо date_trunc — strftime; время там хранится как
+есть, поэтому считается уже московским.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Literal, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import ColumnElement, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.cache import CacheNamespace
+from database.models.orders import Order, OrderStatus
+from database.models.payment_logs import PaymentLog
+from database.models.transactions import BalanceTransaction
+from database.models.users import User
+
+logger = logging.getLogger(__name__)
+
+MSK_TZ = ZoneInfo("Europe/Moscow")
+
+Granularity = Literal["hour", "day", "week"]
+GRANULARITIES: tuple[str, ...] = ("hour", "day", "week")
+
+CLOSE_GRACE = timedelta(minutes=5)  # Поздние commit-ы на границе бакета
+CLOSED_BUCKETS_TTL = 30 * 86400
+RETENTION_DAYS = 400
+
+REFERRAL_BONUS_REASON = "referral_bonus"
+PAYMENT_SUCCEEDED_EVENT = "payment.succeeded"
+
+_SQLITE_FORMATS = {
+    "hour": "%Y-%m-%d %H:00:00",
+    "day": "%Y-%m-%d 00:00:00",
+}
+
+series_cache = CacheNamespace("time_series", ttl=CLOSED_BUCKETS_TTL, l1_maxsize=64)
+
+
+@dataclass(frozen=True)
+class SeriesSource:
+    """Что считать: колонка времени, фильтр и агрегаты (имя → выражение)."""
+    name: str
+    time_column: ColumnElement
+    metrics: dict[str, ColumnElement]
+    where: tuple[ColumnElement, ...] = ()
+
+
+_credit = BalanceTransaction.type == "credit"
+
+SOURCES: dict[str, SeriesSource] = {
+    source.name: source
+    for source in (
+        SeriesSource(
+            "completed_orders",
+            Order.completed_at,
+            {"count": func.count(Order.id), "revenue": func.sum(Order.paid_amount)},
+            (Order.status == OrderStatus.COMPLETED.value,),
+        ),
+        SeriesSource(
+            "users",
+            User.created_at,
+            {"count": func.count(User.id), "referred": func.count(User.id).filter(User.referrer_id.isnot(None))},
+        ),
+        SeriesSource(
+            "online_payments",
+            PaymentLog.processed_at,
+            {"count": func.count(PaymentLog.id), "amount": func.sum(PaymentLog.amount)},
+            (PaymentLog.event_type == PAYMENT_SUCCEEDED_EVENT,),
+        ),
+        SeriesSource(
+            "bonus_ledger",
+            BalanceTransaction.created_at,
+            {
+                "credit": func.sum(BalanceTransaction.amount).filter(_credit),
+                "debit": func.sum(BalanceTransaction.amount).filter(BalanceTransaction.type == "debit"),
+                "referral_bonus": func.sum(BalanceTransaction.amount).filter(
+                    _credit, BalanceTransaction.reason == REFERRAL_BONUS_REASON,
+                ),
+            },
+        ),
+    )
+}
+
+
+@dataclass
+class TimeSeries:
+    """Компактный ряд: buckets[i] — начало бакета (МСК, ISO), values[metric][i] — значение."""
+    granularity: str
+    buckets: list[str]
+    values: dict[str, list[float]] = field(default_factory=dict)
+
+    def total(self, metric: str) -> float:
+        return sum(self.values.get(metric, ()))
+
+
+# ══════════════════════════════════════════════════════════════
+#           БАКЕТЫ
+# ══════════════════════════════════════════════════════════════
+
+def bucket_floor(value: datetime, granularity: str) -> datetime:
+    """Начало бакета, содержащего value (aware, МСК)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=MSK_TZ)
+    value = value.astimezone(MSK_TZ).replace(minute=0, second=0, microsecond=0)
+    if granularity == "hour":
+        return value
+    value = value.replace(hour=0)
+    if granularity == "week":
+        value -= timedelta(days=value.weekday())
+    return value
+
+
+def bucket_step(granularity: str) -> timedelta:
+    return {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(weeks=1)}[granularity]
+
+
+def bucket_starts(start: datetime, now: datetime, granularity: str) -> list[datetime]:
+    step = bucket_step(granularity)
+    current = bucket_floor(start, granularity)
+    last = bucket_floor(now, granularity)
+    buckets = []
+    while current <= last:
+        buckets.append(current)
+        current += step
+    return buckets
+
+
+def bucket_key(bucket: datetime) -> str:
+    return bucket.astimezone(MSK_TZ).strftime("%Y-%m-%dT%H:%M")
+
+
+def _bucket_expr(session: AsyncSession, column: ColumnElement, granularity: str) -> ColumnElement:
+    if session.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(granularity, func.timezone(MSK_TZ.key, column))
+    if granularity == "week":
+        # Понедельник недели: weekday 0 — ближайшее воскресенье не раньше даты
+        return func.datetime(column, "weekday 0", "-6 days", "start of day")
+    return func.strftime(_SQLITE_FORMATS[granularity], column)
+
+
+def _parse_bucket(raw) -> datetime:
+    if isinstance(raw, str):
+        raw = datetime.fromisoformat(raw)
+    return raw.replace(tzinfo=MSK_TZ) if raw.tzinfo is None else raw.astimezone(MSK_TZ)
+
+
+# ══════════════════════════════════════════════════════════════
+#           ЧТЕНИЕ
+# ══════════════════════════════════════════════════════════════
+
+async def _query_buckets(
+    session: AsyncSession,
+    source: SeriesSource,
+    granularity: str,
+    since: datetime,
+) -> dict[str, list[float]]:
+    bucket = _bucket_expr(session, source.time_column, granularity).label("bucket")
+    metrics = [expr.label(name) for name, expr in source.metrics.items()]
+    result = await session.execute(
+        select(bucket, *metrics)
+        .where(source.time_column >= since, *source.where)
+        .group_by(bucket)
+    )
+    rows: dict[str, list[float]] = {}
+    for row in result:
+        values = [float(getattr(row, name) or 0) for name in source.metrics]
+        # PG отдаёт datetime, SQLite — строку; ключ всегда начало бакета по МСК
+        rows[bucket_key(bucket_floor(_parse_bucket(row.bucket), granularity))] = values
+    return rows
+
+
+async def get_series(
+    session: AsyncSession,
+    source_name: str,
+    granularity: Granularity,
+    start: datetime,
+    now: Optional[datetime] = None,
+) -> TimeSeries:
+    """Ряд источника с бакета, содержащего start, по текущий включительно (пустые бакеты — нули)."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    source = SOURCES[source_name]
+    now = (now or datetime.now(MSK_TZ)).astimezone(MSK_TZ)
+    step = bucket_step(granularity)
+    buckets = bucket_starts(start, now, granularity)
+
+    cache_key = f"{source.name}:{granularity}"
+    closed: dict[str, list[float]] = dict(await series_cache.get(cache_key) or {})
+
+    def is_closed(bucket: datetime) -> bool:
+        return bucket + step + CLOSE_GRACE <= now
+
+    # Из базы — с первого незакэшированного или открытого бакета
+    query_from = next(b for b in buckets if not is_closed(b) or bucket_key(b) not in closed)
+    fresh = await _query_buckets(session, source, granularity, query_from)
+
+    zeros = [0.0] * len(source.metrics)
+    newly_closed = False
+    for bucket in buckets:
+        if bucket >= query_from and is_closed(bucket):
+            closed[bucket_key(bucket)] = fresh.get(bucket_key(bucket), zeros)
+            newly_closed = True
+    if newly_closed:
+        horizon = bucket_key(now - timedelta(days=RETENTION_DAYS))
+        await series_cache.set(cache_key, {key: value for key, value in closed.items() if key >= horizon})
+
+    keys = [bucket_key(b) for b in buckets]
+    rows = [closed.get(key) if key in closed else fresh.get(key, zeros) for key in keys]
+    return TimeSeries(
+        granularity=granularity,
+        buckets=keys,
+        values={name: [row[index] for row in rows] for index, name in enumerate(source.metrics)},
+    )
+
+
+async def invalidate_series(source_name: Optional[str] = None) -> None:
+    """Сбросить закэшированные бакеты (после ручных правок истории)."""
+    if source_name is None:
+        await series_cache.invalidate()
+        return
+    for granularity in GRANULARITIES:
+        await series_cache.invalidate(f"{source_name}:{granularity}")
+
+
+# ══════════════════════════════════════════════════════════════
+#           SESSION HOOKS
+# ══════════════════════════════════════════════════════════════
+
+_PENDING_KEY = "time_series_completed_dirty"
+_COMPLETED_ORDER_FIELDS = ("status", "completed_at", "paid_amount")
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _was_completed(order: Order) -> bool:
+    history = inspect(order).attrs.status.history
+    old_status = history.deleted[0] if history.deleted else order.status
+    return old_status == OrderStatus.COMPLETED.value
+
+
+def _on_after_flush(session: Session, flush_context) -> None:
+    # Новое завершение попадает в текущий бакет — сбрасывать нечего
+    if any(isinstance(obj, Order) and _was_completed(obj) for obj in session.deleted):
+        session.info[_PENDING_KEY] = True
+        return
+    for obj in session.dirty:
+        if not isinstance(obj, Order) or not _was_completed(obj):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[name].history.has_changes() for name in _COMPLETED_ORDER_FIELDS):
+            session.info[_PENDING_KEY] = True
+            return
+
+
+async def _invalidate_completed_orders() -> None:
+    try:
+        await invalidate_series("completed_orders")
+    except Exception as e:
+        logger.warning(f"[TimeSeries] completed_orders invalidation failed: {e}")
+
+
+def _on_after_commit(session: Session) -> None:
+    if not session.info.pop(_PENDING_KEY, False):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Синхронный контекст без event loop (скрипты) — остаётся invalidate_series вручную
+    task = loop.create_task(_invalidate_completed_orders())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def _on_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+_HOOKS = (
+    ("after_flush", _on_after_flush),
+    ("after_commit", _on_after_commit),
+    ("after_rollback", _on_after_rollback),
+)
+
+
+def install_series_tracking() -> None:
+    """Сбрасывать ряд completed_orders после правок завершённых заказов (идемпотентно)."""
+    for identifier, fn in _HOOKS:
+        if not event.contains(Session, identifier, fn):
+            event.listen(Session, identifier, fn)
+
+
+def uninstall_series_tracking() -> None:
+    for identifier, fn in _HOOKS:
+        if event.contains(Session, identifier, fn):
+            event.remove(Session, identifier, fn)
+
+
+def to_decimal(value: float) -> Decimal:
+    return Decimal(str(round(value, 2)))
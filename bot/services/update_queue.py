@@ -0,0 +1,249 @@
+"""
+Конвейер апдейтов Telegram: по порядку для каждого пользователя,
+параллельно между пользователями.
+
+Апдейты приходят из webhook-роута (bot/api/routers/telegram_webhook.py)
+или из poll_updates (long polling) и раскладываются по ключу — from_user.id
+(для апдейтов без пользователя — chat.id):
+
+- у каждого ключа своя FIFO-очередь; ключ обрабатывается одним воркером
+  за раз, поэтому сообщения пользователя не обгоняют друг друга и не
+  гоняются за FSM-состояние, а тяжёлый хендлер (загрузка на Я.Диск,
+  создание топика) задерживает только своего пользователя;
+- воркеров BOT_UPDATE_WORKERS — это общий предел одновременной
+  обработки; они берут ключи из очереди готовых по кругу;
+- всего в очереди не больше BOT_UPDATE_QUEUE_SIZE апдейтов:
+  webhook получает False от submit() и отвечает 503 (Telegram повторит),
+  polling ждёт места в put() и не запрашивает новые апдейты;
+- одному пользователю — не больше PER_USER_LIMIT в очереди, лишнее
+  отбрасывается (флуд не должен занимать общую ёмкость).
+
+Глубина очередей — metrics() (God Mode → /api/god/metrics).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Hashable, Optional
+
+from aiogram.types.update import UpdateTypeLookupError
+
+if TYPE_CHECKING:
+    from aiogram import Bot, Dispatcher
+    from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+DRAIN_TIMEOUT_SECONDS = 20
+PER_USER_LIMIT = 50
+
+POLLING_TIMEOUT_SECONDS = 10
+POLLING_BACKOFF_BASE_SECONDS = 1
+POLLING_BACKOFF_MAX_SECONDS = 30
+
+
+@dataclass
+class UpdateQueueStats:
+    accepted: int = 0
+    rejected: int = 0  # Очередь полна — отказ (webhook → 503)
+    dropped: int = 0  # Превышен PER_USER_LIMIT
+    processed: int = 0
+    failed: int = 0
+
+
+def update_key(update: "Update") -> Hashable:
+    """Ключ упорядочивания: пользователь, иначе чат, иначе сам апдейт (без порядка)."""
+    try:
+        event = update.event
+    except UpdateTypeLookupError:
+        return ("update", update.update_id)  # Тип апдейта, неизвестный aiogram
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        return chat.id
+    return ("update", update.update_id)
+
+
+class UpdateQueue:
+    """Очереди по пользователям + общий пул воркеров."""
+
+    def __init__(
+        self,
+        dispatcher: "Dispatcher",
+        bot: "Bot",
+        *,
+        workers: int,
+        maxsize: int,
+        per_user_limit: int = PER_USER_LIMIT,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = max(1, workers)
+        self.maxsize = max(1, maxsize)
+        self.per_user_limit = max(1, per_user_limit)
+        self._pending: dict[Hashable, deque["Update"]] = {}
+        # Ключи с апдейтами, которые сейчас никто не обрабатывает (каждый — не больше одного раза)
+        self._ready: asyncio.Queue[Hashable] = asyncio.Queue()
+        self._depth = 0
+        self._busy = 0
+        self._space = asyncio.Condition()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: list[asyncio.Task] = []
+        self.stats = UpdateQueueStats()
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def submit(self, update: "Update") -> bool:
+        """Принять апдейт. False — очередь полна, пусть Telegram повторит."""
+        if self._depth >= self.maxsize:
+            self.stats.rejected += 1
+            return False
+        key = update_key(update)
+        queued = self._pending.get(key)
+        if queued is not None and len(queued) >= self.per_user_limit:
+            self.stats.dropped += 1
+            logger.warning(f"[UpdateQueue] {key} has {len(queued)} queued updates, dropping {update.update_id}")
+            return True  # Повтор не нужен — это флуд
+        if queued is None:
+            queued = self._pending[key] = deque()
+            self._ready.put_nowait(key)
+        queued.append(update)
+        self._depth += 1
+        self._idle.clear()
+        self.stats.accepted += 1
+        return True
+
+    async def put(self, update: "Update") -> None:
+        """Принять апдейт, дождавшись места в очереди (polling)."""
+        async with self._space:
+            await self._space.wait_for(lambda: self._depth < self.maxsize)
+            self.submit(update)
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            queued = self._pending[key]
+            update = queued.popleft()
+            self._depth -= 1
+            self._busy += 1
+            async with self._space:
+                self._space.notify()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+                self.stats.processed += 1
+            except Exception:
+                self.stats.failed += 1
+                logger.exception("[UpdateQueue] Update %s failed", update.update_id)
+            finally:
+                self._busy -= 1
+                if queued:
+                    self._ready.put_nowait(key)  # Следующий апдейт ключа — в конец круга
+                else:
+                    del self._pending[key]
+                if not self._depth and not self._busy:
+                    self._idle.set()
+
+    def metrics(self) -> dict:
+        """Глубина очередей и счётчики (для God Mode)"""
+        return {
+            "workers": self.workers,
+            "busy_workers": self._busy,
+            "queued": self._depth,
+            "capacity": self.maxsize,
+            "users_queued": len(self._pending),
+            "max_user_depth": max((len(queued) for queued in self._pending.values()), default=0),
+            **asdict(self.stats),
+        }
+
+    def start(self):
+        """Запустить сервис"""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(), name=f"update-worker-{index}")
+                for index in range(self.workers)
+            ]
+
+    async def stop(self, drain_timeout: float = DRAIN_TIMEOUT_SECONDS):
+        """Остановить сервис, дав воркерам доразобрать принятые апдейты"""
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), timeout=drain_timeout)
+        if self._depth or self._busy:
+            logger.warning(f"[UpdateQueue] Stopping with {self._depth + self._busy} unprocessed updates")
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def poll_updates(
+    bot: "Bot",
+    update_queue: UpdateQueue,
+    *,
+    allowed_updates: Optional[list[str]],
+    stop_event: asyncio.Event,
+    timeout: int = POLLING_TIMEOUT_SECONDS,
+) -> None:
+    """Long polling в конвейер: getUpdates → put (ждёт места), пока не выставлен stop_event."""
+    offset: Optional[int] = None
+    failures = 0
+    while not stop_event.is_set():
+        request = asyncio.ensure_future(
+            bot.get_updates(
+                offset=offset,
+                timeout=timeout,
+                allowed_updates=allowed_updates,
+                request_timeout=timeout + POLLING_BACKOFF_MAX_SECONDS,
+            )
+        )
+        stopping = asyncio.ensure_future(stop_event.wait())
+        await asyncio.wait({request, stopping}, return_when=asyncio.FIRST_COMPLETED)
+        stopping.cancel()
+        if not request.done():
+            request.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await request
+            break
+
+        try:
+            updates = request.result()
+        except Exception as e:
+            failures += 1
+            delay = min(POLLING_BACKOFF_BASE_SECONDS * 2 ** (failures - 1), POLLING_BACKOFF_MAX_SECONDS)
+            logger.warning(f"[Polling] getUpdates failed ({failures}), retry in {delay}s: {e}")
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop_event.wait(), timeout=delay)
+            continue
+
+        failures = 0
+        for update in updates:
+            await update_queue.put(update)
+            offset = update.update_id + 1
+
+
+_update_queue: Optional[UpdateQueue] = None
+
+
+def init_update_queue(dispatcher: "Dispatcher", bot: "Bot", *, workers: int, maxsize: int) -> UpdateQueue:
+    global _update_queue
+    _update_queue = UpdateQueue(dispatcher, bot, workers=workers, maxsize=maxsize)
+    _update_queue.start()
+    return _update_queue
+
+
+def get_update_queue() -> Optional[UpdateQueue]:
+    """Конвейер текущего процесса (None — бот ещё не запущен)."""
+    return _update_queue
+
+
+def reset_update_queue() -> None:
+    global _update_queue
+    _update_queue = None
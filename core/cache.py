@@ -0,0 +1,305 @@
+"""
+Двухуровневый кэш: L1 — in-process LRU, L2 — Redis.
+
+- У каждого потребителя своё пространство имён (CacheNamespace) с TTL для обоих уровней.
+- Одновременные промахи по одному ключу выполняют загрузку один раз (single-flight).
+- invalidate() чистит Redis и рассылает событие через pub/sub, чтобы остальные
+  воркеры сбросили свой L1 (слушатель: start_invalidation_listener).
+- Счётчики hit/miss и время загрузки по каждому namespace — cache_metrics().
+
+Пример:
+    levels_cache = CacheNamespace("rank_levels", ttl=300)
+    levels = await levels_cache.get_or_load("all", load_levels)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import suppress
+from typing import Any, Awaitable, Callable, Optional
+
+from core.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cache:"
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_INSTANCE_ID = uuid.uuid4().hex
+_namespaces: dict[str, "CacheNamespace"] = {}
+_listener_task: Optional[asyncio.Task] = None
+
+_MISSING = object()
+
+
+class CacheMetrics:
+    """Счётчики одного namespace."""
+
+    __slots__ = ("l1_hits", "l2_hits", "misses", "loads", "load_errors", "load_seconds", "invalidations")
+
+    def __init__(self):
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.load_seconds = 0.0
+        self.invalidations = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else None,
+            "loads": self.loads,
+            "load_errors": self.load_errors,
+            "avg_load_ms": round(self.load_seconds / self.loads * 1000, 2) if self.loads else None,
+            "invalidations": self.invalidations,
+        }
+
+
+class CacheNamespace:
+    """
+    Пространство имён кэша.
+
+    encode/decode переводят значение в строку для Redis и обратно;
+    в L1 лежит уже готовый Python-объект. use_l2=False — только локальный кэш.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl: int,
+        l1_ttl: Optional[float] = None,
+        l1_maxsize: int = 1024,
+        use_l2: bool = True,
+        encode: Callable[[Any], str] = json.dumps,
+        decode: Callable[[str], Any] = json.loads,
+    ):
+        if name in _namespaces:
+            raise ValueError(f"Cache namespace {name!r} already registered")
+
+        self.name = name
+        self.ttl = ttl
+        self.l1_ttl = l1_ttl if l1_ttl is not None else ttl
+        self.l1_maxsize = l1_maxsize
+        self.use_l2 = use_l2
+        self.encode = encode
+        self.decode = decode
+        self.metrics = CacheMetrics()
+        self._l1: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        _namespaces[name] = self
+
+    def _redis_key(self, key: str) -> str:
+        return f"{KEY_PREFIX}{self.name}:{key}"
+
+    # ── L1 ──
+
+    def _l1_get(self, key: str) -> Any:
+        entry = self._l1.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._l1[key]
+            return _MISSING
+        self._l1.move_to_end(key)
+        return value
+
+    def _l1_set(self, key: str, value: Any) -> None:
+        self._l1[key] = (value, time.monotonic() + self.l1_ttl)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_maxsize:
+            self._l1.popitem(last=False)
+
+    def drop_local(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self._l1.clear()
+        else:
+            self._l1.pop(key, None)
+
+    # ── L2 ──
+
+    async def _l2_get(self, key: str) -> Any:
+        if not self.use_l2:
+            return _MISSING
+        try:
+            redis = await get_redis()
+            raw = await redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.debug(f"[Cache:{self.name}] Redis get failed: {e}")
+            return _MISSING
+        if raw is None:
+            return _MISSING
+        try:
+            return self.decode(raw)
+        except Exception as e:
+            logger.warning(f"[Cache:{self.name}] Corrupted L2 value for {key}: {e}")
+            return _MISSING
+
+    async def _l2_set(self, key: str, value: Any) -> None:
+        if not self.use_l2:
+            return
+        try:
+            redis = await get_redis()
+            await redis.set(self._redis_key(key), self.encode(value), ex=self.ttl)
+        except Exception as e:
+            logger.debug(f"[Cache:{self.name}] Redis set failed: {e}")
+
+    # ── API ──
+
+    async def get(self, key: str) -> Any:
+        """Значение из L1/L2 или None."""
+        value = self._l1_get(key)
+        if value is not _MISSING:
+            self.metrics.l1_hits += 1
+            return value
+        value = await self._l2_get(key)
+        if value is not _MISSING:
+            self.metrics.l2_hits += 1
+            self._l1_set(key, value)
+            return value
+        self.metrics.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        self._l1_set(key, value)
+        await self._l2_set(key, value)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Вернуть значение из кэша или загрузить через loader.
+        Параллельные промахи по одному ключу ждут одну загрузку.
+        """
+        value = self._l1_get(key)
+        if value is not _MISSING:
+            self.metrics.l1_hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._l2_get(key)
+            if value is not _MISSING:
+                self.metrics.l2_hits += 1
+                self._l1_set(key, value)
+            else:
+                self.metrics.misses += 1
+                started = time.perf_counter()
+                try:
+                    value = await loader()
+                except Exception:
+                    self.metrics.load_errors += 1
+                    raise
+                finally:
+                    self.metrics.loads += 1
+                    self.metrics.load_seconds += time.perf_counter() - started
+                await self.set(key, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже пробрасывается вызывающему; ожидающие получат его через future
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def invalidate(self, key: Optional[str] = None) -> None:
+        """Сбросить ключ (или весь namespace) в Redis и в L1 всех воркеров."""
+        self.metrics.invalidations += 1
+        self.drop_local(key)
+        try:
+            redis = await get_redis()
+            if self.use_l2:
+                if key is not None:
+                    await redis.delete(self._redis_key(key))
+                else:
+                    stale = [k async for k in redis.scan_iter(match=self._redis_key("*"), count=500)]
+                    if stale:
+                        await redis.delete(*stale)
+            await redis.publish(
+                INVALIDATION_CHANNEL,
+                json.dumps({"origin": _INSTANCE_ID, "ns": self.name, "key": key}),
+            )
+        except Exception as e:
+            logger.warning(f"[Cache:{self.name}] Invalidation broadcast failed: {e}")
+
+
+def get_namespace(name: str) -> Optional[CacheNamespace]:
+    return _namespaces.get(name)
+
+
+def cache_metrics() -> dict[str, dict]:
+    """Метрики по всем namespace."""
+    return {
+        name: {**ns.metrics.as_dict(), "l1_size": len(ns._l1)}
+        for name, ns in sorted(_namespaces.items())
+    }
+
+
+def handle_invalidation_message(data: str) -> None:
+    """Применить событие инвалидации из pub/sub к локальному L1."""
+    try:
+        event = json.loads(data)
+    except (TypeError, ValueError):
+        return
+    if event.get("origin") == _INSTANCE_ID:
+        return
+    namespace = _namespaces.get(event.get("ns"))
+    if namespace is not None:
+        namespace.drop_local(event.get("key"))
+
+
+async def _listen_invalidations() -> None:
+    while True:
+        pubsub = None
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    handle_invalidation_message(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[Cache] Invalidation listener error, retrying: {e}")
+            await asyncio.sleep(5)
+        finally:
+            if pubsub is not None:
+                with suppress(Exception):
+                    await pubsub.aclose()
+
+
+def start_invalidation_listener() -> None:
+    """Запустить слушатель инвалидаций (один на процесс)."""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen_invalidations(), name="cache-invalidation")
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await _listener_task
+        _listener_task = None
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr
@@ -119,6 +119,34 @@ class Settings(BaseSettings):
     REDIS_DB_FSM: int
     REDIS_DB_CACHE: int
 
+    # WebSocket backplane: доставка событий между несколькими API-воркерами через Redis pub/sub
+    WS_BACKPLANE_ENABLED: bool = False
+    WS_BACKPLANE_SHARDS: int = 64  # Пользователи шардируются по каналам telegram_id % N
+
+    # Приём апдейтов бота: "polling" (один процесс тянет getUpdates) или "webhook"
+    # (Telegram шлёт в POST BOT_WEBHOOK_PATH на api_app, можно держать несколько процессов)
+    BOT_UPDATES_MODE: Literal["polling", "webhook"] = "polling"
+    BOT_WEBHOOK_URL: Optional[str] = None  # Публичный адрес, напр. https://academic-saloon.duckdns.org
+    BOT_WEBHOOK_PATH: str = "/api/telegram/webhook"
+    BOT_WEBHOOK_SECRET: Optional[str] = None  # X-Telegram-Bot-Api-Secret-Token, обязателен для webhook
+    BOT_UPDATE_WORKERS: int = 16  # Сколько апдейтов обрабатывается одновременно
+    BOT_UPDATE_QUEUE_SIZE: int = 1000  # Переполнение — 503, Telegram повторит доставку
+    # Фоновые сервисы (дневной отчёт, пуши, напоминания, сверки rollup). При нескольких
+    # webhook-репликах включить ровно на одной, иначе отчёты и рассылки задвоятся
+    BOT_BACKGROUND_SERVICES: bool = True
+
+    # Логи действий (BotLogger): события не выше BOT_LOG_DIGEST_LEVEL копятся и уходят
+    # одной сводкой раз в окно; WARNING и выше, логи «со звуком» и слежка — сразу
+    BOT_LOG_DIGEST_WINDOW_SECONDS: int = 60  # 0 — без сводок, каждое событие отдельным сообщением
+    BOT_LOG_DIGEST_LEVEL: Literal["info", "action"] = "action"
+    BOT_LOG_DIGEST_MAX_EVENTS: int = 50  # Столько событий — сводка уходит, не дожидаясь окна
+    BOT_LOG_USER_STATS_TTL_SECONDS: int = 60  # Кэш статистики пользователя под логом
+
+    # Исходящие сообщения (bot/services/send_scheduler.py): лимит сообщений в группу/канал
+    # и доля логов в нём — в чатах логов остальным полосам остаётся GROUP - LOGS в минуту
+    BOT_SEND_GROUP_RATE_PER_MINUTE: int = 20
+    BOT_SEND_LOGS_RATE_PER_MINUTE: int = 6
+
     @property
     def DATABASE_URL(self) -> str:
         return (
@@ -3,10 +3,11 @@
 Исключает создание множественных соединений в разных модулях.
 """
 
+import hashlib
 import logging
-from typing import Optional
+from typing import Any, Optional, Sequence
 from redis.asyncio import Redis, ConnectionPool
-from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import ConnectionError as RedisConnectionError, NoScriptError
 
 from core.config import settings
 
@@ -94,6 +95,24 @@ class RedisPool:
             self._fsm_pool = None
 
 
+class RedisScript:
+    """
+    Lua-скрипт, вызываемый по закэшированному SHA (EVALSHA).
+    После рестарта Redis / SCRIPT FLUSH скрипт загружается заново.
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, redis: Redis, keys: Sequence[str] = (), args: Sequence[Any] = ()) -> Any:
+        try:
+            return await redis.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await redis.script_load(self.source)
+            return await redis.evalsha(self.sha, len(keys), *keys, *args)
+
+
 # Глобальный экземпляр
 redis_pool = RedisPool()
 
@@ -0,0 +1,103 @@
+"""
+Ограничители скорости для исходящих вызовов Bot API (in-process).
+
+- TokenBucket — общий лимит (сообщений в секунду) с запасом burst;
+  pause() замораживает выдачу токенов, когда Telegram вернул retry_after.
+- ChatThrottle — минимальный интервал между сообщениями в один чат.
+
+Лимиты Telegram: ~30 сообщений/с на бота суммарно и ~1 сообщение/с в один чат
+(20/мин в группу). Держим небольшой запас ниже этих значений.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Hashable
+
+
+class TokenBucket:
+    """Асинхронный token bucket: acquire() ждёт, пока появится токен."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Неблокирующий acquire(): False, если токена сейчас нет."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def time_until(self, tokens: float = 1.0) -> float:
+        """Через сколько секунд будет доступно tokens токенов."""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, (tokens - self._tokens) / self.rate)
+        return max(wait, self._paused_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены seconds секунд (ответ 429 с retry_after)."""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated_at = max(self._updated_at, self._paused_until)
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+
+class ChatThrottle:
+    """Не чаще одного сообщения в чат за interval секунд."""
+
+    def __init__(self, interval: float = 1.0, max_keys: int = 10_000):
+        self.interval = interval
+        self.max_keys = max_keys
+        self._next_at: dict[Hashable, float] = {}
+
+    def _prune(self, now: float) -> None:
+        if len(self._next_at) > self.max_keys:
+            self._next_at = {key: at for key, at in self._next_at.items() if at > now}
+
+    async def wait(self, key: Hashable) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_at.get(key, 0.0))
+        self._next_at[key] = slot + self.interval
+        self._prune(now)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def defer(self, key: Hashable, seconds: float) -> None:
+        """Сдвинуть следующий слот чата (retry_after для конкретного чата)."""
+        self._next_at[key] = max(self._next_at.get(key, 0.0), time.monotonic() + seconds)
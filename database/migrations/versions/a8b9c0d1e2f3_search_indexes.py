@@ -0,0 +1,70 @@
+"""pg_trgm and tsvector search indexes for orders, users and order messages
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "a8b9c0d1e2f3"
+down_revision: Union[str, None] = "f7a8b9c0d1e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ORDERS_VECTOR = """
+    setweight(to_tsvector('russian', coalesce({row}subject, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}topic, '')), 'B') ||
+    setweight(to_tsvector('russian', coalesce({row}description, '')), 'C')
+"""
+MESSAGES_VECTOR = "to_tsvector('russian', coalesce({row}message_text, ''))"
+
+TRGM_INDEXES = (
+    ("ix_orders_subject_trgm", "orders", "subject"),
+    ("ix_orders_topic_trgm", "orders", "topic"),
+    ("ix_users_username_trgm", "users", "username"),
+    ("ix_users_fullname_trgm", "users", "fullname"),
+    ("ix_order_messages_text_trgm", "order_messages", "message_text"),
+)
+
+
+def _vector_trigger(table: str, vector_sql: str, columns: str) -> None:
+    op.execute(f"ALTER TABLE {table} ADD COLUMN search_vector tsvector")
+    op.execute(f"""
+        CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {vector_sql.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {table}_search_vector_trg
+        BEFORE INSERT OR UPDATE OF {columns} ON {table}
+        FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update()
+    """)
+    op.execute(f"UPDATE {table} SET search_vector = {vector_sql.format(row='')}")
+    op.execute(f"CREATE INDEX ix_{table}_search_vector ON {table} USING gin (search_vector)")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    _vector_trigger("orders", ORDERS_VECTOR, "subject, topic, description")
+    _vector_trigger("order_messages", MESSAGES_VECTOR, "message_text")
+
+    for name, table, column in TRGM_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON {table} USING gin ({column} gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    for name, _, _ in TRGM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    for table in ("order_messages", "orders"):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector_trg ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector_update()")
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
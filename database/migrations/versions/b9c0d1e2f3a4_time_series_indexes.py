@@ -0,0 +1,28 @@
+"""Indexes for hourly/daily time-series bucketing
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "b9c0d1e2f3a4"
+down_revision: Union[str, None] = "a8b9c0d1e2f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Range scans "WHERE <filter> AND ts >= :since" behind bot/services/time_series.py
+    op.create_index("ix_orders_status_completed", "orders", ["status", "completed_at"])
+    op.create_index("ix_payment_logs_event_processed", "payment_logs", ["event_type", "processed_at"])
+    op.create_index("ix_balance_transactions_created_at", "balance_transactions", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_balance_transactions_created_at", "balance_transactions")
+    op.drop_index("ix_payment_logs_event_processed", "payment_logs")
+    op.drop_index("ix_orders_status_completed", "orders")
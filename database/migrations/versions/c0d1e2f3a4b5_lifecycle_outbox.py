@@ -0,0 +1,58 @@
+"""Outbox columns and NOTIFY trigger for order_lifecycle_events
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c0d1e2f3a4
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision: str = "c0d1e2f3a4b5"
+down_revision: Union[str, None] = "b9c0d1e2f3a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NOTIFY_CHANNEL = "order_lifecycle_events"
+
+
+def upgrade() -> None:
+    op.add_column(
+        "order_lifecycle_events",
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "ix_order_lifecycle_events_due",
+        "order_lifecycle_events",
+        ["dispatch_status", "next_attempt_at"],
+    )
+
+    # Будим outbox-воркер (LISTEN order_lifecycle_events), когда событие
+    # появилось или перешло в pending/failed (ошибка, ручной redrive).
+    # Lease воркера (UPDATE next_attempt_at) уведомлений не порождает.
+    op.execute(f"""
+        CREATE FUNCTION order_lifecycle_events_notify() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.dispatch_status IN ('pending', 'failed')
+               AND (TG_OP = 'INSERT' OR OLD.dispatch_status IS DISTINCT FROM NEW.dispatch_status) THEN
+                PERFORM pg_notify('{NOTIFY_CHANNEL}', NEW.id::text);
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER order_lifecycle_events_notify_trg
+        AFTER INSERT OR UPDATE OF dispatch_status ON order_lifecycle_events
+        FOR EACH ROW EXECUTE FUNCTION order_lifecycle_events_notify()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS order_lifecycle_events_notify_trg ON order_lifecycle_events")
+    op.execute("DROP FUNCTION IF EXISTS order_lifecycle_events_notify()")
+    op.drop_index("ix_order_lifecycle_events_due", "order_lifecycle_events")
+    op.drop_column("order_lifecycle_events", "next_attempt_at")
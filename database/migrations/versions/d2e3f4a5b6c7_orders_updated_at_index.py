@@ -0,0 +1,25 @@
+"""Index on orders.updated_at for the achievement metrics refresh
+
+Revision ID: d2e3f4a5b6c7
+Revises: c0d1e2f3a4b5
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "d2e3f4a5b6c7"
+down_revision: Union[str, None] = "c0d1e2f3a4b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # rebuild_recent_achievement_metrics: "created_at >= :since OR updated_at >= :since"
+    # каждые 15 минут — без индекса это полный скан orders
+    op.create_index("ix_orders_updated_at", "orders", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_updated_at", "orders")
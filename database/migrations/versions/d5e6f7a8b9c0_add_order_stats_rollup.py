@@ -0,0 +1,93 @@
+"""add order stats rollup tables
+
+Revision ID: d5e6f7a8b9c0
+Revises: c4d5e6f7a8b9
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e6f7a8b9c0'
+down_revision: Union[str, None] = 'c4d5e6f7a8b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_STATUS_COUNTERS = """
+INSERT INTO order_status_counters (status, orders_count, price_sum, paid_count, paid_sum)
+SELECT status,
+       count(*),
+       coalesce(sum(price), 0),
+       count(*) FILTER (WHERE paid_amount > 0),
+       coalesce(sum(paid_amount) FILTER (WHERE paid_amount > 0), 0)
+FROM orders
+GROUP BY status
+"""
+
+BACKFILL_DAILY_STATS = """
+INSERT INTO order_daily_stats (
+    day, orders_created, orders_price_sum, paid_orders, paid_sum,
+    completed_count, completed_revenue, users_created
+)
+SELECT day, sum(orders_created), sum(orders_price_sum), sum(paid_orders), sum(paid_sum),
+       sum(completed_count), sum(completed_revenue), sum(users_created)
+FROM (
+    SELECT (created_at AT TIME ZONE 'Europe/Moscow')::date AS day,
+           count(*) AS orders_created,
+           coalesce(sum(price), 0) AS orders_price_sum,
+           count(*) FILTER (WHERE paid_amount > 0) AS paid_orders,
+           coalesce(sum(paid_amount) FILTER (WHERE paid_amount > 0), 0) AS paid_sum,
+           0 AS completed_count, 0 AS completed_revenue, 0 AS users_created
+    FROM orders
+    WHERE status <> 'draft'
+    GROUP BY 1
+    UNION ALL
+    SELECT (completed_at AT TIME ZONE 'Europe/Moscow')::date,
+           0, 0, 0, 0, count(*), coalesce(sum(paid_amount), 0), 0
+    FROM orders
+    WHERE status = 'completed' AND completed_at IS NOT NULL
+    GROUP BY 1
+    UNION ALL
+    SELECT (created_at AT TIME ZONE 'Europe/Moscow')::date, 0, 0, 0, 0, 0, 0, count(*)
+    FROM users
+    GROUP BY 1
+) AS parts
+GROUP BY day
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'order_status_counters',
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('price_sum', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('paid_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('paid_sum', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('status'),
+    )
+    op.create_table(
+        'order_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('orders_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('orders_price_sum', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('paid_orders', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('paid_sum', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_revenue', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('users_created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    op.execute(BACKFILL_STATUS_COUNTERS)
+    op.execute(BACKFILL_DAILY_STATS)
+
+
+def downgrade() -> None:
+    op.drop_table('order_daily_stats')
+    op.drop_table('order_status_counters')
@@ -0,0 +1,77 @@
+"""add achievement metrics and owner stats tables
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e6f7a8b9c0
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd5e6f7a8b9c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_METRICS = """
+INSERT INTO user_achievement_metrics (
+    user_id, paid_orders_count, full_payment_orders_count, promo_paid_orders_count,
+    perfect_orders_count, reviewed_orders_count, completed_spend_total
+)
+SELECT u.telegram_id,
+       count(o.id) FILTER (WHERE o.paid_amount > 0 AND o.status NOT IN ('cancelled', 'rejected')),
+       count(o.id) FILTER (WHERE o.paid_amount > 0 AND o.status NOT IN ('cancelled', 'rejected')
+                                 AND lower(o.payment_scheme) = 'full'),
+       count(o.id) FILTER (WHERE o.paid_amount > 0 AND o.status NOT IN ('cancelled', 'rejected')
+                                 AND o.promo_code IS NOT NULL AND o.promo_code <> ''),
+       count(o.id) FILTER (WHERE o.status = 'completed' AND coalesce(o.revision_count, 0) = 0),
+       count(o.id) FILTER (WHERE o.status = 'completed' AND o.review_submitted),
+       coalesce(sum(o.paid_amount) FILTER (WHERE o.status = 'completed'), 0)
+FROM users u
+LEFT JOIN orders o ON o.user_id = u.telegram_id AND o.work_type <> 'support_chat'
+GROUP BY u.telegram_id
+"""
+
+BACKFILL_OWNER_STATS = """
+INSERT INTO achievement_owner_stats (achievement_key, owners_count, owners_percent)
+SELECT a.achievement_key,
+       count(*),
+       greatest(1, least(100, round(count(*) * 100.0 / nullif((SELECT count(*) FROM users), 0))))
+FROM user_achievements a
+GROUP BY a.achievement_key
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_achievement_metrics',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('paid_orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('full_payment_orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('promo_paid_orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('perfect_orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('reviewed_orders_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed_spend_total', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_table(
+        'achievement_owner_stats',
+        sa.Column('achievement_key', sa.String(length=100), nullable=False),
+        sa.Column('owners_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('owners_percent', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('achievement_key'),
+    )
+    op.execute(BACKFILL_METRICS)
+    op.execute(BACKFILL_OWNER_STATS)
+
+
+def downgrade() -> None:
+    op.drop_table('achievement_owner_stats')
+    op.drop_table('user_achievement_metrics')
@@ -0,0 +1,36 @@
+"""Composite (created_at, id) indexes for keyset pagination
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "f7a8b9c0d1e2"
+down_revision: Union[str, None] = "e6f7a8b9c0d1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lists are read as WHERE (created_at, id) < cursor ORDER BY created_at DESC, id DESC:
+    # - client order list (/api/orders), supersedes ix_orders_user_created
+    op.create_index("ix_orders_user_created_id", "orders", ["user_id", "created_at", "id"])
+    op.drop_index("ix_orders_user_created", "orders")
+    # - God Mode orders / users / audit log
+    op.create_index("ix_orders_created_id", "orders", ["created_at", "id"])
+    op.create_index("ix_users_created_id", "users", ["created_at", "id"])
+    op.create_index("ix_admin_action_logs_created_id", "admin_action_logs", ["created_at", "id"])
+    op.drop_index("ix_admin_action_logs_created_at", "admin_action_logs")
+
+
+def downgrade() -> None:
+    op.create_index("ix_admin_action_logs_created_at", "admin_action_logs", ["created_at"])
+    op.drop_index("ix_admin_action_logs_created_id", "admin_action_logs")
+    op.drop_index("ix_users_created_id", "users")
+    op.drop_index("ix_orders_created_id", "orders")
+    op.create_index("ix_orders_user_created", "orders", ["user_id", "created_at"])
+    op.drop_index("ix_orders_user_created_id", "orders")
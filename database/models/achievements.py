@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from datetime import datetime
+from decimal import Decimal
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, UniqueConstraint, func
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, Numeric, String, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.db import Base
@@ -30,3 +31,45 @@ class UserAchievement(Base):
         server_default=func.now(),
         nullable=False,
     )
+
+
+class UserAchievementMetrics(Base):
+    """
+    Order-derived achievement metrics per user.
+
+    Kept up to date incrementally by mapper hooks on Order
+    (bot/services/achievements.py); a missing row is rebuilt from orders on read.
+    Referrals and daily streak are read straight from the users row.
+    """
+
+    __tablename__ = "user_achievement_metrics"
+
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    paid_orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    full_payment_orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    promo_paid_orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    perfect_orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    reviewed_orders_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    completed_spend_total: Mapped[Decimal] = mapped_column(
+        Numeric(14, 2), nullable=False, default=Decimal("0.00"), server_default="0",
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False,
+    )
+
+
+class AchievementOwnerStat(Base):
+    """Share of users owning each achievement, refreshed periodically."""
+
+    __tablename__ = "achievement_owner_stats"
+
+    achievement_key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    owners_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    owners_percent: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False,
+    )
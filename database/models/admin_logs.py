@@ -7,7 +7,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, Integer, String, Text, func, JSON
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, Text, func, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.db import Base
@@ -59,6 +59,9 @@ class AdminActionLog(Base):
     Every action performed in God Mode is logged here.
     """
     __tablename__ = "admin_action_logs"
+    __table_args__ = (
+        Index('ix_admin_action_logs_created_id', 'created_at', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
@@ -88,7 +91,6 @@ class AdminActionLog(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
-        index=True
     )
 
     @property
@@ -4,7 +4,7 @@ import enum
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.db import Base
@@ -19,10 +19,15 @@ class OrderLifecycleDispatchStatus(str, enum.Enum):
     PENDING = "pending"
     DISPATCHED = "dispatched"
     FAILED = "failed"
+    DEAD_LETTER = "dead_letter"  # Исчерпаны попытки — только ручной redrive
 
 
 class OrderLifecycleEvent(Base):
     __tablename__ = "order_lifecycle_events"
+    __table_args__ = (
+        # Outbox claim: pending/failed, у которых подошло время попытки
+        Index("ix_order_lifecycle_events_due", "dispatch_status", "next_attempt_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), index=True)
@@ -38,6 +43,8 @@ class OrderLifecycleEvent(Base):
     )
     dispatch_attempts: Mapped[int] = mapped_column(Integer, default=0)
     last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Не раньше этого времени: backoff после ошибки или lease захватившего воркера
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -0,0 +1,54 @@
+"""
+Rollup-таблицы для админской статистики.
+
+Обновляются инкрементально при каждом flush заказа/пользователя
+(bot/services/order_stats.py) и периодически сверяются с orders/users.
+Дашборды читают отсюда несколько строк вместо COUNT/SUM по всей истории.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Date, DateTime, Integer, Numeric, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.db import Base
+
+
+class OrderStatusCounter(Base):
+    """Текущее число заказов и суммы по каждому статусу."""
+    __tablename__ = "order_status_counters"
+
+    status: Mapped[str] = mapped_column(String(20), primary_key=True)
+    orders_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    price_sum: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=Decimal("0.00"), server_default="0")
+    paid_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")  # paid_amount > 0
+    paid_sum: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=Decimal("0.00"), server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class DailyOrderStats(Base):
+    """
+    Дневной срез (день по МСК).
+
+    orders_* и paid_* — когорта заказов, созданных в этот день (без черновиков);
+    completed_* — заказы, завершённые в этот день (выручка по completed_at);
+    users_created — новые пользователи.
+    """
+    __tablename__ = "order_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    orders_created: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    orders_price_sum: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=Decimal("0.00"), server_default="0")
+    paid_orders: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    paid_sum: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=Decimal("0.00"), server_default="0")
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    completed_revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=Decimal("0.00"), server_default="0")
+    users_created: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -383,7 +383,13 @@ class Order(Base):
     __tablename__ = "orders"
     __table_args__ = (
         Index('ix_orders_user_status', 'user_id', 'status'),
-        Index('ix_orders_user_created', 'user_id', 'created_at'),
+        # Keyset-пагинация: ORDER BY created_at DESC, id DESC
+        Index('ix_orders_user_created_id', 'user_id', 'created_at', 'id'),
+        Index('ix_orders_created_id', 'created_at', 'id'),
+        # Ряды выручки по completed_at (bot/services/time_series.py)
+        Index('ix_orders_status_completed', 'status', 'completed_at'),
+        # Сверка метрик достижений: created_at >= since OR updated_at >= since (BitmapOr)
+        Index('ix_orders_updated_at', 'updated_at'),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
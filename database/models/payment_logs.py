@@ -6,7 +6,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, Integer, Numeric, String, Text, func
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, Numeric, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.db import Base
@@ -19,6 +19,9 @@ class PaymentLog(Base):
     """
 
     __tablename__ = "payment_logs"
+    __table_args__ = (
+        Index("ix_payment_logs_event_processed", "event_type", "processed_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     yookassa_payment_id: Mapped[str] = mapped_column(
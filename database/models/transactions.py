@@ -4,7 +4,7 @@ from datetime import datetime
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, Numeric, ForeignKey, String, func
+from sqlalchemy import BigInteger, DateTime, Index, Numeric, ForeignKey, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.db import Base
@@ -14,6 +14,9 @@ class BalanceTransaction(Base):
     """История операций по бонусному балансу."""
 
     __tablename__ = "balance_transactions"
+    __table_args__ = (
+        Index("ix_balance_transactions_created_at", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(
@@ -3,7 +3,7 @@ from __future__ import annotations
 from decimal import Decimal
 from typing import Optional
 
-from sqlalchemy import BigInteger, String, Boolean, DateTime, Integer, Numeric, Text, func
+from sqlalchemy import BigInteger, String, Boolean, DateTime, Index, Integer, Numeric, Text, func
 from sqlalchemy.orm import Mapped, mapped_column
 from database.db import Base
 from datetime import datetime, timedelta
@@ -16,6 +16,9 @@ MSK_TZ = ZoneInfo("Europe/Moscow")
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index('ix_users_created_id', 'created_at', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)
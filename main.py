@@ -1,5 +1,4 @@
 import asyncio
-import inspect
 import logging
 import signal
 from contextlib import suppress
@@ -46,14 +45,22 @@ from bot.middlewares import (
     AntiSpamMiddleware,
     StopWordsMiddleware,
 )
-from bot.services.logger import init_logger
+from bot.services.logger import init_logger, shutdown_logger
 from bot.services.abandoned_detector import init_abandoned_tracker
 from bot.services.daily_stats import init_daily_stats
 from bot.services.silence_reminder import init_silence_reminder
 from bot.services.notification_scheduler import init_notification_scheduler
+from bot.services.lifecycle_outbox import init_lifecycle_outbox
 from bot.services.engagement_push import init_engagement_push
+from bot.services.order_stats import init_order_stats_reconciler, install_order_stats_tracking
+from bot.services.achievements import init_achievement_stats, install_achievement_tracking
+from bot.services.admin_feed import install_admin_feed_tracking
+from bot.services.presence import init_presence_flusher
+from bot.services.profile_snapshot import install_profile_snapshot_tracking
+from bot.services.time_series import install_series_tracking
 from bot.services.unified_hub import init_unified_hub
-from database.db import async_session_maker
+from bot.services.update_queue import init_update_queue, poll_updates, reset_update_queue
+from database.db import async_session_maker, engine
 from core.redis_pool import close_redis
 
 # Настройка логирования
@@ -69,19 +76,6 @@ class ServiceRuntime:
     bot_dispatcher: Dispatcher | None = None
 
 
-async def _stop_bot_polling(dp: Dispatcher | None) -> None:
-    if dp is None:
-        return
-
-    stop_polling = getattr(dp, "stop_polling", None)
-    if stop_polling is None:
-        return
-
-    result = stop_polling()
-    if inspect.isawaitable(result):
-        await result
-
-
 async def request_shutdown(runtime: ServiceRuntime, reason: str, *, is_reload: bool = False) -> None:
     if runtime.shutdown_requested.is_set():
         return
@@ -96,8 +90,7 @@ async def request_shutdown(runtime: ServiceRuntime, reason: str, *, is_reload: b
         runtime.api_server.should_exit = True
         runtime.api_server.force_exit = False
 
-    with suppress(Exception):
-        await _stop_bot_polling(runtime.bot_dispatcher)
+    # poll_updates / webhook-режим ждут shutdown_requested сами
 
 
 def install_signal_handlers(runtime: ServiceRuntime) -> None:
@@ -152,6 +145,60 @@ async def run_api_server(runtime: ServiceRuntime):
         runtime.api_server = None
 
 
+async def run_update_ingestion(bot, dp: Dispatcher, runtime: ServiceRuntime) -> None:
+    """
+    Приём апдейтов в конвейер UpdateQueue (по порядку для пользователя,
+    параллельно между пользователями) до request_shutdown.
+
+    - polling: poll_updates тянет getUpdates и ждёт места в очереди;
+    - webhook: Telegram шлёт апдейты в POST BOT_WEBHOOK_PATH на api_app, роут
+      сразу отвечает. Webhook при выходе не снимается — пока процесс
+      перезапускается, Telegram копит и повторяет апдейты сам.
+    """
+    webhook_mode = settings.BOT_UPDATES_MODE == "webhook"
+    if webhook_mode and (not settings.BOT_WEBHOOK_URL or not settings.BOT_WEBHOOK_SECRET):
+        raise RuntimeError("BOT_UPDATES_MODE=webhook requires BOT_WEBHOOK_URL and BOT_WEBHOOK_SECRET")
+
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    allowed_updates = dp.resolve_used_update_types()
+    update_queue = init_update_queue(
+        dp,
+        bot,
+        workers=settings.BOT_UPDATE_WORKERS,
+        maxsize=settings.BOT_UPDATE_QUEUE_SIZE,
+    )
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        if webhook_mode:
+            webhook_url = settings.BOT_WEBHOOK_URL.rstrip("/") + settings.BOT_WEBHOOK_PATH
+            await bot.set_webhook(
+                url=webhook_url,
+                secret_token=settings.BOT_WEBHOOK_SECRET,
+                allowed_updates=allowed_updates,
+            )
+            logger.info(
+                "🤖 Bot webhook set: %s (%s workers, queue %s)",
+                webhook_url, update_queue.workers, update_queue.maxsize,
+            )
+            await runtime.shutdown_requested.wait()
+        else:
+            logger.info(
+                "🤖 Bot polling started (%s workers, queue %s)...",
+                update_queue.workers, update_queue.maxsize,
+            )
+            await poll_updates(
+                bot,
+                update_queue,
+                allowed_updates=allowed_updates,
+                stop_event=runtime.shutdown_requested,
+            )
+    finally:
+        await update_queue.stop()
+        reset_update_queue()
+        with suppress(Exception):
+            await dp.emit_shutdown(bot=bot, **workflow_data)
+
+
 async def run_bot(runtime: ServiceRuntime):
     """Run Telegram bot"""
     logger.info("🤖 Starting Academic Saloon Bot...")
@@ -185,16 +232,37 @@ async def run_bot(runtime: ServiceRuntime):
         logger.error(f"⚠️ UNIFIED HUB initialization failed: {e}")
         logger.info("Bot will continue without service topics...")
 
-    abandoned_tracker = init_abandoned_tracker(bot, storage)
-    logger.info("Abandoned order tracker started")
-    daily_stats = init_daily_stats(bot)
-    logger.info("Daily stats service started")
-    silence_reminder = init_silence_reminder(bot, async_session_maker)
-    logger.info("Silence reminder service started")
-    notification_scheduler = init_notification_scheduler(bot, async_session_maker)
-    logger.info("Notification scheduler started")
-    engagement_push = init_engagement_push(bot, async_session_maker)
-    logger.info("Engagement push service started")
+    # Фоновые сервисы по расписанию (отчёты, пуши, напоминания, сверки) нужны
+    # одному процессу на бота: на остальных webhook-репликах
+    # BOT_BACKGROUND_SERVICES=false, иначе отчёты и рассылки задвоятся
+    background_services = []
+    abandoned_tracker = init_abandoned_tracker(bot, storage, start=settings.BOT_BACKGROUND_SERVICES)
+    lifecycle_outbox = init_lifecycle_outbox(bot, async_session_maker, engine)  # SKIP LOCKED — на всех репликах
+    logger.info("Order lifecycle outbox started")
+    if settings.BOT_BACKGROUND_SERVICES:
+        background_services.append(abandoned_tracker)
+        logger.info("Abandoned order tracker started")
+        background_services.append(init_daily_stats(bot))
+        logger.info("Daily stats service started")
+        background_services.append(init_silence_reminder(bot, async_session_maker))
+        logger.info("Silence reminder service started")
+        background_services.append(init_notification_scheduler(bot, async_session_maker))
+        logger.info("Notification scheduler started")
+        background_services.append(init_engagement_push(bot, async_session_maker))
+        logger.info("Engagement push service started")
+        background_services.append(init_order_stats_reconciler(async_session_maker))
+        logger.info("Order stats rollup tracking started")
+        background_services.append(init_achievement_stats(async_session_maker))
+        logger.info("Achievement metrics tracking started")
+        background_services.append(init_presence_flusher(async_session_maker))
+        logger.info("Presence flusher started")
+    else:
+        logger.info("Background services disabled (BOT_BACKGROUND_SERVICES=false), serving updates only")
+    install_order_stats_tracking()
+    install_achievement_tracking()
+    install_profile_snapshot_tracking()
+    install_admin_feed_tracking()
+    install_series_tracking()
     # --------------------------------
 
     # --- РЕГИСТРАЦИЯ РОУТЕРОВ ---
@@ -218,8 +286,9 @@ async def run_bot(runtime: ServiceRuntime):
     # ----------------------------
 
     try:
-        # Удаляем вебхук, чтобы не было конфликтов
-        await bot.delete_webhook(drop_pending_updates=True)
+        if settings.BOT_UPDATES_MODE == "polling":
+            # Удаляем вебхук, чтобы не было конфликтов
+            await bot.delete_webhook(drop_pending_updates=True)
 
         # Настраиваем команды бота — гибридный подход
         commands = [
@@ -258,28 +327,19 @@ async def run_bot(runtime: ServiceRuntime):
         )
         logger.info("📱 Menu button configured")
 
-        logger.info("🤖 Bot polling started...")
-        try:
-            await dp.start_polling(bot, handle_signals=False)
-        except TypeError as exc:
-            if "handle_signals" not in str(exc):
-                raise
-            await dp.start_polling(bot)
+        await run_update_ingestion(bot, dp, runtime)
     except Exception as e:
         logger.error(f"Bot error: {e}")
         raise
     finally:
         # Останавливаем фоновые задачи
+        for service in background_services:
+            with suppress(Exception):
+                service.stop()
         with suppress(Exception):
-            abandoned_tracker.stop()
-        with suppress(Exception):
-            daily_stats.stop()
-        with suppress(Exception):
-            silence_reminder.stop()
-        with suppress(Exception):
-            notification_scheduler.stop()
+            lifecycle_outbox.stop()
         with suppress(Exception):
-            engagement_push.stop()
+            await shutdown_logger()
         with suppress(Exception):
             await close_redis()
         with suppress(Exception):
@@ -1357,8 +1357,11 @@ export async function fetchAdminStats(): Promise<AdminStats> {
   return apiFetch<AdminStats>('/admin/stats')
 }
 
-export async function fetchRevenueChart(days: number = 30): Promise<import('../types').RevenueChartData> {
-  return apiFetch<import('../types').RevenueChartData>(`/admin/revenue-chart?days=${days}`)
+export async function fetchRevenueChart(
+  days: number = 30,
+  granularity: 'hour' | 'day' | 'week' = 'day',
+): Promise<import('../types').RevenueChartData> {
+  return apiFetch<import('../types').RevenueChartData>(`/admin/revenue-chart?days=${days}&granularity=${granularity}`)
 }
 
 export async function fetchClientProfile(userId: number): Promise<import('../types').ClientProfile> {
@@ -1536,7 +1539,7 @@ export async function fetchFaqList(): Promise<FaqListResponse> {
 //  GOD MODE API
 // ═══════════════════════════════════════════════════════════════════════════
 
-import type { GodDashboard, GodOrder, GodOrderMessage, GodUser, GodPromo, GodLog, GodLiveUser } from '../types'
+import type { GodDashboard, GodOrder, GodOrderMessage, GodUser, GodPromo, GodLog, GodLiveUser, GodSearchResult } from '../types'
 
 // Dashboard
 export async function fetchGodDashboard(): Promise<GodDashboard> {
@@ -1549,12 +1552,14 @@ export async function fetchGodOrders(params?: {
   search?: string
   limit?: number
   offset?: number
-}): Promise<{ orders: GodOrder[]; total: number; has_more: boolean }> {
+  cursor?: string
+}): Promise<{ orders: GodOrder[]; total: number | null; has_more: boolean; next_cursor: string | null }> {
   const queryParams = new URLSearchParams()
   if (params?.status && params.status !== 'all') queryParams.append('status', params.status)
   if (params?.search) queryParams.append('search', params.search)
   if (params?.limit) queryParams.append('limit', params.limit.toString())
   if (params?.offset) queryParams.append('offset', params.offset.toString())
+  if (params?.cursor) queryParams.append('cursor', params.cursor)
   const query = queryParams.toString()
   return godFetch(`/god/orders${query ? `?${query}` : ''}`)
 }
@@ -1622,12 +1627,14 @@ export async function fetchGodUsers(params?: {
   filter_type?: string
   limit?: number
   offset?: number
-}): Promise<{ users: GodUser[]; total: number; has_more: boolean }> {
+  cursor?: string
+}): Promise<{ users: GodUser[]; total: number | null; has_more: boolean; next_cursor: string | null }> {
   const queryParams = new URLSearchParams()
   if (params?.search) queryParams.append('search', params.search)
   if (params?.filter_type) queryParams.append('filter_type', params.filter_type)
   if (params?.limit) queryParams.append('limit', params.limit.toString())
   if (params?.offset) queryParams.append('offset', params.offset.toString())
+  if (params?.cursor) queryParams.append('cursor', params.cursor)
   const query = queryParams.toString()
   return godFetch(`/god/users${query ? `?${query}` : ''}`)
 }
@@ -1699,10 +1706,22 @@ export async function fetchGodLiveActivity(): Promise<{ online_count: number; us
   return godFetch('/god/live')
 }
 
-// Report user activity (for tracking)
+// Report user activity (for tracking).
+// Heartbeats are coalesced: the same page/action is re-sent no more often than
+// the server-advised interval (heartbeat_interval in the response).
+let activityHeartbeatMs = 30_000
+let lastActivityKey = ''
+let lastActivitySentAt = 0
+
 export async function reportUserActivity(page: string, action?: string, orderId?: number): Promise<void> {
+  const key = `${page}|${action ?? ''}|${orderId ?? ''}`
+  const now = Date.now()
+  if (key === lastActivityKey && now - lastActivitySentAt < activityHeartbeatMs) return
+  lastActivityKey = key
+  lastActivitySentAt = now
+
   try {
-    await godFetch('/god/activity', {
+    const result = await godFetch<{ success: boolean; heartbeat_interval?: number }>('/god/activity', {
       method: 'POST',
       body: JSON.stringify({
         page,
@@ -1712,6 +1731,7 @@ export async function reportUserActivity(page: string, action?: string, orderId?
           /Android/.test(navigator.userAgent) ? 'Android' : 'Web',
       }),
     })
+    if (result?.heartbeat_interval) activityHeartbeatMs = result.heartbeat_interval * 1000
   } catch {
     // Silent fail - activity tracking is not critical
   }
@@ -1723,16 +1743,28 @@ export async function fetchGodLogs(params?: {
   target_type?: string
   limit?: number
   offset?: number
-}): Promise<{ logs: GodLog[] }> {
+  cursor?: string
+}): Promise<{ logs: GodLog[]; total: number | null; has_more: boolean; next_cursor: string | null }> {
   const queryParams = new URLSearchParams()
   if (params?.action_type) queryParams.append('action_type', params.action_type)
   if (params?.target_type) queryParams.append('target_type', params.target_type)
   if (params?.limit) queryParams.append('limit', params.limit.toString())
   if (params?.offset) queryParams.append('offset', params.offset.toString())
+  if (params?.cursor) queryParams.append('cursor', params.cursor)
   const query = queryParams.toString()
   return godFetch(`/god/logs${query ? `?${query}` : ''}`)
 }
 
+// Search (orders, clients, order chat messages)
+export async function searchGod(
+  q: string,
+  scope: 'all' | 'orders' | 'users' | 'messages' = 'all',
+  limit = 20,
+): Promise<GodSearchResult> {
+  const queryParams = new URLSearchParams({ q, scope, limit: limit.toString() })
+  return godFetch(`/god/search?${queryParams.toString()}`)
+}
+
 // SQL Console
 export async function executeGodSql(query: string): Promise<{
   success: boolean
@@ -1748,11 +1780,26 @@ export async function executeGodSql(query: string): Promise<{
 }
 
 // Broadcast
-export async function sendGodBroadcast(text: string, target: 'all' | 'active' | 'with_orders'): Promise<{
-  success: boolean
+export interface GodBroadcastProgress {
+  job_id: string
+  status: 'queued' | 'running' | 'completed' | 'cancelled' | 'failed'
+  target: string
+  total: number
   sent: number
   failed: number
+  blocked: number
+  processed: number
+  eta_seconds: number | null
+  created_at: number
+  finished_at: number | null
+  error: string | null
+}
+
+export async function sendGodBroadcast(text: string, target: 'all' | 'active' | 'with_orders'): Promise<{
+  success: boolean
+  job_id: string
   total: number
+  status: GodBroadcastProgress['status']
 }> {
   return godFetch('/god/broadcast', {
     method: 'POST',
@@ -1760,6 +1807,14 @@ export async function sendGodBroadcast(text: string, target: 'all' | 'active' |
   })
 }
 
+export async function fetchGodBroadcastStatus(jobId: string): Promise<GodBroadcastProgress> {
+  return godFetch(`/god/broadcast/${jobId}`)
+}
+
+export async function cancelGodBroadcast(jobId: string): Promise<GodBroadcastProgress> {
+  return godFetch(`/god/broadcast/${jobId}/cancel`, { method: 'POST' })
+}
+
 // System info
 export async function fetchGodSystemInfo(): Promise<{
   bot_username: string
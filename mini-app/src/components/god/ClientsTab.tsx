@@ -32,7 +32,7 @@ export const ClientsTab = memo(function ClientsTab() {
       if (search.trim()) params.search = search.trim()
       const result = await fetchGodUsers(params as any)
       setUsers(result.users)
-      setTotal(result.total)
+      setTotal(result.total ?? result.users.length)
       setError(null)
     } catch (e) {
       setError(e instanceof Error ? e.message : 'Ошибка')
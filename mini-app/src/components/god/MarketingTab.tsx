@@ -2,13 +2,14 @@
  * God Mode v3 — Marketing Tab
  * Sub-tabs: Промокоды | Рассылка
  */
-import { memo, useCallback, useState } from 'react'
+import { memo, useCallback, useEffect, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { Plus, Trash2, ToggleLeft, ToggleRight, Send } from 'lucide-react'
 import {
   fetchGodPromos, createGodPromo, toggleGodPromo, deleteGodPromo,
-  sendGodBroadcast,
+  sendGodBroadcast, fetchGodBroadcastStatus, cancelGodBroadcast,
 } from '../../api/userApi'
+import type { GodBroadcastProgress } from '../../api/userApi'
 import type { GodPromo } from '../../types'
 import { formatMoney, formatDateTime } from './godConstants'
 import { useGodData, useHaptic } from './godHooks'
@@ -221,7 +222,27 @@ const BroadcastSection = memo(function BroadcastSection() {
   const [text, setText] = useState('')
   const [target, setTarget] = useState<'all' | 'active' | 'with_orders'>('all')
   const [sending, setSending] = useState(false)
-  const [result, setResult] = useState<{ sent: number; failed: number } | null>(null)
+  const [job, setJob] = useState<GodBroadcastProgress | null>(null)
+
+  const active = job !== null && (job.status === 'queued' || job.status === 'running')
+
+  // Рассылка идёт в фоне — опрашиваем прогресс, пока задача не завершится
+  useEffect(() => {
+    if (!active) return
+    const timer = setInterval(async () => {
+      try {
+        const next = await fetchGodBroadcastStatus(job.job_id)
+        setJob(next)
+        if (next.status === 'completed') {
+          notify('success')
+          showToast({ type: 'success', title: `Доставлено: ${next.sent}` })
+        }
+      } catch {
+        /* повторим на следующем тике */
+      }
+    }, 2000)
+    return () => clearInterval(timer)
+  }, [active, job?.job_id, notify, showToast])
 
   const send = useCallback(async () => {
     if (!text.trim() || !confirm(`Отправить рассылку (${target})?`)) return
@@ -229,9 +250,12 @@ const BroadcastSection = memo(function BroadcastSection() {
     impact('heavy')
     try {
       const r = await sendGodBroadcast(text, target)
-      setResult({ sent: r.sent, failed: r.failed })
-      notify('success')
-      showToast({ type: 'success', title: `Отправлено: ${r.sent}` })
+      setJob({
+        job_id: r.job_id, status: r.status, target, total: r.total,
+        sent: 0, failed: 0, blocked: 0, processed: 0, eta_seconds: null,
+        created_at: Date.now() / 1000, finished_at: null, error: null,
+      })
+      showToast({ type: 'info', title: `Рассылка запущена: ${r.total} получателей` })
       setText('')
     } catch (e) {
       notify('error')
@@ -240,6 +264,15 @@ const BroadcastSection = memo(function BroadcastSection() {
     setSending(false)
   }, [text, target, impact, notify, showToast])
 
+  const cancel = useCallback(async () => {
+    if (!job || !confirm('Остановить рассылку?')) return
+    try {
+      setJob(await cancelGodBroadcast(job.job_id))
+    } catch (e) {
+      showToast({ type: 'error', title: 'Не удалось остановить', message: e instanceof Error ? e.message : '' })
+    }
+  }, [job, showToast])
+
   return (
     <div className={`${s.flexCol} ${s.gap8}`}>
       {/* Warning */}
@@ -280,23 +313,38 @@ const BroadcastSection = memo(function BroadcastSection() {
       </div>
 
       {/* Send */}
-      <button type="button" className={s.dangerBtn} disabled={sending || !text.trim()} onClick={send}>
-        <Send size={14} /> {sending ? 'Отправка...' : 'Отправить рассылку'}
+      <button type="button" className={s.dangerBtn} disabled={sending || active || !text.trim()} onClick={send}>
+        <Send size={14} /> {sending ? 'Запуск...' : active ? 'Рассылка идёт...' : 'Отправить рассылку'}
       </button>
 
-      {/* Result */}
-      {result && (
+      {/* Progress */}
+      {job && (
         <div className={s.card}>
+          <div className={s.mutedSmall} style={{ marginBottom: 6 }}>
+            {job.processed} / {job.total}
+            {active && job.eta_seconds !== null && ` · осталось ~${Math.ceil(job.eta_seconds)} с`}
+            {job.status === 'cancelled' && ' · остановлена'}
+            {job.status === 'failed' && ` · ошибка${job.error ? `: ${job.error}` : ''}`}
+          </div>
           <div className={`${s.flexRow} ${s.gap10}`}>
             <div style={{ textAlign: 'center', flex: 1 }}>
-              <div style={{ fontSize: 20, fontWeight: 700, color: 'var(--success-text)' }}>{result.sent}</div>
+              <div style={{ fontSize: 20, fontWeight: 700, color: 'var(--success-text)' }}>{job.sent}</div>
               <div className={s.mutedSmall}>Доставлено</div>
             </div>
             <div style={{ textAlign: 'center', flex: 1 }}>
-              <div style={{ fontSize: 20, fontWeight: 700, color: 'var(--error-text)' }}>{result.failed}</div>
+              <div style={{ fontSize: 20, fontWeight: 700 }}>{job.blocked}</div>
+              <div className={s.mutedSmall}>Заблокировали</div>
+            </div>
+            <div style={{ textAlign: 'center', flex: 1 }}>
+              <div style={{ fontSize: 20, fontWeight: 700, color: 'var(--error-text)' }}>{job.failed}</div>
               <div className={s.mutedSmall}>Ошибок</div>
             </div>
           </div>
+          {active && (
+            <button type="button" className={s.secondaryBtn} style={{ marginTop: 8, width: '100%' }} onClick={cancel}>
+              Остановить
+            </button>
+          )}
         </div>
       )}
     </div>
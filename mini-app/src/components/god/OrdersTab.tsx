@@ -52,7 +52,7 @@ export const OrdersTab = memo(function OrdersTab() {
       if (search.trim()) params.search = search.trim()
       const result = await fetchGodOrders(params as any)
       setOrders(result.orders)
-      setTotal(result.total)
+      setTotal(result.total ?? result.orders.length)
       setError(null)
     } catch (e) {
       setError(e instanceof Error ? e.message : 'Ошибка')
@@ -2,15 +2,16 @@
  * God Mode v3 — Radar Tab
  * Sub-tabs: Онлайн | События | Журнал
  */
-import { memo, useCallback, useState } from 'react'
+import { memo, useCallback, useEffect, useMemo, useState } from 'react'
 import { motion } from 'framer-motion'
 import { RefreshCw, Wifi } from 'lucide-react'
 import {
   fetchGodLiveActivity, fetchLiveFeed, fetchGodLogs,
 } from '../../api/userApi'
-import type { GodLiveUser, GodLog } from '../../types'
+import type { GodLiveUser, GodLog, LiveEvent, LiveFeedData } from '../../types'
 import { formatPageLabel, formatDateTime } from './godConstants'
-import { useGodData, useHaptic } from './godHooks'
+import { ADMIN_FEED_EVENT, rememberAdminFeedSeq, useGodData, useHaptic } from './godHooks'
+import type { AdminFeedDetail } from './godHooks'
 import { Skeleton, StateCard } from './GodWidgets'
 import s from '../../pages/GodModePage.module.css'
 
@@ -94,20 +95,9 @@ const OnlineSection = memo(function OnlineSection() {
   )
 })
 
-/* ═══════ Events Section (Live Feed — NEW API) ═══════ */
-
-interface LiveEvent {
-  id: string
-  type: string
-  priority: string
-  title: string
-  message: string
-  order_id?: number
-  user_id?: number
-  amount?: number
-  timestamp: string
-  is_new?: boolean
-}
+/* ═══════ Events Section (Live Feed — pushed over WebSocket) ═══════ */
+
+const MAX_FEED_EVENTS = 50
 
 const PRIORITY_COLORS: Record<string, string> = {
   critical: 'var(--error-text)',
@@ -119,12 +109,36 @@ const PRIORITY_COLORS: Record<string, string> = {
 const EventsSection = memo(function EventsSection() {
   const { impact } = useHaptic()
   const fetchEvents = useCallback(() => fetchLiveFeed(), [])
-  const feed = useGodData<{ events: LiveEvent[]; has_critical: boolean }>(fetchEvents, { interval: 10000 })
+  // Snapshot once (and after a replay gap); new events arrive via useGodWebSocket
+  const feed = useGodData<LiveFeedData>(fetchEvents)
+  const [pushed, setPushed] = useState<LiveEvent[]>([])
+  const { refresh } = feed
+
+  useEffect(() => {
+    rememberAdminFeedSeq(feed.data?.last_seq)
+    setPushed([])
+  }, [feed.data])
+
+  useEffect(() => {
+    const onFeed = (e: Event) => {
+      const { events: incoming, gap } = (e as CustomEvent<AdminFeedDetail>).detail
+      if (gap) { refresh(); return }
+      setPushed((prev) => [...[...incoming].reverse(), ...prev].slice(0, MAX_FEED_EVENTS))
+    }
+    window.addEventListener(ADMIN_FEED_EVENT, onFeed)
+    return () => window.removeEventListener(ADMIN_FEED_EVENT, onFeed)
+  }, [refresh])
+
+  const events = useMemo(() => {
+    const seen = new Set<string>()
+    return [...pushed, ...(feed.data?.events || [])]
+      .filter((ev) => (seen.has(ev.id) ? false : (seen.add(ev.id), true)))
+      .slice(0, MAX_FEED_EVENTS)
+  }, [pushed, feed.data])
 
   if (feed.loading && !feed.data) return <Skeleton variant="line" count={5} />
 
-  const events = feed.data?.events || []
-  const hasCritical = feed.data?.has_critical
+  const hasCritical = feed.data?.has_critical || pushed.some((ev) => ev.priority === 'critical')
 
   return (
     <div className={`${s.flexCol} ${s.gap6}`}>
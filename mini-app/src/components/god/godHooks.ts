@@ -10,6 +10,28 @@ import {
 } from '../../api/userApi'
 import { NOTIFICATION_SOUND } from './godConstants'
 import type { AdminNotification } from './godConstants'
+import type { LiveEvent } from '../../types'
+
+/* ═══════ Admin live feed (pushed over /api/ws) ═══════ */
+
+export const ADMIN_FEED_EVENT = 'god:admin-feed'
+
+export interface AdminFeedDetail {
+  events: LiveEvent[]
+  gap: boolean
+}
+
+// Last feed seq seen by this tab: sent on (re)connect to replay missed events
+let adminFeedSeq: number | null = null
+
+export function rememberAdminFeedSeq(seq: number | null | undefined) {
+  if (seq != null && (adminFeedSeq == null || seq > adminFeedSeq)) adminFeedSeq = seq
+}
+
+function emitAdminFeed(detail: AdminFeedDetail) {
+  detail.events.forEach((ev) => rememberAdminFeedSeq(ev.seq))
+  window.dispatchEvent(new CustomEvent<AdminFeedDetail>(ADMIN_FEED_EVENT, { detail }))
+}
 
 /* ═══════ useGodWebSocket ═══════ */
 
@@ -57,11 +79,19 @@ export function useGodWebSocket(
     subscribeGodNotifications().catch(() => {})
 
     const connectWs = () => {
-      const ws = new WebSocket(`${API_WS_URL}?telegram_id=${telegramId}`)
+      const initData = encodeURIComponent(window.Telegram?.WebApp?.initData || '')
+      const ws = new WebSocket(`${API_WS_URL}?telegram_id=${telegramId}&init_data=${initData}`)
+      ws.onopen = () => {
+        ws.send(JSON.stringify({ type: 'subscribe', channels: ['admin_feed'], since_seq: adminFeedSeq }))
+      }
       ws.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data)
-          if (data.type === 'admin_new_order') {
+          if (data.type === 'admin_feed_event') {
+            emitAdminFeed({ events: [data.event], gap: false })
+          } else if (data.type === 'admin_feed_replay') {
+            emitAdminFeed({ events: data.events || [], gap: data.gap === true })
+          } else if (data.type === 'admin_new_order') {
             addNotification({
               type: 'new_order',
               title: 'Новый заказ',
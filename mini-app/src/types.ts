@@ -426,6 +426,10 @@ export interface RevenueChartData {
   data: DailyRevenueItem[]
   total: number
   period_days: number
+  granularity?: 'hour' | 'day' | 'week'
+  buckets?: string[]
+  revenue?: number[]
+  orders?: number[]
 }
 
 export interface ClientOrderSummary {
@@ -489,6 +493,7 @@ export interface LiveEvent {
   amount?: number
   timestamp: string
   is_new: boolean
+  seq?: number
 }
 
 export interface LiveFeedData {
@@ -500,6 +505,8 @@ export interface LiveFeedData {
   }
   last_update: string
   has_critical: boolean
+  last_seq?: number | null
+  gap?: boolean
 }
 
 // ═══════════════════════════════════════════════════════════════════════════════
@@ -703,6 +710,33 @@ export interface GodLog {
   created_at: string | null
 }
 
+export interface GodSearchResult {
+  query: string
+  orders?: {
+    id: number
+    user_id: number
+    status: string
+    work_type: string
+    subject: string | null
+    topic: string | null
+    created_at: string | null
+  }[]
+  users?: {
+    telegram_id: number
+    username: string | null
+    fullname: string | null
+    orders_count: number
+    is_banned: boolean
+  }[]
+  messages?: {
+    id: number
+    order_id: number
+    sender_type: string
+    snippet: string
+    created_at: string | null
+  }[]
+}
+
 export interface GodLiveUser {
   telegram_id: number
   username: string | null
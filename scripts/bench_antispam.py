@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-update latency of AntiSpamMiddleware against a real Redis.
+
+Replays the legacy path (GET mute, GET JSON history, filter, SET) and the
+current single-script path for the same stream of updates from --users
+concurrent users, and prints p50/p95/p99 latency per update plus the
+number of Redis round-trips. Uses keys under antispam:* with ids starting
+at 9000000000 — point it at a scratch Redis database.
+
+Usage:
+    python3 scripts/bench_antispam.py --redis-url redis://localhost:6379/15 --users 200 --updates 20000
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.types import Chat, Message, Update, User  # noqa: E402
+from redis.asyncio import Redis  # noqa: E402
+
+from bot.middlewares import antispam  # noqa: E402
+from bot.middlewares.antispam import MAX_MESSAGES_PER_MINUTE, AntiSpamMiddleware  # noqa: E402
+
+BASE_USER_ID = 9_000_000_000
+
+
+class CountingRedis:
+    """Proxy that counts commands sent to Redis."""
+
+    def __init__(self, redis: Redis):
+        self._redis = redis
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._redis, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            self.round_trips += 1
+            return await attr(*args, **kwargs)
+        return call
+
+
+async def legacy_check(redis, user_id: int) -> bool:
+    """The JSON read-modify-write the middleware used to do (mute branch omitted)."""
+    now = datetime.now()
+    if await redis.get(f"antispam:mute:{user_id}"):
+        return False
+    history_key = f"antispam:history:{user_id}"
+    raw = await redis.get(history_key)
+    history = json.loads(raw) if raw else []
+    cutoff = (now - timedelta(minutes=1)).timestamp()
+    history = [ts for ts in history if ts > cutoff]
+    history.append(now.timestamp())
+    await redis.set(history_key, json.dumps(history), ex=120)
+    return len(history) <= MAX_MESSAGES_PER_MINUTE
+
+
+def make_update(update_id: int, user_id: int) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="Bench"),
+        text="bench",
+    )
+    return Update(update_id=update_id, message=message)
+
+
+async def run(label: str, check, users: int, updates: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for update_id in range(updates):
+        queue.put_nowait(update_id)
+
+    async def worker():
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            user_id = BASE_USER_ID + update_id % users
+            started = time.perf_counter()
+            await check(update_id, user_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    total = time.perf_counter() - started
+    latencies.sort()
+    print(
+        f"{label:>8}: {updates / total:8.0f} upd/s  "
+        f"p50={statistics.median(latencies):.3f}ms  "
+        f"p95={latencies[int(len(latencies) * 0.95)]:.3f}ms  "
+        f"p99={latencies[int(len(latencies) * 0.99)]:.3f}ms"
+    )
+    return latencies
+
+
+async def cleanup(redis: Redis, users: int) -> None:
+    keys = []
+    for offset in range(users):
+        user_id = BASE_USER_ID + offset
+        keys += [f"antispam:mute:{user_id}", f"antispam:history:{user_id}", f"antispam:zhistory:{user_id}"]
+    for start in range(0, len(keys), 1000):
+        await redis.delete(*keys[start:start + 1000])
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    counting = CountingRedis(redis)
+    antispam.get_redis = AsyncMock(return_value=counting)
+    Message.answer = AsyncMock()  # Muted users get a reply; don't call Telegram
+
+    middleware = AntiSpamMiddleware()
+    handler = AsyncMock(return_value=None)
+
+    async def legacy(update_id: int, user_id: int) -> None:
+        await legacy_check(counting, user_id)
+
+    async def current(update_id: int, user_id: int) -> None:
+        await middleware(handler, make_update(update_id, user_id), {})
+
+    try:
+        for label, check in (("legacy", legacy), ("script", current)):
+            await cleanup(redis, args.users)
+            counting.round_trips = 0
+            await run(label, check, args.users, args.updates, args.concurrency)
+            print(f"{'':>8}  round-trips/update: {counting.round_trips / args.updates:.2f}")
+    finally:
+        await cleanup(redis, args.users)
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
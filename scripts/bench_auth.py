@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-request initData authentication overhead.
+
+Compares a cold validation (parse + HMAC for every call, what each request
+paid before caching) with the cached path used for repeat requests.
+
+Usage:
+    python3 scripts/bench_auth.py --iterations 50000
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+BOT_TOKEN = "123456:BENCH-TOKEN"
+for key, value in {
+    "BOT_TOKEN": BOT_TOKEN, "BOT_USERNAME": "bench", "ADMIN_IDS": "[1]",
+    "PAYMENT_PHONE": "0", "PAYMENT_CARD": "0", "PAYMENT_BANKS": "0", "PAYMENT_NAME": "0",
+    "POSTGRES_USER": "x", "POSTGRES_PASSWORD": "x", "POSTGRES_DB": "x", "POSTGRES_HOST": "x", "POSTGRES_PORT": "5432",
+    "REDIS_HOST": "x", "REDIS_PORT": "6379", "REDIS_DB_FSM": "0", "REDIS_DB_CACHE": "1",
+}.items():
+    os.environ.setdefault(key, value)
+
+import logging  # noqa: E402
+
+logging.disable(logging.INFO)
+
+from bot.api import auth  # noqa: E402
+
+
+def build_init_data(user_id: int) -> str:
+    user_json = json.dumps({"id": user_id, "first_name": "Bench", "username": "bench", "language_code": "ru"})
+    params = {"auth_date": str(int(time.time())), "query_id": "AAHdF6IQAAAAAN0XohDhrOrc", "user": user_json}
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
+    secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
+    digest = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    query = "&".join(f"{k}={quote(v)}" for k, v in params.items())
+    return f"{query}&hash={digest}"
+
+
+def bench(label: str, fn, iterations: int) -> None:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    per_call_us = (time.perf_counter() - started) / iterations * 1_000_000
+    print(f"{label:<40} {per_call_us:8.2f} µs/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    init_data = build_init_data(872379852)
+
+    def cold():
+        auth._init_data_cache.clear()
+        auth._webapp_secret_key.cache_clear()
+        auth.validate_init_data(init_data, BOT_TOKEN)
+
+    def warm_key_only():
+        auth._init_data_cache.clear()
+        auth.validate_init_data(init_data, BOT_TOKEN)
+
+    def cached():
+        auth.validate_init_data(init_data, BOT_TOKEN)
+
+    bench("cold (parse + key derivation + HMAC)", cold, args.iterations)
+    bench("secret key precomputed", warm_key_only, args.iterations)
+    auth.validate_init_data(init_data, BOT_TOKEN)
+    bench("cache hit", cached, args.iterations)
+    print("Before this change a request validated twice (terms middleware + dependency) on the cold path.")
+
+
+if __name__ == "__main__":
+    main()
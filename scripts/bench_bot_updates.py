@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bot update ingestion, long polling vs webhook.
+
+Starts a local fake Telegram Bot API (uvicorn on 127.0.0.1) that serves
+getUpdates from a pre-generated backlog and answers sendMessage. The same
+api server also mounts the webhook route (bot/api/routers/telegram_webhook.py).
+
+- polling: poll_updates (getUpdates against the fake API) into UpdateQueue;
+- webhook: a "Telegram" sender POSTs the backlog to the webhook route with
+  up to --connections concurrent requests (Telegram's max_connections) and
+  retries on 503, updates are handled by UpdateQueue workers.
+
+Both modes go through the same per-user ordered UpdateQueue, so --users
+bounds the achievable concurrency. Each update is a private message from
+one of --users users; the handler sleeps --handler-ms (stand-in for DB
+work) and replies with sendMessage, so the fake API sees a real
+round-trip. Reports updates/sec until the last update is handled.
+
+No Postgres/Redis needed (env from .env or tests defaults is enough for config).
+
+Usage:
+    python3 scripts/bench_bot_updates.py --mode both --updates 5000 --handler-ms 20
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+for key, value in {
+    "BOT_TOKEN": "123456:BENCH-TOKEN", "BOT_USERNAME": "bench_bot", "ADMIN_IDS": "[]",
+    "PAYMENT_PHONE": "0", "PAYMENT_CARD": "0", "PAYMENT_BANKS": "bench", "PAYMENT_NAME": "bench",
+    "POSTGRES_USER": "bench", "POSTGRES_PASSWORD": "bench", "POSTGRES_DB": "bench",
+    "POSTGRES_HOST": "localhost", "POSTGRES_PORT": "5432", "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379", "REDIS_DB_FSM": "0", "REDIS_DB_CACHE": "1",
+}.items():
+    os.environ.setdefault(key, value)
+
+import aiohttp  # noqa: E402
+import uvicorn  # noqa: E402
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Message  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from bot.api.routers import telegram_webhook  # noqa: E402
+from bot.services.update_queue import init_update_queue, poll_updates, reset_update_queue  # noqa: E402
+from core.config import settings  # noqa: E402
+
+TOKEN = "123456:BENCH-TOKEN"
+SECRET = "bench-secret"
+
+
+def make_updates(count: int, users: int) -> list[dict]:
+    return [
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+                "text": f"msg {update_id}",
+            },
+        }
+        for update_id in range(1, count + 1)
+        for user_id in [random.randint(1, users)]
+    ]
+
+
+class FakeTelegram:
+    """Just enough of the Bot API: getUpdates from a backlog, sendMessage and friends return ok."""
+
+    def __init__(self):
+        self.backlog: list[dict] = []
+        self.sent = 0
+
+    def app(self) -> FastAPI:
+        app = FastAPI()
+        app.include_router(telegram_webhook.router)
+
+        @app.post("/bot{token}/{method}")
+        async def call(token: str, method: str, request: Request):
+            params = dict(await request.form())
+            if method == "getUpdates":
+                offset = int(params.get("offset") or 0)
+                limit = int(params.get("limit") or 100)
+                self.backlog = [u for u in self.backlog if u["update_id"] >= offset]
+                if not self.backlog:
+                    await asyncio.sleep(0.2)  # Long poll без апдейтов
+                return {"ok": True, "result": self.backlog[:limit]}
+            if method == "sendMessage":
+                self.sent += 1
+                chat_id = int(params["chat_id"])
+                return {"ok": True, "result": {
+                    "message_id": self.sent, "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"}, "text": params.get("text", ""),
+                }}
+            if method == "getMe":
+                return {"ok": True, "result": {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}}
+            return {"ok": True, "result": True}
+
+        return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_dispatcher(handled: list[int], total: int, done: asyncio.Event, handler_ms: float) -> Dispatcher:
+    dp = Dispatcher()
+
+    @dp.message()
+    async def echo(message: Message):
+        await asyncio.sleep(handler_ms / 1000)
+        await message.answer("ok")
+        handled.append(message.message_id)
+        if len(handled) >= total:
+            done.set()
+
+    return dp
+
+
+async def bench_polling(
+    base: str, fake: FakeTelegram, updates: list[dict], handler_ms: float, workers: int, queue_size: int,
+) -> float:
+    handled: list[int] = []
+    done = asyncio.Event()
+    dp = build_dispatcher(handled, len(updates), done, handler_ms)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base)))
+    queue = init_update_queue(dp, bot, workers=workers, maxsize=queue_size)
+    stop = asyncio.Event()
+    fake.backlog = list(updates)
+
+    started = time.perf_counter()
+    polling = asyncio.create_task(poll_updates(bot, queue, allowed_updates=None, stop_event=stop, timeout=1))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await polling
+    await queue.stop()
+    reset_update_queue()
+    await bot.session.close()
+    return len(updates) / elapsed
+
+
+async def bench_webhook(
+    base: str, updates: list[dict], handler_ms: float, workers: int, queue_size: int, connections: int,
+) -> tuple[float, int]:
+    handled: list[int] = []
+    done = asyncio.Event()
+    dp = build_dispatcher(handled, len(updates), done, handler_ms)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(base)))
+    queue = init_update_queue(dp, bot, workers=workers, maxsize=queue_size)
+    settings.BOT_UPDATES_MODE = "webhook"
+    settings.BOT_WEBHOOK_SECRET = SECRET
+    retries = 0
+    pending = iter(updates)
+    headers = {telegram_webhook.SECRET_HEADER: SECRET}
+
+    async def deliver(client: aiohttp.ClientSession):
+        nonlocal retries
+        for update in pending:
+            while True:
+                async with client.post(settings.BOT_WEBHOOK_PATH, json=update, headers=headers) as response:
+                    await response.read()
+                if response.status != 503:
+                    break
+                retries += 1
+                await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession(base, connector=aiohttp.TCPConnector(limit=connections)) as client:
+        await asyncio.gather(*(deliver(client) for _ in range(connections)))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await queue.stop()
+    reset_update_queue()
+    await bot.session.close()
+    return len(updates) / elapsed, retries
+
+
+async def run(args) -> None:
+    fake = FakeTelegram()
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(uvicorn.Config(fake.app(), host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    updates = make_updates(args.updates, args.users)
+    print(f"{args.updates} updates from {args.users} users, handler {args.handler_ms} ms")
+    if args.mode in ("polling", "both"):
+        rate = await bench_polling(base, fake, updates, args.handler_ms, args.workers, args.queue_size)
+        print(f"polling: {rate:.0f} updates/s ({args.workers} workers, queue {args.queue_size})")
+    if args.mode in ("webhook", "both"):
+        rate, retries = await bench_webhook(
+            base, updates, args.handler_ms, args.workers, args.queue_size, args.connections,
+        )
+        print(
+            f"webhook: {rate:.0f} updates/s "
+            f"({args.workers} workers, queue {args.queue_size}, {args.connections} connections, {retries} retries)"
+        )
+
+    server.should_exit = True
+    await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("polling", "webhook", "both"), default="both")
+    parser.add_argument("--updates", type=int, default=2_000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--handler-ms", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=settings.BOT_UPDATE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=settings.BOT_UPDATE_QUEUE_SIZE)
+    parser.add_argument("--connections", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
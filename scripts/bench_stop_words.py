@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark: stop-words scan per customer message.
+
+Replays the legacy StopWordsMiddleware scan (lower() + `in` per stop word,
+three findall passes, nested whitelist loop) and the compiled StopWordMatcher
+on the same corpus and prints µs per message (p50/p95/mean) plus how many
+messages each flagged.
+
+The corpus mimics real chat traffic: short replies, typical order requests
+and long pasted assignment texts (--min-len..--max-len characters), with
+--hit-rate of messages containing a stop word, a phone or a link. Pass
+--corpus FILE (one message per line, e.g. an export of order messages) to
+use real texts instead.
+
+Usage:
+    python3 scripts/bench_stop_words.py --messages 20000 --words 200
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+for key, value in {
+    "BOT_TOKEN": "123456:BENCH-TOKEN", "BOT_USERNAME": "bench_bot", "ADMIN_IDS": "[]",
+    "PAYMENT_PHONE": "0", "PAYMENT_CARD": "0", "PAYMENT_BANKS": "bench", "PAYMENT_NAME": "bench",
+    "POSTGRES_USER": "bench", "POSTGRES_PASSWORD": "bench", "POSTGRES_DB": "bench",
+    "POSTGRES_HOST": "localhost", "POSTGRES_PORT": "5432", "REDIS_HOST": "localhost",
+    "REDIS_PORT": "6379", "REDIS_DB_FSM": "0", "REDIS_DB_CACHE": "1",
+}.items():
+    os.environ.setdefault(key, value)
+
+from bot.services.stop_words import DEFAULT_STOP_WORDS, STOP_PATTERNS, StopWordMatcher  # noqa: E402
+from core.config import settings  # noqa: E402
+
+FRAGMENTS = [
+    "Здравствуйте", "добрый день", "нужна курсовая по экономике", "срок до пятницы",
+    "объём 30 страниц", "методичку прикрепил", "оригинальность от 70%", "сколько будет стоить",
+    "можно ли быстрее", "преподаватель просил добавить практическую часть",
+    "в списке литературы не меньше 25 источников", "оформление по ГОСТ", "спасибо большое",
+    "а когда будет готово", "вот замечания научного руководителя", "глава 2 требует доработки",
+    "тема: анализ финансовой устойчивости предприятия", "введение, три главы, заключение",
+    "скину задание вечером", "оплатил, проверьте пожалуйста",
+]
+HITS = ["это обман", "верни деньги", "пишите 8 912 345-67-89", "t.me/rival_help", "@other_helper", "в Автор24 дешевле"]
+
+LEGACY_PATTERNS = [re.compile(p, re.IGNORECASE) for p in [
+    r"(\+7|8)[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{2}[\s\-]?\d{2}",
+    r"@[a-zA-Z_][a-zA-Z0-9_]{4,}",
+    r"t\.me/[a-zA-Z0-9_]+",
+]]
+
+
+def legacy_scan(text: str, words: list[str], whitelist: list[str]) -> list[str]:
+    """StopWordsMiddleware до скомпилированного матчера."""
+    lowered = text.lower()
+    found = [word for word in words if word in lowered]
+    for pattern in LEGACY_PATTERNS:
+        for match in pattern.findall(text)[:3]:
+            match_lower = match.lower()
+            if not any(match_lower in allowed or allowed in match_lower for allowed in whitelist):
+                found.append(match)
+    return found
+
+
+def make_corpus(count: int, min_len: int, max_len: int, hit_rate: float) -> list[str]:
+    corpus = []
+    for _ in range(count):
+        # Длины как в чате: много коротких, хвост длинных вставок задания
+        target = min(max_len, max(min_len, int(random.lognormvariate(4.8, 0.9))))
+        parts: list[str] = []
+        while sum(len(p) + 2 for p in parts) < target:
+            parts.append(random.choice(FRAGMENTS))
+        if random.random() < hit_rate:
+            parts.insert(random.randrange(len(parts) + 1), random.choice(HITS))
+        corpus.append(", ".join(parts).capitalize() + ".")
+    return corpus
+
+
+def make_words(count: int) -> list[str]:
+    words = list(DEFAULT_STOP_WORDS)
+    while len(words) < count:
+        words.append("".join(random.choice("абвгдежзиклмнопрстуфхцчшщэюя") for _ in range(random.randint(5, 12))))
+    return words
+
+
+def measure(scan, corpus: list[str]) -> tuple[list[float], int]:
+    timings, flagged = [], 0
+    for text in corpus:
+        started = time.perf_counter()
+        found = scan(text)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+        flagged += bool(found)
+    return timings, flagged
+
+
+def report(name: str, timings: list[float], flagged: int) -> None:
+    ordered = sorted(timings)
+    p50 = ordered[len(ordered) // 2]
+    p95 = ordered[int(len(ordered) * 0.95)]
+    print(f"{name:<28} p50 {p50:7.1f} µs   p95 {p95:7.1f} µs   mean {statistics.fmean(timings):7.1f} µs   flagged {flagged}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--words", type=int, default=len(DEFAULT_STOP_WORDS), help="stop words (padded with random)")
+    parser.add_argument("--min-len", type=int, default=10)
+    parser.add_argument("--max-len", type=int, default=2_000)
+    parser.add_argument("--hit-rate", type=float, default=0.03)
+    parser.add_argument("--corpus", type=Path, help="file with one message per line")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.corpus:
+        corpus = [line for line in args.corpus.read_text(encoding="utf-8").splitlines() if line.strip()]
+    else:
+        corpus = make_corpus(args.messages, args.min_len, args.max_len, args.hit_rate)
+    words = make_words(args.words)
+    lengths = sorted(len(text) for text in corpus)
+    print(
+        f"{len(corpus)} messages (median {lengths[len(lengths) // 2]} chars, max {lengths[-1]}), "
+        f"{len(words)} stop words, {len(STOP_PATTERNS)} patterns"
+    )
+
+    legacy_words = [w.lower() for w in words]
+    whitelist = [
+        f"@{settings.SUPPORT_USERNAME}".lower(), f"@{settings.BOT_USERNAME}".lower(),
+        f"t.me/{settings.BOT_USERNAME}".lower(), settings.REVIEWS_CHANNEL.lower(),
+    ]
+    report("legacy", *measure(lambda text: legacy_scan(text, legacy_words, whitelist), corpus))
+    for label, options in (
+        ("compiled", {"normalize": False}),
+        ("compiled +normalize", {"normalize": True}),
+        ("compiled +normalize +bound", {"normalize": True, "word_boundary": True}),
+    ):
+        matcher = StopWordMatcher(words, **options)
+        report(label, *measure(matcher.scan, corpus))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: WebSocket backplane delivery latency.
+
+Simulates several API workers in one process (each with its own
+ConnectionManager and pub/sub connection), spreads N fake sockets across
+them and publishes events from a worker that holds no sockets. Latency is
+measured from publish to the moment the owning worker hands the event to
+the socket.
+
+Requires a running Redis (REDIS_HOST/REDIS_PORT from .env).
+
+Usage:
+    python3 scripts/bench_ws_backplane.py --sockets 10000 --workers 4 --events 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.websockets import WebSocketState  # noqa: E402
+
+from bot.api.websocket import ConnectionManager  # noqa: E402
+
+
+class BenchSocket:
+    def __init__(self, samples: list[float]):
+        self.client_state = WebSocketState.CONNECTED
+        self.samples = samples
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, text):
+        self.samples.append(time.perf_counter() - json.loads(text)["sent_at"])
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+
+async def run(sockets: int, workers: int, events: int, shards: int) -> None:
+    samples: list[float] = []
+    owners = [ConnectionManager() for _ in range(workers)]
+    publisher = ConnectionManager()
+    for manager in (*owners, publisher):
+        await manager.start_backplane(shards=shards)
+
+    user_ids = list(range(1_000_000, 1_000_000 + sockets))
+    for telegram_id in user_ids:
+        await owners[telegram_id % workers].connect(BenchSocket(samples), telegram_id)
+
+    print(f"Connected {sockets} sockets across {workers} workers ({shards} shards)")
+
+    started = time.perf_counter()
+    for _ in range(events):
+        await publisher.send_to_user(random.choice(user_ids), {"type": "bench", "sent_at": time.perf_counter()})
+    publish_elapsed = time.perf_counter() - started
+
+    deadline = time.perf_counter() + 10
+    while len(samples) < events and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+
+    for manager in (*owners, publisher):
+        await manager.stop_backplane()
+
+    if not samples:
+        print("No events delivered — is Redis reachable?")
+        return
+
+    ms = [s * 1000 for s in samples]
+    print(f"Delivered {len(samples)}/{events} events, publish rate {events / publish_elapsed:.0f}/s")
+    print(
+        f"Latency ms: p50={statistics.median(ms):.2f} p95={percentile(ms, 95):.2f} "
+        f"p99={percentile(ms, 99):.2f} max={max(ms):.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--events", type=int, default=2_000)
+    parser.add_argument("--shards", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(run(args.sockets, args.workers, args.events, args.shards))
+
+
+if __name__ == "__main__":
+    main()
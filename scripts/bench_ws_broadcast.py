@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ConnectionManager.broadcast latency vs. number of sockets.
+
+Connects N fake sockets (one of them deliberately slow) to a local
+ConnectionManager and measures how long broadcast() blocks the caller and
+how long until every fast socket has received the frame. No Redis needed.
+
+Usage:
+    python3 scripts/bench_ws_broadcast.py --sizes 100,1000,5000,10000
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.websockets import WebSocketState  # noqa: E402
+
+from bot.api.websocket import ConnectionManager  # noqa: E402
+
+
+class BenchSocket:
+    def __init__(self, delay: float = 0.0):
+        self.client_state = WebSocketState.CONNECTED
+        self.delay = delay
+        self.received_at: float | None = None
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received_at = time.perf_counter()
+
+    async def close(self, code=1000):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+async def run_once(size: int) -> tuple[float, float]:
+    manager = ConnectionManager()
+    sockets = [BenchSocket() for _ in range(size - 1)]
+    slow = BenchSocket(delay=2.0)
+    for telegram_id, socket in enumerate([slow, *sockets], start=1):
+        await manager.connect(socket, telegram_id)
+
+    started = time.perf_counter()
+    await manager.broadcast({"type": "notification", "title": "bench", "message": "x" * 200})
+    call_ms = (time.perf_counter() - started) * 1000
+
+    while any(s.received_at is None for s in sockets):
+        await asyncio.sleep(0.001)
+    fanout_ms = (max(s.received_at for s in sockets) - started) * 1000
+
+    for telegram_id, socket in enumerate([slow, *sockets], start=1):
+        await manager.disconnect(socket, telegram_id)
+    return call_ms, fanout_ms
+
+
+async def run(sizes: list[int]) -> None:
+    print(f"{'sockets':>8} {'broadcast() ms':>15} {'all fast delivered ms':>22}")
+    for size in sizes:
+        call_ms, fanout_ms = await run_once(size)
+        print(f"{size:>8} {call_ms:>15.2f} {fanout_ms:>22.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,5000,10000")
+    args = parser.parse_args()
+    asyncio.run(run([int(x) for x in args.sizes.split(",")]))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import sys
 from decimal import Decimal
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import event, select
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
@@ -33,9 +33,15 @@ REQUIRED_ENV = {
 for key, value in REQUIRED_ENV.items():
     os.environ.setdefault(key, value)
 
-from bot.services.achievements import sync_user_achievements
+from bot.services import achievements as achievements_service
+from bot.services.achievements import (
+    ORDER_METRICS,
+    rebuild_achievement_metrics,
+    refresh_achievement_owner_stats,
+    sync_user_achievements,
+)
 from database.db import Base
-from database.models.achievements import UserAchievement
+from database.models.achievements import UserAchievement, UserAchievementMetrics
 from database.models.orders import Order, OrderStatus
 from database.models.transactions import BalanceTransaction
 from database.models.users import User
@@ -165,3 +171,119 @@ async def test_sync_user_achievements_returns_progress_for_locked_items():
         assert streak["hint"] == "Ещё 3 дня"
 
     await engine.dispose()
+
+
+@pytest.fixture
+async def tracked_db():
+    achievements_service.install_achievement_tracking()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    yield SessionLocal, engine
+    achievements_service.uninstall_achievement_tracking()
+    await engine.dispose()
+
+
+async def _stored_metrics(session, telegram_id: int) -> dict:
+    row = await session.get(UserAchievementMetrics, telegram_id, populate_existing=True)
+    return {field: int(getattr(row, field)) for field in ORDER_METRICS}
+
+
+@pytest.mark.asyncio
+async def test_metrics_follow_order_events_without_rescanning_orders(tracked_db):
+    SessionLocal, engine = tracked_db
+
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=333, username="inc", fullname="Inc"))
+        await session.commit()
+        await sync_user_achievements(session, 333)  # Creates the metrics row
+
+        orders = [
+            Order(user_id=333, work_type="essay", status=OrderStatus.PENDING.value, price=Decimal("6000"))
+            for _ in range(2)
+        ]
+        session.add_all(orders)
+        await session.commit()
+
+        first, second = orders
+        first.paid_amount = Decimal("6000")
+        first.payment_scheme = "full"
+        first.status = OrderStatus.PAID_FULL.value
+        second.paid_amount = Decimal("3000")
+        second.promo_code = "SAVE10"
+        second.status = OrderStatus.PAID.value
+        await session.commit()
+
+        first.status = OrderStatus.COMPLETED.value
+        first.review_submitted = True
+        await session.commit()
+
+        second.status = OrderStatus.CANCELLED.value
+        await session.commit()
+
+        incremental = await _stored_metrics(session, 333)
+        assert incremental == {
+            "paid_orders_count": 1,
+            "full_payment_orders_count": 1,
+            "promo_paid_orders_count": 0,
+            "perfect_orders_count": 1,
+            "reviewed_orders_count": 1,
+            "completed_spend_total": 6000,
+        }
+        rebuilt = await rebuild_achievement_metrics(session, [333])
+        assert {field: int(value) for field, value in rebuilt[333].items()} == incremental
+
+        queries: list[str] = []
+        listener = lambda conn, cursor, stmt, *args: queries.append(stmt)  # noqa: E731
+        event.listen(engine.sync_engine, "before_cursor_execute", listener)
+        user = await session.scalar(select(User).where(User.telegram_id == 333))
+        queries.clear()
+        payload = await sync_user_achievements(session, 333, user=user)
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    by_key = {item["key"]: item for item in payload}
+    assert by_key["first_paid_order"]["unlocked"] is True
+    assert by_key["review_first"]["unlocked"] is True
+    assert not any("FROM orders" in stmt for stmt in queries)
+
+
+@pytest.mark.asyncio
+async def test_unknown_previous_state_marks_metrics_stale(tracked_db):
+    SessionLocal, _ = tracked_db
+
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=444, username="stale", fullname="Stale"))
+        order = Order(user_id=444, work_type="essay", status=OrderStatus.PAID.value, paid_amount=Decimal("500"))
+        session.add(order)
+        await session.commit()
+        await sync_user_achievements(session, 444)
+
+        session.expire(order, ["paid_amount"])
+        order.status = OrderStatus.COMPLETED.value
+        await session.commit()
+        assert await session.get(UserAchievementMetrics, 444, populate_existing=True) is None
+
+        payload = await sync_user_achievements(session, 444)
+        assert (await _stored_metrics(session, 444))["completed_spend_total"] == 500
+        assert {item["key"]: item for item in payload}["perfect_first"]["unlocked"] is True
+
+
+@pytest.mark.asyncio
+async def test_owner_percentages_come_from_refreshed_table(tracked_db):
+    SessionLocal, _ = tracked_db
+
+    async with SessionLocal() as session:
+        session.add_all([
+            User(telegram_id=501, username="a", fullname="A", referrals_count=1),
+            User(telegram_id=502, username="b", fullname="B"),
+        ])
+        await session.commit()
+        await sync_user_achievements(session, 501)
+
+        payload = await sync_user_achievements(session, 502)
+        assert {item["key"]: item for item in payload}["first_referral"]["owners_percent"] == 0
+
+        assert await refresh_achievement_owner_stats(session) == {"first_referral": 50}
+        payload = await sync_user_achievements(session, 502)
+        assert {item["key"]: item for item in payload}["first_referral"]["owners_percent"] == 50
@@ -0,0 +1,210 @@
+"""Admin live feed: events published after commit, shared replay buffer, live-feed snapshot without scans."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.api import websocket
+from bot.api.auth import TelegramUser, get_current_user
+from bot.api.routers import admin as admin_router
+from bot.services import admin_feed
+from bot.services.admin_feed import install_admin_feed_tracking, recent_events, uninstall_admin_feed_tracking
+from bot.services.order_stats import install_order_stats_tracking, uninstall_order_stats_tracking
+from database.db import Base, get_session
+from database.models.orders import Order, OrderStatus
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+ADMIN_ID = 123456789
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.lists: dict[str, list[str]] = {}
+
+    async def incrby(self, key, amount):
+        self.counters[key] = self.counters.get(key, 0) + amount
+        return self.counters[key]
+
+    async def lpush(self, key, *values):
+        items = self.lists.setdefault(key, [])
+        for value in values:
+            items.insert(0, value)
+
+    async def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:end + 1]
+
+    async def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+async def env():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_session():
+        async with SessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(admin_router.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: TelegramUser(id=ADMIN_ID, first_name="Admin")
+    app.dependency_overrides[get_session] = override_session
+
+    redis = FakeRedis()
+    sent = AsyncMock(return_value=True)
+    install_admin_feed_tracking()
+    install_order_stats_tracking()
+    with patch.object(admin_feed, "get_redis", AsyncMock(return_value=redis)), \
+            patch.object(admin_feed, "_last_seq", 0), \
+            patch.object(admin_feed, "_local_buffer", deque(maxlen=admin_feed.REPLAY_SIZE)), \
+            patch.object(websocket.manager, "send_to_user", sent):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client, SessionLocal, engine, sent, redis
+    uninstall_order_stats_tracking()
+    uninstall_admin_feed_tracking()
+    await engine.dispose()
+
+
+async def _drain():
+    await asyncio.gather(*list(admin_feed._background_tasks))
+
+
+@pytest.mark.asyncio
+async def test_transitions_published_after_commit_only(env):
+    _, SessionLocal, _, sent, _ = env
+
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=1, fullname="Анна"))
+        order = Order(user_id=1, work_type="essay", subject="История", price=1000)
+        session.add(order)
+        await session.flush()
+        order.status = OrderStatus.PENDING.value
+        await session.flush()
+        assert sent.await_count == 0  # До commit ничего не уходит
+        await session.commit()
+        order_id = order.id
+    await _drain()
+
+    events, gap = await recent_events()
+    assert [e["type"] for e in events] == ["new_order", "new_user"]  # Новые первыми
+    assert [e["seq"] for e in events] == [2, 1]
+    assert events[0]["message"] == f"#{order_id} • 📝 Эссе • История"
+    assert not gap
+
+    admin_messages = [call.args for call in sent.await_args_list if call.args[0] == ADMIN_ID]
+    assert [m[1]["event"]["type"] for m in admin_messages] == ["new_user", "new_order"]
+
+    async with SessionLocal() as session:
+        order = await session.get(Order, order_id)
+        order.status = OrderStatus.VERIFICATION_PENDING.value
+        await session.flush()
+        await session.rollback()
+    await _drain()
+    assert len((await recent_events())[0]) == 2
+
+    async with SessionLocal() as session:
+        order = await session.get(Order, order_id)
+        order.status = OrderStatus.VERIFICATION_PENDING.value
+        await session.commit()
+    await _drain()
+
+    replay, gap = await recent_events(since_seq=2)
+    assert [(e["type"], e["amount"]) for e in replay] == [("payment_received", 1000.0)]
+
+
+@pytest.mark.asyncio
+async def test_replay_reports_gap_when_buffer_overflowed(env):
+    await admin_feed.publish_admin_events(
+        admin_feed.make_event("new_user", "normal", "👤", str(i), entity_id=i) for i in range(admin_feed.REPLAY_SIZE + 5)
+    )
+    events, gap = await recent_events(since_seq=1)
+    assert gap
+    assert events[0]["seq"] == admin_feed.REPLAY_SIZE + 5
+
+    events, gap = await recent_events(since_seq=admin_feed.REPLAY_SIZE)
+    assert not gap
+    assert [e["seq"] for e in events] == [205, 204, 203, 202, 201]
+
+
+@pytest.mark.asyncio
+async def test_local_fallback_continues_seq_and_reports_gap(env):
+    def new_user(n: int) -> dict:
+        return admin_feed.make_event("new_user", "normal", "👤", str(n), entity_id=n)
+
+    await admin_feed.publish_admin_events([new_user(1), new_user(2)])
+    await recent_events(since_seq=0)
+
+    with patch.object(admin_feed, "get_redis", AsyncMock(side_effect=ConnectionError("redis down"))):
+        await admin_feed.publish_admin_events([new_user(3)])
+        events, gap = await recent_events(since_seq=2)
+    assert [e["seq"] for e in events] == [3]
+    assert gap  # Локальный буфер не видит событий других воркеров
+
+    # Redis вернулся: номера идут после локальных, клиент с since_seq=3 их получит
+    await admin_feed.publish_admin_events([new_user(4)])
+    events, gap = await recent_events(since_seq=3)
+    assert [e["seq"] for e in events] == [4]
+    assert not gap
+
+
+@pytest.mark.asyncio
+async def test_live_feed_snapshot_reads_buffer_and_rollup(env):
+    client, SessionLocal, engine, _, _ = env
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=1))
+        session.add(Order(user_id=1, work_type="essay", status=OrderStatus.PENDING.value))
+        await session.commit()
+    await _drain()
+
+    queries: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, stmt, *a: queries.append(stmt))
+    feed = (await client.get("/api/admin/live-feed")).json()
+
+    assert [e["type"] for e in feed["events"]] == ["new_order", "new_user"]
+    assert feed["counters"]["pending_orders"] == 1
+    assert feed["has_critical"] is True
+    assert feed["last_seq"] == 2
+    assert not [q for q in queries if "FROM orders" in q or "FROM users" in q]
+
+    resumed = (await client.get("/api/admin/live-feed", params={"since_seq": 2})).json()
+    assert resumed["events"] == []
+    assert resumed["last_seq"] == 2
@@ -0,0 +1,121 @@
+"""Antispam middleware: one script call per update, zset history, mute flow."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram.types import Chat, Message, Update, User
+from redis.exceptions import NoScriptError
+
+from bot.middlewares import antispam
+from bot.middlewares.antispam import (
+    MAX_MESSAGES_PER_MINUTE,
+    MUTE_DURATION_SECONDS,
+    AntiSpamMiddleware,
+)
+
+
+class ScriptRedis:
+    """Executes ANTISPAM_SCRIPT semantics in Python; counts round-trips."""
+
+    def __init__(self):
+        self.zsets: dict[str, dict[str, int]] = {}
+        self.expires: dict[str, float] = {}
+        self.calls: list[str] = []
+        self.loaded = False
+
+    def _alive(self, key: str) -> bool:
+        return key in self.expires and self.expires[key] > time.monotonic()
+
+    async def script_load(self, source):
+        self.calls.append("script_load")
+        self.loaded = True
+
+    async def evalsha(self, sha, numkeys, mute_key, history_key, window, limit, mute_ms, member):
+        self.calls.append("evalsha")
+        if not self.loaded:
+            raise NoScriptError("NOSCRIPT")
+        assert sha == antispam.antispam_script.sha
+        now = int(time.monotonic() * 1000)
+        if self._alive(mute_key):
+            return [1, int((self.expires[mute_key] - time.monotonic()) * 1000)]
+        history = self.zsets.setdefault(history_key, {})
+        for old, score in list(history.items()):
+            if score <= now - window:
+                del history[old]
+        history[member] = now
+        if len(history) > limit:
+            self.expires[mute_key] = time.monotonic() + mute_ms / 1000
+            del self.zsets[history_key]
+            return [2, mute_ms]
+        return [0, len(history)]
+
+
+def _update(update_id: int, user_id: int = 42) -> Update:
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(),
+        chat=Chat(id=user_id, type="private"),
+        from_user=User(id=user_id, is_bot=False, first_name="U"),
+        text="hi",
+    )
+    return Update(update_id=update_id, message=message)
+
+
+@pytest.fixture
+def answer():
+    with patch.object(Message, "answer", AsyncMock()) as mock:
+        yield mock
+
+
+@pytest.fixture
+def redis(answer):
+    fake = ScriptRedis()
+    with patch.object(antispam, "get_redis", AsyncMock(return_value=fake)):
+        yield fake
+
+
+@pytest.mark.asyncio
+async def test_one_round_trip_per_update(redis):
+    redis.loaded = True
+    middleware = AntiSpamMiddleware()
+    handler = AsyncMock(return_value="ok")
+
+    for update_id in range(MAX_MESSAGES_PER_MINUTE):
+        assert await middleware(handler, _update(update_id), {}) == "ok"
+
+    assert redis.calls == ["evalsha"] * MAX_MESSAGES_PER_MINUTE
+    assert handler.await_count == MAX_MESSAGES_PER_MINUTE
+
+
+@pytest.mark.asyncio
+async def test_concurrent_burst_mutes_exactly_once(redis, answer):
+    middleware = AntiSpamMiddleware()
+    handler = AsyncMock(return_value="ok")
+    updates = [_update(update_id) for update_id in range(MAX_MESSAGES_PER_MINUTE + 5)]
+
+    await asyncio.gather(*(middleware(handler, update, {}) for update in updates))
+
+    # Script reloaded once after NOSCRIPT, then one call per update
+    assert redis.calls.count("script_load") == 1
+    assert handler.await_count == MAX_MESSAGES_PER_MINUTE
+    replies = [call.args[0] for call in answer.await_args_list]
+    assert sum("Обнаружен спам" in text for text in replies) == 1
+    assert sum("Слишком много сообщений" in text for text in replies) == 4
+    assert f"{MUTE_DURATION_SECONDS // 60} минут" in next(t for t in replies if "спам" in t)
+
+
+@pytest.mark.asyncio
+async def test_admins_and_redis_errors_pass_through(answer):
+    middleware = AntiSpamMiddleware()
+    handler = AsyncMock(return_value="ok")
+    failing = AsyncMock(side_effect=ConnectionError("Redis down"))
+
+    with patch.object(antispam, "get_redis", failing):
+        assert await middleware(handler, _update(1, user_id=123456789), {}) == "ok"
+        failing.assert_not_awaited()  # Admin skipped before Redis
+        assert await middleware(handler, _update(2), {}) == "ok"
@@ -106,3 +106,78 @@ class TestInitDataValidation:
         user, error = validate_init_data(init_data, bot_token)
         assert user is None
         assert error == "missing_user"
+
+
+class TestInitDataCache:
+    """Validated initData is cached by hash and bound to the exact string."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from bot.api.auth import _init_data_cache
+
+        _init_data_cache.clear()
+        yield
+        _init_data_cache.clear()
+
+    @pytest.fixture
+    def bot_token(self):
+        return "123456:ABC-TEST-TOKEN"
+
+    def test_repeat_validation_hits_cache(self, bot_token):
+        from bot.api.auth import _init_data_cache, validate_init_data
+
+        init_data = _build_init_data({"id": 777, "first_name": "A"}, bot_token)
+        first, _ = validate_init_data(init_data, bot_token)
+        second, error = validate_init_data(init_data, bot_token)
+
+        assert second == first
+        assert error == ""
+        assert _init_data_cache.hits == 1
+
+    def test_reused_hash_with_tampered_payload_is_rejected(self, bot_token):
+        from bot.api.auth import validate_init_data
+
+        init_data = _build_init_data({"id": 777, "first_name": "A"}, bot_token)
+        validate_init_data(init_data, bot_token)
+
+        received_hash = init_data.rsplit("hash=", 1)[1]
+        forged = _build_init_data({"id": 1, "first_name": "Admin"}, bot_token).rsplit("hash=", 1)[0]
+        user, error = validate_init_data(f"{forged}hash={received_hash}", bot_token)
+
+        assert user is None
+        assert error == "hash_mismatch"
+
+    def test_cache_is_scoped_to_bot_token(self, bot_token):
+        from bot.api.auth import validate_init_data
+
+        init_data = _build_init_data({"id": 777, "first_name": "A"}, bot_token)
+        validate_init_data(init_data, bot_token)
+
+        user, error = validate_init_data(init_data, "999:OTHER-TOKEN")
+        assert user is None
+        assert error == "hash_mismatch"
+
+    def test_cached_entry_expires_with_auth_date(self, bot_token, monkeypatch):
+        from bot.api import auth
+
+        auth_date = int(time.time()) - 3600
+        init_data = _build_init_data({"id": 777, "first_name": "A"}, bot_token, auth_date=auth_date)
+        auth.validate_init_data(init_data, bot_token)
+
+        monkeypatch.setattr(auth.time, "time", lambda: auth_date + auth.INIT_DATA_MAX_AGE_SECONDS + 1)
+        user, error = auth.validate_init_data(init_data, bot_token)
+
+        assert user is None
+        assert error == "expired"
+
+    def test_lru_is_bounded(self, bot_token):
+        from bot.api.auth import InitDataCache, TelegramUser
+
+        cache = InitDataCache(maxsize=2)
+        now = int(time.time())
+        for n in range(3):
+            cache.set(f"h{n}", f"data{n}", bot_token, TelegramUser(id=n, first_name=""), now)
+
+        assert len(cache) == 2
+        assert cache.get("h0", "data0", bot_token) is None
+        assert cache.get("h2", "data2", bot_token).id == 2
@@ -0,0 +1,245 @@
+"""Background broadcast engine: rate limiting, flood control, resumable progress."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.services.broadcast import BroadcastEngine, BroadcastStatus
+from core.token_bucket import TokenBucket
+from database.db import Base
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.sets: dict[str, set[str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.strings: dict[str, str] = {}
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hincrby(self, key, field, amount):
+        data = self.hashes.setdefault(key, {})
+        data[field] = str(int(data.get(field, 0)) + amount)
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(str(m) for m in members)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zrevrange(self, key, start, end):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1], reverse=True)
+        return [member for member, _ in items[start:end + 1]]
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = value
+        return True
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.strings.pop(key, None)
+            self.sets.pop(key, None)
+            self.hashes.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def evalsha(self, sha, numkeys, job_key, status, finished_at, error, ttl):
+        """FINISH_SCRIPT: итоговый статус, если задачу не отменили."""
+        data = self.hashes.setdefault(job_key, {})
+        if data.get("status") == BroadcastStatus.CANCELLED:
+            return 0
+        data.update(status=status, finished_at=str(finished_at), error=error)
+        return 1
+
+
+class FakeBot:
+    def __init__(self, *, blocked=(), flood_once=(), delay=0.0):
+        self.delivered: list[int] = []
+        self.blocked = set(blocked)
+        self.flood_once = set(flood_once)
+        self.delay = delay
+
+    async def send_message(self, chat_id, text):
+        method = SendMessage(chat_id=chat_id, text=text)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if chat_id in self.flood_once:
+            self.flood_once.discard(chat_id)
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=0.05)
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(method=method, message="bot was blocked by the user")
+        self.delivered.append(chat_id)
+
+
+USER_IDS = list(range(100, 130))
+
+
+@pytest.fixture
+async def session_maker():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    async with SessionLocal() as session:
+        session.add_all(User(telegram_id=tid, username=f"u{tid}", fullname="U") for tid in USER_IDS)
+        session.add(User(telegram_id=999, username="banned", fullname="B", is_banned=True))
+        await session.commit()
+    yield SessionLocal
+    await engine.dispose()
+
+
+def _engine(bot, session_maker, redis, **kwargs) -> BroadcastEngine:
+    async def redis_factory():
+        return redis
+
+    return BroadcastEngine(bot, session_maker, redis_factory=redis_factory, **kwargs)
+
+
+async def _wait_final(engine: BroadcastEngine, job_id: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await engine.get_job(job_id)
+        if job.status in BroadcastStatus.FINAL:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("broadcast did not finish")
+
+
+@pytest.mark.asyncio
+async def test_job_returns_immediately_and_delivers_everyone_once(session_maker):
+    redis = FakeRedis()
+    bot = FakeBot(blocked={105}, flood_once={110})
+    engine = _engine(bot, session_maker, redis, rate=1000, page_size=7)
+
+    job = await engine.create_job("hello", "all", created_by=1)
+    assert job.total == len(USER_IDS)
+    assert job.status == BroadcastStatus.QUEUED
+
+    job = await _wait_final(engine, job.id)
+    assert job.status == BroadcastStatus.COMPLETED
+    assert (job.sent, job.blocked, job.failed) == (len(USER_IDS) - 1, 1, 0)
+    assert sorted(bot.delivered) == [tid for tid in USER_IDS if tid != 105]
+    assert job.progress()["eta_seconds"] is None
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_without_duplicates(session_maker):
+    redis = FakeRedis()
+    first_bot = FakeBot(delay=0.005)
+    engine = _engine(first_bot, session_maker, redis, rate=1000, concurrency=2, page_size=4)
+
+    job = await engine.create_job("hello", "all", created_by=1)
+    while len(first_bot.delivered) < 10:
+        await asyncio.sleep(0.005)
+    await engine.stop()  # Worker shutdown mid-page
+    redis.strings.clear()  # Lock expired
+
+    interrupted = await engine.get_job(job.id)
+    assert interrupted.status == BroadcastStatus.RUNNING
+    assert 0 < interrupted.processed < len(USER_IDS)
+
+    second_bot = FakeBot()
+    resumed_engine = _engine(second_bot, session_maker, redis, rate=1000, page_size=4)
+    assert await resumed_engine.resume_unfinished() == 1
+    job = await _wait_final(resumed_engine, job.id)
+
+    assert sorted(first_bot.delivered + second_bot.delivered) == USER_IDS
+    assert job.sent == len(USER_IDS)
+
+
+@pytest.mark.asyncio
+async def test_cancel_stops_job(session_maker):
+    redis = FakeRedis()
+    engine = _engine(FakeBot(delay=0.01), session_maker, redis, rate=1000, concurrency=1, page_size=2)
+
+    job = await engine.create_job("hello", "all", created_by=1)
+    await asyncio.sleep(0.03)
+    await engine.cancel(job.id)
+    await asyncio.sleep(0.05)
+
+    job = await engine.get_job(job.id)
+    assert job.status == BroadcastStatus.CANCELLED
+    assert job.processed < len(USER_IDS)
+
+
+@pytest.mark.asyncio
+async def test_cancel_during_last_page_is_not_overwritten(session_maker):
+    redis = FakeRedis()
+    engine = _engine(FakeBot(), session_maker, redis, rate=1000, concurrency=4, page_size=len(USER_IDS))
+    other_worker = _engine(FakeBot(), session_maker, redis)
+    next_page = engine._next_page
+
+    async def next_page_then_cancel(job):
+        page = await next_page(job)
+        if not page:
+            await other_worker.cancel(job.id)  # Отмена с другого воркера после последней проверки
+        return page
+
+    engine._next_page = next_page_then_cancel
+    job = await engine.create_job("hello", "all", created_by=1)
+    await asyncio.wait_for(engine._tasks[job.id], timeout=5)
+
+    job = await engine.get_job(job.id)
+    assert job.status == BroadcastStatus.CANCELLED
+    assert job.sent == len(USER_IDS)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate_and_pauses():
+    bucket = TokenBucket(rate=100, capacity=10)
+    started = time.monotonic()
+    for _ in range(30):
+        await bucket.acquire()
+    assert time.monotonic() - started >= 0.18  # 10 burst + 20 at 100/s
+
+    bucket.pause(0.1)
+    started = time.monotonic()
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.09
@@ -0,0 +1,154 @@
+"""Tests for the two-tier (in-process + Redis) cache."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from core import cache as cache_module
+from core.cache import CacheNamespace, cache_metrics, handle_invalidation_message
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.published: list[tuple[str, str]] = []
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 0
+
+    async def scan_iter(self, match=None, count=None):
+        prefix = match.rstrip("*")
+        for key in list(self.data):
+            if key.startswith(prefix):
+                yield key
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+
+    async def get_redis():
+        return fake
+
+    monkeypatch.setattr(cache_module, "get_redis", get_redis)
+    return fake
+
+
+def _namespace(**kwargs) -> CacheNamespace:
+    return CacheNamespace(f"test_{uuid.uuid4().hex[:8]}", ttl=60, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_run_loader_once(redis):
+    ns = _namespace()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(ns.get_or_load("k", loader) for _ in range(20)))
+
+    assert calls == 1
+    assert all(result == {"value": 42} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_l2_serves_worker_with_cold_l1(redis):
+    ns = _namespace()
+
+    async def loader():
+        return [1, 2, 3]
+
+    await ns.get_or_load("k", loader)
+    ns.drop_local()  # Fresh worker: empty L1, shared Redis
+
+    async def failing_loader():
+        raise AssertionError("must not hit the database")
+
+    assert await ns.get_or_load("k", failing_loader) == [1, 2, 3]
+    assert ns.metrics.l2_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_loader_error_propagates_to_all_waiters(redis):
+    ns = _namespace()
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    results = await asyncio.gather(*(ns.get_or_load("k", loader) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert ns.metrics.load_errors == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_clears_redis_and_notifies_other_workers(redis):
+    ns = _namespace()
+    await ns.set("a", 1)
+    await ns.set("b", 2)
+
+    await ns.invalidate()
+
+    assert redis.data == {}
+    channel, payload = redis.published[-1]
+    assert channel == cache_module.INVALIDATION_CHANNEL
+    assert json.loads(payload) == {"origin": cache_module._INSTANCE_ID, "ns": ns.name, "key": None}
+
+
+@pytest.mark.asyncio
+async def test_remote_invalidation_drops_local_entry(redis):
+    ns = _namespace(use_l2=False)
+    await ns.set("k", "stale")
+
+    handle_invalidation_message(json.dumps({"origin": "other-worker", "ns": ns.name, "key": "k"}))
+
+    assert await ns.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_reported_per_namespace(redis):
+    ns = _namespace()
+
+    async def loader():
+        return "v"
+
+    await ns.get_or_load("k", loader)
+    await ns.get_or_load("k", loader)
+
+    metrics = cache_metrics()[ns.name]
+    assert metrics["misses"] == 1
+    assert metrics["l1_hits"] == 1
+    assert metrics["loads"] == 1
+    assert metrics["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_rank_levels_survive_redis_round_trip(redis):
+    from bot.api.cache import rank_levels_cache
+    from database.models.levels import RankLevel
+
+    levels = [RankLevel(id=1, name="Novice", emoji="*", min_spent=0.0, cashback_percent=1.0, bonus=None)]
+    decoded = rank_levels_cache.decode(rank_levels_cache.encode(levels))
+
+    assert isinstance(decoded[0], RankLevel)
+    assert (decoded[0].name, decoded[0].min_spent, decoded[0].cashback_percent) == ("Novice", 0.0, 1.0)
@@ -0,0 +1,117 @@
+"""GodMode dashboard aggregation: same numbers, constant number of queries."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.api.routers import god_mode
+from bot.services import god_dashboard
+from database.db import Base
+from database.models.admin_logs import UserActivity
+from database.models.orders import Order, OrderStatus
+from database.models.promocodes import PromoCode, PromoCodeUsage
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    now = datetime.now(god_mode.MSK_TZ)  # SQLite compares datetimes as text: keep one offset
+    old = now - timedelta(days=20)
+    async with SessionLocal() as session:
+        session.add_all([
+            User(telegram_id=1, username="a", fullname="A", balance=Decimal("150"), created_at=now),
+            User(telegram_id=2, username="b", fullname="B", is_banned=True, created_at=old),
+            User(telegram_id=3, username="c", fullname="C", is_watched=True, balance=Decimal("50"), created_at=old),
+        ])
+        session.add_all([
+            Order(id=1, user_id=1, work_type="essay", status=OrderStatus.PENDING.value, created_at=now),
+            Order(id=2, user_id=1, work_type="essay", status=OrderStatus.IN_PROGRESS.value,
+                  price=Decimal("1000"), promo_discount=Decimal("10"), paid_amount=Decimal("900"), created_at=now),
+            Order(id=3, user_id=3, work_type="essay", status=OrderStatus.COMPLETED.value,
+                  paid_amount=Decimal("3000"), created_at=old, completed_at=now),
+            Order(id=4, user_id=3, work_type="essay", status=OrderStatus.CANCELLED.value, created_at=old),
+        ])
+        session.add_all([
+            PromoCode(id=1, code="SPRING", discount_percent=10.0, is_active=True),
+            PromoCode(id=2, code="OLD", discount_percent=5.0, is_active=False),
+        ])
+        session.add(PromoCodeUsage(promocode_id=1, user_id=1, order_id=2, discount_amount=100.0, is_active=True))
+        session.add(UserActivity(telegram_id=1, is_online=True, last_activity_at=now))
+        session.add(UserActivity(telegram_id=3, is_online=True, last_activity_at=now - timedelta(hours=1)))
+        await session.commit()
+
+    yield SessionLocal, engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_dashboard_values_and_query_count(db):
+    SessionLocal, engine = db
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args, **kwargs: queries.append(1))
+
+    async with SessionLocal() as session:
+        data = await god_mode.build_god_dashboard(session)
+
+    assert len(queries) == 3
+    assert data["orders"]["total"] == 4
+    assert data["orders"]["active"] == 2
+    assert data["orders"]["needing_attention"] == 1
+    assert data["orders"]["today"] == 2
+    assert data["orders"]["completed_today"] == 1
+    assert data["revenue"] == {
+        "total": 3900.0, "today": 900.0, "week": 900.0, "month": 3900.0, "average_order": 1950.0,
+    }
+    assert data["users"] == {
+        "total": 3, "today": 1, "week": 1, "banned": 1, "watched": 1, "online": 1, "total_bonus_balance": 200.0,
+    }
+    assert data["promos"] == {
+        "total": 2, "active": 1, "total_uses": 1, "total_discount_given": 100.0,
+        "popular": [{"code": "SPRING", "uses": 1}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_dashboard_snapshot_is_shared_between_requests(db, monkeypatch):
+    SessionLocal, _ = db
+    calls = 0
+    real_build = god_mode.build_god_dashboard
+
+    async def counting_build(session):
+        nonlocal calls
+        calls += 1
+        return await real_build(session)
+
+    async def no_redis():
+        raise ConnectionError("redis unavailable")
+
+    monkeypatch.setattr(god_mode, "build_god_dashboard", counting_build)
+    monkeypatch.setattr("core.cache.get_redis", no_redis)
+    monkeypatch.setattr(god_mode, "require_god_mode", lambda user: None)
+
+    async def no_2fa(user, request):
+        return None
+
+    monkeypatch.setattr(god_mode, "require_god_2fa", no_2fa)
+    god_dashboard.dashboard_cache.drop_local()
+
+    async with SessionLocal() as session:
+        first = await god_mode.get_dashboard(request=None, tg_user=None, session=session)
+        second = await god_mode.get_dashboard(request=None, tg_user=None, session=session)
+
+    god_dashboard.dashboard_cache.drop_local()
+    assert calls == 1
+    assert first == second
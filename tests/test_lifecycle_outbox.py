@@ -0,0 +1,153 @@
+"""Order lifecycle outbox: SKIP LOCKED claim with lease, bounded concurrent replay, backoff and dead letter."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.services import lifecycle_outbox
+from bot.services.lifecycle_outbox import (
+    CLAIM_LEASE,
+    MAX_DISPATCH_ATTEMPTS,
+    MSK_TZ,
+    OrderLifecycleOutbox,
+    claim_due_events,
+    mark_event_dispatched,
+    mark_event_failed,
+    replay_due_events,
+    retry_delay,
+)
+from bot.services.order_status_service import OrderLifecycleReplaySummary
+from database.db import Base
+from database.models.order_events import OrderLifecycleDispatchStatus, OrderLifecycleEvent
+from database.models.orders import Order
+
+
+pytest.importorskip("aiosqlite")
+
+NOW = datetime(2026, 10, 14, 15, 30, tzinfo=MSK_TZ)
+
+
+@pytest.fixture
+async def session_maker(tmp_path):
+    # Файл, а не :memory: — у каждой сессии своё соединение, как с пулом PostgreSQL
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'outbox.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def _add_events(session_maker, *states: dict) -> list[int]:
+    async with session_maker() as session:
+        order = Order(user_id=1, work_type="essay")
+        session.add(order)
+        await session.flush()
+        events = [
+            OrderLifecycleEvent(
+                order_id=order.id, user_id=1, event_type="status_changed",
+                status_from="pending", status_to="paid", **state,
+            )
+            for state in states
+        ]
+        session.add_all(events)
+        await session.commit()
+        return [event.id for event in events]
+
+
+def test_failed_event_backs_off_then_dead_letters():
+    assert retry_delay(1, jitter=0) == timedelta(seconds=30)
+    assert retry_delay(4, jitter=0) == timedelta(minutes=4)
+    assert retry_delay(50, jitter=0) == timedelta(hours=6)
+
+    event = OrderLifecycleEvent(dispatch_attempts=3)
+    mark_event_failed(event, "timeout", NOW)
+    assert event.dispatch_status == OrderLifecycleDispatchStatus.FAILED.value
+    assert timedelta(minutes=1.8) <= event.next_attempt_at - NOW <= timedelta(minutes=2.2)
+
+    event.dispatch_attempts = MAX_DISPATCH_ATTEMPTS
+    mark_event_failed(event, "timeout", NOW)
+    assert event.dispatch_status == OrderLifecycleDispatchStatus.DEAD_LETTER.value
+    assert event.next_attempt_at is None
+
+    mark_event_dispatched(event, NOW)
+    assert (event.dispatch_status, event.dispatched_at) == (OrderLifecycleDispatchStatus.DISPATCHED.value, NOW)
+
+
+@pytest.mark.asyncio
+async def test_claim_takes_only_due_events_and_leases_them(session_maker):
+    due_pending, due_failed, backing_off, leased, dispatched, dead = await _add_events(
+        session_maker,
+        {},
+        {"dispatch_status": "failed", "next_attempt_at": NOW - timedelta(seconds=1)},
+        {"dispatch_status": "failed", "next_attempt_at": NOW + timedelta(minutes=5)},
+        {"dispatch_status": "pending", "next_attempt_at": NOW + timedelta(minutes=1)},
+        {"dispatch_status": "dispatched"},
+        {"dispatch_status": "dead_letter"},
+    )
+
+    async with session_maker() as session:
+        assert await claim_due_events(session, now=NOW) == [due_pending, due_failed]
+        # Второй воркер в то же время ничего не получает — lease уже закоммичен
+        assert await claim_due_events(session, now=NOW) == []
+        event = await session.get(OrderLifecycleEvent, due_pending)
+        assert event.next_attempt_at.replace(tzinfo=MSK_TZ) == NOW + CLAIM_LEASE
+
+        # Упавший воркер: после lease событие снова доступно
+        assert await claim_due_events(session, now=NOW + CLAIM_LEASE + timedelta(seconds=1)) == [
+            due_pending, due_failed, leased,
+        ]
+
+
+@pytest.mark.asyncio
+async def test_replay_dispatches_concurrently_within_limit(session_maker, monkeypatch):
+    event_ids = await _add_events(session_maker, *({} for _ in range(6)))
+    active = peak = 0
+
+    async def fake_replay(session, bot, event):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        event.dispatch_attempts += 1
+        if event.id == event_ids[0]:
+            raise RuntimeError("telegram down")
+        mark_event_dispatched(event)
+        await session.commit()
+        return type("Result", (), {"successful": True})()
+
+    monkeypatch.setattr("bot.services.order_status_service.replay_order_lifecycle_event", fake_replay)
+
+    summary = await replay_due_events(session_maker, None, concurrency=3)
+
+    assert (summary.processed, summary.dispatched, summary.failed) == (6, 5, 1)
+    assert 1 < peak <= 3
+    async with session_maker() as session:
+        rows = {e.id: e for e in (await session.execute(select(OrderLifecycleEvent))).scalars()}
+    assert rows[event_ids[0]].dispatch_status == OrderLifecycleDispatchStatus.FAILED.value
+    assert rows[event_ids[0]].last_error == "telegram down"
+    assert rows[event_ids[0]].next_attempt_at is not None
+    assert [rows[i].dispatch_status for i in event_ids[1:]] == ["dispatched"] * 5
+
+
+@pytest.mark.asyncio
+async def test_outbox_run_once_uses_session_maker(monkeypatch):
+    calls = []
+
+    async def fake_replay_due_events(session_maker, bot):
+        calls.append((session_maker, bot))
+        return OrderLifecycleReplaySummary(processed=1, dispatched=1)
+
+    monkeypatch.setattr(lifecycle_outbox, "replay_due_events", fake_replay_due_events)
+
+    bot, session_maker = object(), object()
+    outbox = OrderLifecycleOutbox(bot, session_maker)
+    summary = await outbox.run_once()
+
+    assert calls == [(session_maker, bot)]
+    assert summary.dispatched == 1
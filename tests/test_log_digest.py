@@ -0,0 +1,126 @@
+"""BotLogger digests: low-severity events batched per window, important ones sent at once, cached user stats."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import User as TgUser
+
+from bot.services.logger import DIGEST_TEXT_LIMIT, BotLogger, LogDigest, LogEvent, LogLevel, user_stats_cache
+from core.config import settings
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def send_message(self, **kwargs):
+        self.sent.append(kwargs)
+        return SimpleNamespace(message_id=len(self.sent))
+
+
+class FakeSession:
+    """Отдаёт пользователя на первый запрос и «нет диалога» на второй; считает запросы."""
+
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        value = self.user if self.queries % 2 else None
+        return SimpleNamespace(scalar_one_or_none=lambda: value)
+
+
+def tg_user(user_id: int, name: str = "Анна") -> TgUser:
+    return TgUser(id=user_id, is_bot=False, first_name=name)
+
+
+def db_user(*, is_watched: bool = False):
+    return SimpleNamespace(
+        loyalty_status=("Новичок", 0), orders_count=2, balance=0, total_spent=0,
+        referrals_count=0, admin_notes="", is_banned=False, is_watched=is_watched,
+    )
+
+
+@pytest.fixture
+def bot_logger(monkeypatch):
+    monkeypatch.setattr(settings, "BOT_LOG_DIGEST_WINDOW_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "BOT_LOG_DIGEST_LEVEL", "action")
+    monkeypatch.setattr(settings, "BOT_LOG_DIGEST_MAX_EVENTS", 50)
+    user_stats_cache.drop_local()
+    bot = FakeBot()
+    return BotLogger(bot), bot
+
+
+@pytest.mark.asyncio
+async def test_low_level_events_are_sent_as_one_digest(bot_logger):
+    logger, bot = bot_logger
+
+    for _ in range(3):
+        assert await logger.log(LogEvent.NAV_BUTTON, tg_user(1), details="Меню") is None
+    await logger.log(LogEvent.ORDER_START, tg_user(1), level=LogLevel.ACTION)
+    await logger.log(LogEvent.USER_START, tg_user(2, "Борис"))
+    assert bot.sent == []
+
+    await asyncio.sleep(0.1)
+    assert len(bot.sent) == 1
+    text = bot.sent[0]["text"]
+    assert "событий: 5" in text
+    assert "Нажал кнопку ×3 · Меню" in text
+    assert text.index("Анна") < text.index("Начал заказ") < text.index("Борис")
+    assert bot.sent[0]["disable_notification"] is True
+
+
+@pytest.mark.asyncio
+async def test_warnings_and_loud_logs_skip_the_digest(bot_logger):
+    logger, bot = bot_logger
+
+    assert await logger.log(LogEvent.SPAM_DETECTED, tg_user(1), level=LogLevel.WARNING) == 1
+    assert await logger.log(LogEvent.USER_TERMS_ACCEPT, tg_user(1), silent=False) == 2
+    assert len(logger.digest) == 0
+
+
+@pytest.mark.asyncio
+async def test_digest_flushes_early_at_max_events(bot_logger):
+    logger, bot = bot_logger
+    logger.digest.max_events = 3
+
+    for user_id in range(1, 4):
+        await logger.log(LogEvent.NAV_MENU, tg_user(user_id))
+    await asyncio.sleep(0)
+
+    assert len(bot.sent) == 1 and "событий: 3" in bot.sent[0]["text"]
+
+
+@pytest.mark.asyncio
+async def test_user_stats_are_cached_and_watched_users_logged_immediately(bot_logger):
+    logger, bot = bot_logger
+    session = FakeSession(db_user(is_watched=True))
+
+    await logger.log(LogEvent.NAV_BUTTON, tg_user(7), session=session)
+    await logger.log(LogEvent.NAV_BUTTON, tg_user(7), session=session)
+
+    assert session.queries == 2  # User + Conversation один раз, дальше — кэш
+    assert len(bot.sent) == 2  # На слежке — каждый лог отдельным сообщением
+    assert "НА СЛЕЖКЕ" in bot.sent[0]["text"]
+
+    await logger.log(LogEvent.USER_UNWATCH, tg_user(7), session=session, level=LogLevel.WARNING)
+    assert session.queries == 4  # Слежку сняли — статистика перечитана
+
+
+def test_long_user_block_is_split_by_lines_with_header_first():
+    entries = [
+        ("12:00", LogEvent.NAV_BUTTON, tg_user(1), f"Кнопка {n} " + "x" * 150) for n in range(60)
+    ] + [("12:01", LogEvent.NAV_MENU, tg_user(2, "Борис"), None)]
+
+    texts = LogDigest.render(entries)
+
+    assert len(texts) > 1
+    assert all(len(text) <= DIGEST_TEXT_LIMIT for text in texts)
+    assert texts[0].startswith("🗂") and "Кнопка 0 " in texts[0]
+    assert all("Анна" in text for text in texts[1:])  # Продолжение блока — с тем же пользователем
+    assert sum(text.count("Кнопка ") for text in texts) == 60
+    assert "Борис" in texts[-1]
@@ -0,0 +1,231 @@
+"""Order/revenue rollup: hooks keep counters exact, reconciler repairs drift."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, event, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.services import order_stats
+from bot.services.order_stats import (
+    MSK_TZ,
+    get_daily_stats,
+    get_status_counters,
+    get_total_users,
+    msk_day_start,
+    msk_today,
+    reconcile_order_stats,
+)
+from bot.services.order_status_service import apply_order_status_transition
+from database.db import Base
+from database.models.order_stats import DailyOrderStats, OrderStatusCounter
+from database.models.orders import Order, OrderStatus
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+async def db():
+    order_stats.install_order_stats_tracking()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add_all([
+            User(telegram_id=1, username="a", fullname="A"),
+            User(telegram_id=2, username="b", fullname="B"),
+        ])
+        await session.commit()
+
+    yield SessionLocal, engine
+    order_stats.uninstall_order_stats_tracking()
+    await engine.dispose()
+
+
+def _snapshot(counters: dict) -> dict:
+    return {
+        status: (row.orders_count, Decimal(row.price_sum), row.paid_count, Decimal(row.paid_sum))
+        for status, row in counters.items()
+        if row.orders_count
+    }
+
+
+async def _place_orders(SessionLocal) -> list[int]:
+    async with SessionLocal() as session:
+        orders = [
+            Order(user_id=1, work_type="essay", status=OrderStatus.PENDING.value, price=Decimal("1000")),
+            Order(user_id=1, work_type="essay", status=OrderStatus.WAITING_PAYMENT.value, price=Decimal("3000")),
+            Order(user_id=2, work_type="essay", status=OrderStatus.DRAFT.value),
+        ]
+        session.add_all(orders)
+        await session.commit()
+        return [order.id for order in orders]
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_status_and_payment_changes(db):
+    SessionLocal, _ = db
+    first, second, draft = await _place_orders(SessionLocal)
+
+    async with SessionLocal() as session:
+        order = await session.get(Order, second)
+        order.paid_amount = Decimal("3000")  # Payment confirmed
+        apply_order_status_transition(order, OrderStatus.PAID_FULL.value)
+        await session.commit()
+
+        apply_order_status_transition(order, OrderStatus.COMPLETED.value, force=True)
+        await session.commit()
+
+        await session.delete(await session.get(Order, draft))
+        await session.commit()
+
+    async with SessionLocal() as session:
+        counters = _snapshot(await get_status_counters(session))
+        today = (await get_daily_stats(session, msk_today()))[msk_today()]
+
+    assert counters == {
+        OrderStatus.PENDING.value: (1, Decimal("1000"), 0, Decimal("0")),
+        OrderStatus.COMPLETED.value: (1, Decimal("3000"), 1, Decimal("3000")),
+    }
+    assert (today.orders_created, today.paid_orders, today.completed_count) == (2, 1, 1)
+    assert Decimal(today.completed_revenue) == Decimal("3000")
+    assert today.users_created == 2
+
+    # Incremental state must match a full recount
+    async with SessionLocal() as session:
+        assert await reconcile_order_stats(session, days=None) == 0
+
+
+@pytest.mark.asyncio
+async def test_reopening_completed_order_moves_revenue_back(db):
+    SessionLocal, _ = db
+    order_id, *_ = await _place_orders(SessionLocal)
+    yesterday = msk_today() - timedelta(days=1)
+
+    async with SessionLocal() as session:
+        order = await session.get(Order, order_id)
+        order.paid_amount = Decimal("1000")
+        apply_order_status_transition(order, OrderStatus.COMPLETED.value, force=True)
+        order.completed_at = order_stats.msk_day_start(yesterday).replace(hour=12)
+        await session.commit()
+
+        assert (await get_daily_stats(session, yesterday))[yesterday].completed_count == 1
+
+        apply_order_status_transition(order, OrderStatus.REVISION.value, force=True)
+        await session.commit()
+
+    async with SessionLocal() as session:
+        row = (await get_daily_stats(session, yesterday))[yesterday]
+        assert (row.completed_count, Decimal(row.completed_revenue)) == (0, Decimal("0"))
+        assert await reconcile_order_stats(session, days=None) == 0
+
+
+@pytest.mark.asyncio
+async def test_reconciler_repairs_drift(db):
+    SessionLocal, _ = db
+    await _place_orders(SessionLocal)
+
+    async with SessionLocal() as session:
+        await session.execute(
+            update(OrderStatusCounter)
+            .where(OrderStatusCounter.status == OrderStatus.PENDING.value)
+            .values(orders_count=42)
+        )
+        await session.commit()
+
+    async with SessionLocal() as session:
+        assert await reconcile_order_stats(session) == 1
+        counters = await get_status_counters(session)
+        assert counters[OrderStatus.PENDING.value].orders_count == 1
+        assert await get_total_users(session) == 2
+
+
+@pytest.mark.asyncio
+async def test_dashboards_read_constant_number_of_rows(db):
+    SessionLocal, engine = db
+    async with SessionLocal() as session:
+        session.add_all(
+            Order(user_id=1, work_type="essay", status=OrderStatus.IN_PROGRESS.value, price=Decimal("500"))
+            for _ in range(200)
+        )
+        await session.commit()
+
+    from bot.services.live_cards import render_dashboard
+
+    queries: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, stmt, *args: queries.append(stmt))
+    async with SessionLocal() as session:
+        text = await render_dashboard(session)
+
+    assert len(queries) == 1
+    assert "orders" not in queries[0].split("FROM", 1)[1]
+    assert "<b>В работе:</b> 200" in text
+
+
+@pytest.mark.asyncio
+async def test_stats_are_bucketed_by_moscow_day(db):
+    SessionLocal, _ = db
+    yesterday_evening = order_stats.msk_day_start(msk_today()) - timedelta(minutes=30)
+
+    async with SessionLocal() as session:
+        session.add(Order(
+            user_id=1, work_type="essay", status=OrderStatus.PENDING.value,
+            created_at=yesterday_evening.astimezone(MSK_TZ),
+        ))
+        await session.commit()
+        rows = await get_daily_stats(session, msk_today() - timedelta(days=1))
+
+    assert rows[msk_today() - timedelta(days=1)].orders_created == 1
+
+
+@pytest.mark.asyncio
+async def test_users_outside_window_are_reconciled_by_total(db):
+    SessionLocal, _ = db
+    old_day = msk_today() - timedelta(days=30)
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=3, username="c", fullname="C", created_at=msk_day_start(old_day)))
+        await session.commit()
+        # Дрейф за пределами окна сверки: строка дня потеряна
+        await session.execute(delete(DailyOrderStats).where(DailyOrderStats.day == old_day))
+        await session.commit()
+        assert await get_total_users(session) == 2
+
+        assert await reconcile_order_stats(session) == 1
+        assert await get_total_users(session) == 3
+        assert await reconcile_order_stats(session) == 0
+
+
+@pytest.mark.asyncio
+async def test_counter_rows_are_upserted_in_key_order(db):
+    SessionLocal, engine = db
+    first, second, _ = await _place_orders(SessionLocal)
+    touched: list[str] = []
+
+    def listener(conn, cursor, statement, params, *args):
+        if statement.startswith("INSERT INTO order_status_counters"):
+            touched.append(params[0])
+
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        async with SessionLocal() as session:
+            # Один flush на два заказа: строки всех статусов — одним проходом в порядке ключей
+            orders = [await session.get(Order, order_id) for order_id in (first, second)]
+            for order, status in zip(orders, (OrderStatus.COMPLETED, OrderStatus.IN_PROGRESS)):
+                apply_order_status_transition(order, status.value, force=True)
+            await session.flush()
+            counters = _snapshot(await get_status_counters(session))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert touched == sorted([
+        OrderStatus.PENDING.value, OrderStatus.COMPLETED.value,
+        OrderStatus.WAITING_PAYMENT.value, OrderStatus.IN_PROGRESS.value,
+    ])
+    assert counters[OrderStatus.IN_PROGRESS.value][0] == 1  # Видно в той же транзакции после flush
@@ -0,0 +1,128 @@
+"""Status fan-out: surfaces run concurrently in their own sessions, time out independently, slow ones defer to the outbox."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.services import order_status_service
+from bot.services.order_status_service import (
+    ORDER_EVENT_SURFACE_ACHIEVEMENTS,
+    ORDER_EVENT_SURFACE_CLOSE_TOPIC,
+    ORDER_EVENT_SURFACE_LIVE_CARD,
+    ORDER_EVENT_SURFACE_NOTIFY_USER,
+    OrderStatusChangeResult,
+    OrderStatusDispatchOptions,
+    finalize_order_status_change,
+)
+from database.db import Base
+from database.models.order_events import OrderLifecycleDispatchStatus, OrderLifecycleEvent
+from database.models.orders import Order, OrderStatus
+
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+async def session_maker(tmp_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fanout.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def no_side_effects(_session, _bot, _order, result):
+        return result
+
+    monkeypatch.setattr(order_status_service, "apply_order_status_side_effects", no_side_effects)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def surfaces(monkeypatch):
+    """Fake surfaces that sleep; records (surface, session) and the peak number running at once."""
+    state = {"active": 0, "peak": 0, "calls": [], "delays": {}}
+
+    def fake(surface):
+        async def run(*args, **kwargs):
+            session = kwargs.get("session", args[1] if len(args) > 1 else None)
+            state["calls"].append((surface, session))
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            try:
+                await asyncio.sleep(state["delays"].get(surface, 0.05))
+            finally:
+                state["active"] -= 1
+        return run
+
+    monkeypatch.setattr("bot.services.live_cards.update_live_card", fake(ORDER_EVENT_SURFACE_LIVE_CARD))
+    monkeypatch.setattr("bot.services.unified_hub.close_order_topic", fake(ORDER_EVENT_SURFACE_CLOSE_TOPIC))
+    monkeypatch.setattr(
+        "bot.services.realtime_notifications.send_order_status_notification", fake(ORDER_EVENT_SURFACE_NOTIFY_USER)
+    )
+    monkeypatch.setattr("bot.services.achievements.sync_user_achievements", fake(ORDER_EVENT_SURFACE_ACHIEVEMENTS))
+    return state
+
+
+async def _complete_order(session_maker, **dispatch):
+    async with session_maker() as session:
+        order = Order(user_id=1, work_type="essay", status=OrderStatus.REVIEW.value)
+        session.add(order)
+        await session.commit()
+        order.status = OrderStatus.COMPLETED.value
+        change = OrderStatusChangeResult(
+            old_status=OrderStatus.REVIEW.value,
+            new_status=OrderStatus.COMPLETED.value,
+            changed=True,
+            achievement_sync_required=True,
+        )
+        await finalize_order_status_change(
+            session, object(), order, change,
+            dispatch=OrderStatusDispatchOptions(update_live_card=True, close_topic=True, **dispatch),
+        )
+        lifecycle_event = await session.get(OrderLifecycleEvent, 1)
+        return session, lifecycle_event
+
+
+@pytest.mark.asyncio
+async def test_surfaces_run_concurrently_in_own_sessions(session_maker, surfaces):
+    session, lifecycle_event = await _complete_order(session_maker)
+
+    assert surfaces["peak"] == 3  # Полосы: карточка → топик, уведомление, достижения
+    names = [name for name, _ in surfaces["calls"]]
+    assert names.index(ORDER_EVENT_SURFACE_LIVE_CARD) < names.index(ORDER_EVENT_SURFACE_CLOSE_TOPIC)
+    db_sessions = {s for name, s in surfaces["calls"] if name != ORDER_EVENT_SURFACE_NOTIFY_USER}
+    assert session not in db_sessions and len(db_sessions) == 2  # Своя сессия на каждую DB-полосу
+
+    assert lifecycle_event.dispatch_status == OrderLifecycleDispatchStatus.DISPATCHED.value
+    assert len(lifecycle_event.payload["dispatch_state"]["completed_surfaces"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_slow_surface_times_out_without_blocking_others(session_maker, surfaces, monkeypatch):
+    monkeypatch.setitem(order_status_service.SURFACE_TIMEOUTS, ORDER_EVENT_SURFACE_ACHIEVEMENTS, 0.05)
+    surfaces["delays"][ORDER_EVENT_SURFACE_ACHIEVEMENTS] = 5
+
+    _, lifecycle_event = await _complete_order(session_maker)
+
+    assert lifecycle_event.dispatch_status == OrderLifecycleDispatchStatus.FAILED.value
+    assert lifecycle_event.last_error.startswith("achievements: timeout")
+    assert sorted(lifecycle_event.payload["dispatch_state"]["completed_surfaces"]) == [
+        ORDER_EVENT_SURFACE_CLOSE_TOPIC, ORDER_EVENT_SURFACE_LIVE_CARD, ORDER_EVENT_SURFACE_NOTIFY_USER,
+    ]
+    assert lifecycle_event.next_attempt_at is not None  # Backoff до повтора outbox
+
+
+@pytest.mark.asyncio
+async def test_deferred_surfaces_are_left_to_outbox(session_maker, surfaces, monkeypatch):
+    woken = []
+    monkeypatch.setattr(order_status_service, "wake_lifecycle_outbox", lambda: woken.append(True))
+
+    _, lifecycle_event = await _complete_order(session_maker, defer_slow_surfaces=True)
+
+    assert sorted(name for name, _ in surfaces["calls"]) == [ORDER_EVENT_SURFACE_LIVE_CARD, ORDER_EVENT_SURFACE_NOTIFY_USER]
+    assert lifecycle_event.dispatch_status == OrderLifecycleDispatchStatus.PENDING.value
+    assert lifecycle_event.next_attempt_at is None  # Outbox берёт сразу
+    assert woken == [True]
+    assert "defer_slow_surfaces" not in lifecycle_event.payload["dispatch"]  # Повтор доставит всё
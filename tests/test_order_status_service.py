@@ -267,16 +267,15 @@ async def test_finalize_order_status_change_commits_and_dispatches(monkeypatch):
         ORDER_EVENT_SURFACE_CLOSE_TOPIC,
         ORDER_EVENT_SURFACE_NOTIFY_USER,
     }
-    assert [name for name, _args, _kwargs in calls] == [
-        "side_effects",
-        "live_card",
-        "close_topic",
-        "notify",
-    ]
-    assert calls[1][2]["client_username"] == "saloon"
-    assert calls[1][2]["client_name"] == "Academic Saloon"
-    assert calls[1][2]["extra_text"] == "done"
-    assert calls[3][2] == {
+    names = [name for name, _args, _kwargs in calls]
+    assert names[0] == "side_effects"
+    assert sorted(names[1:]) == ["close_topic", "live_card", "notify"]
+    assert names.index("live_card") < names.index("close_topic")  # Одна полоса: топик закрывается после карточки
+    kwargs_by_name = {name: kwargs for name, _args, kwargs in calls}
+    assert kwargs_by_name["live_card"]["client_username"] == "saloon"
+    assert kwargs_by_name["live_card"]["client_name"] == "Academic Saloon"
+    assert kwargs_by_name["live_card"]["extra_text"] == "done"
+    assert kwargs_by_name["notify"] == {
         "telegram_id": order.user_id,
         "order_id": order.id,
         "new_status": OrderStatus.COMPLETED.value,
@@ -548,6 +547,18 @@ async def test_replay_pending_order_lifecycle_events_summarizes_results(monkeypa
         async def execute(self, _stmt):
             return FakeExecuteResult(self.events)
 
+        async def get(self, _model, event_id):
+            return next(event for event in self.events if event.id == event_id)
+
+        async def commit(self):
+            return None
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
     replayed_ids: list[int] = []
 
     async def fake_replay_order_lifecycle_event(session, bot, lifecycle_event):
@@ -559,8 +570,9 @@ async def test_replay_pending_order_lifecycle_events_summarizes_results(monkeypa
         fake_replay_order_lifecycle_event,
     )
 
+    session = FakeSession([first, second])
     summary = await replay_pending_order_lifecycle_events(
-        FakeSession([first, second]),
+        lambda: session,
         object(),
         limit=10,
     )
@@ -570,4 +582,5 @@ async def test_replay_pending_order_lifecycle_events_summarizes_results(monkeypa
     assert summary.dispatched == 2
     assert summary.failed == 0
     assert summary.skipped == 0
-    assert replayed_ids == [1, 2]
+    assert sorted(replayed_ids) == [1, 2]
+    assert first.next_attempt_at is not None  # Захвачены lease-ом
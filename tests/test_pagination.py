@@ -0,0 +1,159 @@
+"""Keyset pagination: cursor walk, offset compatibility, optional/cached totals."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.api.auth import TelegramUser, get_current_user
+from bot.api.pagination import decode_cursor, encode_cursor, fetch_page, resolve_total, totals_cache
+from bot.api.routers import god_mode, orders as orders_router
+from database.db import Base, get_session
+from database.models.admin_logs import AdminActionLog
+from database.models.orders import Order, OrderStatus
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+TELEGRAM_ID = 555
+ADMIN_ID = 123456789
+BASE_TIME = datetime(2026, 10, 1, 12, 0)
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=TELEGRAM_ID, username="pager", fullname="Pager"))
+        for index in range(25):
+            # Пары заказов с одинаковым created_at: порядок решает id
+            session.add(Order(
+                user_id=TELEGRAM_ID,
+                work_type="essay",
+                status=OrderStatus.PENDING.value if index % 3 else OrderStatus.COMPLETED.value,
+                created_at=BASE_TIME + timedelta(minutes=index // 2),
+            ))
+        for index in range(7):
+            session.add(AdminActionLog(
+                admin_id=ADMIN_ID,
+                action_type="user_ban" if index % 2 else "order_status_change",
+                created_at=BASE_TIME + timedelta(minutes=index),
+            ))
+        await session.commit()
+
+    totals_cache.drop_local()
+    with patch("core.cache.get_redis", AsyncMock(side_effect=ConnectionError("no redis"))):
+        yield SessionLocal, engine
+    totals_cache.drop_local()
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(db):
+    SessionLocal, engine = db
+
+    async def override_session():
+        async with SessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(orders_router.router, prefix="/api")
+    app.include_router(god_mode.router, prefix="/api")
+    current = {"user": TelegramUser(id=TELEGRAM_ID, first_name="Pager")}
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+    app.dependency_overrides[get_session] = override_session
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        yield http, current, engine
+
+
+@pytest.mark.asyncio
+async def test_cursor_walk_matches_full_ordering(db):
+    SessionLocal, _ = db
+    async with SessionLocal() as session:
+        expected = (await session.execute(
+            select(Order.id).order_by(Order.created_at.desc(), Order.id.desc())
+        )).scalars().all()
+
+        seen: list[int] = []
+        cursor = None
+        while True:
+            page = await fetch_page(session, select(Order), Order, limit=4, cursor=cursor)
+            seen += [order.id for order in page.items]
+            if not page.has_more:
+                assert page.next_cursor is None
+                break
+            cursor = page.next_cursor
+
+        assert seen == expected
+
+        legacy = await fetch_page(session, select(Order), Order, limit=4, offset=8)
+        assert [order.id for order in legacy.items] == expected[8:12]
+        assert legacy.has_more
+
+
+def test_cursor_roundtrip_is_opaque():
+    created_at = datetime(2026, 10, 1, 12, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor and "2026" not in cursor
+    decoded = decode_cursor(cursor)
+    assert (decoded.created_at, decoded.id) == (created_at, 42)
+
+
+@pytest.mark.asyncio
+async def test_orders_endpoint_cursor_pages_and_bad_cursor(client):
+    http, _, _ = client
+
+    first = (await http.get("/api/orders", params={"limit": 10})).json()
+    assert first["total"] == 25
+    assert first["has_more"] and first["next_cursor"]
+
+    second = (await http.get("/api/orders", params={"limit": 10, "cursor": first["next_cursor"]})).json()
+    assert second["total"] is None  # Не считаем COUNT на каждой странице
+    assert not {o["id"] for o in first["orders"]} & {o["id"] for o in second["orders"]}
+
+    legacy = (await http.get("/api/orders", params={"limit": 10, "offset": 10})).json()
+    assert [o["id"] for o in legacy["orders"]] == [o["id"] for o in second["orders"]]
+    assert legacy["total"] == 25
+
+    bad = await http.get("/api/orders", params={"cursor": "not-a-cursor"})
+    assert bad.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_god_logs_cursor_and_cached_filtered_total(client, db):
+    http, current, engine = client
+    SessionLocal, _ = db
+    current["user"] = TelegramUser(id=ADMIN_ID, first_name="Admin")
+
+    first = (await http.get("/api/god/logs", params={"limit": 5})).json()
+    assert len(first["logs"]) == 5 and first["total"] is None
+    rest = (await http.get("/api/god/logs", params={"limit": 5, "cursor": first["next_cursor"]})).json()
+    assert len(rest["logs"]) == 2 and not rest["has_more"] and rest["next_cursor"] is None
+
+    filtered = (await http.get("/api/god/logs", params={"action_type": "user_ban", "include_total": True})).json()
+    assert filtered["total"] == 3
+
+    queries: list[str] = []
+    listener = lambda conn, cursor, stmt, *args: queries.append(stmt)  # noqa: E731
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    async with SessionLocal() as session:
+        query = select(AdminActionLog).where(AdminActionLog.action_type == "user_ban")
+        total = await resolve_total(session, query, AdminActionLog, cache_key="test:user_ban", filtered=True)
+        again = await resolve_total(session, query, AdminActionLog, cache_key="test:user_ban", filtered=True)
+    event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert total == again == 3
+    assert len([q for q in queries if "count" in q.lower()]) == 1
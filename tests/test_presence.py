@@ -0,0 +1,191 @@
+"""Mini App presence: heartbeats land in Redis, /live reads only Redis, write-behind flush to user_activities."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.api.auth import TelegramUser, get_current_user
+from bot.api.routers import god_mode
+from bot.services import presence
+from bot.services.presence import MSK_TZ, flush_presence, get_online, record_heartbeat
+from database.db import Base, get_session
+from database.models.admin_logs import UserActivity
+
+
+pytest.importorskip("aiosqlite")
+
+ADMIN_ID = 123456789
+NOW = datetime(2026, 10, 14, 15, 30, tzinfo=MSK_TZ)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    """Hashes, one sorted set, sets — just what the presence store uses."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.sets: dict[str, set[str]] = {}
+
+    async def hsetnx(self, key, field, value):
+        data = self.hashes.setdefault(key, {})
+        if field in data:
+            return 0
+        data[field] = str(value)
+        return 1
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    async def zrevrangebyscore(self, key, high, low):
+        zset = self.zsets.get(key, {})
+        return [m for m, score in sorted(zset.items(), key=lambda item: -item[1]) if score >= low]
+
+    async def zcount(self, key, low, high):
+        return sum(1 for score in self.zsets.get(key, {}).values() if score >= low)
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    async def spop(self, key, count):
+        members = self.sets.get(key, set())
+        popped = [members.pop() for _ in range(min(count, len(members)))]
+        return popped
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+async def env():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_session():
+        async with SessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(god_mode.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: TelegramUser(id=ADMIN_ID, first_name="Admin", username="boss")
+    app.dependency_overrides[get_session] = override_session
+
+    redis = FakeRedis()
+    with patch.object(presence, "get_redis", AsyncMock(return_value=redis)):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client, SessionLocal, engine, redis
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_and_live_never_touch_database(env):
+    client, _, engine, redis = env
+    queries: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, stmt, *a: queries.append(stmt))
+
+    response = await client.post("/api/god/activity", json={"page": "/orders", "platform": "iOS"})
+    assert response.json() == {"success": True, "heartbeat_interval": presence.HEARTBEAT_INTERVAL_SECONDS}
+    await client.post("/api/god/activity", json={"page": "/order", "action": "viewing_order", "order_id": 42})
+
+    live = (await client.get("/api/god/live")).json()
+    assert queries == []
+    assert live["online_count"] == 1
+    user = live["users"][0]
+    assert (user["telegram_id"], user["username"], user["current_page"]) == (ADMIN_ID, "boss", "/order")
+    assert (user["current_action"], user["current_order_id"]) == ("viewing_order", 42)
+    assert str(ADMIN_ID) in redis.sets[presence.DIRTY_KEY]
+
+
+@pytest.mark.asyncio
+async def test_live_window_and_session_start(env):
+    await record_heartbeat(1, page="/a", now=NOW - timedelta(minutes=20))
+    await record_heartbeat(1, page="/b", now=NOW - timedelta(minutes=1))
+    await record_heartbeat(2, page="/c", now=NOW - timedelta(minutes=10))  # Вне окна «онлайн»
+
+    online = await get_online(NOW)
+    assert [p.telegram_id for p in online] == [1]
+    assert online[0].page == "/b"
+    assert online[0].session_duration_minutes == 19  # Сессия началась с первого heartbeat
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_behind_and_marks_stale_offline(env):
+    _, SessionLocal, _, redis = env
+    async with SessionLocal() as session:
+        session.add(UserActivity(telegram_id=3, is_online=True, last_activity_at=NOW - timedelta(hours=1)))
+        await session.commit()
+
+    await record_heartbeat(1, username="a", page="/orders", now=NOW - timedelta(minutes=2))
+    await record_heartbeat(2, page="/profile", order_id=7, now=NOW)
+
+    async with SessionLocal() as session:
+        assert await flush_presence(session, now=NOW, batch=1) == 2
+    assert not redis.sets[presence.DIRTY_KEY]
+
+    await record_heartbeat(1, username="a", page="/support", now=NOW)
+    async with SessionLocal() as session:
+        assert await flush_presence(session, now=NOW) == 1
+        rows = {a.telegram_id: a for a in (await session.execute(select(UserActivity))).scalars()}
+
+    assert (rows[1].current_page, rows[1].username, rows[1].is_online) == ("/support", "a", True)
+    assert (rows[2].current_page, rows[2].current_order_id) == ("/profile", 7)
+    assert rows[3].is_online is False
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_users_dirty(env):
+    _, SessionLocal, _, redis = env
+    await record_heartbeat(1, page="/orders", now=NOW)
+    await record_heartbeat(2, page="/profile", now=NOW)
+
+    async with SessionLocal() as session:
+        with patch.object(presence, "_upsert_activities", AsyncMock(side_effect=RuntimeError("db down"))):
+            with pytest.raises(RuntimeError):
+                await flush_presence(session, now=NOW, batch=1)
+    assert redis.sets[presence.DIRTY_KEY] == {"1", "2"}
+
+    async with SessionLocal() as session:
+        assert await flush_presence(session, now=NOW) == 2
@@ -0,0 +1,196 @@
+"""GET /api/user profile snapshot: Redis hits, ETag/304, commit-driven invalidation."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.api.auth import TelegramUser, get_current_user
+from bot.api.routers import auth as auth_router
+from bot.services import profile_snapshot
+from bot.services.profile_snapshot import MSK_TZ, etag_matches, snapshot_ttl, store_profile_snapshot
+from database.db import Base, get_session
+from database.models.orders import Order, OrderStatus
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+TELEGRAM_ID = 777
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.ops]
+
+
+class FakeRedis:
+    """Strings + hashes; evalsha runs STORE_SCRIPT semantics."""
+
+    def __init__(self):
+        self.strings: dict[str, str] = {}
+        self.hashes: dict[str, dict[str, str]] = {}
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+    async def incr(self, key):
+        self.strings[key] = str(int(self.strings.get(key, 0)) + 1)
+        return int(self.strings[key])
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.strings.pop(key, None)
+            self.hashes.pop(key, None)
+
+    async def hmget(self, key, *fields):
+        data = self.hashes.get(key, {})
+        return [data.get(field) for field in fields]
+
+    async def evalsha(self, sha, numkeys, version_key, snapshot_key, version, etag, body, ttl):
+        assert sha == profile_snapshot.store_script.sha
+        if self.strings.get(version_key, "0") != str(version):
+            return 0
+        self.hashes[snapshot_key] = {"version": str(version), "etag": etag, "body": body}
+        return 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+async def api():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add(User(telegram_id=TELEGRAM_ID, username="snap", fullname="Snap", balance=Decimal("100")))
+        session.add(Order(user_id=TELEGRAM_ID, work_type="essay", status=OrderStatus.PENDING.value))
+        await session.commit()
+
+    async def override_session():
+        async with SessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(auth_router.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: TelegramUser(id=TELEGRAM_ID, first_name="Snap")
+    app.dependency_overrides[get_session] = override_session
+
+    redis = FakeRedis()
+    profile_snapshot.install_profile_snapshot_tracking()
+    with patch.object(profile_snapshot, "get_redis", AsyncMock(return_value=redis)), \
+            patch("core.cache.get_redis", AsyncMock(side_effect=ConnectionError("no redis"))):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client, SessionLocal, engine, redis
+    profile_snapshot.uninstall_profile_snapshot_tracking()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_second_read_is_served_from_redis_without_queries(api):
+    client, _, engine, redis = api
+
+    first = await client.get("/api/user")
+    assert first.status_code == 200
+    assert first.json()["telegram_id"] == TELEGRAM_ID
+    assert f"profile:snap:{TELEGRAM_ID}" in redis.hashes
+
+    queries: list[str] = []
+    listener = lambda conn, cursor, stmt, *args: queries.append(stmt)  # noqa: E731
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    second = await client.get("/api/user")
+    event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert queries == []
+
+
+@pytest.mark.asyncio
+async def test_if_none_match_returns_304(api):
+    client, *_ = api
+
+    first = await client.get("/api/user")
+    etag = first.headers["ETag"]
+
+    not_modified = await client.get("/api/user", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    changed = await client.get("/api/user", headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_balance_change_invalidates_snapshot(api):
+    client, SessionLocal, _, redis = api
+
+    first = await client.get("/api/user")
+    assert first.json()["balance"] == 100
+
+    async with SessionLocal() as session:
+        user = await session.scalar(select(User).where(User.telegram_id == TELEGRAM_ID))
+        user.balance = Decimal("250")
+        await session.commit()
+    await asyncio.sleep(0.01)  # Invalidation runs after commit in the background
+
+    assert f"profile:snap:{TELEGRAM_ID}" not in redis.hashes
+    second = await client.get("/api/user", headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.json()["balance"] == 250
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+
+@pytest.mark.asyncio
+async def test_stale_build_is_not_stored_after_invalidation(api):
+    _, _, _, redis = api
+
+    await profile_snapshot.invalidate_profile_snapshot(TELEGRAM_ID)  # version 0 -> 1
+    assert await store_profile_snapshot(TELEGRAM_ID, "0", "{}", 60) is None
+    assert await store_profile_snapshot(TELEGRAM_ID, "1", "{}", 60) is not None
+
+
+def test_etag_matching_and_ttl_bounds():
+    assert etag_matches('W/"abc", "def"', '"def"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches(None, '"x"')
+
+    now = datetime(2026, 3, 1, 23, 58, tzinfo=MSK_TZ)
+    assert snapshot_ttl([], now) == 120  # Midnight MSK: daily bonus resets
+
+    noon = now.replace(hour=12)
+    paused = Order(user_id=1, work_type="essay", pause_until=noon + timedelta(seconds=30))
+    assert snapshot_ttl([paused], noon) == 30
+    assert snapshot_ttl([], noon) == profile_snapshot.SNAPSHOT_TTL_SECONDS
@@ -0,0 +1,114 @@
+"""Promo usage stats: one grouped query for all promos, cache dropped after promo return commits."""
+
+from __future__ import annotations
+
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.services.promo_analytics import (
+    EMPTY_STATS,
+    get_promo_usage_stat,
+    get_promo_usage_stats,
+    promo_stats_cache,
+)
+from bot.services.promo_service import PromoService
+from database.db import Base
+from database.models.orders import Order, OrderStatus
+from database.models.promocodes import PromoCode, PromoCodeUsage
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add_all([User(telegram_id=1, username="a"), User(telegram_id=2, username="b")])
+        session.add_all([
+            Order(id=1, user_id=1, work_type="essay", status=OrderStatus.PAID.value,
+                  price=Decimal("1000"), discount=Decimal("10"), promo_discount=Decimal("10")),
+            Order(id=2, user_id=2, work_type="essay", status=OrderStatus.PAID.value,
+                  price=Decimal("2000"), promo_discount=Decimal("10")),
+            Order(id=3, user_id=2, work_type="essay", status=OrderStatus.CANCELLED.value,
+                  price=Decimal("500"), promo_discount=Decimal("20")),
+        ])
+        session.add_all([
+            PromoCode(id=1, code="SPRING", discount_percent=10.0, current_uses=2),
+            PromoCode(id=2, code="SUMMER", discount_percent=20.0, current_uses=0),
+            PromoCode(id=3, code="UNUSED", discount_percent=5.0),
+        ])
+        session.add_all([
+            PromoCodeUsage(promocode_id=1, user_id=1, order_id=1, discount_amount=90.0, is_active=True),
+            PromoCodeUsage(promocode_id=1, user_id=2, order_id=2, discount_amount=200.0, is_active=True),
+            PromoCodeUsage(promocode_id=2, user_id=2, order_id=3, discount_amount=100.0, is_active=False),
+        ])
+        await session.commit()
+
+    promo_stats_cache.drop_local()
+    with patch("core.cache.get_redis", AsyncMock(side_effect=ConnectionError("no redis"))):
+        yield SessionLocal, engine
+    promo_stats_cache.drop_local()
+    await engine.dispose()
+
+
+def _count_queries(engine):
+    queries: list[str] = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda conn, cursor, stmt, *a: queries.append(stmt))
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_all_promos_in_one_query_then_cached(db):
+    SessionLocal, engine = db
+    queries = _count_queries(engine)
+
+    async with SessionLocal() as session:
+        stats = await get_promo_usage_stats(session)
+        assert len(queries) == 1
+
+        spring = stats[1]
+        assert (spring.total_usages, spring.active_usages) == (2, 2)
+        assert spring.total_savings == pytest.approx(1000 * 0.9 * 0.1 + 2000 * 0.1)
+        assert spring.recorded_savings == pytest.approx(290.0)
+
+        summer = stats[2]
+        assert (summer.total_usages, summer.active_usages, summer.total_savings) == (1, 0, 0.0)
+        assert 3 not in stats
+
+        assert await get_promo_usage_stat(session, 3) == EMPTY_STATS
+        promo_stats = await PromoService.get_promo_stats(session, 1)
+    assert promo_stats["active_usages"] == 2
+    assert promo_stats["total_savings"] == pytest.approx(290.0)
+    assert not [q for q in queries[1:] if "promocode_usages" in q]  # Served from cache
+
+
+@pytest.mark.asyncio
+async def test_return_promo_usage_invalidates_after_commit(db):
+    SessionLocal, _ = db
+
+    async with SessionLocal() as session:
+        assert (await get_promo_usage_stat(session, 1)).active_usages == 2
+
+    async with SessionLocal() as session:
+        ok, _ = await PromoService.return_promo_usage(session, order_id=2)
+        assert ok
+        # До commit кэш не трогаем: параллельное чтение не должно закэшировать незакоммиченное
+        assert (await get_promo_usage_stat(session, 1)).active_usages == 2
+        await session.commit()
+    await asyncio.sleep(0.01)  # Сброс идёт фоновой задачей после commit
+
+    async with SessionLocal() as session:
+        spring = await get_promo_usage_stat(session, 1)
+    assert (spring.total_usages, spring.active_usages) == (2, 1)
+    assert spring.recorded_savings == pytest.approx(90.0)
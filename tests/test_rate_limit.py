@@ -2,7 +2,20 @@
 
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from bot.api.rate_limit import check_rate_limit, _get_client_ip
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from redis.exceptions import NoScriptError
+
+from bot.api import rate_limit as rl
+from bot.api.rate_limit import (
+    GCRA_SCRIPT,
+    GCRA_SCRIPT_SHA,
+    _get_client_ip,
+    acquire_rate_limit,
+    check_rate_limit,
+    rate_limit,
+    rate_limit_headers_middleware,
+)
 
 
 class TestGetClientIp:
@@ -46,8 +59,7 @@ class TestCheckRateLimit:
     @pytest.mark.asyncio
     async def test_allows_within_limit(self):
         mock_redis = AsyncMock()
-        mock_redis.incr.return_value = 1
-        mock_redis.expire.return_value = True
+        mock_redis.evalsha.return_value = [1, 9, 6000, 0]
 
         mock_get_redis = AsyncMock(return_value=mock_redis)
         with patch("core.redis_pool.get_redis", mock_get_redis):
@@ -57,7 +69,7 @@ class TestCheckRateLimit:
     @pytest.mark.asyncio
     async def test_blocks_over_limit(self):
         mock_redis = AsyncMock()
-        mock_redis.incr.return_value = 11
+        mock_redis.evalsha.return_value = [0, 0, 60000, 6000]
 
         mock_get_redis = AsyncMock(return_value=mock_redis)
         with patch("core.redis_pool.get_redis", mock_get_redis):
@@ -71,3 +83,95 @@ class TestCheckRateLimit:
         with patch("core.redis_pool.get_redis", mock_get_redis):
             result = await check_rate_limit("test:key", limit=10, window_seconds=60)
             assert result is True  # Fail-open
+
+    @pytest.mark.asyncio
+    async def test_single_script_call_per_check(self):
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [1, 9, 6000, 0]
+
+        with patch("core.redis_pool.get_redis", AsyncMock(return_value=mock_redis)):
+            await check_rate_limit("test:key", limit=10, window_seconds=60)
+
+        mock_redis.evalsha.assert_awaited_once_with(GCRA_SCRIPT_SHA, 1, "test:key", 6000, 60000)
+        mock_redis.incr.assert_not_called()
+        mock_redis.expire.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reloads_script_after_flush(self):
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.side_effect = [NoScriptError("NOSCRIPT"), [1, 4, 1000, 0]]
+
+        with patch("core.redis_pool.get_redis", AsyncMock(return_value=mock_redis)):
+            result = await acquire_rate_limit("test:key", limit=5, window_seconds=5, local_prefilter=False)
+
+        mock_redis.script_load.assert_awaited_once_with(GCRA_SCRIPT)
+        assert (result.allowed, result.remaining) == (True, 4)
+
+
+class TestLocalPrefilter:
+    """Requests over the local budget never reach Redis."""
+
+    @pytest.fixture(autouse=True)
+    def _clear_buckets(self):
+        rl._local_buckets.clear()
+        yield
+        rl._local_buckets.clear()
+
+    @pytest.mark.asyncio
+    async def test_rejects_without_redis_hop(self):
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [1, 0, 1000, 0]
+
+        with patch("core.redis_pool.get_redis", AsyncMock(return_value=mock_redis)):
+            results = [await acquire_rate_limit("test:key", limit=3, window_seconds=60) for _ in range(5)]
+
+        assert [r.allowed for r in results] == [True, True, True, False, False]
+        assert mock_redis.evalsha.await_count == 3
+        assert results[-1].retry_after > 0
+
+    def test_bucket_map_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(rl, "LOCAL_BUCKETS_MAX", 2)
+        for i in range(5):
+            rl._local_bucket(f"k{i}", 10, 60)
+        assert list(rl._local_buckets) == ["k3", "k4"]
+
+
+class TestRateLimitHeaders:
+    """Decorated endpoints expose the limiter state."""
+
+    @pytest.fixture
+    def client(self):
+        rl._local_buckets.clear()
+        app = FastAPI()
+        app.middleware("http")(rate_limit_headers_middleware)
+
+        @app.get("/limited")
+        @rate_limit(limit=10, window=60, key_prefix="rl:test")
+        async def limited(request: Request):
+            return {"ok": True}
+
+        yield TestClient(app)
+        rl._local_buckets.clear()
+
+    def test_allowed_response_has_headers(self, client):
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [1, 7, 18000, 0]
+
+        with patch("core.redis_pool.get_redis", AsyncMock(return_value=mock_redis)):
+            response = client.get("/limited")
+
+        assert response.status_code == 200
+        assert response.headers["X-RateLimit-Limit"] == "10"
+        assert response.headers["X-RateLimit-Remaining"] == "7"
+        assert response.headers["X-RateLimit-Reset"] == "18"
+
+    def test_rejected_response_has_retry_after(self, client):
+        mock_redis = AsyncMock()
+        mock_redis.evalsha.return_value = [0, 0, 60000, 4500]
+
+        with patch("core.redis_pool.get_redis", AsyncMock(return_value=mock_redis)):
+            response = client.get("/limited")
+
+        assert response.status_code == 429
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+        assert response.headers["Retry-After"] == "5"
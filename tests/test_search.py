@@ -0,0 +1,113 @@
+"""God Mode search: SQLite ILIKE fallback, username prefix, message snippets, PG query shape."""
+
+from __future__ import annotations
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.api.auth import TelegramUser, get_current_user
+from bot.api.routers import god_mode
+from bot.services.search import make_snippet, normalize_term, order_search_clause, user_search_clause
+from database.db import Base, get_session
+from database.models.orders import Order, OrderMessage
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+ADMIN_ID = 123456789
+
+
+@pytest.fixture
+async def client():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add_all([
+            User(telegram_id=1, username="ivanov", fullname="Пётр Сидоров"),
+            User(telegram_id=2, username="petrov_ivan", fullname="Иван Петров"),
+            User(telegram_id=3, username="ivan", fullname="Иван Иванов"),
+        ])
+        await session.flush()
+        essay = Order(user_id=1, work_type="essay", subject="История", topic="Реформы Петра I")
+        course = Order(user_id=2, work_type="coursework", subject="Экономика", topic="Инфляция 100% за год")
+        session.add_all([essay, course])
+        await session.flush()
+        session.add(OrderMessage(
+            order_id=course.id, sender_type="client", sender_id=2,
+            message_text="Здравствуйте! Нужно добавить главу про денежную массу и обновить список литературы",
+        ))
+        await session.commit()
+
+    async def override_session():
+        async with SessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(god_mode.router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: TelegramUser(id=ADMIN_ID, first_name="Admin")
+    app.dependency_overrides[get_session] = override_session
+
+    with patch("core.cache.get_redis", AsyncMock(side_effect=ConnectionError("no redis"))):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            yield http
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_global_search_finds_orders_users_and_messages(client):
+    result = (await client.get("/api/god/search", params={"q": "Иван"})).json()
+    assert [u["telegram_id"] for u in result["users"]] == [3, 2]  # Пётр Сидоров не совпал по имени
+    assert result["orders"] == []
+
+    by_username = (await client.get("/api/god/search", params={"q": "@ivan", "scope": "users"})).json()
+    assert [u["telegram_id"] for u in by_username["users"]][0] == 3  # Точное совпадение первым
+    assert "orders" not in by_username
+
+    messages = (await client.get("/api/god/search", params={"q": "денежную", "scope": "messages"})).json()
+    assert len(messages["messages"]) == 1
+    assert "денежную массу" in messages["messages"][0]["snippet"]
+
+
+@pytest.mark.asyncio
+async def test_list_search_uses_search_clauses(client):
+    orders = (await client.get("/api/god/orders", params={"search": "Реформы"})).json()
+    assert [o["topic"] for o in orders["orders"]] == ["Реформы Петра I"]
+
+    # % в запросе — литерал, а не wildcard
+    percent = (await client.get("/api/god/orders", params={"search": "100%"})).json()
+    assert len(percent["orders"]) == 1
+    assert (await client.get("/api/god/orders", params={"search": "%"})).json()["orders"][0]["subject"] == "Экономика"
+
+    users = (await client.get("/api/god/users", params={"search": "@petrov"})).json()
+    assert [u["telegram_id"] for u in users["users"]] == [2]
+
+
+def test_postgres_clause_uses_fts_and_escaped_like():
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+
+    sql = str(order_search_clause(session, "50%_off").compile(dialect=postgresql.dialect()))
+    assert "orders.search_vector @@ websearch_to_tsquery" in sql
+    assert "ILIKE" in sql and "ESCAPE" in sql
+
+    params = user_search_clause("@ivan").compile(dialect=postgresql.dialect()).params
+    assert "ivan%" in params.values()
+
+
+def test_normalize_and_snippet():
+    assert normalize_term("  курсовая \n  работа ") == "курсовая работа"
+    assert normalize_term(None) == ""
+    text = "а" * 200 + " ключевое слово " + "б" * 200
+    snippet = make_snippet(text, "ключевое")
+    assert "ключевое" in snippet and snippet.startswith("…") and snippet.endswith("…")
+    assert len(snippet) < 140
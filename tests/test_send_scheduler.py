@@ -0,0 +1,165 @@
+"""Outbound send scheduler: priority lanes, per-chat limits and order, retry_after, edit coalescing, lane limits."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import AnswerCallbackQuery, EditForumTopic, EditMessageText, SendMessage
+
+from bot.services import send_scheduler as module
+from bot.services.send_scheduler import SendQueueFull, SendScheduler, lane_for, send_lane
+from core.config import settings
+from core.token_bucket import TokenBucket
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """Fake make_request: records (method, chat_id, text), optional per-call gates and failures."""
+    monkeypatch.setattr(module, "PRIVATE_CHAT_RATE", 1000)
+    monkeypatch.setattr(settings, "BOT_SEND_GROUP_RATE_PER_MINUTE", 60_000)
+    monkeypatch.setattr(settings, "BOT_SEND_LOGS_RATE_PER_MINUTE", 30_000)
+    state = {"calls": [], "gates": {}, "failures": []}
+
+    async def make_request(bot, method):
+        state["calls"].append((type(method).__name__, method.chat_id, getattr(method, "text", None)))
+        gate = state["gates"].get(method.chat_id)
+        if gate is not None:
+            await gate.wait()
+        if state["failures"]:
+            raise state["failures"].pop(0)
+        return f"ok:{method.chat_id}"
+
+    return make_request, state
+
+
+@pytest.fixture
+async def scheduler():
+    scheduler = SendScheduler()
+    scheduler.bucket = TokenBucket(1000, capacity=1)
+    yield scheduler
+    await scheduler.stop(drain_timeout=1)
+
+
+def send(chat_id: int, text: str = "hi") -> SendMessage:
+    return SendMessage(chat_id=chat_id, text=text)
+
+
+def test_lane_inference(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_IDS", [777])
+    assert lane_for(send(42)) == "customer"
+    assert lane_for(send(777)) == "admin"
+    assert lane_for(send(settings.ADMIN_GROUP_ID)) == "admin"
+    assert lane_for(send(settings.LOG_CHANNEL_ID)) == "logs"
+    assert lane_for(AnswerCallbackQuery(callback_query_id="1")) is None  # Мимо планировщика
+    with send_lane("marketing"):
+        assert lane_for(send(42)) == "marketing"
+    assert lane_for(send(42)) == "customer"
+
+
+@pytest.mark.asyncio
+async def test_higher_lanes_go_first(scheduler, telegram):
+    make_request, state = telegram
+    scheduler.bucket.pause(0.05)  # Все запросы успевают встать в очередь
+
+    async def call(lane: str, chat_id: int):
+        with send_lane(lane):
+            return await scheduler(make_request, None, send(chat_id))
+
+    results = await asyncio.gather(
+        call("marketing", 4), call("logs", 3), call("admin", 2), call("customer", 1),
+    )
+
+    assert results == ["ok:4", "ok:3", "ok:2", "ok:1"]
+    assert [chat_id for _, chat_id, _ in state["calls"]] == [1, 2, 3, 4]
+    metrics = scheduler.metrics()
+    assert metrics["lanes"]["customer"]["sent"] == 1
+    assert metrics["lanes"]["customer"]["latency_ms"]["p95"] <= metrics["lanes"]["marketing"]["latency_ms"]["p95"]
+
+
+@pytest.mark.asyncio
+async def test_chat_order_kept_and_busy_chat_does_not_block_others(scheduler, telegram):
+    make_request, state = telegram
+    state["gates"][1] = asyncio.Event()
+
+    first = asyncio.create_task(scheduler(make_request, None, send(1, "first")))
+    second = asyncio.create_task(scheduler(make_request, None, send(1, "second")))
+    other = asyncio.create_task(scheduler(make_request, None, send(2, "other")))
+    await asyncio.wait_for(other, timeout=1)
+
+    # Второе сообщение в чат 1 ждёт ответа на первое, чат 2 не ждёт никого
+    assert [text for _, _, text in state["calls"]] == ["first", "other"]
+    assert scheduler.metrics()["in_flight"] == 1
+
+    state["gates"][1].set()
+    await asyncio.wait_for(asyncio.gather(first, second), timeout=1)
+    assert [text for _, _, text in state["calls"]] == ["first", "other", "second"]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_retried_transparently(scheduler, telegram):
+    make_request, state = telegram
+    state["failures"].append(TelegramRetryAfter(method=send(5), message="Too Many Requests", retry_after=0))
+
+    assert await asyncio.wait_for(scheduler(make_request, None, send(5)), timeout=1) == "ok:5"
+    assert len(state["calls"]) == 2
+    lane = scheduler.metrics()["lanes"]["customer"]
+    assert (lane["sent"], lane["retried"], lane["failed"]) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_queued_edits_of_one_message_are_coalesced(scheduler, telegram):
+    make_request, state = telegram
+    scheduler.bucket.pause(0.05)
+
+    def edit(text: str) -> EditMessageText:
+        return EditMessageText(chat_id=settings.ORDERS_CHANNEL_ID, message_id=10, text=text)
+
+    results = await asyncio.gather(*(scheduler(make_request, None, edit(f"v{n}")) for n in range(1, 4)))
+
+    assert state["calls"] == [("EditMessageText", settings.ORDERS_CHANNEL_ID, "v3")]
+    assert results == [f"ok:{settings.ORDERS_CHANNEL_ID}"] * 3
+    lane = scheduler.metrics()["lanes"]["admin"]
+    assert (lane["sent"], lane["coalesced"]) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_edits_skip_the_chat_bucket_and_logs_have_their_own(scheduler, telegram, monkeypatch):
+    make_request, state = telegram
+    monkeypatch.setattr(settings, "BOT_SEND_GROUP_RATE_PER_MINUTE", 20)
+    monkeypatch.setattr(settings, "BOT_SEND_LOGS_RATE_PER_MINUTE", 6)
+    group = settings.ADMIN_GROUP_ID
+
+    # Логи выбрали своё ведро — сообщения админки в ту же группу идут без ожидания
+    with send_lane("logs"):
+        await asyncio.gather(*(scheduler(make_request, None, send(group, f"log{n}")) for n in range(module.LOGS_BURST)))
+        queued_log = asyncio.create_task(scheduler(make_request, None, send(group, "late log")))
+        await asyncio.sleep(0.01)
+    assert not queued_log.done()
+    await asyncio.wait_for(scheduler(make_request, None, send(group, "card")), timeout=1)
+
+    # Ведро сообщений группы пусто — edit и правка топика всё равно уходят
+    for n in range(module.GROUP_CHAT_BURST - 1):
+        await scheduler(make_request, None, send(group, f"card{n}"))
+    await asyncio.wait_for(scheduler(make_request, None, EditMessageText(chat_id=group, message_id=1, text="v2")), timeout=1)
+    await asyncio.wait_for(
+        scheduler(make_request, None, EditForumTopic(chat_id=group, message_thread_id=5, name="Заказ")), timeout=1,
+    )
+    queued_log.cancel()
+
+
+@pytest.mark.asyncio
+async def test_full_lane_fails_fast(scheduler, telegram, monkeypatch):
+    make_request, state = telegram
+    monkeypatch.setitem(module.LANE_LIMITS, "marketing", 2)
+    scheduler.bucket.pause(0.05)
+
+    with send_lane("marketing"):
+        queued = [asyncio.create_task(scheduler(make_request, None, send(chat_id))) for chat_id in (1, 2)]
+        await asyncio.sleep(0)
+        with pytest.raises(SendQueueFull):
+            await scheduler(make_request, None, send(3))
+
+    assert await asyncio.wait_for(asyncio.gather(*queued), timeout=1) == ["ok:1", "ok:2"]
+    assert scheduler.metrics()["lanes"]["marketing"]["dropped"] == 1
@@ -0,0 +1,85 @@
+"""Stop words: one compiled matcher, normalisation and word-boundary options, hot reload from Redis."""
+
+from __future__ import annotations
+
+import pytest
+
+from bot.services import stop_words as module
+from bot.services.stop_words import DEFAULT_STOP_WORDS, StopWordMatcher
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values: dict[str, str] = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value):
+        self.values[key] = value
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = FakeRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(module, "get_redis", get_redis)
+    monkeypatch.setattr(module, "_config", module.StopWordsConfig())
+    monkeypatch.setattr(module, "_matcher", None)
+    monkeypatch.setattr(module, "_next_refresh_at", 0.0)
+    return redis
+
+
+def test_words_and_patterns_in_one_pass():
+    matcher = StopWordMatcher(DEFAULT_STOP_WORDS)
+
+    text = "Это ОБМАН! Пишите 8 912 345-67-89 или @other_helper, а лучше в Автор24. Обман же"
+    assert matcher.scan(text) == ["обман", "8 912 345-67-89", "@other_helper", "автор24"]
+    assert matcher.scan("Хочу заказать курсовую к пятнице") == []
+
+
+def test_own_usernames_and_links_are_whitelisted():
+    matcher = StopWordMatcher([])
+    assert matcher.scan("Написал @academicsaloon и в t.me/test_bot") == []
+    assert matcher.scan("Есть ещё t.me/rival_channel") == ["t.me/rival_channel"]
+
+
+def test_cyrillic_normalisation_and_word_boundary():
+    normalized = StopWordMatcher(["мошенник", "возврат денег"])
+    assert normalized.scan("вы MOШEHHИK") == ["мошенник"]  # Латиница вперемешку с кириллицей
+    assert normalized.scan("требую возврат\n денег") == ["возврат денег"]
+
+    plain = StopWordMatcher(["мошенник"], normalize=False)
+    assert plain.scan("вы MOШEHHИK") == []
+
+    bounded = StopWordMatcher(["развод"], word_boundary=True)
+    assert bounded.scan("разводной ключ") == []
+    assert bounded.scan("это развод!") == ["развод"]
+    assert StopWordMatcher(["развод"]).scan("разводной ключ") == ["развод"]
+
+
+def test_findings_are_limited():
+    matcher = StopWordMatcher([f"слово{n}" for n in range(10)])
+    assert len(matcher.scan(" ".join(f"слово{n}" for n in range(10)))) == module.MAX_FINDINGS
+
+
+@pytest.mark.asyncio
+async def test_saved_list_is_applied_and_reloaded_by_other_processes(redis):
+    assert module.get_matcher().scan("кинул") == ["кинул"]
+    assert await module.refresh_matcher() is False  # В Redis пусто — остаётся список по умолчанию
+
+    config = await module.save_stop_words(["Кидалово", " "], word_boundary=True, normalize=False)
+    assert config.words == ["кидалово"]
+    assert module.get_matcher().scan("кинул, кидалово") == ["кидалово"]
+
+    # Другой процесс со старым списком перечитывает Redis
+    module._config = module.StopWordsConfig()
+    module._matcher = None
+    assert await module.refresh_matcher() is True
+    assert module.get_config().word_boundary is True
+    assert module.get_matcher().scan("кидалово") == ["кидалово"]
+    assert not module.refresh_due()
+    assert await module.refresh_matcher() is False  # Версия та же — без пересборки
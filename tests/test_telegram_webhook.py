@@ -0,0 +1,106 @@
+"""Webhook ingestion: secret check, immediate ack, bounded queue with concurrent workers and 503 backpressure."""
+
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from fastapi import FastAPI
+
+from bot.api.routers import telegram_webhook
+from bot.services.update_queue import init_update_queue, reset_update_queue
+from core.config import settings
+
+SECRET = "s3cret"
+WEBHOOK_PATH = settings.BOT_WEBHOOK_PATH
+
+
+def make_update(update_id: int, user_id: int = 1) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Анна"},
+            "text": f"msg {update_id}",
+        },
+    }
+
+
+@pytest.fixture
+async def env(monkeypatch):
+    monkeypatch.setattr(settings, "BOT_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(settings, "BOT_UPDATES_MODE", "webhook")
+    state = {"handled": [], "active": 0, "peak": 0, "release": asyncio.Event()}
+
+    dp = Dispatcher()
+
+    @dp.message()
+    async def handler(message: Message):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await state["release"].wait()
+        state["active"] -= 1
+        state["handled"].append(message.message_id)
+
+    bot = Bot(token="123456:TEST-TOKEN")
+    queue = init_update_queue(dp, bot, workers=3, maxsize=5)
+
+    app = FastAPI()
+    app.include_router(telegram_webhook.router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client, queue, state
+    state["release"].set()
+    await queue.stop(drain_timeout=1)
+    reset_update_queue()
+    await bot.session.close()
+
+
+async def _post(client, update_id: int, secret: str | None = SECRET):
+    headers = {telegram_webhook.SECRET_HEADER: secret} if secret is not None else {}
+    # Разные пользователи — их апдейты обрабатываются параллельно
+    return await client.post(WEBHOOK_PATH, json=make_update(update_id, user_id=update_id), headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_rejects_wrong_or_missing_secret(env):
+    client, queue, _ = env
+    assert (await _post(client, 1, secret="nope")).status_code == 401
+    assert (await _post(client, 2, secret=None)).status_code == 401
+    assert queue.stats.accepted == 0
+
+
+@pytest.mark.asyncio
+async def test_acks_immediately_and_processes_concurrently(env):
+    client, queue, state = env
+
+    for update_id in range(1, 4):
+        # Хендлеры ещё висят, а Telegram уже получил ответ
+        assert (await _post(client, update_id)).status_code == 200
+    await asyncio.sleep(0.05)
+    assert state["peak"] == 3  # Ровно столько, сколько воркеров
+
+    for update_id in range(4, 9):
+        assert (await _post(client, update_id)).status_code == 200
+    assert queue.depth == 5
+
+    response = await _post(client, 9)
+    assert response.status_code == 503  # Очередь полна — Telegram повторит
+    assert response.headers["Retry-After"] == "1"
+
+    state["release"].set()
+    await queue.stop(drain_timeout=1)
+    assert sorted(state["handled"]) == list(range(1, 9))
+    assert (queue.stats.accepted, queue.stats.rejected, queue.stats.processed) == (8, 1, 8)
+
+
+@pytest.mark.asyncio
+async def test_not_found_outside_webhook_mode(env, monkeypatch):
+    client, *_ = env
+    monkeypatch.setattr(settings, "BOT_UPDATES_MODE", "polling")
+    assert (await _post(client, 1)).status_code == 404
@@ -0,0 +1,166 @@
+"""Terms-acceptance cache: accepted users must cost zero DB round-trips."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.services import terms_acceptance
+from core.config import settings
+from database.db import Base
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.sets: dict[str, set[str]] = {}
+
+    async def sismember(self, key, member):
+        return member in self.sets.get(key, set())
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    async def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    @contextmanager
+    def expect(self, expected: int):
+        before = self.count
+        yield
+        assert self.count - before == expected, f"expected {expected} DB queries, got {self.count - before}"
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add(
+            User(telegram_id=501, username="accepted", fullname="Accepted", terms_accepted_at=datetime.now(timezone.utc))
+        )
+        session.add(User(telegram_id=502, username="newbie", fullname="Newbie"))
+        await session.commit()
+
+    yield SessionLocal, QueryCounter(engine)
+    await engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(terms_acceptance, "get_redis", get_redis)
+    terms_acceptance.clear_local_terms_cache()
+    yield redis
+    terms_acceptance.clear_local_terms_cache()
+
+
+@pytest.mark.asyncio
+async def test_accepted_user_hits_db_once(db):
+    SessionLocal, queries = db
+
+    with queries.expect(1):
+        assert await terms_acceptance.is_terms_accepted(501, SessionLocal) is True
+
+    with queries.expect(0):
+        for _ in range(5):
+            assert await terms_acceptance.is_terms_accepted(501, SessionLocal) is True
+
+
+@pytest.mark.asyncio
+async def test_redis_serves_other_workers_without_db(db, fake_redis):
+    SessionLocal, queries = db
+    await terms_acceptance.is_terms_accepted(501, SessionLocal)
+    terms_acceptance.clear_local_terms_cache()  # Simulate a fresh worker
+
+    with queries.expect(0):
+        assert await terms_acceptance.is_terms_accepted(501, SessionLocal) is True
+
+
+@pytest.mark.asyncio
+async def test_mark_and_invalidate(db):
+    SessionLocal, queries = db
+
+    assert await terms_acceptance.is_terms_accepted(502, SessionLocal) is False
+
+    await terms_acceptance.mark_terms_accepted(502)
+    with queries.expect(0):
+        assert await terms_acceptance.is_terms_accepted(502, SessionLocal) is True
+
+    await terms_acceptance.invalidate_terms_acceptance(502)
+    with queries.expect(1):
+        assert await terms_acceptance.is_terms_accepted(502, SessionLocal) is False
+
+
+@pytest.mark.asyncio
+async def test_local_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(terms_acceptance, "LOCAL_MAXSIZE", 2)
+
+    await terms_acceptance.mark_terms_accepted(1)
+    await terms_acceptance.mark_terms_accepted(2)
+    # Hit refreshes recency, so 2 becomes the oldest entry
+    assert await terms_acceptance.is_terms_accepted(1) is True
+    await terms_acceptance.mark_terms_accepted(3)
+
+    assert list(terms_acceptance._local_accepted) == [1, 3]
+
+
+def _init_data(user_id: int) -> str:
+    user_json = json.dumps({"id": user_id, "first_name": "T"}, separators=(",", ":"))
+    auth_date = str(int(time.time()))
+    check = f"auth_date={auth_date}\nuser={user_json}"
+    secret = hmac.new(b"WebAppData", settings.BOT_TOKEN.get_secret_value().encode(), hashlib.sha256).digest()
+    digest = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return f"auth_date={auth_date}&user={quote(user_json)}&hash={digest}"
+
+
+@pytest.mark.asyncio
+async def test_terms_middleware_db_queries_per_request(db, monkeypatch):
+    SessionLocal, queries = db
+    monkeypatch.setattr(terms_acceptance, "_session_maker", lambda: SessionLocal)
+
+    from bot.api.app import create_app
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        accepted = {"X-Telegram-Init-Data": _init_data(501)}
+        newbie = {"X-Telegram-Init-Data": _init_data(502)}
+
+        with queries.expect(1):
+            for _ in range(3):
+                response = await client.get("/api/terms-gate-probe", headers=accepted)
+                assert response.status_code == 404  # Passed the gate, no such route
+
+        with queries.expect(1):
+            response = await client.get("/api/terms-gate-probe", headers=newbie)
+            assert response.status_code == 403
+            assert response.json()["code"] == "TERMS_ACCEPTANCE_REQUIRED"
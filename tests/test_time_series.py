@@ -0,0 +1,162 @@
+"""Time-series layer: DB bucketing in MSK, closed buckets cached, only the open bucket re-queried, edits invalidate."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from bot.handlers import admin_dashboard
+from bot.services import time_series
+from bot.services.time_series import MSK_TZ, bucket_floor, get_series, series_cache
+from database.db import Base
+from database.models.orders import Order, OrderStatus
+from database.models.payment_logs import PaymentLog
+from database.models.transactions import BalanceTransaction
+from database.models.users import User
+
+
+pytest.importorskip("aiosqlite")
+
+NOW = datetime(2026, 10, 14, 15, 30, tzinfo=MSK_TZ)  # Среда
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with SessionLocal() as session:
+        session.add_all([
+            User(telegram_id=1, created_at=NOW - timedelta(days=3)),
+            User(telegram_id=2, referrer_id=1, created_at=NOW - timedelta(minutes=10)),
+        ])
+        session.add_all([
+            Order(user_id=1, work_type="essay", status=OrderStatus.COMPLETED.value,
+                  paid_amount=Decimal("1000"), completed_at=NOW - timedelta(days=2, hours=1)),
+            Order(user_id=1, work_type="essay", status=OrderStatus.COMPLETED.value,
+                  paid_amount=Decimal("500"), completed_at=NOW - timedelta(days=2, hours=3)),
+            Order(user_id=1, work_type="essay", status=OrderStatus.COMPLETED.value,
+                  paid_amount=Decimal("700"), completed_at=NOW - timedelta(minutes=20)),
+            Order(user_id=1, work_type="essay", status=OrderStatus.CANCELLED.value,
+                  paid_amount=Decimal("9999"), completed_at=NOW - timedelta(minutes=20)),
+        ])
+        session.add_all([
+            PaymentLog(yookassa_payment_id="p1", order_id=1, event_type="payment.succeeded",
+                       amount=Decimal("1000"), processed_at=NOW - timedelta(hours=2)),
+            PaymentLog(yookassa_payment_id="p2", order_id=2, event_type="payment.canceled",
+                       amount=Decimal("500"), processed_at=NOW - timedelta(hours=2)),
+        ])
+        session.add_all([
+            BalanceTransaction(user_id=1, amount=Decimal("100"), type="credit", reason="referral_bonus",
+                               created_at=NOW - timedelta(minutes=5)),
+            BalanceTransaction(user_id=1, amount=Decimal("40"), type="debit", reason="order_payment",
+                               created_at=NOW - timedelta(days=9, hours=15)),  # Пн 05.10, 00:30
+        ])
+        await session.commit()
+
+    series_cache.drop_local()
+    with patch("core.cache.get_redis", AsyncMock(side_effect=ConnectionError("no redis"))):
+        yield SessionLocal, engine
+    series_cache.drop_local()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_daily_revenue_buckets_in_msk(db):
+    SessionLocal, _ = db
+    async with SessionLocal() as session:
+        series = await get_series(session, "completed_orders", "day", NOW - timedelta(days=3), NOW)
+
+    assert series.buckets == ["2026-10-11T00:00", "2026-10-12T00:00", "2026-10-13T00:00", "2026-10-14T00:00"]
+    assert series.values["revenue"] == [0.0, 1500.0, 0.0, 700.0]  # Отменённый заказ не считается
+    assert series.values["count"] == [0, 2, 0, 1]
+    assert series.total("revenue") == 2200.0
+
+
+@pytest.mark.asyncio
+async def test_closed_buckets_cached_only_open_bucket_requeried(db):
+    SessionLocal, engine = db
+    captured: list[tuple[str, tuple]] = []
+    listener = lambda conn, cursor, stmt, params, *a: captured.append((stmt, params))  # noqa: E731
+
+    async with SessionLocal() as session:
+        first = await get_series(session, "completed_orders", "hour", NOW - timedelta(days=3), NOW)
+        event.listen(engine.sync_engine, "before_cursor_execute", listener)
+        second = await get_series(session, "completed_orders", "hour", NOW - timedelta(days=3), NOW)
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert first.values == second.values
+    assert len(first.buckets) == 3 * 24 + 1
+    # Второй запрос — только с начала текущего часа
+    assert len(captured) == 1
+    assert "2026-10-14 15:00:00" in str(captured[0][1])
+
+
+@pytest.mark.asyncio
+async def test_edits_of_completed_orders_reset_cached_buckets(db):
+    SessionLocal, _ = db
+    time_series.install_series_tracking()
+    try:
+        async with SessionLocal() as session:
+            before = await get_series(session, "completed_orders", "day", NOW - timedelta(days=3), NOW)
+
+            # God Mode: правка оплаты и force-смена статуса завершённых заказов
+            first, second = await session.get(Order, 1), await session.get(Order, 2)
+            first.paid_amount = Decimal("1200")
+            second.status, second.completed_at = OrderStatus.IN_PROGRESS.value, None
+            await session.commit()
+            await asyncio.gather(*time_series._background_tasks)
+
+            after = await get_series(session, "completed_orders", "day", NOW - timedelta(days=3), NOW)
+    finally:
+        time_series.uninstall_series_tracking()
+
+    assert before.values["revenue"][1] == 1500.0
+    assert after.values["revenue"] == [0.0, 1200.0, 0.0, 700.0]
+    assert after.values["count"] == [0, 1, 0, 1]
+
+
+@pytest.mark.asyncio
+async def test_week_granularity_starts_on_monday(db):
+    SessionLocal, _ = db
+    async with SessionLocal() as session:
+        series = await get_series(session, "bonus_ledger", "week", NOW - timedelta(days=14), NOW)
+
+    assert series.buckets == ["2026-09-28T00:00", "2026-10-05T00:00", "2026-10-12T00:00"]
+    assert series.values["debit"] == [0.0, 40.0, 0.0]
+    assert series.values["referral_bonus"] == [0.0, 0.0, 100.0]
+    assert bucket_floor(NOW, "week") == datetime(2026, 10, 12, tzinfo=MSK_TZ)
+
+
+@pytest.mark.asyncio
+async def test_boss_period_blocks_use_hourly_series(db):
+    SessionLocal, _ = db
+    today_start = NOW.replace(hour=0, minute=0)
+    async with SessionLocal() as session:
+        series = await admin_dashboard._load_period_series(session, NOW - timedelta(days=30), NOW)
+        today = await admin_dashboard._collect_period_stats(session, today_start, series)
+        week = await admin_dashboard._collect_period_stats(session, NOW - timedelta(days=7), series)
+
+    assert (today["new_users"], today["ref_users"]) == (1, 1)
+    assert (today["online_count"], today["online_sum"]) == (1, Decimal("1000.0"))
+    assert (today["ref_bonus_sum"], today["bonus_credit"], today["bonus_debit"]) == (
+        Decimal("100.0"), Decimal("100.0"), Decimal("0.0"),
+    )
+    assert week["new_users"] == 2
+
+
+def test_postgres_buckets_use_date_trunc_in_moscow():
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+    expr = time_series._bucket_expr(session, Order.completed_at, "day")
+    sql = str(select(expr).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "date_trunc('day', timezone('Europe/Moscow', orders.completed_at))" in sql
@@ -0,0 +1,187 @@
+"""Update pipeline: per-user order, cross-user concurrency, bounded queue with backpressure, polling into the queue."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiogram.types import CallbackQuery, Message, Update
+
+from bot.services.update_queue import UpdateQueue, poll_updates, update_key
+
+
+def message_update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "U"},
+            "text": str(update_id),
+        },
+    })
+
+
+def callback_update(update_id: int, user_id: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": "x",
+            "from": {"id": user_id, "is_bot": False, "first_name": "U"},
+            "data": "tap",
+        },
+    })
+
+
+@pytest.fixture
+async def pipeline():
+    """Dispatcher whose handlers block per update until released; records start/finish order."""
+    state = {"started": [], "finished": [], "gates": {}}
+
+    async def handle(update_id: int, user_id: int):
+        state["started"].append((user_id, update_id))
+        gate = state["gates"].setdefault(update_id, asyncio.Event())
+        await gate.wait()
+        state["finished"].append((user_id, update_id))
+
+    dp = Dispatcher()
+
+    @dp.message()
+    async def on_message(message: Message):
+        await handle(message.message_id, message.from_user.id)
+
+    @dp.callback_query()
+    async def on_callback(callback: CallbackQuery):
+        await handle(int(callback.id), callback.from_user.id)
+
+    bot = Bot(token="123456:TEST-TOKEN")
+    queues: list[UpdateQueue] = []
+
+    def make(**kwargs) -> UpdateQueue:
+        queue = UpdateQueue(dp, bot, **kwargs)
+        queue.start()
+        queues.append(queue)
+        return queue
+
+    def release(*update_ids: int):
+        for update_id in update_ids:
+            state["gates"].setdefault(update_id, asyncio.Event()).set()
+
+    yield make, state, release
+    release(*range(1, 200))
+    for queue in queues:
+        await queue.stop(drain_timeout=1)
+    await bot.session.close()
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_key_is_the_acting_user():
+    assert update_key(message_update(1, 42)) == 42
+    assert update_key(callback_update(2, 42)) == 42
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings("ignore:Detected unknown update type")
+async def test_update_without_known_event_is_queued_unordered(pipeline):
+    make, state, release = pipeline
+    queue = make(workers=2, maxsize=10)
+
+    assert update_key(Update(update_id=7)) == ("update", 7)
+    assert queue.submit(Update(update_id=7))
+    await _settle()
+    assert queue.metrics()["queued"] == 0 and queue.metrics()["busy_workers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_same_user_serial_other_users_concurrent(pipeline):
+    make, state, release = pipeline
+    queue = make(workers=4, maxsize=100)
+
+    # Пользователь 1: сообщение и сразу нажатие кнопки; пользователь 2 — своё сообщение
+    for update in (message_update(1, 1), callback_update(2, 1), message_update(3, 2)):
+        assert queue.submit(update)
+    await _settle()
+
+    assert state["started"] == [(1, 1), (2, 3)]  # Второй апдейт пользователя 1 ждёт первого
+    metrics = queue.metrics()
+    assert (metrics["busy_workers"], metrics["queued"], metrics["users_queued"], metrics["max_user_depth"]) == (2, 1, 2, 1)
+
+    release(3)
+    await _settle()
+    assert state["finished"] == [(2, 3)]  # Пользователь 2 не ждал тяжёлый хендлер пользователя 1
+
+    release(1, 2)
+    await _settle()
+    assert state["finished"] == [(2, 3), (1, 1), (1, 2)]
+
+
+@pytest.mark.asyncio
+async def test_global_concurrency_is_bounded_and_fair(pipeline):
+    make, state, release = pipeline
+    queue = make(workers=2, maxsize=100)
+
+    for update_id, user_id in ((1, 1), (2, 1), (3, 2), (4, 3)):
+        queue.submit(message_update(update_id, user_id))
+    await _settle()
+    assert state["started"] == [(1, 1), (2, 3)]
+
+    release(1)
+    await _settle()
+    # Освободившийся воркер берёт следующего по кругу пользователя, а не второй апдейт первого
+    assert state["started"] == [(1, 1), (2, 3), (3, 4)]
+
+
+@pytest.mark.asyncio
+async def test_backpressure_and_per_user_limit(pipeline):
+    make, state, release = pipeline
+    queue = make(workers=1, maxsize=3, per_user_limit=2)
+
+    queue.submit(message_update(1, 1))
+    await _settle()  # В работе, место в очереди освободилось
+    assert queue.submit(message_update(2, 1))
+    assert queue.submit(message_update(3, 1))
+    assert queue.submit(message_update(4, 1))  # Флуд: принят, но отброшен
+    assert queue.submit(message_update(5, 2))
+    assert not queue.submit(message_update(6, 3))  # Очередь полна — webhook ответит 503
+    assert (queue.stats.dropped, queue.stats.rejected, queue.depth) == (1, 1, 3)
+
+    blocked = asyncio.create_task(queue.put(message_update(7, 3)))
+    await _settle()
+    assert not blocked.done()  # Polling ждёт места
+    release(1)
+    await _settle()
+    assert blocked.done()
+    assert queue.depth == 3
+
+
+@pytest.mark.asyncio
+async def test_poll_updates_feeds_queue_and_advances_offset(pipeline):
+    make, state, release = pipeline
+    queue = make(workers=4, maxsize=100)
+    stop = asyncio.Event()
+    batches = [[message_update(1, 1), message_update(2, 2)], [message_update(3, 1)]]
+    offsets = []
+
+    class FakeBot:
+        async def get_updates(self, *, offset, timeout, allowed_updates, request_timeout):
+            offsets.append(offset)
+            if batches:
+                return batches.pop(0)
+            await asyncio.sleep(3600)  # Long poll без апдейтов
+
+    polling = asyncio.create_task(poll_updates(FakeBot(), queue, allowed_updates=None, stop_event=stop))
+    await _settle()
+    release(1, 2, 3)
+    await _settle()
+
+    assert offsets == [None, 3, 4]
+    assert sorted(state["finished"]) == [(1, 1), (1, 3), (2, 2)]
+    stop.set()
+    await asyncio.wait_for(polling, timeout=1)
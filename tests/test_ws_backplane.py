@@ -0,0 +1,155 @@
+"""Tests for cross-process WebSocket delivery through the Redis backplane."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketState
+
+from bot.api.websocket import ConnectionManager
+from bot.api.ws_backplane import BROADCAST_CHANNEL, channel_for_shard
+
+
+class FakeBroker:
+    """In-memory stand-in for Redis PUBLISH/SUBSCRIBE."""
+
+    def __init__(self):
+        self.subscribers: dict[str, set["FakePubSub"]] = {}
+
+    async def publish(self, channel: str, data: str) -> int:
+        receivers = list(self.subscribers.get(channel, ()))
+        for pubsub in receivers:
+            pubsub.queue.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(receivers)
+
+    def pubsub(self, **kwargs):
+        return FakePubSub(self)
+
+
+class FakePubSub:
+    def __init__(self, broker: FakeBroker):
+        self.broker = broker
+        self.channels: set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels)
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.channels.add(channel)
+            self.broker.subscribers.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, *channels):
+        for channel in channels:
+            self.channels.discard(channel)
+            self.broker.subscribers.get(channel, set()).discard(self)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        await self.unsubscribe(*list(self.channels))
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.client_state = WebSocketState.CONNECTED
+        self.sent: list[dict] = []
+        self.delivered = asyncio.Event()
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+        self.delivered.set()
+
+
+async def _make_manager(broker: FakeBroker, shards: int = 8) -> ConnectionManager:
+    async def factory():
+        return broker
+
+    manager = ConnectionManager()
+    await manager.start_backplane(shards=shards, redis_factory=factory)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_event_reaches_socket_on_other_worker():
+    broker = FakeBroker()
+    publisher = await _make_manager(broker)
+    owner = await _make_manager(broker)
+    socket = FakeWebSocket()
+    await owner.connect(socket, 1001)
+
+    try:
+        delivered = await publisher.send_to_user(1001, {"type": "balance_update", "balance": 50})
+        await asyncio.wait_for(socket.delivered.wait(), 1.0)
+        await owner.disconnect(socket, 1001)
+    finally:
+        await publisher.stop_backplane()
+        await owner.stop_backplane()
+
+    assert delivered is True
+    assert socket.sent == [{"type": "balance_update", "balance": 50}]
+
+
+@pytest.mark.asyncio
+async def test_worker_subscribes_only_to_shards_with_local_users():
+    broker = FakeBroker()
+    manager = await _make_manager(broker, shards=8)
+    socket = FakeWebSocket()
+
+    try:
+        await manager.connect(socket, 19)  # shard 3
+        assert manager.backplane._pubsub.channels == {BROADCAST_CHANNEL, channel_for_shard(3)}
+
+        await manager.disconnect(socket, 19)
+        assert manager.backplane._pubsub.channels == {BROADCAST_CHANNEL}
+    finally:
+        await manager.stop_backplane()
+
+
+@pytest.mark.asyncio
+async def test_local_delivery_is_not_duplicated_by_own_publication():
+    broker = FakeBroker()
+    manager = await _make_manager(broker)
+    socket = FakeWebSocket()
+    await manager.connect(socket, 7)
+
+    try:
+        await manager.send_to_user(7, {"type": "refresh"})
+        await asyncio.sleep(0.05)
+        await manager.disconnect(socket, 7)
+    finally:
+        await manager.stop_backplane()
+
+    assert socket.sent == [{"type": "refresh"}]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_every_worker():
+    broker = FakeBroker()
+    first = await _make_manager(broker)
+    second = await _make_manager(broker)
+    local_socket, remote_socket = FakeWebSocket(), FakeWebSocket()
+    await first.connect(local_socket, 1)
+    await second.connect(remote_socket, 2)
+
+    try:
+        await first.broadcast({"type": "notification"})
+        await asyncio.wait_for(remote_socket.delivered.wait(), 1.0)
+        await asyncio.wait_for(local_socket.delivered.wait(), 1.0)
+    finally:
+        await first.stop_backplane()
+        await second.stop_backplane()
+
+    assert local_socket.sent == [{"type": "notification"}]
+    assert remote_socket.sent == [{"type": "notification"}]
@@ -0,0 +1,107 @@
+"""Tests for per-socket outbound queues in the WebSocket ConnectionManager."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from starlette.websockets import WebSocketState
+
+from bot.api.websocket import ClientConnection, ConnectionManager
+
+
+class RecordingWebSocket:
+    def __init__(self, gate: asyncio.Event | None = None):
+        self.client_state = WebSocketState.CONNECTED
+        self.sent: list[dict] = []
+        self.gate = gate
+        self.closed_with = None
+
+    async def accept(self):
+        return None
+
+    async def send_text(self, text):
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_others():
+    manager = ConnectionManager()
+    stuck = RecordingWebSocket(gate=asyncio.Event())
+    fast = RecordingWebSocket()
+    await manager.connect(stuck, 1)
+    await manager.connect(fast, 2)
+
+    await asyncio.wait_for(manager.broadcast({"type": "notification", "title": "hi"}), 0.5)
+    await asyncio.sleep(0.01)
+
+    assert fast.sent == [{"type": "notification", "title": "hi"}]
+    assert stuck.sent == []
+
+    await manager.disconnect(stuck, 1)
+    await manager.disconnect(fast, 2)
+
+
+def test_full_queue_drops_oldest_frame():
+    connection = ClientConnection(RecordingWebSocket(), 1, maxsize=2)
+
+    connection.send({"type": "order_update", "n": 1})
+    connection.send({"type": "order_update", "n": 2})
+    connection.send({"type": "order_update", "n": 3})
+
+    assert connection.queue_depth == 2
+    assert connection.dropped == 1
+    assert [json.loads(slot[1])["n"] for slot in connection._queue] == [2, 3]
+
+
+def test_refresh_frames_are_coalesced():
+    connection = ClientConnection(RecordingWebSocket(), 1)
+
+    connection.send({"type": "refresh", "refresh_type": "orders", "n": 1})
+    connection.send({"type": "order_update", "order_id": 5})
+    connection.send({"type": "refresh", "refresh_type": "orders", "n": 2})
+
+    frames = [json.loads(slot[1]) for slot in connection._queue]
+    assert frames == [
+        {"type": "refresh", "refresh_type": "orders", "n": 2},
+        {"type": "order_update", "order_id": 5},
+    ]
+
+
+def test_refreshes_of_different_types_are_kept():
+    connection = ClientConnection(RecordingWebSocket(), 1)
+
+    connection.send({"type": "refresh", "refresh_type": "orders"})
+    connection.send({"type": "refresh", "refresh_type": "profile"})
+
+    assert [json.loads(slot[1])["refresh_type"] for slot in connection._queue] == ["orders", "profile"]
+
+
+def test_balance_updates_are_not_coalesced():
+    connection = ClientConnection(RecordingWebSocket(), 1)
+
+    connection.send({"type": "balance_update", "balance": 150, "change": 50, "reason": "Бонус"})
+    connection.send({"type": "balance_update", "balance": 100, "change": -50, "reason": "Оплата"})
+
+    assert [json.loads(slot[1])["change"] for slot in connection._queue] == [50, -50]
+
+
+@pytest.mark.asyncio
+async def test_failed_writer_removes_connection(monkeypatch):
+    monkeypatch.setattr("bot.api.websocket.SEND_TIMEOUT_SECONDS", 0.01)
+    manager = ConnectionManager()
+    stuck = RecordingWebSocket(gate=asyncio.Event())
+    await manager.connect(stuck, 42)
+
+    await manager.send_to_user(42, {"type": "notification"})
+    await asyncio.sleep(0.1)
+
+    assert not manager.is_user_connected(42)
+    assert stuck.closed_with == 1011